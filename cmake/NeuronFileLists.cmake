@@ -486,6 +486,7 @@ set(NRNPYTHON_FILES_LIST
     grids.cpp
     rxd.cpp
     rxd_extracellular.cpp
+    rxd_stochastic.cpp
     rxd_intracellular.cpp
     rxd_vol.cpp
     rxd_marching_cubes.c
@@ -33,7 +33,8 @@ Important names and sub-packages
 
 For help on these useful functions, see their docstrings:
 
-  neuron.init, run, psection, load_mechanisms
+  neuron.init, run, psection, load_mechanisms, gather, scatter,
+  morphology, MultiRecorder, RecordFile
 
 
 neuron.h
@@ -364,6 +365,329 @@ def run(tstop):
     h('while (t < tstop) { fadvance() }')
     # what about pc.psolve(tstop)?
 
+def gather(name, sections=None, x=None):
+    """Return a numpy array of the range variable name over sections.
+
+    Parameters
+    ----------
+    name : str
+        a range variable as for segment attributes, e.g. 'v', 'diam',
+        'gnabar_hh', or mechanism qualified 'hh.gnabar' or 'na_ion.ena'.
+        Array range variables take an index, e.g. 'vext[1]'.
+    sections : iterable of Section, optional
+        e.g. a SectionList or a list of sections. Default all sections.
+    x : array_like, optional
+        locations in each section. Default the center of every segment.
+
+    The values are ordered by section and then by location. The symbol is
+    resolved once and the sections are walked in C, so this is much faster
+    than a Python loop over segments.
+    """
+    import numpy
+    if x is not None:
+        x = numpy.ascontiguousarray(x, dtype=float).ravel()
+    return numpy.frombuffer(nrn.gather(name, sections, x), dtype=float)
+
+def scatter(name, sections, values, x=None):
+    """Assign the range variable name over sections from values.
+
+    values is an array_like (or a scalar) in the order returned by
+    gather(name, sections, x). See gather for the other arguments.
+    """
+    import numpy
+    if x is not None:
+        x = numpy.ascontiguousarray(x, dtype=float).ravel()
+    if numpy.ndim(values) == 0:
+        if sections is not None:
+            sections = list(sections)
+        n = len(nrn.gather(name, sections, x)) // 8
+        values = numpy.full(n, values, dtype=float)
+    values = numpy.ascontiguousarray(values, dtype=float).ravel()
+    nrn.scatter(name, sections, values, x)
+
+def morphology(sections=None):
+    """Return the geometry of sections as a dict of numpy arrays.
+
+    sections is an iterable of Section, e.g. a SectionList. Default all
+    sections. The data is collected in C in a single pass, instead of a
+    Python call per 3-d point or segment.
+
+    Per section, in the order of result['sections']:
+        parent       int32 index of the parent section in sections, -1 if
+                     none or not in sections
+        parentx      float64 connection location on the parent, nan if none
+        orientation  float64 end (0 or 1) connected to the parent
+        L            float64 length
+        nseg         int32 number of segments
+    3-d points, rows pt3d_offset[i]:pt3d_offset[i+1] for section i:
+        pt3d         float64 (npt, 5) x, y, z, arc length, diameter
+    Segments, rows seg_offset[i]:seg_offset[i+1] for section i:
+        seg_x        float64 normalized center
+        seg_area     float64 area
+        seg_diam     float64 diam, nan without the morphology mechanism
+        seg_xyz      float64 (n, 3) 3-d center, nan without 3-d points
+
+    Sections without 3-d points have none. Call h.define_shape() first to
+    give them points.
+    """
+    import numpy
+    if sections is not None:
+        sections = list(sections)
+    else:
+        sections = list(h.allsec())
+    arrays = nrn.morphology(sections)
+    types = {'parent': numpy.int32, 'nseg': numpy.int32,
+             'pt3d_offset': numpy.int64, 'seg_offset': numpy.int64}
+    result = dict((name, numpy.frombuffer(a, dtype=types.get(name, float)))
+                  for name, a in arrays.items())
+    result['pt3d'] = result['pt3d'].reshape(-1, 5)
+    result['seg_xyz'] = result['seg_xyz'].reshape(-1, 3)
+    result['sections'] = sections
+    return result
+
+def profile_report():
+    """Return the profile of the fixed step method as a dict.
+
+    pc.profile(1) (pc a ParallelContext) starts measuring the wall time
+    and number of calls, per thread, of the phases of a step and of the
+    cur, jacob and state functions of each mechanism. pc.profile(2) also
+    keeps every call for pc.profile_trace(filename), which writes them in
+    the Chrome trace format. pc.profile(0) stops.
+
+        result['phases'][phase]
+            phase is one of deliver_net_events, setup_tree_matrix,
+            nrn_solve, update, nonvint, rxd, deliver_events and
+            spike_exchange. setup_tree_matrix includes the cur and jacob
+            functions, nonvint the state functions.
+        result['mechanisms'][name][fun]
+            fun is 'cur', 'jacob' or 'state', only those that were called.
+
+    Each of these is a dict with 'time' (seconds) and 'count', lists with
+    an item per thread, and 'total', the sum of 'time'.
+    result['nthread'] is the number of threads profiled.
+    """
+    result = nrn.profile()
+    items = list(result['phases'].values())
+    for funcs in result['mechanisms'].values():
+        items.extend(funcs.values())
+    for item in items:
+        item['total'] = sum(item['time'])
+    return result
+
+_structure_change = None
+class MembListData(object):
+    """Zero-copy numpy views of a range variable over the Memb_list of its
+    mechanism in one thread.
+
+    Parameters
+    ----------
+    name : str
+        a mechanism range variable, e.g. 'hh.m', 'm_hh', 'na_ion.ina' or,
+        for point processes, 'ExpSyn.g'.
+    ithread : int, optional
+        the thread index. Default 0.
+
+    Requires h.CVode().cache_efficient(1). data is a writable view in
+    Memb_list instance order and nodeindices, a read-only copy, gives the
+    index of each instance in the thread's v (and rhs, area, etc.) arrays.
+
+    .. warning::
+
+        data is an array over NEURON's own memory, which moves when the
+        model structure changes (e.g. insert, nseg, new sections or point
+        processes, nthread, cache_efficient). The properties raise after
+        a structure change. Arrays already obtained from them keep the old
+        memory alive, so they are still safe to use, but no longer follow
+        the model. Make a new MembListData after any structure change.
+    """
+
+    def __init__(self, name, ithread=0):
+        import numpy
+        data, nodeindices, count, stride, offset, self._cnt = \
+            nrn.memb_list_data(name, ithread)
+        block = numpy.frombuffer(data, dtype=float).reshape(count, stride)
+        self._data = block[:, offset]
+        self._nodeindices = numpy.frombuffer(nodeindices, dtype=numpy.int32)
+        self.name = name
+        self.ithread = ithread
+
+    @property
+    def valid(self):
+        """False after a structure change has moved the data."""
+        global _structure_change
+        import ctypes
+        if _structure_change is None:
+            _structure_change = [nrn_dll_sym(name, ctypes.c_int) for name in
+                ['structure_change_cnt', 'v_structure_change', 'tree_changed']]
+        cnt, v_structure_change, tree_changed = _structure_change
+        return (cnt.value == self._cnt and not v_structure_change.value
+                and not tree_changed.value)
+
+    def _check(self):
+        if not self.valid:
+            raise RuntimeError('%s Memb_list data moved after a structure '
+                               'change' % self.name)
+
+    @property
+    def data(self):
+        self._check()
+        return self._data
+
+    @property
+    def nodeindices(self):
+        self._check()
+        return self._nodeindices
+
+    def __len__(self):
+        return len(self._data)
+
+class MultiRecorder(object):
+    """Record many variables every dt into one row-major 2D array.
+
+    Parameters
+    ----------
+    signals : str or sequence of pointers
+        a range variable name, as for gather, recorded at the center of
+        every segment of sections (or at x), or a sequence of _ref_
+        pointers, e.g. [h._ref_t, soma(0.5)._ref_v].
+    dt : float
+        the sample interval [ms], as for Vector.record(&var, dt).
+    sections, x : optional
+        as for gather, when signals is a range variable name.
+    capacity : int, optional
+        the number of rows to preallocate. Recording beyond it still
+        works but may reallocate.
+    path : str, optional
+        stream the rows to this file instead of keeping them in memory.
+        Under MPI each rank writes path.<rank> and close() writes an
+        index of the shards to path.
+    chunk : int, optional
+        the number of rows per write when streaming. A background thread
+        writes a full chunk while the next one fills.
+    labels : list of str, optional
+        the column names stored in the stream file. Default 'sec(x).name'
+        for a range variable, none for pointers.
+
+    Each sample appends one row of len(self) values to a single hoc
+    Vector. data is a zero-copy (nrows, ncol) view of it, so fetch it again
+    after a run instead of keeping it. When streaming, data is a read only
+    memory map of the file. See RecordFile for the file format.
+
+    With more than one thread, each thread samples its own variables into
+    their columns of the row, so the variables can be in any thread.
+    """
+
+    def __init__(self, signals, dt, sections=None, x=None, capacity=0,
+                 path=None, chunk=4096, labels=None):
+        self.vector = h.Vector()
+        if isinstance(signals, str):
+            if x is not None:
+                x = [float(xi) for xi in x]
+            sections = list(h.allsec() if sections is None else sections)
+            self.ncol = nrn.record_multi(self.vector, dt, signals, sections, x)
+            if labels is None:
+                labels = ['%s(%g).%s' % (sec.name(), xj, signals)
+                          for sec in sections for xj in
+                          (x if x is not None else [seg.x for seg in sec])]
+        else:
+            self.ncol = nrn.record_multi(self.vector, dt, list(signals))
+        self.dt = dt
+        self.path = path
+        self.file = None
+        if path is not None:
+            pc = h.ParallelContext()
+            self.file = path if pc.nhost() == 1 else '%s.%d' % (path, pc.id())
+            self.labels = list(labels or [])
+            nrn.record_stream(self.vector, self.file, int(chunk),
+                              '\n'.join(self.labels))
+        elif capacity:
+            self.vector.buffer_size(int(capacity) * self.ncol)
+
+    @property
+    def data(self):
+        import numpy
+        if self.file is not None:
+            self.flush()
+            return RecordFile(self.file).data
+        return numpy.asarray(self.vector).reshape(-1, self.ncol)
+
+    @property
+    def t(self):
+        import numpy
+        return numpy.arange(len(self.data)) * self.dt
+
+    def flush(self):
+        """Wait until the streamed rows are on disk."""
+        nrn.record_flush(self.vector)
+
+    def close(self):
+        """Stop recording. When streaming, close the file and, under MPI,
+        write the index of the shards (collective)."""
+        import json
+        if self.file is not None:
+            self.flush()
+            pc = h.ParallelContext()
+            if pc.nhost() > 1:
+                shards = pc.py_gather({'file': os.path.basename(self.file),
+                                       'rank': int(pc.id()),
+                                       'ncol': self.ncol,
+                                       'labels': self.labels}, 0)
+                if pc.id() == 0:
+                    with open(self.path, 'w') as f:
+                        json.dump({'format': 'nrnrec', 'version': 1,
+                                   'dt': self.dt, 'shards': shards}, f)
+        self.vector.play_remove()
+
+    def __len__(self):
+        return self.ncol
+
+class RecordFile(object):
+    """A file written by MultiRecorder(..., path=path), memory mapped.
+
+    The file is a header followed by the rows as native float64. The
+    header, in native byte order, is the 8 bytes 'NRNREC1\\n', the int32
+    header size (the offset of the rows), int32 number of columns, int64
+    number of rows, float64 dt, int32 length of the labels, int32 0 and the
+    column labels separated by newlines. The number of rows is updated after
+    every chunk, so a file can be read while it is being written.
+
+    For the index written by a MultiRecorder under MPI, use
+    RecordFile.shards(path).
+    """
+
+    def __init__(self, path):
+        import numpy
+        import struct
+        with open(path, 'rb') as f:
+            head = f.read(40)
+            if len(head) < 40 or head[:8] != b'NRNREC1\n':
+                raise ValueError('%s is not a MultiRecorder file' % path)
+            hsize, ncol, nrow, self.dt, nlabel, unused = \
+                struct.unpack('=iiqdii', head[8:])
+            labels = f.read(nlabel).decode()
+        self.path = path
+        self.labels = labels.split('\n') if labels else []
+        if nrow:
+            self.data = numpy.memmap(path, dtype=float, mode='r',
+                                     offset=hsize, shape=(nrow, ncol))
+        else:
+            self.data = numpy.empty((0, ncol))
+
+    @property
+    def t(self):
+        import numpy
+        return numpy.arange(len(self.data)) * self.dt
+
+    @staticmethod
+    def shards(path):
+        """The RecordFile of every rank, in rank order, from the index."""
+        import json
+        with open(path) as f:
+            index = json.load(f)
+        folder = os.path.dirname(path)
+        return [RecordFile(os.path.join(folder, shard['file']))
+                for shard in sorted(index['shards'], key=lambda s: s['rank'])]
+
 _nrn_dll = None
 _nrn_hocobj_ptr = None
 _double_ptr = None
@@ -872,41 +1196,6 @@ if not embedded:
     pass
 
 
-def nrnpy_vec_math(op, flag, arg1, arg2=None):
-  import numbers
-  valid_types = (numbers.Number, hoc.HocObject)
-  if isinstance(arg1, valid_types):
-    if flag == 2:
-      # unary
-      arg1 = arg1.c()
-      if op == 'uneg':
-        return arg1.mul(-1)
-      if op == 'upos':
-        return arg1
-      if op == 'uabs':
-        return arg1.abs()
-    elif isinstance(arg2, valid_types):
-      if flag == 1:
-        # either reversed (flag=1) or unary (flag=2)
-        arg2 = arg2.c()
-        if op in ('mul', 'add'):
-          return getattr(arg2, op)(arg1)
-        if op == 'div':
-          return arg2.pow(-1).mul(arg1)
-        if op == 'sub':
-          return arg2.mul(-1).add(arg1)
-      else:
-        arg1 = arg1.c()
-        return getattr(arg1, op)(arg2)
-
-  return NotImplemented
-
-try:
-  nrnpy_vec_math_register = nrn_dll_sym('nrnpy_vec_math_register')
-  nrnpy_vec_math_register(ctypes.py_object(nrnpy_vec_math))
-except:
-  print("Failed to setup nrnpy_vec_math")
-
 try:
   from neuron.psection import psection
   nrn.set_psection(psection)
@@ -82,27 +82,125 @@ def psection(sec):
     results['cm'] = [seg.cm for seg in sec]
 
     if have_rxd:
-        regions = {r() for r in region._all_regions if r() is not None and sec in r().secs}
-        results['regions'] = regions
-
-        my_species = []
-        for sp in species._all_species:
-            sp = sp()
-            if sp is not None:
-                sp_regions = sp._regions
-                if not hasattr(sp_regions, '__len__'):
-                    sp_regions = [sp_regions]
-                if any(r in sp_regions for r in regions):
-                    my_species.append(sp)
-        results['species'] = set(my_species)
-        results['name'] = sec.hname()
-        results['hoc_internal_name'] = sec.hoc_internal_name()
-        results['cell'] = sec.cell()
-
-        #all_active_reactions = [r() for r in rxd_module._all_reactions if r() is not None]
+        _rxd_results(sec, results, region, species)
 
     return results
 
+def _rxd_results(sec, results, region, species):
+    regions = {r() for r in region._all_regions if r() is not None and sec in r().secs}
+    results['regions'] = regions
+
+    my_species = []
+    for sp in species._all_species:
+        sp = sp()
+        if sp is not None:
+            sp_regions = sp._regions
+            if not hasattr(sp_regions, '__len__'):
+                sp_regions = [sp_regions]
+            if any(r in sp_regions for r in regions):
+                my_species.append(sp)
+    results['species'] = set(my_species)
+    results['name'] = sec.hname()
+    results['hoc_internal_name'] = sec.hoc_internal_name()
+    results['cell'] = sec.cell()
+
+    #all_active_reactions = [r() for r in rxd_module._all_reactions if r() is not None]
+
+def model_description(sections=None):
+    """Return the mechanisms of sections (default all) as columns.
+
+    The Prop lists of all the nodes are walked once in C and the names and
+    offsets of the range variables are resolved once per mechanism type,
+    so this is fast for very large models. The result is a dict with
+        sections          the list of sections
+        nseg, L, Ra       per section numpy arrays
+        seg_offset        segments of section i are seg_offset[i]:seg_offset[i+1]
+        cm, diam          per segment numpy arrays
+        mechanisms        {mechanism name: {'present': bool per segment,
+                          range variable name: values per segment}}, nan
+                          where absent. Array variables are 2-d. Ions are
+                          mechanisms, e.g. 'na_ion'.
+        point_processes   {'name', 'section' (index), 'x', 'object'}
+    """
+    import numpy
+    from neuron import h, nrn
+    sections = list(h.allsec() if sections is None else sections)
+    d = nrn.model_description(sections)
+    result = {'sections': sections}
+    for name in ['L', 'Ra', 'cm', 'diam']:
+        result[name] = numpy.frombuffer(d[name], dtype=float)
+    result['nseg'] = numpy.frombuffer(d['nseg'], dtype=numpy.int32)
+    result['seg_offset'] = numpy.concatenate(([0], numpy.cumsum(result['nseg'])))
+    mechs = {}
+    for name, present, variables in d['mechanisms']:
+        mech = {'present': numpy.frombuffer(present, dtype=numpy.bool_)}
+        for varname, size, values in variables:
+            values = numpy.frombuffer(values, dtype=float)
+            mech[varname] = values.reshape(-1, size) if size > 1 else values
+        mechs[name] = mech
+    result['mechanisms'] = mechs
+    pps = d['point_processes']
+    result['point_processes'] = {
+        'name': [pp[0] for pp in pps],
+        'section': numpy.array([pp[1] for pp in pps], dtype=numpy.int32),
+        'x': numpy.array([pp[2] for pp in pps], dtype=float),
+        'object': [pp[3] for pp in pps]}
+    return result
+
+
+def psections(sections=None):
+    """Return [psection(sec) for sec in sections] (default all sections),
+    built from model_description and neuron.morphology instead of per
+    segment Python calls."""
+    from neuron import h, morphology
+    try:
+        from neuron import rxd
+        from neuron.rxd import region, species
+        have_rxd = True
+    except:
+        have_rxd = False
+    desc = model_description(sections)
+    sections = desc['sections']
+    morph = morphology(sections)
+    offset = desc['seg_offset']
+    pt3d_offset = morph['pt3d_offset']
+    pps = [{} for sec in sections]
+    ppinfo = desc['point_processes']
+    for name, isec, obj in zip(ppinfo['name'], ppinfo['section'], ppinfo['object']):
+        pps[isec].setdefault(name, set()).add(obj)
+    all_results = []
+    for i, sec in enumerate(sections):
+        i0, i1 = offset[i], offset[i + 1]
+        center = i0 + min(int(0.5 * (i1 - i0)), i1 - i0 - 1)
+        results = {'point_processes': pps[i], 'density_mechs': {}, 'ions': {}}
+        for mech, columns in desc['mechanisms'].items():
+            if not columns['present'][center]:
+                continue
+            my_results = {}
+            for name, values in columns.items():
+                if name == 'present':
+                    continue
+                key = name[:-(len(mech) + 1)] if name.endswith('_' + mech) else name
+                my_results[key] = values[i0:i1].tolist()
+            if mech.endswith('_ion'):
+                results['ions'][mech[:-4]] = my_results
+            else:
+                results['density_mechs'][mech] = my_results
+        pts = morph['pt3d'][pt3d_offset[i]:pt3d_offset[i + 1]]
+        results['morphology'] = {
+            'L': sec.L,
+            'diam': desc['diam'][i0:i1].tolist(),
+            'pts3d': [(x, y, z, d) for x, y, z, arc, d in pts.tolist()],
+            'parent': sec.parentseg(),
+            'trueparent': sec.trueparentseg()}
+        results['nseg'] = sec.nseg
+        results['Ra'] = sec.Ra
+        results['cm'] = desc['cm'][i0:i1].tolist()
+        if have_rxd:
+            _rxd_results(sec, results, region, species)
+        all_results.append(results)
+    return all_results
+
 if __name__ == '__main__':
     from pprint import pprint
     from neuron import h, rxd
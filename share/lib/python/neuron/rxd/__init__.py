@@ -1,32 +1,122 @@
 from .rxdException import RxDException
+import sys
 
 #import sys
 #if 'neuron.rxd' in sys.modules:
 #    raise RxDException('NEURON CRxD module cannot be used with NEURON RxD module.')
 
-from . import rxd, constants
-from .species import Species, Parameter, State
-from .region import Region, Extracellular
-from .rate import Rate
-from .reaction import Reaction
-from . import geometry
-from .multiCompartmentReaction import MultiCompartmentReaction
-from .rxd import re_init, set_solve_type, nthread
-from .rxdmath import v
-try:
-  from . import dimension3
-except:
-  pass
-from .rangevar import RangeVar
-from .geometry import membrane, inside, Shell, FractionalVolume, FixedCrossSection, FixedPerimeter, ScalableBorder, DistributedBoundary
-from .plugins import set_solver
+# The public names and the submodules that define them. Importing the
+# implementation (numpy, the Cython 3d code, the ctypes bindings and the
+# FInitializeHandlers of rxd.rxd) is deferred to the first use of any of
+# them, e.g. the first rxd.Region, so that importing neuron.rxd is cheap.
+_lazy_names = {
+    'Species': 'species', 'Parameter': 'species', 'State': 'species',
+    'Region': 'region', 'Extracellular': 'region',
+    'Rate': 'rate',
+    'Reaction': 'reaction',
+    'MultiCompartmentReaction': 'multiCompartmentReaction',
+    're_init': 'rxd', 'set_solve_type': 'rxd', 'nthread': 'rxd',
+    'variable_step_statistics': 'rxd', 'save_state': 'rxd',
+    'restore_state': 'rxd',
+    'v': 'rxdmath',
+    'RangeVar': 'rangevar',
+    'membrane': 'geometry', 'inside': 'geometry', 'Shell': 'geometry',
+    'FractionalVolume': 'geometry', 'FixedCrossSection': 'geometry',
+    'FixedPerimeter': 'geometry', 'ScalableBorder': 'geometry',
+    'DistributedBoundary': 'geometry',
+    'set_solver': 'plugins',
+}
 # deprecated:
 # from geometry import ConstantArea, ConstantVolume
 # TODO: if we ever separate Parameter and State from species, then we need to
 #       rembember to call rxd._do_nbs_register()
 
+_lazy_modules = ('rxd', 'constants', 'geometry', 'dimension3')
+
+__all__ = sorted(_lazy_names) + ['RxDException', 'rxd', 'constants',
+                                 'geometry']
+
+
+_loading = False
+
+
+def _load():
+    """Import the implementation and bind the public names."""
+    global _loading
+    _loading = True
+    try:
+        import importlib
+        # rxd first, the submodules import each other in that order
+        from . import rxd, constants, geometry
+        try:
+            from . import dimension3
+        except:
+            pass
+        for module in set(_lazy_names.values()):
+            importlib.import_module('.' + module, __name__)
+        package = sys.modules[__name__]
+        for name, module in _lazy_names.items():
+            setattr(package, name,
+                    getattr(sys.modules[__name__ + '.' + module], name))
+    finally:
+        _loading = False
+
+
+def _loaded():
+    return __name__ + '.rxd' in sys.modules
+
+
+if sys.version_info >= (3, 7):
+    class _Finder(object):
+        """Loads the implementation before a submodule is imported directly,
+        e.g. import neuron.rxd.species, so that the submodules are always
+        imported in the same order."""
+
+        def find_spec(self, fullname, path, target=None):
+            if (not fullname.startswith(__name__ + '.') or _loading
+                    or _loaded()):
+                return None
+            _load()
+            module = sys.modules.get(fullname)
+            if module is None:
+                return None
+            import importlib.util
+            return importlib.util.spec_from_loader(fullname, _Loaded(module))
+
+    class _Loaded(object):
+        """Loader of a submodule that _load already imported."""
+
+        def __init__(self, module):
+            self.module = module
+            self.spec = module.__spec__
+
+        def create_module(self, spec):
+            return self.module
+
+        def exec_module(self, module):
+            module.__spec__ = self.spec
+
+    sys.meta_path.insert(0, _Finder())
+
+    def __getattr__(name):
+        # also the submodules, e.g. rxd.species, that _load imports
+        if not name.startswith('__') and not _loading and not _loaded():
+            _load()
+            if name in globals():
+                return globals()[name]
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+    def __dir__():
+        return sorted(set(globals()) | set(__all__) | set(_lazy_modules))
+else:
+    # no module __getattr__ (PEP 562), import eagerly
+    _load()
+
+
 def _model_view(tree):
-    from . import species
+    if not _loaded():
+        return
+    from . import species, rxd
     from neuron import h
     species_dict = species._get_all_species()
     if 'TreeViewItem' not in dir(h): return
@@ -35,7 +125,5 @@ def _model_view(tree):
         # TODO: do the species disappear if they go out of scope? or does this overcount?
         rxd_species = h.TreeViewItem(rxd_head, '%d Species/State/Parameter' % len(species_dict))
         species_children = [h.TreeViewItem(rxd_species, str(name)) for name in species_dict]
-        rxd_reactions = h.TreeViewItem(rxd_head, '%d Reaction/Rate/MultiCompartmentReaction' % len([r for r in rxd._all_reactions if r() is not None]))        
+        rxd_reactions = h.TreeViewItem(rxd_head, '%d Reaction/Rate/MultiCompartmentReaction' % len([r for r in rxd._all_reactions if r() is not None]))
         tree.append(rxd_head)
-
-
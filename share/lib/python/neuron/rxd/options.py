@@ -12,6 +12,17 @@ concentration_nodes_3d = "surface"
 #          idea, numerically speaking, at least for now
 fixed_step_factor = 1
 
+# the linear solver used by CVode for 3D species:
+#   'adi'    -- a single approximate ADI pass per solve
+#   'krylov' -- matrix-free GMRES, preconditioned by the ADI pass
+variable_step_3d_solver = 'adi'
+
+# the maximum Krylov subspace dimension, number of iterations and relative
+# residual tolerance used by the 'krylov' solver
+krylov_maxl = 5
+krylov_maxiter = 20
+krylov_tol = 0.05
+
 class _OverrideLockouts:
 	def __init__(self):
 		self._extracellular = True
@@ -106,6 +106,8 @@ class Reaction(GeneralizedReaction):
                         rate_b *= k ** v
         rate = rate_f - rate_b
         self._rate_arithmeticed = rate
+        self._rate_f_arithmeticed = rate_f
+        self._rate_b_arithmeticed = rate_b if self._dir == '<>' else None
         
         self._sources = ref_list_with_mult(lhs)
         self._dests = ref_list_with_mult(rhs)
@@ -132,6 +134,7 @@ class Reaction(GeneralizedReaction):
                     ecs_region = [r for r in s._extracellular_instances.keys() if r in ecs_region]
         if ecs_region:
             self._rate_ecs, self._involved_species_ecs = rxdmath._compile(rate, ecs_region)
+        self._ecs_region = ecs_region
         
         # if a region is specified -- use it
         if self._regions and self._regions != [None]:
@@ -156,6 +159,20 @@ class Reaction(GeneralizedReaction):
         if hasattr(self, '_mult'):
             rxd._compile_reactions()
 
+    def _stochastic_rates(self):
+        """Return the forward and backward rates compiled separately, for the
+        stochastic method which fires them as independent channels.
+
+        Each is a tuple of the compiled rate, the compiled extracellular rate
+        and the sign of the change to the species."""
+        rates = []
+        for rate, sign in [(self._rate_f_arithmeticed, 1), (self._rate_b_arithmeticed, -1)]:
+            if rate is None:
+                continue
+            rate_ecs = rxdmath._compile(rate, self._ecs_region)[0] if self._ecs_region else {}
+            rates.append((rxdmath._compile(rate, self._react_regions)[0], rate_ecs, sign))
+        return rates
+
     
     @property
     def f_rate(self):
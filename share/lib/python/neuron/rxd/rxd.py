@@ -11,8 +11,6 @@ from .rxdException import RxDException
 from . import initializer 
 import collections
 import os
-from distutils import sysconfig
-import uuid
 import sys
 import itertools
 from numpy.ctypeslib import ndpointer
@@ -175,6 +173,43 @@ rxd_include_node_flux3D.argtypes = [ctypes.c_int, _int_ptr, _int_ptr, _long_ptr,
                                     _double_ptr,
                                     ctypes.POINTER(ctypes.py_object)]
 
+rxd_set_3d_linear_solver = nrn_dll_sym('rxd_set_3d_linear_solver')
+rxd_set_3d_linear_solver.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                     ctypes.c_double]
+
+rxd_3d_solver_statistics = nrn_dll_sym('rxd_3d_solver_statistics')
+rxd_3d_solver_statistics.argtypes = [_long_ptr, ctypes.c_int]
+
+_3d_linear_solvers = {'adi': 0, 'krylov': 1}
+
+register_stochastic_rate = nrn_dll_sym('register_stochastic_rate')
+register_stochastic_rate.argtypes = [
+    ctypes.c_int,                                                   #num channels
+    numpy.ctypeslib.ndpointer(numpy.uint8, flags='contiguous'),     #signed rate
+    numpy.ctypeslib.ndpointer(ctypes.c_int, flags='contiguous'),    #stoichiometry start
+    numpy.ctypeslib.ndpointer(ctypes.c_int, flags='contiguous'),    #species ids
+    numpy.ctypeslib.ndpointer(ctypes.c_int, flags='contiguous'),    #region ids
+    numpy.ctypeslib.ndpointer(ctypes.c_double, flags='contiguous'), #changes
+    ctypes.c_void_p,                                                #propensity function
+    ]
+
+register_stochastic_reaction_3d = nrn_dll_sym('register_stochastic_reaction_3d')
+register_stochastic_reaction_3d.argtypes = [
+    ctypes.c_int,
+    numpy.ctypeslib.ndpointer(numpy.uint8, flags='contiguous'),
+    numpy.ctypeslib.ndpointer(ctypes.c_int, flags='contiguous'),
+    numpy.ctypeslib.ndpointer(ctypes.c_int, flags='contiguous'),
+    numpy.ctypeslib.ndpointer(ctypes.c_double, flags='contiguous'),
+    ctypes.c_void_p,
+    ]
+
+rxd_set_stochastic = nrn_dll_sym('rxd_set_stochastic')
+rxd_set_stochastic.argtypes = [ctypes.c_int,
+                               numpy.ctypeslib.ndpointer(numpy.double, flags='contiguous'),
+                               ctypes.c_double]
+
+_reaction_methods = {'deterministic': 0, 'stochastic': 1}
+
 _c_headers = """#include <math.h>
 /*Some functions supported by numpy that aren't included in math.h
  * names and arguments match the wrappers used in rxdmath.py
@@ -258,6 +293,7 @@ _dptr = _double_ptr
 _dimensions = collections.defaultdict(lambda: 1)
 _default_dx = 0.25
 _default_method = 'deterministic'
+_stochastic_volumes = None
 
 #CRxD
 _diffusion_d = None
@@ -270,7 +306,12 @@ _diffusion_a_ptr, _diffusion_b_ptr, _diffusion_p_ptr = None, None, None
 def set_solve_type(domain=None, dimension=None, dx=None, nsubseg=None, method=None):
     """Specify the numerical discretization and solver options.
     
-    domain -- a section or Python iterable of sections"""
+    domain -- a section or Python iterable of sections
+    method -- 'deterministic' (default) or 'stochastic'; the stochastic
+              method fires the reactions with tau-leaping on each
+              fixed step, diffusion remains deterministic. It applies to
+              all sections, so domain must not be specified."""
+    global _default_method, _external_solver_initialized
     setting_default = False
     if domain is None:
         domain = h.allsec()
@@ -284,7 +325,13 @@ def set_solve_type(domain=None, dimension=None, dx=None, nsubseg=None, method=No
     
     # domain is now always an iterable (or invalid)
     if method is not None:
-        raise RxDException('using set_solve_type to specify method is not yet implemented')
+        if not setting_default:
+            raise RxDException('the method can only be set for all sections')
+        if method not in _reaction_methods:
+            raise RxDException('invalid option to set_solve_type: method must be one of %s' % ', '.join(sorted(_reaction_methods)))
+        if method != _default_method:
+            _default_method = method
+            _external_solver_initialized = False
     if dimension is not None:
         if dimension not in (1, 3):
             raise RxDException('invalid option to set_solve_type: dimension must be 1 or 3')
@@ -474,7 +521,44 @@ def _find_librxdmath():
             raise RxDException('unable to connect to the librxdmath library')
     return dll
     
-def _c_compile(formula):
+def _localize_3d(rate, gids, param_gids):
+    """Replace the grid ids in a 3D rate with their position in the species
+    (gids) and parameters (param_gids) passed to the reaction"""
+    rate_str = re.sub(r'species_3d\[(\d+)\]', lambda m: "species_3d[%i]" % gids.index(int(m.groups()[0])), rate)
+    return re.sub(r'params_3d\[(\d+)\]', lambda m: "params_3d[%i]" % param_gids.index(int(m.groups()[0])), rate_str)
+
+def _stochastic_channels(header, channels):
+    """Return the C source of the propensity function and the arguments for
+    registering the stochastic channels.
+
+    header -- the declaration of the propensity function, it sets a[k] to
+              the rate of channel k
+    channels -- a list of (rate, signed, [(species_id, region_id, change), ...]);
+                if signed the channel is a Rate and the sign of rate gives the
+                direction of the change
+
+    Channels that do not change any species are dropped."""
+    channels = [(rate, signed, [entry for entry in stoich if entry[2]]) for rate, signed, stoich in channels]
+    channels = [channel for channel in channels if channel[2]]
+    fxn_string = '\n' + header + '\n{'
+    for k, (rate, signed, stoich) in enumerate(channels):
+        fxn_string += '\n\ta[%d] = %s;' % (k, rate)
+    fxn_string += '\n}\n'
+    entries = [entry for channel in channels for entry in channel[2]]
+    signed_rate = numpy.array([channel[1] for channel in channels], dtype=numpy.uint8)
+    stoich_start = numpy.cumsum([0] + [len(channel[2]) for channel in channels]).astype(ctypes.c_int)
+    stoich_species = numpy.array([entry[0] for entry in entries], dtype=ctypes.c_int)
+    stoich_region = numpy.array([entry[1] for entry in entries], dtype=ctypes.c_int)
+    stoich_change = numpy.array([entry[2] for entry in entries], dtype=ctypes.c_double)
+    return fxn_string, (len(channels), signed_rate, stoich_start, stoich_species, stoich_region, stoich_change)
+
+def _c_compile(formula, propensity=False):
+    """Compile the C source in formula and return its reaction function;
+    if propensity is True the propensity function used by the stochastic
+    method is returned as well"""
+    # only needed here, and slow to import
+    from distutils import sysconfig
+    import uuid
     filename = 'rxddll' + str(uuid.uuid1())
     with open(filename + '.c', 'w') as f:
         f.write(formula)
@@ -516,6 +600,8 @@ def _c_compile(formula):
         _windows_dll_files.append(filename + ".so")
     else:
         os.remove(filename + '.so')
+    if propensity:
+        return reaction, dll.propensity
     return reaction
 
 
@@ -1039,6 +1125,7 @@ def _compile_reactions():
     #supporting indexes
     #_windows_remove_dlls()
     clear_rates()
+    _set_reaction_method()
     
     regions_inv = dict() #regions -> reactions that occur there
     species_by_region = dict()
@@ -1236,6 +1323,8 @@ def _compile_reactions():
             ecs_species_ids_used = numpy.zeros((creg.num_ecs_species),bool)
             fxn_string = _c_headers 
             fxn_string += 'void reaction(double** species, double** params, double** rhs, double* mult, double* species_3d, double* params_3d, double* rhs_3d, double** flux, double v)\n{'
+            # stochastic channels: (rate, signed, [(species_id, region_id, change), ...])
+            channels = []
             # declare the "rate" variable if any reactions (non-rates)
             for rprt in creg._react_regions:
                 if not isinstance(rprt(),rate.Rate):
@@ -1259,7 +1348,10 @@ def _compile_reactions():
                             operator = '+=' if species_ids_used[species_id][region_id] else '='
                             fxn_string += "\n\trhs[%d][%d] %s %s;" % (species_id, region_id, operator, rate_str)
                             species_ids_used[species_id][region_id] = True
+                            channels.append((rate_str, True, [(species_id, region_id, 1)]))
                 elif isinstance(r, multiCompartmentReaction.MultiCompartmentReaction):
+                    if _default_method == 'stochastic':
+                        raise RxDException('%r is not supported by the stochastic method' % r)
                     #Lookup the region_id for the reaction
                     try:
                         for reg in r._rate:
@@ -1292,6 +1384,7 @@ def _compile_reactions():
                         mc_mult_count += 1
                     mc_mult_list.extend(r._mult.flatten())
                 else:
+                    stochastic_rates = r._stochastic_rates() if _default_method == 'stochastic' else []
                     for reg in creg._react_regions[rptr]:
                         try:
                             region_id = creg._region_ids[reg()._id]
@@ -1307,7 +1400,16 @@ def _compile_reactions():
                             operator = '+=' if species_ids_used[idx][region_id] else '='
                             species_ids_used[idx][region_id] = True
                             fxn_string += "\n\trhs[%d][%d] %s (%g) * rate;" % (idx, region_id, operator, summed_mults[idx])
+                        for rates, rates_ecs, sign in stochastic_rates:
+                            if reg() in rates:
+                                channels.append((localize_index(creg, rates[reg()][0]), False,
+                                                 [(idx, region_id, sign * summed_mults[idx]) for idx in sorted(summed_mults.keys()) if idx is not None]))
             fxn_string += "\n}\n"
+            if _default_method == 'stochastic':
+                propensity_string, stochastic_args = _stochastic_channels('void propensity(double** species, double** params, double* a, double* mult, double* species_3d, double* params_3d, double v)', channels)
+                reaction, propensity = _c_compile(fxn_string + propensity_string, propensity=True)
+            else:
+                reaction = _c_compile(fxn_string)
             register_rate(creg.num_species, creg.num_params, creg.num_regions,
                           creg.num_segments, creg.get_state_index(),
                           creg.num_ecs_species, creg.num_ecs_params,
@@ -1315,7 +1417,9 @@ def _compile_reactions():
                           mc_mult_count,
                           numpy.array(mc_mult_list, dtype=ctypes.c_double),
                           _list_to_pyobject_array(creg._vptrs),
-                          _c_compile(fxn_string))
+                          reaction)
+            if _default_method == 'stochastic':
+                register_stochastic_rate(*(stochastic_args + (propensity,)))
 
     #Setup intracellular 3D reactions
     if regions_inv_3d:
@@ -1325,6 +1429,7 @@ def _compile_reactions():
             ics_param_gids = set()
             fxn_string = _c_headers
             fxn_string += 'void reaction(double* species_3d, double* params_3d, double*rhs, double* mc3d_mults)\n{'
+            channels = []
             for rptr in [r for rlist in list(regions_inv.values()) for r in rlist]:
                 if not isinstance(rptr(), rate.Rate):
                     fxn_string += '\n\tdouble rate;\n'
@@ -1368,8 +1473,7 @@ def _compile_reactions():
                 r = rptr()
                 if reg not in r._rate:
                     continue
-                rate_str = re.sub(r'species_3d\[(\d+)\]',lambda m: "species_3d[%i]" % [pid for pid,gid in enumerate(all_ics_gids) if gid == int(m.groups()[0])][0], r._rate[reg][-1])
-                rate_str = re.sub(r'params_3d\[(\d+)\]',lambda m: "params_3d[%i]" %  [pid for pid, gid in enumerate(ics_param_gids) if gid == int(m.groups()[0])][0], rate_str)
+                rate_str = _localize_3d(r._rate[reg][-1], all_ics_gids, ics_param_gids)
                 if isinstance(r,rate.Rate):
                     s = r._species()
                     #Get underlying rxd._IntracellularSpecies for the grid_id
@@ -1386,7 +1490,10 @@ def _compile_reactions():
                         ics_grid_ids.append(s._grid_id)
                     pid = [pid for pid,gid in enumerate(all_ics_gids) if gid == s._grid_id][0]
                     fxn_string += "\n\trhs[%d] %s %s;" % (pid, operator, rate_str)
+                    channels.append((rate_str, True, [(pid, 0, 1)]))
                 elif isinstance(r, multiCompartmentReaction.MultiCompartmentReaction):
+                    if _default_method == 'stochastic':
+                        raise RxDException('%r is not supported by the stochastic method' % r)
                     if reg in r._regions:
                         from . import geometry
                         fxn_string += '\n\trate = ' + rate_str + ";"
@@ -1432,6 +1539,7 @@ def _compile_reactions():
                                 
                 else:
                     idx=0
+                    summed_mults = collections.defaultdict(lambda: 0)
                     fxn_string += "\n\trate = %s;" %  rate_str
                     for sp in r._sources + r._dests:
                         s = sp()
@@ -1453,13 +1561,26 @@ def _compile_reactions():
                             ics_grid_ids.append(s._grid_id)
                         pid = [pid for pid,gid in enumerate(all_ics_gids) if gid == s._grid_id][0]
                         fxn_string += "\n\trhs[%d] %s (%s)*rate;" % (pid, operator, r._mult[idx])
+                        summed_mults[pid] += r._mult[idx]
                         idx += 1
+                    if _default_method == 'stochastic':
+                        for rates, rates_ecs, sign in r._stochastic_rates():
+                            if reg in rates:
+                                channels.append((_localize_3d(rates[reg][-1], all_ics_gids, ics_param_gids), False,
+                                                 [(pid, 0, sign * summed_mults[pid]) for pid in sorted(summed_mults.keys())]))
             fxn_string += "\n}\n"
             for i, ele in enumerate(mults):
                 if ele == []:
                     mults[i] = numpy.ones(len(reg._xs))
             mults = list(itertools.chain.from_iterable(mults))
-            ics_register_reaction(0, len(all_ics_gids), len(ics_param_gids), _list_to_cint_array(all_ics_gids + ics_param_gids), numpy.asarray(mc3d_indices_start), mc3d_region_size, numpy.asarray(mults), _c_compile(fxn_string))               
+            if _default_method == 'stochastic':
+                propensity_string, stochastic_args = _stochastic_channels('void propensity(double* species_3d, double* params_3d, double* a)', channels)
+                reaction, propensity = _c_compile(fxn_string + propensity_string, propensity=True)
+            else:
+                reaction = _c_compile(fxn_string)
+            ics_register_reaction(0, len(all_ics_gids), len(ics_param_gids), _list_to_cint_array(all_ics_gids + ics_param_gids), numpy.asarray(mc3d_indices_start), mc3d_region_size, numpy.asarray(mults), reaction)
+            if _default_method == 'stochastic':
+                register_stochastic_reaction_3d(*(stochastic_args[:4] + stochastic_args[5:] + (propensity,)))
     #Setup extracellular reactions
     if len(ecs_regions_inv) > 0:
         for reg in ecs_regions_inv:
@@ -1470,6 +1591,7 @@ def _compile_reactions():
             #TODO: find the nrn include path in python
             #It is necessary for a couple of function in python that are not in math.h
             fxn_string += 'void reaction(double* species_3d, double* params_3d, double* rhs)\n{'
+            channels = []
             # declare the "rate" variable if any reactions (non-rates)
             for rptr in [r for rlist in list(ecs_regions_inv.values()) for r in rlist]:
                 if not isinstance(rptr(),rate.Rate):
@@ -1487,8 +1609,7 @@ def _compile_reactions():
             param_gids = list(param_gids)
             for rptr in ecs_regions_inv[reg]:
                 r = rptr()
-                rate_str = re.sub(r'species_3d\[(\d+)\]',lambda m: "species_3d[%i]" %  [pid for pid, gid in enumerate(all_gids) if gid == int(m.groups()[0])][0], r._rate_ecs[reg][-1])
-                rate_str = re.sub(r'params_3d\[(\d+)\]',lambda m: "params_3d[%i]" %  [pid for pid, gid in enumerate(param_gids) if gid == int(m.groups()[0])][0], rate_str)
+                rate_str = _localize_3d(r._rate_ecs[reg][-1], all_gids, param_gids)
                 if isinstance(r,rate.Rate):
                     s = r._species()
                     #Get underlying rxd._ExtracellularSpecies for the grid_id
@@ -1505,8 +1626,10 @@ def _compile_reactions():
                         grid_ids.append(s._grid_id)
                     pid = [pid for pid,gid in enumerate(all_gids) if gid == s._grid_id][0]
                     fxn_string += "\n\trhs[%d] %s %s;" % (pid, operator, rate_str)
+                    channels.append((rate_str, True, [(pid, 0, 1)]))
                 else:
                     idx=0
+                    summed_mults = collections.defaultdict(lambda: 0)
                     fxn_string += "\n\trate = %s;" %  rate_str
                     for sp in r._sources + r._dests:
                         s = sp()
@@ -1525,16 +1648,31 @@ def _compile_reactions():
                             grid_ids.append(s._grid_id)
                         pid = [pid for pid,gid in enumerate(all_gids) if gid == s._grid_id][0]
                         fxn_string += "\n\trhs[%d] %s (%s)*rate;" % (pid, operator, r._mult[idx])
+                        summed_mults[pid] += r._mult[idx]
                         idx += 1
+                    if _default_method == 'stochastic':
+                        for rates, rates_ecs, sign in r._stochastic_rates():
+                            if reg in rates_ecs:
+                                channels.append((_localize_3d(rates_ecs[reg][-1], all_gids, param_gids), False,
+                                                 [(pid, 0, sign * summed_mults[pid]) for pid in sorted(summed_mults.keys())]))
             fxn_string += "\n}\n"
+            if _default_method == 'stochastic':
+                propensity_string, stochastic_args = _stochastic_channels('void propensity(double* species_3d, double* params_3d, double* a)', channels)
+                reaction, propensity = _c_compile(fxn_string + propensity_string, propensity=True)
+            else:
+                reaction = _c_compile(fxn_string)
             ecs_register_reaction(0, len(all_gids), len(param_gids),
                                   _list_to_cint_array(all_gids + param_gids),
-                                  _c_compile(fxn_string))
+                                  reaction)
+            if _default_method == 'stochastic':
+                register_stochastic_reaction_3d(*(stochastic_args[:4] + stochastic_args[5:] + (propensity,)))
 
 def _init():
     if len(species._all_species) == 0:
         return None
     initializer._do_init()
+    if _default_method == 'stochastic' and _cvode_object.active():
+        raise RxDException('the stochastic method requires fixed step integration')
     # TODO: check about the 0<x<1 problem alluded to in the documentation
     h.define_shape()
 
@@ -1553,6 +1691,110 @@ def _init():
     _setup_matrices()
     _compile_reactions()
     _setup_memb_currents()
+    _set_3d_linear_solver()
+
+def _set_reaction_method():
+    global _stochastic_volumes
+    # the C code keeps a pointer to the volumes
+    _stochastic_volumes = numpy.ascontiguousarray(node._volumes, dtype=float)
+    if _stochastic_volumes.size == 0:
+        _stochastic_volumes = numpy.zeros(1)
+    rxd_set_stochastic(_reaction_methods[_default_method], _stochastic_volumes,
+                       molecules_per_mM_um3)
+
+def _set_3d_linear_solver():
+    try:
+        method = _3d_linear_solvers[options.variable_step_3d_solver]
+    except KeyError:
+        raise RxDException('unknown variable_step_3d_solver: %r' % options.variable_step_3d_solver)
+    rxd_set_3d_linear_solver(method, options.krylov_maxl,
+                             options.krylov_maxiter, options.krylov_tol)
+
+def variable_step_statistics(reset=False):
+    """Return the work done by CVode on the 3D species as a dictionary.
+
+    The counts are of right hand side evaluations ('rhs'), linear solves
+    ('solves'), linear iterations ('iterations') and applications of the ADI
+    preconditioner ('preconditioner'). If reset is True the counters are set
+    to zero after they are read."""
+    stats = (ctypes.c_long * 4)()
+    rxd_3d_solver_statistics(stats, int(reset))
+    return dict(zip(['rhs', 'solves', 'iterations', 'preconditioner'], stats))
+
+# header of the saved state: magic, version, stochastic step, number of node
+# fluxes and the number of state records
+_state_magic = 0x52584453
+_state_version = 1
+_state_header = 5
+_stochastic_step = nrn_dll_sym('_rxd_stochastic_step', ctypes.c_uint32)
+
+def _state_records():
+    """the arrays holding the rxd states, in a fixed order: the 1D states then
+    the 3D grids in the order they were created"""
+    records = [node._states]
+    for s in species._defined_species_by_gid:
+        records.append(s._states.as_numpy())
+    return records
+
+def save_state(filename=None):
+    """Return the rxd states as a binary blob (bytes).
+
+    The blob holds the 1D, 3D intracellular and extracellular states along
+    with the position in the stochastic random streams; it is restored by
+    restore_state. If filename is given the blob is written to that file
+    instead (it can be memory-mapped by restore_state).
+
+    h.SaveState and BBSaveState include this data automatically when rxd is
+    in use."""
+    records = _state_records()
+    header = [_state_magic, _state_version, _stochastic_step.value,
+              len(node._node_fluxes['index']), len(records)]
+    data = numpy.concatenate([numpy.array(header, dtype=float)] +
+                             [numpy.concatenate(([r.size], r)) for r in records])
+    if filename is not None:
+        data.tofile(filename)
+        return None
+    return data.tobytes()
+
+def restore_state(state):
+    """Restore the rxd states from save_state.
+
+    state -- the bytes returned by save_state (or any buffer) or the name
+             of a file written by save_state, which is memory-mapped rather
+             than read.
+
+    The model must have the same species, regions and node fluxes, created
+    in the same order, as when the state was saved, and it must have been
+    initialized."""
+    if isinstance(state, str):
+        data = numpy.memmap(state, dtype=numpy.float64, mode='r')
+    else:
+        data = numpy.frombuffer(state, dtype=numpy.float64)
+    if len(data) < _state_header or data[0] != _state_magic:
+        raise RxDException('not an rxd state')
+    if data[1] != _state_version:
+        raise RxDException('unsupported rxd state version %g' % data[1])
+    if species._all_species and not initializer.is_initialized():
+        raise RxDException('rxd must be initialized before restoring a state')
+    records = _state_records()
+    if data[3] != len(node._node_fluxes['index']) or data[4] != len(records):
+        raise RxDException('the saved rxd state does not match the model')
+    # check all the sizes before changing anything
+    offset = _state_header
+    slices = []
+    for r in records:
+        if offset >= len(data) or data[offset] != r.size:
+            raise RxDException('the saved rxd state does not match the model')
+        slices.append(data[offset + 1 : offset + 1 + r.size])
+        offset += 1 + r.size
+    if offset != len(data):
+        raise RxDException('the saved rxd state does not match the model')
+    for r, values in zip(records, slices):
+        r[:] = values
+    _stochastic_step.value = int(data[2])
+    # update the NEURON concentrations
+    _section1d_transfer_to_legacy()
+    scatter_concentrations()
 
 def _include_flux(force=False):
     from .node import _node_fluxes
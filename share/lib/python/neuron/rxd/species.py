@@ -67,13 +67,19 @@ remove_species_atolscale = nrn_dll_sym('remove_species_atolscale')
 remove_species_atolscale.argtypes = [ctypes.c_int]
 
 _set_grid_concentrations = nrn_dll_sym('set_grid_concentrations')
-_set_grid_concentrations.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.py_object, ctypes.py_object]
+_set_grid_concentrations.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int64, numpy.ctypeslib.ndpointer(dtype=numpy.int64), ctypes.c_int, ctypes.c_int]
+_set_grid_concentrations.restype = ctypes.c_int
 
 _ics_set_grid_concentrations = nrn_dll_sym('ics_set_grid_concentrations')
 _ics_set_grid_concentrations.argtypes = [ctypes.c_int, ctypes.c_int, numpy.ctypeslib.ndpointer(dtype=numpy.int64), numpy.ctypeslib.ndpointer(dtype=numpy.int64), ctypes.py_object]
 
 _set_grid_currents = nrn_dll_sym('set_grid_currents')
-_set_grid_currents.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.py_object, ctypes.py_object, ctypes.py_object]
+_set_grid_currents.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int64, numpy.ctypeslib.ndpointer(dtype=numpy.int64), numpy.ctypeslib.ndpointer(dtype=numpy.float_), ctypes.c_int, ctypes.c_int]
+_set_grid_currents.restype = ctypes.c_int
+
+# offsets of the outside concentration and the current in an ion's data
+_ion_conco_offset = 2
+_ion_cur_offset = 3
 
 _ics_set_grid_currents = nrn_dll_sym('ics_set_grid_currents')
 _ics_set_grid_currents.argtypes = [ctypes.c_int, ctypes.c_int, numpy.ctypeslib.ndpointer(dtype=numpy.int64), numpy.ctypeslib.ndpointer(dtype=numpy.int64), ctypes.py_object, numpy.ctypeslib.ndpointer(dtype=numpy.float_)]
@@ -1064,6 +1070,7 @@ class _ExtracellularSpecies(_SpeciesMathable):
             ion_type = h.ion_register(self._species, self._charge)
             if ion_type == -1:
                 raise RxDException('Unable to register species: %s' % self._species)
+            self._ion_type = int(ion_type)
             # insert the species if not already present
             ion_forms = [self._species + 'i', self._species + 'o', 'i' + self._species, 'e' + self._species]
             for s in h.allsec():
@@ -1133,30 +1140,25 @@ class _ExtracellularSpecies(_SpeciesMathable):
         from .geometry import _surface_areas1d
 
         grid_list = 0
-        grid_indices = []
-        neuron_pointers = []
-        stateo = '_ref_' + self._species + 'o'
-        for sec, indices in self._seg_indices.items():
-            for seg, i in zip(sec, indices):
-                if i is not None:
-                    grid_indices.append(i)
-                    neuron_pointers.append(getattr(seg, stateo))
-        _set_grid_concentrations(grid_list, self._grid_id, grid_indices, neuron_pointers)
+        # one entry for every segment, in h.allsec() order, so the pointers
+        # can be resolved in C without a _ref_ object for each segment
+        secs = list(h.allsec())
+        grid_indices = numpy.fromiter((-1 if i is None else i for sec in secs for i in self._seg_indices[sec]), dtype=numpy.int64)
+        num_locations = len(grid_indices)
+        unresolved = _set_grid_concentrations(grid_list, self._grid_id, num_locations, grid_indices, self._ion_type, _ion_conco_offset)
+        if unresolved:
+            raise RxDException('Unable to locate %so for %d segments' % (self._species, unresolved))
         if isinstance(_defined_species[self._species][self._region](), Parameter):
-            _set_grid_currents(grid_list, self._grid_id, [], [], [])
+            _set_grid_currents(grid_list, self._grid_id, 0, numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0), self._ion_type, _ion_cur_offset)
         else:
             tenthousand_over_charge_faraday = 10000. / (self._charge * h.FARADAY)
             scale_factor = tenthousand_over_charge_faraday / (numpy.prod(self._dx))
-            ispecies = '_ref_i' + self._species
-            neuron_pointers = []
-            scale_factors = []
-            for sec, indices in self._seg_indices.items():
-                for seg, surface_area, i in zip(sec, _surface_areas1d(sec), indices):
-                    if i is not None:
-                        neuron_pointers.append(getattr(seg, ispecies))
-                        scale_factors.append(float(scale_factor * surface_area))
+            scale_factors = numpy.fromiter((area for sec in secs for area in _surface_areas1d(sec)), dtype=numpy.float_, count=num_locations)
+            scale_factors *= scale_factor
             #TODO: MultiCompartment reactions ?
-            _set_grid_currents(grid_list, self._grid_id, grid_indices, neuron_pointers, scale_factors)
+            unresolved = _set_grid_currents(grid_list, self._grid_id, num_locations, grid_indices, scale_factors, self._ion_type, _ion_cur_offset)
+            if unresolved:
+                raise RxDException('Unable to locate i%s for %d segments' % (self._species, unresolved))
     
     def _semi_compile(self, reg, instruction):
 
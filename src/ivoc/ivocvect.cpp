@@ -140,10 +140,10 @@ extern "C" {
 
 extern "C" int hoc_return_type_code;
 
-IvocVect::IvocVect(Object* o) : ParentVect(){obj_ = o; label_ = NULL; MUTCONSTRUCT(0)}
-IvocVect::IvocVect(int l, Object* o) : ParentVect(l){obj_ = o; label_ = NULL; MUTCONSTRUCT(0)}
-IvocVect::IvocVect(int l, double fill_value, Object* o) : ParentVect(l, fill_value){obj_ = o; label_ = NULL; MUTCONSTRUCT(0)}
-IvocVect::IvocVect(IvocVect& v, Object* o) : ParentVect(v) {obj_ = o; label_ = NULL; MUTCONSTRUCT(0)}
+IvocVect::IvocVect(Object* o) : ParentVect(){obj_ = o; label_ = NULL; nexport_ = 0; retired_ = NULL; MUTCONSTRUCT(0)}
+IvocVect::IvocVect(int l, Object* o) : ParentVect(l){obj_ = o; label_ = NULL; nexport_ = 0; retired_ = NULL; MUTCONSTRUCT(0)}
+IvocVect::IvocVect(int l, double fill_value, Object* o) : ParentVect(l, fill_value){obj_ = o; label_ = NULL; nexport_ = 0; retired_ = NULL; MUTCONSTRUCT(0)}
+IvocVect::IvocVect(IvocVect& v, Object* o) : ParentVect(v) {obj_ = o; label_ = NULL; nexport_ = 0; retired_ = NULL; MUTCONSTRUCT(0)}
 
 IvocVect::~IvocVect(){
 	MUTDESTRUCT
@@ -202,10 +202,70 @@ IvocVect* IvocVect::subvec(int start, int end) {
 	return subvec_;
 }
 
+/*
+A Python buffer (memoryview, numpy array) of a Vector points at its data.
+When the Vector needs new data space while buffers exist, the old data
+is kept, with the number of buffers using it, until they are all
+released. Those buffers then no longer see the Vector values.
+*/
+struct IvocVectRetired {
+	double* s;
+	int nexport;
+	IvocVectRetired* next;
+};
+
+void IvocVect::export_acquire() {
+	++nexport_;
+}
+
+void IvocVect::export_release(double* y) {
+	if (y == s && nexport_) {
+		--nexport_;
+		return;
+	}
+	IvocVectRetired* r, *prev = NULL;
+	for (r = retired_; r; prev = r, r = r->next) {
+		if (r->s == y) {
+			if (--r->nexport == 0) {
+				if (prev) {
+					prev->next = r->next;
+				}else{
+					retired_ = r->next;
+				}
+				delete [] r->s;
+				delete r;
+			}
+			return;
+		}
+	}
+}
+
+// replace the exported data by a copy with space for n values
+void IvocVect::export_retire(int n) {
+	IvocVectRetired* r = new IvocVectRetired;
+	r->s = s;
+	r->nexport = nexport_;
+	r->next = retired_;
+	retired_ = r;
+	nexport_ = 0;
+	double* y = new double[n];
+	if (len > n) {
+		len = n;
+	}
+	for (int i=0; i < len; ++i) {
+		y[i] = s[i];
+	}
+	space = n;
+	s = y;
+}
+
 void IvocVect::resize(int newlen) { // all that for this
 	long oldcap = capacity();
 	if (newlen > space) {
 		notify_freed_val_array(vec(), capacity());
+		if (nexport_) {
+			export_retire(newlen);
+		}
 	}
 	ParentVect::resize(newlen);
 	for (;oldcap < newlen; ++oldcap) {
@@ -1281,6 +1341,10 @@ int IvocVect::buffer_size() {
 }
 
 void IvocVect::buffer_size(int n) {
+	if (nexport_) {
+		export_retire(n);
+		return;
+	}
 	double* y = new double[n];
 	if (len > n) {
 		len = n;
@@ -29,6 +29,10 @@ public:
 	void buffer_size(int);
 	void label(const char*);
 
+	// Python buffers of the data
+	void export_acquire();
+	void export_release(double*);
+
 #if USE_PTHREAD
 	void mutconstruct(int mkmut) {if (!mut_) MUTCONSTRUCT(mkmut)}
 #else
@@ -40,7 +44,11 @@ public:
 	//intended as friend static Object** temp_objvar(IvocVect*);
 	Object* obj_;	// so far only needed by record and play; not reffed
 	char* label_;
+	int nexport_;	// Python buffers sharing the data
+	struct IvocVectRetired* retired_; // replaced data still in a buffer
 	MUTDEC
+private:
+	void export_retire(int);
 };
 
 
@@ -60,6 +60,7 @@ extern int nrn_modeltype();
 extern int nrn_use_selfqueue_;
 extern int use_cachevec;
 extern void nrn_cachevec(int);
+extern void nrn_interleave(int);
 extern Point_process* ob2pntproc(Object*);
 extern void (*nrnthread_v_transfer_)(NrnThread*);
 extern void (*nrnmpi_v_transfer_)();
@@ -83,6 +84,7 @@ extern N_Vector N_VNew_NrnParallelLD(int comm,
 extern bool nrn_use_fifo_queue_;
 #if BBTQ == 5
 extern bool nrn_use_bin_queue_;
+extern bool nrn_use_calendar_queue_;
 #endif
 
 #undef SUCCESS
@@ -142,7 +144,12 @@ static double queue_mode(void* v) {
 	}
 #endif
 	}
-	return double(nrn_use_bin_queue_ + 2*nrn_use_selfqueue_);
+	if (ifarg(3)) {
+		// takes effect when the event queues are next created (finitialize)
+		nrn_use_calendar_queue_ = chkarg(3, 0, 1) ? true : false;
+	}
+	return double(nrn_use_bin_queue_ + 2*nrn_use_selfqueue_
+		+ 4*nrn_use_calendar_queue_);
 #endif
 	return 0.;
 }
@@ -359,6 +366,13 @@ static double cache_efficient(void* v) {
 	if (ifarg(1)) {
 		int i = (int)chkarg(1,0,1);
 		nrn_cachevec(i);
+		// interleaved node order, only with cache efficient. Without
+		// the second arg, cache_efficient(1) keeps the current order.
+		if (!i) {
+			nrn_interleave(0);
+		}else if (ifarg(2)) {
+			nrn_interleave((int)chkarg(2,0,1));
+		}
 	}
 	hoc_return_type_code = 2; // boolean
 	return (double) use_cachevec;
@@ -2,6 +2,7 @@
 // solver CVode stub to allow cvode as dll for mswindows version.
 
 #include <InterViews/resource.h>
+#include <nrnmpi.h>
 #include "classreg.h"
 #include "nrnoc2iv.h"
 #include "datapath.h"
@@ -41,19 +42,25 @@ static void check_thresh(NrnThread*);
 // for fixed step thread
 void deliver_net_events(NrnThread* nt) {
 	int i;
+	double w;
+	if (nrn_prof_) { w = nrnmpi_wtime(); }
 	if (net_cvode_instance) {
 		net_cvode_instance->check_thresh(nt);
 		net_cvode_instance->deliver_net_events(nt);
 	}
+	if (nrn_prof_) { nrn_prof_phase(nt->id, NRN_PROF_DELIVER_NET_EVENTS, w); }
 }
 
 // handle events during finitialize()
 void nrn_deliver_events(NrnThread* nt) {
 	double tsav = nt->_t;
+	double w;
+	if (nrn_prof_) { w = nrnmpi_wtime(); }
 	if (net_cvode_instance) {
 		net_cvode_instance->deliver_events(tsav, nt);
 	}
 	nt->_t = tsav;
+	if (nrn_prof_) { nrn_prof_phase(nt->id, NRN_PROF_DELIVER_EVENTS, w); }
 }
 
 void clear_event_queue() {
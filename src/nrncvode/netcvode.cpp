@@ -340,11 +340,16 @@ void PlayRecordEvent::savestate_write(FILE* f) {
 DiscreteEvent* PlayRecordEvent::savestate_read(FILE* f) {
 	DiscreteEvent* de = nil;
 	char buf[100];
-	int type, plr_index;
+	int type, plr_index, k;
 	nrn_assert(fgets(buf, 100, f));
-	sscanf(buf, "%d %d\n", &type, &plr_index);
+	int n = sscanf(buf, "%d %d %d\n", &type, &plr_index, &k);
 	PlayRecord* plr = net_cvode_instance->playrec_item(plr_index);
 	assert(plr && plr->type() == type);
+	if (n == 3) { // a VecRecordMultiEvent
+		VecRecordMulti* vrm = (VecRecordMulti*)plr;
+		assert(k < vrm->nth_);
+		return vrm->th_[k].e->savestate_save();
+	}
 	return plr->event()->savestate_save();
 }
 
@@ -3416,6 +3421,32 @@ void PlayRecordEvent::deliver(double tt, NetCvode* ns, NrnThread* nt) {
 
 NrnThread* PlayRecordEvent::thread() { return nrn_threads + plr_->ith_; }
 
+void VecRecordMultiEvent::deliver(double tt, NetCvode* ns, NrnThread* nt) {
+	STATISTICS(playrecord_deliver_);
+	((VecRecordMulti*)plr_)->deliver_thread(tt, ns, k_);
+}
+
+NrnThread* VecRecordMultiEvent::thread() {
+	return nrn_threads + ((VecRecordMulti*)plr_)->th_[k_].ith;
+}
+
+DiscreteEvent* VecRecordMultiEvent::savestate_save() {
+	VecRecordMultiEvent* e = new VecRecordMultiEvent();
+	e->plr_ = plr_;
+	e->k_ = k_;
+	return e;
+}
+
+void VecRecordMultiEvent::savestate_restore(double tt, NetCvode* nc) {
+	VecRecordMultiThread& th = ((VecRecordMulti*)plr_)->th_[k_];
+	nc->event(tt, th.e, nrn_threads + th.ith);
+}
+
+void VecRecordMultiEvent::savestate_write(FILE* f) {
+	fprintf(f, "%d\n", PlayRecordEventType);
+	fprintf(f, "%d %d %d\n", plr_->type(), net_cvode_instance->playrec_item(plr_), k_);
+}
+
 void PlayRecordEvent::pr(const char* s, double tt, NetCvode* ns) {
 	Printf("%s PlayRecordEvent %.15g ", s, tt);
 	plr_->pr();
@@ -3462,6 +3493,7 @@ void TstopEvent::savestate_write(FILE* f) {
 }
 
 #include <hocevent.cpp>
+#include <recstream.cpp>
 
 void NetCvode::local_retreat(double t, Cvode* cv) {
 	if (!cvode_active_) { return; }
@@ -3935,7 +3967,7 @@ void NetCvode::re_init(double t) {
 			Cvode& cv = p[i].lcv_[j];
 			cv.stat_init();
 			cv.init(t);
-			cv.tqitem_->t_ = t;
+			p[i].tq_->move(cv.tqitem_, t);
 			if (condition_order() == 2) {
 				cv.evaluate_conditions();
 			}
@@ -4074,11 +4106,13 @@ void NetCvode::record_init() {
 	if (cnt) {
 		// there may be some events on the queue descended from
 		// finitialize that need to be removed
-		record_init_items_->remove_all();
-		p[0].tqe_->forall_callback(record_init_clear);
-		int j, jcnt = record_init_items_->count();
-		for (j=0; j < jcnt; ++j) {
-			p[0].tqe_->remove(record_init_items_->item(j));
+		for (int it=0; it < pcnt_; ++it) {
+			record_init_items_->remove_all();
+			p[it].tqe_->forall_callback(record_init_clear);
+			int j, jcnt = record_init_items_->count();
+			for (j=0; j < jcnt; ++j) {
+				p[it].tqe_->remove(record_init_items_->item(j));
+			}
 		}
 		record_init_items_->remove_all();
 	}
@@ -6172,6 +6206,286 @@ void VecRecordDt::deliver(double tt, NetCvode* nc) {
 	e_->send(tt + dt_, nc, nrn_threads);
 }
 
+// the item is associated with the cell, and thread, of the first pointer
+// that is not &t
+static int multi_owner(int n, double** pds) {
+	for (int i=0; i < n; ++i) {
+		if (pds[i] != &t) {
+			return i;
+		}
+	}
+	return 0;
+}
+
+VecRecordMulti::VecRecordMulti(int n, double** pds, IvocVect* y, double dt)
+    : PlayRecord(pds[multi_owner(n, pds)]) {
+//printf("VecRecordMulti\n");
+	n_ = n;
+	i0_ = multi_owner(n, pds);
+	pds_ = new double*[n_];
+	for (int i=0; i < n_; ++i) {
+		pds_[i] = pds[i];
+		if (i != i0_) {
+			nrn_notify_when_double_freed(pds_[i], this);
+		}
+	}
+	y_ = y;
+	dt_ = dt;
+	stream_ = nil;
+	ObjObservable::Attach(y_->obj_, this);
+	e_ = new PlayRecordEvent();
+	e_->plr_ = this;
+	nth_ = 0;
+	th_ = nil;
+	nrow0_ = 0;
+	MUTCONSTRUCT(0)
+}
+
+VecRecordMulti::~VecRecordMulti() {
+//printf("~VecRecordMulti\n");
+	ObjObservable::Detach(y_->obj_, this);
+	delete e_;
+	delete [] pds_;
+	if (stream_) {
+		delete stream_;
+	}
+	free_threads();
+	MUTDESTRUCT
+}
+
+void VecRecordMulti::free_threads() {
+	for (int k=0; k < nth_; ++k) {
+		delete [] th_[k].col;
+		delete th_[k].e;
+	}
+	if (th_) {
+		delete [] th_;
+	}
+	th_ = nil;
+	nth_ = 0;
+}
+
+void VecRecordMulti::update_ptr(double* pd) {
+	PlayRecord::update_ptr(pd);
+	for (int i=0; i < n_; ++i) {
+		if (i == i0_) {
+			pds_[i] = pd;
+		}else{
+			pds_[i] = nrn_recalc_ptr(pds_[i]);
+			nrn_notify_when_double_freed(pds_[i], this);
+		}
+	}
+}
+
+void VecRecordMulti::disconnect(Observable*) {
+	delete this;
+}
+
+// address range of the node voltages and mechanism data of a thread
+struct MultiRange {
+	double* begin;
+	double* end;
+	int ith;
+};
+
+static int multi_range_cmp(const void* a, const void* b) {
+	double* x = ((const MultiRange*)a)->begin;
+	double* y = ((const MultiRange*)b)->begin;
+	return (x < y) ? -1 : ((x > y) ? 1 : 0);
+}
+
+// With more than one thread, the thread of each variable is found in the
+// sorted address ranges of the node voltages and mechanism data. If the
+// variables are in more than one thread, each of those threads samples its
+// own columns with its own event, so no variable is read while its thread
+// integrates. Variables in no thread, e.g. t, go to the thread of the item.
+void VecRecordMulti::thread_columns() {
+	free_threads();
+	if (nrn_nthread < 2) {
+		return;
+	}
+	int i, it, in, nr = 0;
+	for (it=0; it < nrn_nthread; ++it) {
+		NrnThread& nt = nrn_threads[it];
+		for (in=0; in < nt.end; ++in) {
+			Node* nd = nt._v_node[in];
+			nr += 2;
+			for (Prop* p = nd->prop; p; p = p->next) {
+				++nr;
+			}
+		}
+	}
+	MultiRange* r = new MultiRange[nr];
+	nr = 0;
+	for (it=0; it < nrn_nthread; ++it) {
+		NrnThread& nt = nrn_threads[it];
+		for (in=0; in < nt.end; ++in) {
+			Node* nd = nt._v_node[in];
+			MultiRange x = {&NODEV(nd), &NODEV(nd) + 1, it};
+			r[nr++] = x;
+			if (nd->extnode) {
+				MultiRange xe = {nd->extnode->v, nd->extnode->v + nlayer, it};
+				r[nr++] = xe;
+			}
+			for (Prop* p = nd->prop; p; p = p->next) {
+				if (p->param_size) {
+					MultiRange xp = {p->param, p->param + p->param_size, it};
+					r[nr++] = xp;
+				}
+			}
+		}
+	}
+	qsort(r, nr, sizeof(MultiRange), multi_range_cmp);
+	int* ith = new int[n_];
+	int* ncol = new int[nrn_nthread];
+	for (it=0; it < nrn_nthread; ++it) {
+		ncol[it] = 0;
+	}
+	for (i=0; i < n_; ++i) {
+		// last range that begins at or before pds_[i]
+		int lo = 0, hi = nr;
+		while (hi - lo > 1) {
+			int mid = (lo + hi)/2;
+			if (r[mid].begin <= pds_[i]) {
+				lo = mid;
+			}else{
+				hi = mid;
+			}
+		}
+		ith[i] = (nr && r[lo].begin <= pds_[i] && pds_[i] < r[lo].end)
+			? r[lo].ith : ith_;
+		++ncol[ith[i]];
+	}
+	int nth = 0;
+	for (it=0; it < nrn_nthread; ++it) {
+		if (ncol[it]) {
+			++nth;
+		}
+	}
+	if (nth > 1) {
+		// ncol becomes the index into th_ of each thread
+		nth_ = nth;
+		th_ = new VecRecordMultiThread[nth_];
+		int k = 0;
+		for (it=0; it < nrn_nthread; ++it) if (ncol[it]) {
+			VecRecordMultiThread& th = th_[k];
+			th.ith = it;
+			th.col = new int[ncol[it]];
+			th.ncol = 0;
+			th.nrow = 0;
+			th.e = new VecRecordMultiEvent();
+			th.e->plr_ = this;
+			th.e->k_ = k;
+			ncol[it] = k++;
+		}
+		for (i=0; i < n_; ++i) {
+			VecRecordMultiThread& th = th_[ncol[ith[i]]];
+			th.col[th.ncol++] = i;
+		}
+		if (!MUTCONSTRUCTED) {MUTCONSTRUCT(1);}
+	}
+	delete [] ncol;
+	delete [] ith;
+	delete [] r;
+}
+
+void VecRecordMulti::install(Cvode* cv) {
+	if (cv && cv->nth_ && nrn_nthread > 1) {
+		hoc_execerror("multiple variable recording is not supported with",
+		  "cvode.use_local_dt(1) and more than one thread");
+	}
+	record_add(cv);
+}
+
+void VecRecordMulti::record_init() {
+	if (stream_) {
+		stream_->restart();
+	}else{
+		y_->resize(0);
+	}
+	thread_columns();
+	if (nth_) {
+		// y_ holds the rows that are not complete or streamed yet
+		y_->resize(0);
+		nrow0_ = 0;
+		for (int k=0; k < nth_; ++k) {
+			th_[k].nrow = 0;
+			th_[k].e->send(0., net_cvode_instance, nrn_threads + th_[k].ith);
+		}
+	}else{
+		e_->send(0., net_cvode_instance, nrn_threads + ith_);
+	}
+}
+
+void VecRecordMulti::frecord_init(TQItem* q) {
+	record_init_items_->append(q);
+}
+
+void VecRecordMulti::deliver(double tt, NetCvode* nc) {
+	if (cvode_ && cvode_->nth_) {
+		// the variables may be in other cells, bring them all to tt
+		int j;
+		NetCvodeThreadData& d = nc->p[0];
+		for (j=0; j < d.nlcv_; ++j) {
+			if (d.lcv_ + j != cvode_) {
+				nc->local_retreat(tt, d.lcv_ + j);
+			}
+		}
+	}
+	double* y;
+	if (stream_) {
+		y = stream_->row();
+	}else{
+		int j = y_->capacity();
+		y_->resize_chunk(j + n_);
+		y = vector_vec(y_) + j;
+	}
+	for (int i=0; i < n_; ++i) {
+		y[i] = (pds_[i] == &t) ? tt : *pds_[i];
+	}
+	e_->send(tt + dt_, nc, nrn_threads + ith_);
+}
+
+// Threads may be apart by a few samples, so each thread fills its columns
+// of its own next row. The first thread at a row appends it to y_. When
+// streaming, the rows that all the threads have filled go to the file.
+void VecRecordMulti::deliver_thread(double tt, NetCvode* nc, int k) {
+	VecRecordMultiThread& th = th_[k];
+	int i;
+	MUTLOCK
+	long j = (th.nrow++ - nrow0_) * n_;
+	assert(j <= y_->capacity());
+	if (j == y_->capacity()) {
+		y_->resize_chunk(j + n_);
+	}
+	double* y = vector_vec(y_) + j;
+	for (i=0; i < th.ncol; ++i) {
+		int c = th.col[i];
+		y[c] = (pds_[c] == &t) ? tt : *pds_[c];
+	}
+	if (stream_) {
+		long nrow = th_[0].nrow;
+		for (i=1; i < nth_; ++i) {
+			if (th_[i].nrow < nrow) {
+				nrow = th_[i].nrow;
+			}
+		}
+		long ndone = nrow - nrow0_;
+		if (ndone > 0) {
+			y = vector_vec(y_);
+			for (long r=0; r < ndone; ++r) {
+				memcpy(stream_->row(), y + r*n_, n_*sizeof(double));
+			}
+			long nleft = y_->capacity() - ndone*n_;
+			memmove(y, y + ndone*n_, nleft*sizeof(double));
+			y_->resize(nleft);
+			nrow0_ = nrow;
+		}
+	}
+	MUTUNLOCK
+	th.e->send(tt + dt_, nc, nrn_threads + th.ith);
+}
+
 void NetCvode::vecrecord_add() {
 	double* pd = hoc_pgetarg(1);
 	consist_sec_pd("Cvode.record", chk_access(), pd);
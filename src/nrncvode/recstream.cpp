@@ -0,0 +1,183 @@
+// included by netcvode.cpp
+#include <string.h>
+#include <recstream.h>
+
+/*
+The header of a RecordStream file, all fields in native byte order.
+	offset	type		content
+	0	char[8]		RECSTREAM_MAGIC
+	8	int32		header size in bytes, a multiple of 8
+	12	int32		number of columns
+	16	int64		number of rows on disk
+	24	float64		sample interval
+	32	int32		length of the labels
+	36	int32		0
+	40	char[]		column labels separated by '\n', 0 padded
+The rows start at the header size. The number of rows is updated after
+every chunk so a file that is still being written can be read.
+*/
+
+RecordStream::RecordStream(const char* fname, int ncol, int chunk, double dt,
+  const char* labels) {
+	fname_ = strdup(fname);
+	labels_ = strdup(labels ? labels : "");
+	ncol_ = ncol;
+	chunk_ = chunk > 0 ? chunk : 1;
+	dt_ = dt;
+	err_ = false;
+	f_ = NULL;
+	open();
+	buf_ = new double[2 * ncol_ * chunk_];
+	cur_ = buf_;
+	spare_ = buf_ + ncol_ * chunk_;
+	full_ = NULL;
+	nrow_cur_ = 0;
+	nrow_full_ = 0;
+#if USE_PTHREAD
+	quit_ = false;
+	MUTCONSTRUCT(1)
+	pthread_cond_init(&cond_, NULL);
+	pthread_create(&thread_, NULL, writer, this);
+#endif
+}
+
+RecordStream::~RecordStream() {
+	if (nrow_cur_) {
+		hand_off();
+	}
+	wait_written();
+#if USE_PTHREAD
+	MUTLOCK
+	quit_ = true;
+	pthread_cond_broadcast(&cond_);
+	MUTUNLOCK
+	pthread_join(thread_, NULL);
+	pthread_cond_destroy(&cond_);
+	MUTDESTRUCT
+#endif
+	fclose(f_);
+	delete [] buf_;
+	free(fname_);
+	free(labels_);
+}
+
+void RecordStream::open() {
+	f_ = fopen(fname_, "w+b");
+	if (!f_) {
+		hoc_execerror("Could not open for writing:", fname_);
+	}
+	nrow_written_ = 0;
+	write_header();
+}
+
+void RecordStream::write_header() {
+	int nlabel = strlen(labels_);
+	int hsize = 40 + ((nlabel + 7) / 8) * 8;
+	int zero = 0;
+	char pad[8] = {0};
+	rewind(f_);
+	fwrite(RECSTREAM_MAGIC, 1, 8, f_);
+	fwrite(&hsize, sizeof(int), 1, f_);
+	fwrite(&ncol_, sizeof(int), 1, f_);
+	long long nrow = nrow_written_;
+	fwrite(&nrow, sizeof(long long), 1, f_);
+	fwrite(&dt_, sizeof(double), 1, f_);
+	fwrite(&nlabel, sizeof(int), 1, f_);
+	fwrite(&zero, sizeof(int), 1, f_);
+	fwrite(labels_, 1, nlabel, f_);
+	fwrite(pad, 1, hsize - 40 - nlabel, f_);
+	if (fflush(f_) != 0) {
+		err_ = true;
+	}
+}
+
+// called only by the writer, or with the writer idle
+void RecordStream::write_chunk(double* d, int nrow) {
+	if (fseek(f_, 0, SEEK_END) != 0
+	    || fwrite(d, sizeof(double), nrow * ncol_, f_) != size_t(nrow * ncol_)) {
+		err_ = true;
+		return;
+	}
+	long long n = nrow_written_ + nrow;
+	if (fseek(f_, 16, SEEK_SET) != 0
+	    || fwrite(&n, sizeof(long long), 1, f_) != 1 || fflush(f_) != 0) {
+		err_ = true;
+		return;
+	}
+	nrow_written_ = n;
+}
+
+#if USE_PTHREAD
+void* RecordStream::writer(void* v) {
+	RecordStream* rs = (RecordStream*)v;
+	pthread_mutex_t* mut_ = rs->mut_;
+	for (;;) {
+		MUTLOCK
+		while (!rs->full_ && !rs->quit_) {
+			pthread_cond_wait(&rs->cond_, mut_);
+		}
+		if (!rs->full_) { // quit
+			MUTUNLOCK
+			break;
+		}
+		double* d = rs->full_;
+		int n = rs->nrow_full_;
+		MUTUNLOCK
+		rs->write_chunk(d, n);
+		MUTLOCK
+		rs->spare_ = d;
+		rs->full_ = NULL;
+		rs->nrow_full_ = 0;
+		pthread_cond_broadcast(&rs->cond_);
+		MUTUNLOCK
+	}
+	return NULL;
+}
+#endif
+
+// cur_ is full (or flushing), give it to the writer and continue in spare_
+void RecordStream::hand_off() {
+#if USE_PTHREAD
+	MUTLOCK
+	while (full_) {
+		pthread_cond_wait(&cond_, mut_);
+	}
+	full_ = cur_;
+	nrow_full_ = nrow_cur_;
+	cur_ = spare_;
+	nrow_cur_ = 0;
+	pthread_cond_broadcast(&cond_);
+	MUTUNLOCK
+#else
+	write_chunk(cur_, nrow_cur_);
+	nrow_cur_ = 0;
+#endif
+}
+
+void RecordStream::wait_written() {
+#if USE_PTHREAD
+	MUTLOCK
+	while (full_) {
+		pthread_cond_wait(&cond_, mut_);
+	}
+	MUTUNLOCK
+#endif
+}
+
+void RecordStream::flush() {
+	if (nrow_cur_) {
+		hand_off();
+	}
+	wait_written();
+	if (err_) {
+		err_ = false;
+		hoc_execerror("Error writing", fname_);
+	}
+}
+
+void RecordStream::restart() {
+	wait_written();
+	nrow_cur_ = 0;
+	fclose(f_);
+	open();
+}
@@ -0,0 +1,57 @@
+#ifndef recstream_h
+#define recstream_h
+
+#include <stdio.h>
+#include <nrnmutdec.h>
+
+// Appends rows of doubles to a binary file. The file starts with a
+// header (see RecordStream::write_header) followed by row major float64
+// data in native byte order, so it can be memory mapped. Full chunks are
+// handed to a background thread so the simulation does not wait on the
+// disk. Only the chunk being filled and the one being written are in memory.
+
+#define RECSTREAM_MAGIC "NRNREC1\n"
+
+class RecordStream {
+public:
+	RecordStream(const char* fname, int ncol, int chunk, double dt,
+		const char* labels);
+	virtual ~RecordStream();
+	// the next row to fill
+	double* row() {
+		if (nrow_cur_ == chunk_) { hand_off(); }
+		return cur_ + ncol_ * nrow_cur_++;
+	}
+	void flush(); // everything appended so far is on disk
+	void restart(); // discard all rows
+private:
+	void open();
+	void write_header();
+	void hand_off();
+	void write_chunk(double*, int);
+	void wait_written();
+	static void* writer(void*);
+private:
+	char* fname_;
+	char* labels_;
+	FILE* f_;
+	int ncol_;
+	int chunk_;
+	double dt_;
+	long nrow_written_;
+	double* cur_; // chunk being filled by the simulation
+	int nrow_cur_;
+	double* full_; // chunk waiting for, or being written by, the writer
+	int nrow_full_;
+	double* spare_;
+	double* buf_;
+	bool err_;
+#if USE_PTHREAD
+	bool quit_;
+	pthread_t thread_;
+	pthread_cond_t cond_;
+	MUTDEC
+#endif
+};
+
+#endif
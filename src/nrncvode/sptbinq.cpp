@@ -13,6 +13,9 @@ of struct _spblk, we are really using TQItem
 #include <stdlib.h>
 #include <string.h>
 #include <stdarg.h>
+#include <math.h>
+#include <vector>
+#include <algorithm>
 #include <section.h>
 
 #define SPBLK TQItem
@@ -29,6 +32,7 @@ extern "C" {
 }
 
 void (*nrn_binq_enqueue_error_handler)(double, TQItem*);
+bool nrn_use_calendar_queue_; // for TQueue constructed afterwards
 
 TQItem::TQItem() {
 	left_ = 0;
@@ -63,8 +67,14 @@ TQueue::TQueue(TQItemPool* tp, int mkmut) {
 	MUTCONSTRUCT(mkmut)
 	tpool_ = tp;
 	nshift_ = 0;
-	sptree_ = new SPTREE;
-	spinit(sptree_);
+	if (nrn_use_calendar_queue_) {
+		sptree_ = 0;
+		calq_ = new CalQ;
+	}else{
+		sptree_ = new SPTREE;
+		spinit(sptree_);
+		calq_ = 0;
+	}
 	binq_ = new BinQ;
 	least_ = 0;
 
@@ -76,10 +86,15 @@ TQueue::TQueue(TQItemPool* tp, int mkmut) {
 
 TQueue::~TQueue() {
 	SPBLK* q, *q2;
-	while((q = spdeq(&sptree_->root)) != nil) {
+	while((q = tdeq()) != nil) {
 		deleteitem(q);
 	}
-	delete sptree_;
+	if (sptree_) {
+		delete sptree_;
+	}
+	if (calq_) {
+		delete calq_;
+	}
 	for (q = binq_->first(); q; q = q2) {
 		q2 = binq_->next(q);
 		remove(q);
@@ -88,6 +103,30 @@ TQueue::~TQueue() {
 	MUTDESTRUCT
 }
 	
+inline void TQueue::tenq(TQItem* q) {
+	if (calq_) { calq_->enqueue(q); }else{ spenq(q, sptree_); }
+}
+
+inline TQItem* TQueue::tdeq() {
+	return calq_ ? calq_->dequeue() : spdeq(&sptree_->root);
+}
+
+inline TQItem* TQueue::thead() {
+	return calq_ ? calq_->least() : sphead(sptree_);
+}
+
+inline void TQueue::tdelete(TQItem* q) {
+	if (calq_) { calq_->remove(q); }else{ spdelete(q, sptree_); }
+}
+
+inline TQItem* TQueue::tlookup(double t) {
+	return calq_ ? calq_->lookup(t) : splookup(t, sptree_);
+}
+
+inline bool TQueue::tempty() {
+	return calq_ ? calq_->empty() : !sptree_->root;
+}
+
 void TQueue::deleteitem(TQItem* i) {
 	tpool_->hpfree(i);
 }
@@ -99,7 +138,11 @@ void TQueue::print() {
 		prnt(least_, 0);
 	}
 #endif
-	spscan(prnt, nil, sptree_);
+	if (calq_) {
+		calq_->forall_callback(prnt);
+	}else{
+		spscan(prnt, nil, sptree_);
+	}
 	for (TQItem* q = binq_->first(); q; q = binq_->next(q)) {
 		prnt(q, 0);
 	}
@@ -113,7 +156,11 @@ void TQueue::forall_callback(void(*f)(const TQItem*, int)) {
 		f(least_, 0);
 	}
 #endif
-	spscan(f, nil, sptree_);
+	if (calq_) {
+		calq_->forall_callback(f);
+	}else{
+		spscan(f, nil, sptree_);
+	}
 	for (TQItem* q = binq_->first(); q; q = binq_->next(q)) {
 		f(q, 0);
 	}
@@ -128,7 +175,7 @@ void TQueue::check(const char* mes) {
 // Assume not using bin queue.
 TQItem* TQueue::second_least(double t) {
 	assert(least_);
-	TQItem* b = sphead(sptree_);
+	TQItem* b = thead();
 	if (b && b->t_ == t) {
 		return b;
 	}
@@ -146,11 +193,11 @@ void TQueue::move_least_nolock(double tnew) {
 	TQItem* b = least();
 	if (b) {
 		b->t_ = tnew;
-		TQItem* nl = sphead(sptree_);
+		TQItem* nl = thead();
 		if (nl) {
 			if (tnew > nl->t_) {
-				least_ = spdeq(&sptree_->root);
-				spenq(b, sptree_);
+				least_ = tdeq();
+				tenq(b);
 			}
 		}
 	}
@@ -162,14 +209,14 @@ void TQueue::move(TQItem* i, double tnew) {
 	if (i == least_) {
 		move_least_nolock(tnew);
 	}else if (tnew < least_->t_) {
-		spdelete(i, sptree_);
+		tdelete(i);
 		i->t_ = tnew;
-		spenq(least_, sptree_);
+		tenq(least_);
 		least_ = i;
 	}else{
-		spdelete(i, sptree_);
+		tdelete(i);
 		i->t_ = tnew;
-		spenq(i, sptree_);
+		tenq(i);
 	}
 	MUTUNLOCK
 }
@@ -180,8 +227,12 @@ void TQueue::statistics() {
 		ninsert, nmove, nrem, nleast);
 	Printf("calls to find=%lu\n",
 		nfind);
-	Printf("comparisons=%d\n",
-		sptree_->enqcmps);
+	if (calq_) {
+		calq_->statistics();
+	}else{
+		Printf("comparisons=%d\n",
+			sptree_->enqcmps);
+	}
 #else
 	Printf("Turn on COLLECT_TQueue_STATISTICS_ in tqueue.h\n");
 #endif
@@ -205,11 +256,11 @@ TQItem* TQueue::insert(double t, void* d) {
 	i->cnt_ = -1;
 	if (t < least_t_nolock()) {
 		if (least()) {
-			spenq(least(), sptree_);
+			tenq(least());
 		}
 		least_ = i;
 	}else{
-		spenq(i, sptree_);
+		tenq(i);
 	}
 	MUTUNLOCK
 	return i;
@@ -236,15 +287,15 @@ void TQueue::remove(TQItem* q) {
 	STAT(nrem);
 	if (q) {
 		if (q == least_) {
-			if (sptree_->root) {
-				least_ = spdeq(&sptree_->root);
+			if (!tempty()) {
+				least_ = tdeq();
 			}else{
 				least_ = nil;
 			}
 		}else if (q->cnt_ >= 0) {
 			binq_->remove(q);
 		}else{
-			spdelete(q, sptree_);
+			tdelete(q);
 		}
 		tpool_->hpfree(q);
 	}
@@ -257,8 +308,8 @@ TQItem* TQueue::atomic_dq(double tt) {
 	if (least_ && least_->t_ <= tt) {
 		q = least_;
 		STAT(nrem);
-		if (sptree_->root) {
-			least_ = spdeq(&sptree_->root);
+		if (!tempty()) {
+			least_ = tdeq();
 		}else{
 			least_ = nil;
 		}
@@ -275,7 +326,7 @@ TQItem* TQueue::find(double t) {
 	if (t == least_t_nolock()) {
 		q = least();
 	}else{
-		q = splookup(t, sptree_);
+		q = tlookup(t);
 	}
 	MUTUNLOCK
 	return(q);
@@ -387,6 +438,227 @@ void BinQ::remove(TQItem* q) {
 	}
 }
 
+#define CALQ_MINBUCKET 16
+#define CALQ_SAMPLE 64
+
+static bool calq_time_less(const TQItem* a, const TQItem* b) {
+	return a->t_ < b->t_;
+}
+
+static double least_time(std::vector<TQItem*>& items) {
+	double t = items[0]->t_;
+	for (size_t i=1; i < items.size(); ++i) {
+		if (items[i]->t_ < t) { t = items[i]->t_; }
+	}
+	return t;
+}
+
+CalQ::CalQ() {
+	n_ = 0;
+	nbucket_ = CALQ_MINBUCKET;
+	mask_ = nbucket_ - 1;
+	width_ = 1.;
+	buckets_ = new TQItem*[nbucket_];
+	for (int i=0; i < nbucket_; ++i) { buckets_[i] = 0; }
+	vcur_ = 0;
+	cur_ = 0;
+#if COLLECT_TQueue_STATISTICS
+	nresize = nsearch = 0;
+#endif
+}
+
+CalQ::~CalQ() {
+	// the TQueue has already dequeued and freed the items
+	delete [] buckets_;
+}
+
+long long CalQ::vbucket(double t) {
+	double b = floor(t/width_);
+	// times very far in the future all go into one bucket
+	if (b > 1e18) { return (long long)1e18; }
+	if (b < -1e18) { return -(long long)1e18; }
+	return (long long)b;
+}
+
+// into its bucket after all items with the same or earlier time
+void CalQ::link(TQItem* q) {
+	TQItem** b = bucket(q->t_);
+	TQItem* h = *b;
+	if (!h) {
+		q->left_ = q;
+		q->right_ = q;
+		*b = q;
+		return;
+	}
+	TQItem* p = h->left_; // last
+	if (q->t_ < h->t_) {
+		*b = q;
+	}else{
+		// usually at or near the end
+		while (q->t_ < p->t_) {
+			p = p->left_;
+		}
+		h = p->right_;
+	}
+	q->left_ = p;
+	q->right_ = h;
+	p->right_ = q;
+	h->left_ = q;
+}
+
+void CalQ::unlink(TQItem* q) {
+	TQItem** b = bucket(q->t_);
+	if (q->right_ == q) {
+		*b = 0;
+	}else{
+		q->left_->right_ = q->right_;
+		q->right_->left_ = q->left_;
+		if (*b == q) {
+			*b = q->right_;
+		}
+	}
+	q->left_ = 0;
+	q->right_ = 0;
+}
+
+void CalQ::enqueue(TQItem* q) {
+	link(q);
+	long long vb = vbucket(q->t_);
+	if (++n_ == 1 || vb < vcur_) {
+		vcur_ = vb;
+		cur_ = int(vb & mask_);
+	}
+	if (n_ > 2*nbucket_) {
+		resize(2*nbucket_);
+	}
+}
+
+TQItem* CalQ::least() {
+	int i;
+	if (n_ == 0) {
+		return 0;
+	}
+	for (i=0; i < nbucket_; ++i) {
+		TQItem* q = buckets_[cur_];
+		if (q && vbucket(q->t_) == vcur_) {
+			return q;
+		}
+		++vcur_;
+		cur_ = (cur_ + 1) & mask_;
+	}
+	// nothing within a year, the least is the earliest bucket head
+#if COLLECT_TQueue_STATISTICS
+	++nsearch;
+#endif
+	TQItem* q = 0;
+	for (i=0; i < nbucket_; ++i) {
+		if (buckets_[i] && (!q || buckets_[i]->t_ < q->t_)) {
+			q = buckets_[i];
+		}
+	}
+	vcur_ = vbucket(q->t_);
+	cur_ = int(vcur_ & mask_);
+	return q;
+}
+
+TQItem* CalQ::dequeue() {
+	TQItem* q = least();
+	if (q) {
+		remove(q);
+	}
+	return q;
+}
+
+void CalQ::remove(TQItem* q) {
+	unlink(q);
+	--n_;
+	if (nbucket_ > CALQ_MINBUCKET && n_ < nbucket_/2) {
+		resize(nbucket_/2);
+	}
+}
+
+TQItem* CalQ::lookup(double t) {
+	TQItem* h = *bucket(t);
+	TQItem* q = h;
+	if (q) do {
+		if (q->t_ == t) {
+			return q;
+		}
+		q = q->right_;
+	}while (q != h);
+	return 0;
+}
+
+void CalQ::forall_callback(void (*f)(const TQItem*, int)) {
+	std::vector<TQItem*> items;
+	items.reserve(n_);
+	for (int i=0; i < nbucket_; ++i) {
+		TQItem* h = buckets_[i];
+		TQItem* q = h;
+		if (q) do {
+			items.push_back(q);
+			q = q->right_;
+		}while (q != h);
+	}
+	// equal times are in one bucket, already in order
+	std::stable_sort(items.begin(), items.end(), calq_time_less);
+	for (size_t i=0; i < items.size(); ++i) {
+		f(items[i], 0);
+	}
+}
+
+// Brown's rule: the width is about three times the average separation of
+// the earliest items, here separation of distinct times since many
+// events are often delivered at the same time.
+void CalQ::resize(int nbucket) {
+	int i;
+	std::vector<TQItem*> items;
+	items.reserve(n_);
+	for (i=0; i < nbucket_; ++i) {
+		TQItem* h = buckets_[i];
+		TQItem* q = h;
+		if (q) do {
+			items.push_back(q);
+			q = q->right_;
+		}while (q != h);
+	}
+	int ns = n_ < CALQ_SAMPLE ? n_ : CALQ_SAMPLE;
+	if (ns > 1) {
+		std::vector<double> t(n_);
+		for (i=0; i < n_; ++i) { t[i] = items[i]->t_; }
+		std::nth_element(t.begin(), t.begin() + ns - 1, t.end());
+		std::sort(t.begin(), t.begin() + ns);
+		int ndistinct = 1;
+		for (i=1; i < ns; ++i) {
+			if (t[i] != t[i-1]) { ++ndistinct; }
+		}
+		if (ndistinct > 1) {
+			width_ = 3.*(t[ns-1] - t[0])/(ndistinct - 1);
+		}
+	}
+	delete [] buckets_;
+	nbucket_ = nbucket;
+	mask_ = nbucket_ - 1;
+	buckets_ = new TQItem*[nbucket_];
+	for (i=0; i < nbucket_; ++i) { buckets_[i] = 0; }
+	// bucket by bucket, so equal times keep their order
+	for (i=0; i < n_; ++i) {
+		link(items[i]);
+	}
+	vcur_ = n_ ? vbucket(least_time(items)) : 0;
+	cur_ = int(vcur_ & mask_);
+#if COLLECT_TQueue_STATISTICS
+	++nresize;
+#endif
+}
+
+void CalQ::statistics() {
+#if COLLECT_TQueue_STATISTICS
+	Printf("calendar queue buckets=%d width=%g resizes=%lu searches=%lu\n",
+		nbucket_, width_, nresize, nsearch);
+#endif
+}
+
 #include <spaux.c>
 #include <sptree.c>
 #include <spdaveb.c>
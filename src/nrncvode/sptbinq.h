@@ -57,6 +57,43 @@ private:
 	TQItem** bins_;
 };
 
+// helper class for the TQueue (SplayTBinQueue). A calendar queue
+// (R. Brown, Comm. ACM 31:1220-1227, 1988) used instead of the splay tree
+// when nrn_use_calendar_queue_ is set (CVode.queue_mode). Each bucket is a
+// circular doubly linked list (left_, right_) in time order, equal times in
+// order of insertion, of the items whose floor(t_/width_) modulo nbucket_
+// is that bucket. The number of buckets follows the number of items and
+// the width follows the spacing of the earliest items, so that insertion,
+// removal, and finding the least are O(1) on average.
+class CalQ {
+public:
+	CalQ();
+	virtual ~CalQ();
+	void enqueue(TQItem*);
+	TQItem* dequeue();
+	TQItem* least(); // does not remove
+	void remove(TQItem*);
+	TQItem* lookup(double t);
+	bool empty() { return n_ == 0; }
+	void forall_callback(void (*)(const TQItem*, int)); // in time order
+	void statistics();
+#if COLLECT_TQueue_STATISTICS
+public:
+	unsigned long nresize, nsearch;
+#endif
+private:
+	long long vbucket(double t);
+	TQItem** bucket(double t) { return buckets_ + (vbucket(t) & mask_); }
+	void link(TQItem*);
+	void unlink(TQItem*);
+	void resize(int nbucket);
+	int n_, nbucket_, mask_;
+	double width_;
+	TQItem** buckets_;
+	long long vcur_; // no items in earlier (virtual, not modulo) buckets
+	int cur_; // vcur_ modulo nbucket_
+};
+
 class TQueue {
 public:
 	TQueue(TQItemPool*, int mkmut = 0);
@@ -96,7 +133,15 @@ public:
 private:
 	double least_t_nolock(){if (least_) { return least_->t_;}else{return 1e15;}}
 	void move_least_nolock(double tnew);
+	// the time ordered items other than least_ and the bins
+	void tenq(TQItem*);
+	TQItem* tdeq();
+	TQItem* thead();
+	void tdelete(TQItem*);
+	TQItem* tlookup(double);
+	bool tempty();
 	SPTREE* sptree_;
+	CalQ* calq_;
 	BinQ* binq_;
 	TQItem* least_;
 	TQItemPool* tpool_;
@@ -5,6 +5,7 @@
 #include <InterViews/observe.h>
 #include <netcon.h>
 #include <ivocvect.h>
+#include <nrnmutdec.h>
 
 class PlayRecord;
 class PlayRecordSave;
@@ -12,6 +13,7 @@ class VecRecordDiscreteSave;
 class VecPlayStepSave;
 class VecPlayContinuousSave;
 class StmtInfo;
+class RecordStream;
 struct NrnThread;
 struct Section;
 
@@ -24,6 +26,7 @@ struct Section;
 #define YvecRecordType 6
 #define GLineRecordType 7
 #define GVectorRecordType 8
+#define VecRecordMultiType 9
 
 // used by PlayRecord subclasses that utilize discrete events
 class PlayRecordEvent : public DiscreteEvent {
@@ -186,6 +189,62 @@ public:
 	virtual void savestate_restore();
 };
 
+// many variables recorded every dt into successive rows of one Vector
+// samples the columns of a VecRecordMulti in one of several threads
+class VecRecordMultiEvent : public PlayRecordEvent {
+public:
+	virtual void deliver(double, NetCvode*, NrnThread*);
+	virtual NrnThread* thread();
+	virtual DiscreteEvent* savestate_save();
+	virtual void savestate_restore(double deliverytime, NetCvode*);
+	virtual void savestate_write(FILE*);
+	int k_; // index into VecRecordMulti::th_
+};
+
+// the columns of a VecRecordMulti in one thread
+struct VecRecordMultiThread {
+	int ith;
+	int ncol;
+	int* col;
+	long nrow; // rows sampled so far
+	VecRecordMultiEvent* e;
+};
+
+class VecRecordMulti : public PlayRecord {
+public:
+	VecRecordMulti(int n, double** pds, IvocVect* y, double dt);
+	virtual ~VecRecordMulti();
+	virtual void install(Cvode*);
+	virtual void record_init();
+	virtual void deliver(double t, NetCvode*);
+	void deliver_thread(double t, NetCvode*, int k);
+	virtual PlayRecordEvent* event() { return e_;}
+	virtual void update_ptr(double*);
+
+	virtual void disconnect(Observable*);
+	virtual bool uses(void* v) { return (void*)y_== v;}
+
+	virtual void frecord_init(TQItem*);
+	virtual int type() { return VecRecordMultiType; }
+
+	IvocVect* y_;
+	double dt_;
+	int n_;
+	int i0_; // index of pd_ in pds_
+	double** pds_;
+	RecordStream* stream_; // if not nil, the rows go here instead of y_
+	PlayRecordEvent* e_;
+	// With variables in more than one thread, each of those threads
+	// samples its own columns. Otherwise nth_ is 0 and e_ samples all.
+	int nth_;
+	VecRecordMultiThread* th_;
+	long nrow0_; // rows already streamed, the rest are in y_
+	MUTDEC
+private:
+	void thread_columns();
+	void free_threads();
+};
+
 class VecPlayStep : public PlayRecord {
 public:
 	VecPlayStep(double*, IvocVect* y, IvocVect* t, double dt, Object* ppobj = nil);
@@ -169,7 +169,14 @@ callback to bbss_early when needed.
 
 #include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
+#include <ctype.h>
 #include <sys/stat.h>
+#if !defined(MINGW)
+#include <fcntl.h>
+#include <unistd.h>
+#include <sys/mman.h>
+#endif
 #include "ocfile.h"
 #include "nrnoc2iv.h"
 #include "classreg.h"
@@ -217,6 +224,8 @@ extern void nrn_fake_fire(int gid, double firetime, int fake_out);
 extern Object* nrn_gid2obj(int gid);
 extern PreSyn* nrn_gid2presyn(int gid);
 extern int nrn_gid_exists(int gid);
+extern double* (*nrnpy_rxd_save_state)(int* size);
+extern int (*nrnpy_rxd_restore_state)(double* data, int size);
 
 #if NRNMPI
 extern void nrn_spike_exchange(NrnThread*);
@@ -432,6 +441,7 @@ public:
 	virtual void s(char* cp, int chk=0);
 	virtual Type type() {return BBSS_IO::IN;}
 	virtual void skip(int);
+	virtual bool more();
 	FILE* f;
 };
 BBSS_TxtFileIn::BBSS_TxtFileIn(const char* fname) {
@@ -466,6 +476,15 @@ void BBSS_TxtFileIn::skip(int n) {
 		fgetc(f);
 	}
 }
+bool BBSS_TxtFileIn::more() {
+	int c;
+	while ((c = fgetc(f)) != EOF && isspace(c)) {}
+	if (c == EOF) {
+		return false;
+	}
+	ungetc(c, f);
+	return true;
+}
 
 class BBSS_BufferOut : public BBSS_IO {
 public:
@@ -504,6 +523,7 @@ public:
 	virtual void i(int& j, int chk=0);
 	virtual void s(char* cp, int chk=0);
 	virtual void skip(int n) { p += n; }
+	virtual bool more() { return (p - b) < sz; }
 	virtual Type type();
 	virtual void cpy(int size, char* cp);
 };
@@ -533,6 +553,64 @@ void BBSS_BufferIn::cpy(int ns, char* cp){
 	p += ns;
 }
 
+// Buffered binary file. The byte stream is the same as BBSS_BufferOut
+// so the file can be read back with a BBSS_BufferIn over its contents.
+#define BBSS_BUFSIZE 1048576
+class BBSS_BinFileOut : public BBSS_IO {
+public:
+	BBSS_BinFileOut(const char*);
+	virtual ~BBSS_BinFileOut();
+	virtual void i(int& j, int chk=0);
+	virtual void d(int n, double& p);
+	virtual void d(int n, double* p);
+	virtual void s(char* cp, int chk=0);
+	virtual Type type();
+	void cpy(int size, const char* cp);
+	void flush();
+	long long nbyte; // written so far
+private:
+	FILE* f;
+	char* b;
+	int n;
+};
+BBSS_BinFileOut::BBSS_BinFileOut(const char* fname) {
+	f = fopen(fname, "wb");
+	if (!f) {
+		hoc_execerror("BBSaveState: could not open for writing:", fname);
+	}
+	b = new char[BBSS_BUFSIZE];
+	n = 0;
+	nbyte = 0;
+}
+BBSS_BinFileOut::~BBSS_BinFileOut() {
+	flush();
+	fclose(f);
+	delete [] b;
+}
+void BBSS_BinFileOut::i(int& j, int chk) {cpy(sizeof(int), (char*)(&j));}
+void BBSS_BinFileOut::d(int n, double& d) {cpy(sizeof(double), (char*)(&d));}
+void BBSS_BinFileOut::d(int n, double* d) {cpy(n*sizeof(double), (char*)d);}
+void BBSS_BinFileOut::s(char* cp, int chk) {cpy(strlen(cp)+1, cp);}
+BBSS_IO::Type BBSS_BinFileOut::type() {return BBSS_IO::OUT;}
+void BBSS_BinFileOut::cpy(int ns, const char* cp) {
+	nbyte += ns;
+	if (n + ns > BBSS_BUFSIZE) {
+		flush();
+		if (ns > BBSS_BUFSIZE) {
+			nrn_assert(fwrite(cp, 1, ns, f) == (size_t)ns);
+			return;
+		}
+	}
+	memcpy(b + n, cp, ns);
+	n += ns;
+}
+void BBSS_BinFileOut::flush() {
+	if (n) {
+		nrn_assert(fwrite(b, 1, n, f) == (size_t)n);
+		n = 0;
+	}
+}
+
 static void* cons(Object*) {
         BBSaveState* ss = new BBSaveState();
         return (void*)ss;
@@ -589,10 +667,123 @@ static double restore_gid(void* v) {
 	return 0.;
 }
 
+// The rxd states are not distributed by gid. The global part has a block
+// of rxd states for each host, gathered by host 0 which writes it, and each
+// host restores its own block, so a restore needs the same number of hosts.
+// The global part ends after the time unless there are rxd states, so
+// files without them are the same as before rxd states were saved.
+static const char* bbss_rxd_flag = "rxd";
+static int rxd_nhost_; // 0 if no host has rxd states
+static int* rxd_cnt_; // size of the block of each host
+static double* rxd_; // the blocks of all hosts
+
+static void bbss_rxd_free() {
+	if (rxd_) {
+		delete [] rxd_;
+	}
+	if (rxd_cnt_) {
+		delete [] rxd_cnt_;
+	}
+	rxd_nhost_ = 0;
+	rxd_cnt_ = NULL;
+	rxd_ = NULL;
+}
+
+static void bbss_rxd_save() { // call on all hosts
+	int n = 0;
+	double* d = NULL;
+	bbss_rxd_free();
+	if (nrnpy_rxd_save_state) {
+		d = (*nrnpy_rxd_save_state)(&n);
+	}
+	if (nrnmpi_int_allmax(n ? 1 : 0) == 0) {
+		return;
+	}
+	rxd_nhost_ = nrnmpi_numprocs;
+	rxd_cnt_ = new int[rxd_nhost_];
+	if (rxd_nhost_ == 1) {
+		rxd_cnt_[0] = n;
+		rxd_ = d;
+		return;
+	}
+	nrnmpi_int_allgather(&n, rxd_cnt_, 1);
+	int* displ = new int[rxd_nhost_ + 1];
+	displ[0] = 0;
+	for (int i=0; i < rxd_nhost_; ++i) {
+		displ[i+1] = displ[i] + rxd_cnt_[i];
+	}
+	rxd_ = new double[displ[rxd_nhost_]];
+	nrnmpi_dbl_allgatherv(d, rxd_, rxd_cnt_, displ);
+	delete [] displ;
+	if (d) {
+		delete [] d;
+	}
+}
+
+static void bbss_rxd(BBSS_IO* io) { // global rxd states after bbss_rxd_save
+	char flag[100];
+	int i, n, nhost;
+	if (io->type() == BBSS_IO::IN) {
+		// no rxd block leaves the rxd states unchanged
+		bbss_rxd_free();
+		if (!io->more()) {
+			return;
+		}
+	}else if (!rxd_nhost_) {
+		return;
+	}
+	strcpy(flag, bbss_rxd_flag);
+	io->s(flag, 1);
+	nhost = rxd_nhost_;
+	io->i(nhost);
+	if (io->type() != BBSS_IO::IN) {
+		double* d = rxd_;
+		for (i=0; i < nhost; ++i) {
+			n = rxd_cnt_[i];
+			io->i(n);
+			io->d(n, d);
+			d += n;
+		}
+		return;
+	}
+	if (nhost != nrnmpi_numprocs) {
+		hoc_execerror("BBSaveState:",
+		"rxd states were saved with a different number of hosts");
+	}
+	double* mine = NULL;
+	int nmine = 0;
+	for (i=0; i < nhost; ++i) {
+		io->i(n);
+		if (n < 0) {
+			if (mine) {
+				delete [] mine;
+			}
+			hoc_execerror("BBSaveState:", "invalid rxd state");
+		}
+		double* d = new double[n ? n : 1];
+		io->d(n, d);
+		if (i == nrnmpi_myid) {
+			mine = d;
+			nmine = n;
+		}else{
+			delete [] d;
+		}
+	}
+	// a host that had no rxd states keeps them unchanged
+	if (nmine && (!nrnpy_rxd_restore_state
+	    || (*nrnpy_rxd_restore_state)(mine, nmine) != 0)) {
+		delete [] mine;
+		hoc_execerror("BBSaveState:",
+		"Stored rxd state inconsistent with current rxd model");
+	}
+	delete [] mine;
+}
+
 static double save_test(void* v) {
 	int* gids, *sizes;
 	BBSaveState* ss = (BBSaveState*)v;
 	usebin_ = 0;
+	bbss_rxd_save();
 	if (nrnmpi_myid == 0) { // save global time
 #if defined(MINGW)
 		mkdir("bbss_out");
@@ -601,8 +792,10 @@ static double save_test(void* v) {
 #endif
 		BBSS_IO* io = new BBSS_TxtFileOut("bbss_out/tmp");
 		io->d(1, nrn_threads->_t);
+		bbss_rxd(io);
 		delete io;
 	}
+	bbss_rxd_free();
  	nrnmpi_barrier();
 
 	int len = ss->counts(&gids, &sizes);
@@ -698,9 +891,11 @@ void* bbss_buffer_counts(int* len, int** gids, int** sizes, int* global_size) {
 	usebin_ = 1;
 	BBSaveState* ss = new BBSaveState();
 	*global_size = 0;
+	bbss_rxd_save();
 	if (nrnmpi_myid == 0) { // save global time
 		BBSS_Cnt* io = new BBSS_Cnt();
 		io->d(1, nrn_threads->_t);
+		bbss_rxd(io);
 		*global_size = io->bytecnt();
 		delete io;
 	}
@@ -711,6 +906,7 @@ void bbss_save_global(void* bbss, char* buffer, int sz) { // call only on host 0
 	usebin_ = 1;
 	BBSS_IO* io = new BBSS_BufferOut(buffer, sz);
 	io->d(1, nrn_threads->_t);
+	bbss_rxd(io);
 	delete io;
 }
 void bbss_restore_global(void* bbss, char* buffer, int sz) { // call on all hosts
@@ -718,6 +914,7 @@ void bbss_restore_global(void* bbss, char* buffer, int sz) { // call on all host
 	BBSS_IO* io = new BBSS_BufferIn(buffer, sz);
 	io->d(1, nrn_threads->_t);
 	t = nrn_threads->_t;
+	bbss_rxd(io);
 	delete io;
 	clear_event_queue();
 #if NRNMPI
@@ -752,6 +949,7 @@ void bbss_restore(void* bbss, int gid, int ngroup, char* buffer, int sz) {
 void bbss_save_done(void* bbss) {
 	BBSaveState* ss = (BBSaveState*) bbss;
 	delete ss;
+	bbss_rxd_free();
 }
 
 static void bbss_remove_delivered() {
@@ -839,6 +1037,7 @@ static double restore_test(void* v) {
 	BBSS_IO* io = new BBSS_TxtFileIn("in/tmp");
 	io->d(1, nrn_threads->_t);
 	t = nrn_threads->_t;
+	bbss_rxd(io);
 	delete io;
 	
  	clear_event_queue();
@@ -931,6 +1130,211 @@ static double restore_test_bin(void* v) { //assumes whole cells
 	return 0.;
 }
 
+// Binary per-rank layout written by save_bin and read by restore_bin.
+// <dir>/global has the header followed by the global part (t and the
+// rxd states). <dir>/<rank> has the header, an index of (gid, size, offset)
+// for the gids saved by that rank and then the cell buffers in the
+// bbss_save format. The byte order is native, use save/restore for a
+// portable file.
+// The header is magic, version, nhost, split, n where split is 1 if any
+// cell was split over several ranks and n is the size in bytes of the
+// global part or the number of index items of a rank.
+#define BBSS_MAGIC 0x53534242
+#define BBSS_VERSION 1
+#define BBSS_HDRSIZE 5
+struct BBSS_BinIndex {
+	int gid;
+	int size;
+	long long offset;
+};
+
+static int bbss_split_cells();
+
+static void bbss_bin_header(BBSS_BinFileOut* io, int split, int n) {
+	int hdr[BBSS_HDRSIZE] = {BBSS_MAGIC, BBSS_VERSION, nrnmpi_numprocs,
+		split, n};
+	io->cpy(sizeof(hdr), (char*)hdr);
+}
+
+// whole file, memory-mapped where possible
+static char* bbss_map(const char* fname, size_t* sz) {
+	char* buf;
+#if defined(MINGW)
+	FILE* f = fopen(fname, "rb");
+	if (!f) {
+		hoc_execerror("BBSaveState: could not open for reading:", fname);
+	}
+	fseek(f, 0, SEEK_END);
+	*sz = ftell(f);
+	fseek(f, 0, SEEK_SET);
+	buf = new char[*sz];
+	nrn_assert(fread(buf, 1, *sz, f) == *sz);
+	fclose(f);
+#else
+	struct stat st;
+	int fd = open(fname, O_RDONLY);
+	if (fd < 0) {
+		hoc_execerror("BBSaveState: could not open for reading:", fname);
+	}
+	nrn_assert(fstat(fd, &st) == 0);
+	*sz = st.st_size;
+	buf = (char*)mmap(0, *sz, PROT_READ, MAP_PRIVATE, fd, 0);
+	close(fd);
+	if (buf == (char*)MAP_FAILED) {
+		hoc_execerror("BBSaveState: could not map:", fname);
+	}
+#endif
+	if (*sz < BBSS_HDRSIZE*sizeof(int)
+	    || ((int*)buf)[0] != BBSS_MAGIC || ((int*)buf)[1] != BBSS_VERSION) {
+		hoc_execerror(fname, "is not a BBSaveState binary file");
+	}
+	return buf;
+}
+
+static void bbss_unmap(char* buf, size_t sz) {
+#if defined(MINGW)
+	delete [] buf;
+#else
+	munmap(buf, sz);
+#endif
+}
+
+static int bbss_gidcmp(const void* a, const void* b) {
+	return *(const int*)a - *(const int*)b;
+}
+
+static double save_bin(void* v) {
+	int len, *gids, *sizes, global_size;
+	char fname[1024];
+	char* dir = gargstr(1);
+	void* ref = bbss_buffer_counts(&len, &gids, &sizes, &global_size);
+	BBSaveState* ss = (BBSaveState*)ref;
+	int split = nrnmpi_int_allmax(bbss_split_cells());
+	if (nrnmpi_myid == 0) { // save global time
+#if defined(MINGW)
+		mkdir(dir);
+#else
+		mkdir(dir, 0770);
+#endif
+		nrn_assert(snprintf(fname, 1024, "%s/global", dir) < 1024);
+		BBSS_BinFileOut* io = new BBSS_BinFileOut(fname);
+		bbss_bin_header(io, split, global_size);
+		io->d(1, nrn_threads->_t);
+		bbss_rxd(io);
+		delete io;
+	}
+	nrnmpi_barrier();
+
+	nrn_assert(snprintf(fname, 1024, "%s/%d", dir, nrnmpi_myid) < 1024);
+	BBSS_BinFileOut* io = new BBSS_BinFileOut(fname);
+	bbss_bin_header(io, split, len);
+	BBSS_BinIndex x;
+	x.offset = BBSS_HDRSIZE*sizeof(int) + len*sizeof(BBSS_BinIndex);
+	for (int i = 0; i < len; ++i) {
+		x.gid = gids[i];
+		x.size = sizes[i];
+		io->cpy(sizeof(x), (char*)&x);
+		x.offset += sizes[i];
+	}
+	ss->f = io;
+	for (int i = 0; i < len; ++i) {
+		long long n = io->nbyte;
+		ss->gidobj(gids[i]);
+		nrn_assert(io->nbyte - n == sizes[i]);
+	}
+	delete io;
+	if (len) {
+		free(gids);
+		free(sizes);
+	}
+	bbss_save_done(ref);
+	nrnmpi_barrier();
+	return double(len);
+}
+
+// Each rank reads only the files it needs. If the number of ranks and the
+// gids of this rank are the same as when saved (and no cell was split),
+// that is only its own file. Otherwise the index of every file is
+// scanned for the gids of this rank.
+static double restore_bin(void* v) {
+	int len, *gids = NULL, *sizes = NULL;
+	size_t sz;
+	char fname[1024];
+	char* dir = gargstr(1);
+	usebin_ = 1;
+	nrn_assert(snprintf(fname, 1024, "%s/global", dir) < 1024);
+	char* buf = bbss_map(fname, &sz);
+	int* hdr = (int*)buf;
+	int nhost = hdr[2];
+	int split = hdr[3];
+	nrn_assert(BBSS_HDRSIZE*sizeof(int) + hdr[4] <= sz);
+	BBSaveState* ss = new BBSaveState();
+	bbss_restore_global(ss, buf + BBSS_HDRSIZE*sizeof(int), hdr[4]);
+	bbss_unmap(buf, sz);
+
+	len = ss->counts(&gids, &sizes);
+	if (len) {
+		qsort(gids, len, sizeof(int), bbss_gidcmp);
+	}
+	int* npiece = new int[len + 1];
+	for (int i = 0; i < len; ++i) {
+		npiece[i] = 0;
+	}
+	int r0 = 0, r1 = nhost;
+	if (nhost == nrnmpi_numprocs && !split) {
+		// layout matches if this rank saved the same set of gids
+		nrn_assert(snprintf(fname, 1024, "%s/%d", dir, nrnmpi_myid) < 1024);
+		buf = bbss_map(fname, &sz);
+		hdr = (int*)buf;
+		BBSS_BinIndex* x = (BBSS_BinIndex*)(buf + BBSS_HDRSIZE*sizeof(int));
+		nrn_assert(BBSS_HDRSIZE*sizeof(int)
+		    + hdr[4]*sizeof(BBSS_BinIndex) <= sz);
+		int match = (hdr[4] == len);
+		for (int i = 0; match && i < len; ++i) {
+			match = (bsearch(&x[i].gid, gids, len, sizeof(int),
+				bbss_gidcmp) != NULL);
+		}
+		bbss_unmap(buf, sz);
+		if (match) {
+			r0 = nrnmpi_myid;
+			r1 = r0 + 1;
+		}
+	}
+	for (int r = r0; r < r1; ++r) {
+		nrn_assert(snprintf(fname, 1024, "%s/%d", dir, r) < 1024);
+		buf = bbss_map(fname, &sz);
+		hdr = (int*)buf;
+		int n = hdr[4];
+		BBSS_BinIndex* x = (BBSS_BinIndex*)(buf + BBSS_HDRSIZE*sizeof(int));
+		nrn_assert(hdr[2] == nhost
+		    && BBSS_HDRSIZE*sizeof(int) + n*sizeof(BBSS_BinIndex) <= sz);
+		for (int i = 0; i < n; ++i) {
+			int* g = (int*)bsearch(&x[i].gid, gids, len, sizeof(int),
+				bbss_gidcmp);
+			if (g) {
+				nrn_assert(x[i].offset + x[i].size <= (long long)sz);
+				bbss_restore(ss, x[i].gid, 1, buf + x[i].offset,
+					x[i].size);
+				++npiece[g - gids];
+			}
+		}
+		bbss_unmap(buf, sz);
+	}
+	for (int i = 0; i < len; ++i) {
+		if (npiece[i] == 0) {
+			snprintf(fname, 1024, "gid %d not saved in %s", gids[i], dir);
+			hoc_execerror("BBSaveState:", fname);
+		}
+	}
+	delete [] npiece;
+	if (len) {
+		free(gids);
+		free(sizes);
+	}
+	bbss_restore_done(ss);
+	return double(len);
+}
+
 static double vector_play_init(void* v) {
 	nrn_play_init();
 	return 0.;
@@ -944,6 +1348,9 @@ static Member_func members[] = {
 	"restore_test", restore_test,
 	"save_test_bin", save_test_bin,
 	"restore_test_bin", restore_test_bin,
+	// binary file per rank
+	"save_bin", save_bin,
+	"restore_bin", restore_bin,
 	// binary test
 	"save_request", save_request,
 	"save_gid", save_gid,
@@ -1440,6 +1847,19 @@ void BBSaveState::mk_base2spgid() {
 	nrn_gidout_iter(&base2spgid_item);
 }
 
+// 1 if a piece of a split cell is on this host
+static int split_cnt;
+static void split_item(int spgid, Object* obj) {
+	if (spgid != spgid % 10000000) {
+		++split_cnt;
+	}
+}
+static int bbss_split_cells() {
+	split_cnt = 0;
+	nrn_gidout_iter(&split_item);
+	return split_cnt ? 1 : 0;
+}
+
 // c++ blue brain write interface in two phases. First return to bb what is
 // needed for each gid and then get from bb a series of gid, buffer
 // pairs to write the buffer. The read interface only requires a single
@@ -20,6 +20,7 @@ public:
 	virtual void s(char* cp, int chk=0) = 0;
 	virtual Type type() = 0;
 	virtual void skip(int){} // only when reading
+	virtual bool more(){return false;} // only when reading, not at the end
 };
 
 class BBSaveState {
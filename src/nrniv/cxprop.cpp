@@ -33,6 +33,9 @@ void* nrn_pool_alloc(void* pool);
 void nrn_pool_free(void* pool, void* item);
 void nrn_pool_freeall(void* pool);
 
+void* nrn_prop_data_export(int type);
+void nrn_prop_data_release(void* pool);
+
 }
 
 declareArrayPool(CharArrayPool, char)
@@ -393,6 +396,65 @@ static double* recalc_ptr(double* old) {
 	return old;
 }
 
+// The Memb_list data of a type is exported to Python (neuron.MembListData)
+// as a whole DoubleArrayPool. An exported pool that in_place_data_realloc
+// replaces is only retired, and deleted when its last export is released,
+// so the numpy arrays over it stay valid though no longer used by the model.
+struct PoolExport {
+	DoubleArrayPool* pool;
+	int nexport;
+	int retired;
+	PoolExport* next;
+};
+static PoolExport* pool_exports_;
+
+void* nrn_prop_data_export(int type) {
+	DoubleArrayPool* pool = dblpools_[type];
+	PoolExport* pe;
+	for (pe = pool_exports_; pe; pe = pe->next) {
+		if (pe->pool == pool) {
+			break;
+		}
+	}
+	if (!pe) {
+		pe = new PoolExport;
+		pe->pool = pool;
+		pe->nexport = 0;
+		pe->retired = 0;
+		pe->next = pool_exports_;
+		pool_exports_ = pe;
+	}
+	++pe->nexport;
+	return pool;
+}
+
+void nrn_prop_data_release(void* pool) {
+	for (PoolExport** ppe = &pool_exports_; *ppe; ppe = &(*ppe)->next) {
+		PoolExport* pe = *ppe;
+		if (pe->pool == pool) {
+			if (--pe->nexport == 0) {
+				if (pe->retired) {
+					delete pe->pool;
+				}
+				*ppe = pe->next;
+				delete pe;
+			}
+			return;
+		}
+	}
+	assert(0);
+}
+
+static void prop_pool_delete(DoubleArrayPool* pool) {
+	for (PoolExport* pe = pool_exports_; pe; pe = pe->next) {
+		if (pe->pool == pool) {
+			pe->retired = 1;
+			return;
+		}
+	}
+	delete pool;
+}
+
 static hoc_List* mechstanlist_;
 
 static int in_place_data_realloc() {
@@ -544,7 +606,7 @@ static int in_place_data_realloc() {
 #endif
 	// finally get rid of the old ion pools
 	for (int i=0; i < n_memb_func; ++i) if (types[i] && oldpools_[i]) {
-		delete oldpools_[i];
+		prop_pool_delete(oldpools_[i]);
 	}
 	delete [] oldpools_;
 	delete [] types;
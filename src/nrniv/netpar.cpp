@@ -26,6 +26,7 @@ implementNrnHash(Gid2PreSyn, int, PreSyn*)
 #include <netcon.h>
 #include <cvodeobj.h>
 #include <netcvode.h>
+#include <oclist.h>
 
 #define BGP_INTERVAL 2
 #if BGP_INTERVAL == 2
@@ -48,10 +49,14 @@ extern int nrn_use_selfqueue_;
 extern void nrn_pending_selfqueue(double, NrnThread*);
 extern int vector_capacity(IvocVect*); //ivocvect.h conflicts with STL
 extern double* vector_vec(IvocVect*);
+extern IvocVect* vector_arg(int);
+extern Object* hoc_new_object(Symbol*, void*);
+extern void (**pnt_receive)(Point_process*, double*, double);
 extern Object* nrn_sec2cell(Section*);
 extern void ncs2nrn_integrate(double tstop);
 extern void nrn_fake_fire(int gid, double firetime, int fake_out);
 int nrnmpi_spike_compress(int nspike, bool gid_compress, int xchng_meth);
+int nrnmpi_spike_exchange_auto(int ninterval, int verbose);
 void nrn_cleanup_presyn(PreSyn*);
 int nrn_set_timeout(int);
 void nrnmpi_gid_clear(int);
@@ -94,6 +99,7 @@ void nrn_timeout(int);
 void nrn_spike_exchange(NrnThread*);
 extern int nrnmpi_int_allmax(int);
 extern void nrnmpi_int_allgather(int*, int*, int);
+extern void nrnmpi_dbl_allreduce_vec(double*, double*, int, int);
 void nrn2ncs_outputevent(int netcon_output_index, double firetime);
 bool nrn_use_compress_; // global due to bbsavestate
 #define use_compress_ nrn_use_compress_
@@ -199,6 +205,9 @@ static double wt1_; // time to find the PreSyns and send the spikes.
 static int spfixout_capacity_;
 static int idxout_;
 static void nrn_spike_exchange_compressed(NrnThread*);
+static int auto_ninterval_; // exchanges sampled by spike_exchange_auto
+static void spike_exchange_auto_init();
+static void spike_exchange_auto(double wt);
 #endif // NRNMPI
 
 #if BGPDMA & 4
@@ -267,6 +276,7 @@ void NetParEvent::deliver(double tt, NetCvode* nc, NrnThread* nt){
 	MUTUNLOCK
       if (seq == nrn_nthread) {
 	last_nt_ = nt;
+	double wt = nrnmpi_wtime();
 #if BGPDMA
 	if (use_bgpdma_) {
 		bgp_dma_receive(nt);
@@ -278,6 +288,12 @@ void NetParEvent::deliver(double tt, NetCvode* nc, NrnThread* nt){
 #endif
 	wx_ += wt_;
 	ws_ += wt1_;
+	if (auto_ninterval_) {
+		spike_exchange_auto(nrnmpi_wtime() - wt);
+	}
+	if (nrn_prof_) {
+		nrn_prof_phase(nt->id, NRN_PROF_SPIKE_EXCHANGE, wt);
+	}
 	seqcnt_ = 0;
      }
    }
@@ -532,6 +548,9 @@ void nrn_spike_exchange_init() {
 			MUTDESTRUCT
 		}
 	}
+	if (auto_ninterval_) {
+		spike_exchange_auto_init();
+	}
 #endif // NRNMPI
 	//if (nrnmpi_myid == 0){printf("usable_mindelay_ = %g\n", usable_mindelay_);}
 }
@@ -1119,6 +1138,18 @@ void BBS::spike_record(IvocVect* gids, IvocVect* spikevec, IvocVect* gidvec) {
 	}
 }
 
+// 1 if the Vector has an element for each of n, 0 if only one
+static int bulk_stride(IvocVect* v, int n, const char* name) {
+	int sz = vector_capacity(v);
+	if (sz == n) {
+		return 1;
+	}else if (sz == 1 || (sz == 0 && strcmp(name, "threshold") == 0)) {
+		return 0;
+	}
+	hoc_execerror(name, "Vector must have size 1 or the number of connections");
+	return 0;
+}
+
 static Object* gid2obj_(int gid) {
 	Object* cell = 0;
 //printf("%d gid2obj gid=%d\n", nrnmpi_myid, gid);
@@ -1160,12 +1191,8 @@ Object** BBS::gid2cell(int gid) {
 	return hoc_temp_objptr(cell);
 }
 
-Object** BBS::gid_connect(int gid) {
-	Object* target = *hoc_objgetarg(2);
-	if (!is_point_process(target)) {
-		hoc_execerror("arg 2 must be a point process", 0);
-	}
-	alloc_space();
+// the PreSyn for a NetCon from gid, a new input stub if needed
+static PreSyn* gid_connect_src(int gid) {
 	PreSyn* ps;
 	if (gid2out_->find(gid, ps)) {
 		// the gid is owned by this machine so connect directly
@@ -1188,6 +1215,16 @@ Object** BBS::gid_connect(int gid) {
 #endif
 		ps->gid_ = gid;
 	}
+	return ps;
+}
+
+Object** BBS::gid_connect(int gid) {
+	Object* target = *hoc_objgetarg(2);
+	if (!is_point_process(target)) {
+		hoc_execerror("arg 2 must be a point process", 0);
+	}
+	alloc_space();
+	PreSyn* ps = gid_connect_src(gid);
 	NetCon* nc;
 	Object** po;
 	if (ifarg(3)) {
@@ -1208,6 +1245,94 @@ Object** BBS::gid_connect(int gid) {
 	return po;
 }
 
+// gid_connect(srcgid[i], targets.object(index[i])) for all i, with
+// weight[0], delay and, if the source is on this rank, threshold set
+// from the elements of the Vectors, or the only element if size 1.
+// The NetCons are appended to the List arg 7 (or a new List) which
+// is returned and holds the only references to them.
+Object** BBS::gid_connect_bulk() {
+	int i;
+	IvocVect* vsrc = vector_arg(1);
+	Object* otar = *hoc_objgetarg(2);
+	check_obj_type(otar, "List");
+	OcList* targets = (OcList*)otar->u.this_pointer;
+	IvocVect* vindex = vector_arg(3);
+	IvocVect* vw = vector_arg(4);
+	IvocVect* vdel = vector_arg(5);
+	IvocVect* vth = ifarg(6) ? vector_arg(6) : NULL;
+	int n = vector_capacity(vsrc);
+	if (vector_capacity(vindex) != n) {
+		hoc_execerror("source gid and target index Vectors must have the same size", 0);
+	}
+	double* src = vector_vec(vsrc);
+	double* index = vector_vec(vindex);
+	double* w = vector_vec(vw);
+	double* del = vector_vec(vdel);
+	double* th = vth ? vector_vec(vth) : NULL;
+	int wstep = bulk_stride(vw, n, "weight");
+	int delstep = bulk_stride(vdel, n, "delay");
+	int thstep = vth ? bulk_stride(vth, n, "threshold") : 0;
+	if (vth && vector_capacity(vth) == 0) {
+		th = NULL;
+	}
+	// check everything before creating anything
+	long ntar = targets->count();
+	for (i=0; i < ntar; ++i) {
+		Object* ob = targets->object(i);
+		if (!is_point_process(ob)) {
+			hoc_execerror(hoc_object_name(ob), "is not a point process");
+		}
+		if (!pnt_receive[ob2pntproc(ob)->prop->type]) {
+			hoc_execerror("No NET_RECEIVE in target PointProcess:", hoc_object_name(ob));
+		}
+	}
+	for (i=0; i < n; ++i) {
+		if (src[i] < 0. || src[i] >= MD) {
+			hoc_execerror("source gid out of range", 0);
+		}
+		if (index[i] < 0. || index[i] >= ntar) {
+			hoc_execerror("target index out of range", 0);
+		}
+		if (del[i*delstep] < 0.) {
+			hoc_execerror("delay must be >= 0", 0);
+		}
+	}
+	Object** po;
+	OcList* ncl;
+	if (ifarg(7)) {
+		po = hoc_objgetarg(7);
+		check_obj_type(*po, "List");
+		ncl = (OcList*)((*po)->u.this_pointer);
+	}else{
+		ncl = new OcList(n > 5 ? n : 5);
+		ncl->ref();
+		po = hoc_temp_objvar(hoc_lookup("List"), ncl);
+	}
+	alloc_space();
+	PreSyn* ps = NULL;
+	int gid = -1;
+	bool owned = false;
+	for (i=0; i < n; ++i) {
+		if (!ps || int(src[i]) != gid) { // usually sorted by source
+			PreSyn* ps1;
+			gid = int(src[i]);
+			owned = gid2out_->find(gid, ps1) != 0;
+			ps = gid_connect_src(gid);
+		}
+		if (th && owned) {
+			ps->threshold_ = th[i*thstep];
+		}
+		NetCon* nc = new NetCon(ps, targets->object(long(index[i])));
+		if (nc->cnt_) {
+			nc->weight_[0] = w[i*wstep];
+		}
+		nc->delay_ = del[i*delstep];
+		nc->obj_ = hoc_new_object(netcon_sym_, nc);
+		ncl->append(nc->obj_);
+	}
+	return po;
+}
+
 static int timeout_ = 20;
 int nrn_set_timeout(int timeout) {
 	int tt;
@@ -1403,6 +1528,12 @@ two phase multisend distributes the injection
 See case 8 of nrn_bgp_receive_time for the xchng_meth properties
 */
 
+#if NRNMPI
+// gid_compress of the last spike_compress that turned compression on, also
+// used when spike_exchange_auto switches to compressed
+static bool gid_compress_ = true;
+#endif
+
 int nrnmpi_spike_compress(int nspike, bool gid_compress, int xchng_meth) {
 #if NRNMPI
 	if (nrnmpi_numprocs < 2) { return 0; }
@@ -1444,6 +1575,7 @@ int nrnmpi_spike_compress(int nspike, bool gid_compress, int xchng_meth) {
 		use_compress_ = false;
 		nrn_use_localgid_ = false;
 	}else if (nspike > 0) { // turn on
+		gid_compress_ = gid_compress;
 		if (cvode_active_) {
 if (nrnmpi_myid == 0) {hoc_warning("ParallelContext.spike_compress cannot be used with cvode active", 0);}
 			use_compress_ = false;
@@ -1476,6 +1608,168 @@ Printf("Notice: gid compression did not succeed. Probably more than 255 cells on
 #endif
 }
 
+/*
+pc.spike_exchange_auto(ninterval) chooses between the allgather and the
+compressed spike exchange at run time. After each finitialize, ninterval
+exchanges are timed with the method in use, then ninterval with the
+other one, and the faster is kept. The compressed buffer size is a
+quarter more than the 90th percentile of the largest per rank spike
+count of the sampled exchanges and, while compressed is in use, it is
+retuned every ninterval exchanges when too small or twice too large.
+Every rank receives the same spike counts, so all ranks switch at the
+same exchange and only the times need a reduction.
+Compressed uses the gid_compress of the last pc.spike_compress that
+turned it on (default 1).
+The exchange interval is never changed, so compressed is not a candidate
+with cvode or when the interval is 255 dt or more. With more than one
+thread the others may already be filling the buffers for the next
+exchange, so the method is only switched with a single thread.
+Multisend needs the target tables built by set_maxstep and is left alone.
+*/
+
+#if NRNMPI
+static int auto_verbose_;
+static int auto_phase_; // sampling the first (0) or second (1) method,
+	// decided (2), or not switching (3)
+static int auto_cnt_;
+static double auto_wt_[2]; // exchange time of each phase
+static int auto_nspike_[2]; // compressed buffer size of each phase, 0 is allgather
+static int* auto_maxnin_; // largest per rank spike count of each exchange
+
+static const char* auto_name(int nspike) {
+	static char buf[50];
+	if (nspike) {
+		sprintf(buf, "compressed(%d)", nspike);
+	}else{
+		sprintf(buf, "allgather");
+	}
+	return buf;
+}
+
+static int auto_intcmp(const void* a, const void* b) {
+	return *(const int*)a - *(const int*)b;
+}
+
+// 90th percentile of the sampled spike counts
+static int auto_percentile() {
+	qsort(auto_maxnin_, auto_ninterval_, sizeof(int), auto_intcmp);
+	return auto_maxnin_[(9*auto_ninterval_)/10];
+}
+
+static void auto_use(int nspike) {
+	nrnmpi_spike_compress(nspike, gid_compress_, 0);
+	// as in nrn_spike_exchange_init but keeping usable_mindelay_
+	nout_ = 0;
+	if (use_compress_) {
+		idxout_ = 2;
+		t_exchange_ = nrn_threads->_t;
+		dt1_ = 1./dt;
+	}else{
+#if nrn_spikebuf_size > 0
+		if (spbufout_) {
+			spbufout_->nspike = 0;
+		}
+#endif
+	}
+}
+
+static void spike_exchange_auto_init() {
+	auto_phase_ = 3;
+	auto_cnt_ = 0;
+	auto_wt_[0] = auto_wt_[1] = 0.;
+	auto_nspike_[0] = use_compress_ ? ag_send_nspike_ : 0;
+	const char* why = 0;
+#if BGPDMA
+	if (use_bgpdma_) { why = "multisend is in use"; }
+#endif
+	if (!why && cvode_active_) {
+		why = "cvode is active";
+	}else if (!why && !use_compress_ && usable_mindelay_/dt >= 255.) {
+		why = "the exchange interval is 255 dt or more";
+	}else if (!why && nrn_nthread > 1) {
+		why = "there is more than one thread";
+	}
+	if (why) {
+		if (auto_verbose_ && nrnmpi_myid == 0) {
+Printf("spike_exchange_auto: keeping %s since %s\n", auto_name(auto_nspike_[0]), why);
+		}
+		return;
+	}
+	auto_phase_ = 0;
+}
+
+// called after each exchange with its elapsed time
+static void spike_exchange_auto(double wt) {
+	if (auto_phase_ == 3) { return; }
+	auto_maxnin_[auto_cnt_] = 0;
+	if (nin_) for (int i = 0; i < nrnmpi_numprocs; ++i) {
+#if nrn_spikebuf_size > 0
+		int n = use_compress_ ? nin_[i] : spbufin_[i].nspike;
+#else
+		int n = nin_[i];
+#endif
+		if (auto_maxnin_[auto_cnt_] < n) { auto_maxnin_[auto_cnt_] = n; }
+	}
+	if (auto_phase_ < 2) {
+		auto_wt_[auto_phase_] += wt;
+	}
+	if (++auto_cnt_ < auto_ninterval_) { return; }
+	auto_cnt_ = 0;
+	int n90 = auto_percentile();
+	int nspike = n90 + n90/4 + 1; // some room to avoid retuning often
+	if (auto_phase_ == 0) {
+		// try the other method
+		auto_phase_ = 1;
+		auto_nspike_[1] = use_compress_ ? 0 : nspike;
+		auto_use(auto_nspike_[1]);
+	}else if (auto_phase_ == 1) {
+		double w[2];
+		nrnmpi_dbl_allreduce_vec(auto_wt_, w, 2, 2);
+		int chosen = auto_nspike_[(w[1] < w[0]) ? 1 : 0];
+		if (chosen) { // buffer size from the latest samples
+			chosen = nspike;
+		}
+		auto_phase_ = 2;
+		if (auto_verbose_ && nrnmpi_myid == 0) {
+			Printf("spike_exchange_auto: %s %g ms,", auto_name(auto_nspike_[0]),
+				1000.*w[0]/auto_ninterval_);
+			Printf(" %s %g ms per exchange,", auto_name(auto_nspike_[1]),
+				1000.*w[1]/auto_ninterval_);
+			Printf(" using %s\n", auto_name(chosen));
+		}
+		if (chosen != ag_send_nspike_) {
+			auto_use(chosen);
+		}
+	}else if (use_compress_) {
+		// retune a buffer that overflows too often or is much too large
+		if (n90 > ag_send_nspike_ || 2*nspike < ag_send_nspike_) {
+			if (auto_verbose_ && nrnmpi_myid == 0) {
+Printf("spike_exchange_auto: compressed buffer %d -> %d spikes\n", ag_send_nspike_, nspike);
+			}
+			auto_use(nspike);
+		}
+	}
+}
+#endif // NRNMPI
+
+int nrnmpi_spike_exchange_auto(int ninterval, int verbose) {
+#if NRNMPI
+	if (ninterval >= 0) {
+		if (auto_maxnin_) { delete [] auto_maxnin_; auto_maxnin_ = 0; }
+		auto_ninterval_ = 0;
+		if (nrnmpi_numprocs > 1 && ninterval > 0) {
+			auto_ninterval_ = ninterval;
+			auto_maxnin_ = new int[ninterval];
+		}
+		auto_verbose_ = verbose;
+		auto_phase_ = 3;
+	}
+	return auto_ninterval_;
+#else
+	return 0;
+#endif
+}
+
 PreSyn* nrn_gid2outputpresyn(int gid) { // output PreSyn
         PreSyn* ps;
         if (gid2out_->find(gid, ps)) {
@@ -148,6 +148,7 @@ static void write_globals(const char* fname);
 static int get_global_int_item(const char* name);
 static void* get_global_dbl_item(void* p, const char* & name, int& size, double*& val);
 static void write_nrnthread(const char* fname, NrnThread& nt, CellGroup& cg);
+static void* write_nrnthread_thread(NrnThread*);
 
 static void nrnthread_group_ids(int* groupids);
 static int nrnthread_dat1(int tid, int& n_presyn, int& n_netcon,
@@ -171,7 +172,6 @@ static int nrnthread_dat2_vecplay_inst(int tid, int i, int& vptype, int& mtype,
 static void write_nrnthread_task(const char*, CellGroup* cgs);
 static int* datum2int(int type, Memb_list* ml, NrnThread& nt, CellGroup& cg, DatumIndices& di, int ml_vdata_offset);
 static void setup_nrn_has_net_event();
-static int chkpnt;
 
 // Up to now all the artificial cells have been left out of the processing.
 // Since most processing is in the context of iteration over nt.tml it
@@ -341,12 +341,29 @@ static void part2_clean() {
   cellgroups_ = NULL;
 }
 
+// The files of each thread are written concurrently by the threads.
+// A file that cannot be opened is reported after all have finished.
+static const char* part2_path_;
+static std::vector<std::string> part2_err_;
+
+static void* write_nrnthread_thread(NrnThread* nt) {
+  write_nrnthread(part2_path_, *nt, cellgroups_[nt->id]);
+  return NULL;
+}
+
 static void part2(const char* path) {
   CellGroup* cgs = cellgroups_;
+  part2_path_ = path;
+  part2_err_.assign(nrn_nthread, std::string());
+  nrn_multithread_job(write_nrnthread_thread);
   for (int i=0; i < nrn_nthread; ++i) {
-    chkpnt = 0;
-    write_nrnthread(path, nrn_threads[i], cgs[i]);
+    if (!part2_err_[i].empty()) {
+      std::string fname(part2_err_[i]);
+      part2_err_.clear();
+      hoc_execerror("nrnbbcore_write write_nrnthread could not open for writing:", fname.c_str());
+    }
   }
+  part2_err_.clear();
 
   /** write mapping information */
   if(mapinfo.size()) {
@@ -624,76 +641,82 @@ static void mk_cgs_netcon_info(CellGroup* cgs) {
   delete [] nccnt;
 }
 
-CellGroup* mk_cellgroups() {
+// PreSyn and output gid information of the CellGroup of one thread.
+static void* mk_cellgroup_thread(NrnThread* nt) {
   CellGroup* cgs = cellgroups_;
-  for (int i=0; i < nrn_nthread; ++i) {
-    int ncell = nrn_threads[i].ncell; // real cell count
-    int npre = ncell;
-    MlWithArt& mla = cgs[i].mlwithart;
-    for (size_t j = 0; j < mla.size(); ++j) {
-      int type = mla[j].first;
-      Memb_list* ml = mla[j].second;
-      cgs[i].type2ml[type] = ml;
-      if (nrn_has_net_event(type)) {
-        npre += ml->nodecount;
-      }
-    }
-    cgs[i].n_presyn = npre;
-    cgs[i].n_real_output = ncell;
-    cgs[i].output_ps = new PreSyn*[npre];
-    cgs[i].output_gid = new int[npre];
-    cgs[i].output_vindex = new int[npre];
-    // in case some cells do not have voltage presyns (eg threshold detection
-    // computed from a POINT_PROCESS NET_RECEIVE with WATCH and net_event)
-    // initialize as unused.
-    for (int j=0; j < npre; ++j) {
-      cgs[i].output_ps[j] = NULL;
-      cgs[i].output_gid[j] = -1;
-      cgs[i].output_vindex[j] = -1;
+  int i = nt->id;
+  int ncell = nrn_threads[i].ncell; // real cell count
+  int npre = ncell;
+  MlWithArt& mla = cgs[i].mlwithart;
+  for (size_t j = 0; j < mla.size(); ++j) {
+    int type = mla[j].first;
+    Memb_list* ml = mla[j].second;
+    cgs[i].type2ml[type] = ml;
+    if (nrn_has_net_event(type)) {
+      npre += ml->nodecount;
     }
-
-    // fill in the artcell info
-    npre = ncell;
-    cgs[i].n_output = ncell; // add artcell (and PP with net_event) with gid in following loop
-    for (size_t j = 0; j < mla.size(); ++j) {
-      int type = mla[j].first;
-      Memb_list* ml = mla[j].second;
-      if (nrn_has_net_event(type)) {
-        for (int j=0; j < ml->nodecount; ++j) {
-          Point_process* pnt = (Point_process*)ml->pdata[j][1]._pvoid;
-          PreSyn* ps = (PreSyn*)pnt->presyn_;
-          cgs[i].output_ps[npre] = ps;
-          int agid = -1;
-          if (nrn_is_artificial_[type]) {
-            agid = -(type + 1000*nrncore_art2index(pnt->prop->param));
-          }else{ // POINT_PROCESS with net_event
-            int sz = nrn_prop_param_size_[type];
-            double* d1 = ml->data[0];
-            double* d2 = pnt->prop->param;
-            assert(d2 >= d1 && d2 < (d1 + (sz*ml->nodecount)));
-            int ix = (d2 - d1)/sz;
-            agid = -(type + 1000*ix);
-          }
-          if (ps) {
-            if (ps->output_index_ >= 0) { // has gid
-              cgs[i].output_gid[npre] = ps->output_index_;
-              if (cgs[i].group_id < 0) {
-                cgs[i].group_id = ps->output_index_;
-              }
-              ++cgs[i].n_output;
-            }else{
-              cgs[i].output_gid[npre] = agid;
+  }
+  cgs[i].n_presyn = npre;
+  cgs[i].n_real_output = ncell;
+  cgs[i].output_ps = new PreSyn*[npre];
+  cgs[i].output_gid = new int[npre];
+  cgs[i].output_vindex = new int[npre];
+  // in case some cells do not have voltage presyns (eg threshold detection
+  // computed from a POINT_PROCESS NET_RECEIVE with WATCH and net_event)
+  // initialize as unused.
+  for (int j=0; j < npre; ++j) {
+    cgs[i].output_ps[j] = NULL;
+    cgs[i].output_gid[j] = -1;
+    cgs[i].output_vindex[j] = -1;
+  }
+
+  // fill in the artcell info
+  npre = ncell;
+  cgs[i].n_output = ncell; // add artcell (and PP with net_event) with gid in following loop
+  for (size_t j = 0; j < mla.size(); ++j) {
+    int type = mla[j].first;
+    Memb_list* ml = mla[j].second;
+    if (nrn_has_net_event(type)) {
+      for (int j=0; j < ml->nodecount; ++j) {
+        Point_process* pnt = (Point_process*)ml->pdata[j][1]._pvoid;
+        PreSyn* ps = (PreSyn*)pnt->presyn_;
+        cgs[i].output_ps[npre] = ps;
+        int agid = -1;
+        if (nrn_is_artificial_[type]) {
+          agid = -(type + 1000*nrncore_art2index(pnt->prop->param));
+        }else{ // POINT_PROCESS with net_event
+          int sz = nrn_prop_param_size_[type];
+          double* d1 = ml->data[0];
+          double* d2 = pnt->prop->param;
+          assert(d2 >= d1 && d2 < (d1 + (sz*ml->nodecount)));
+          int ix = (d2 - d1)/sz;
+          agid = -(type + 1000*ix);
+        }
+        if (ps) {
+          if (ps->output_index_ >= 0) { // has gid
+            cgs[i].output_gid[npre] = ps->output_index_;
+            if (cgs[i].group_id < 0) {
+              cgs[i].group_id = ps->output_index_;
             }
-          }else{ // if an acell is never a source, it will not have a presyn
-            cgs[i].output_gid[npre] = -1;
+            ++cgs[i].n_output;
+          }else{
+            cgs[i].output_gid[npre] = agid;
           }
-          // the way we associate an acell PreSyn with the Point_process.
-          cgs[i].output_vindex[npre] = agid;
-          ++npre;
+        }else{ // if an acell is never a source, it will not have a presyn
+          cgs[i].output_gid[npre] = -1;
         }
+        // the way we associate an acell PreSyn with the Point_process.
+        cgs[i].output_vindex[npre] = agid;
+        ++npre;
       }
     }
   }
+  return NULL;
+}
+
+CellGroup* mk_cellgroups() {
+  CellGroup* cgs = cellgroups_;
+  nrn_multithread_job(mk_cellgroup_thread);
   // work at netpar.cpp because we don't have the output gid hash tables here.
   // fill in the output_ps, output_gid, and output_vindex for the real cells.
   nrncore_netpar_cellgroups_helper(cgs);
@@ -717,6 +740,9 @@ CellGroup* mk_cellgroups() {
 
 void datumtransform(CellGroup* cgs) {
   // ions, area, and POINTER to v.
+  // Only the sizes are determined here. The DatumIndices of a mechanism
+  // are filled by nrnthread_dat2_mech when its pdata is needed and
+  // released right after, so they never exist for all cell groups at once.
   for (int ith=0; ith < nrn_nthread; ++ith) {
     NrnThread& nt = nrn_threads[ith];
     CellGroup& cg = cgs[ith];
@@ -730,21 +756,27 @@ void datumtransform(CellGroup* cgs) {
       }
     }
     cg.datumindices = new DatumIndices[cg.ntype];
-    // specify type, allocate the space, and fill the indices
+    // specify type and whether the diam is needed
     int i=0;
     for (size_t j = 0; j < mla.size(); ++j) {
       int type = mla[j].first;
-      Memb_list* ml = mla[j].second;
       int sz = bbcore_dparam_size[type];
       if (sz) {
         DatumIndices& di = cg.datumindices[i++];
         di.type = type;
-        int n = ml->nodecount * sz;
-        di.ion_type = new int[n];
-        di.ion_index = new int[n];
-        // fill the indices.
-        // had tointroduce a memb_func[i].dparam_semantics registered by each mod file.
-        datumindex_fill(ith, cg, di, ml);
+        int* dmap = memb_func[type].dparam_semantics;
+        for (int k=0; k < sz; ++k) {
+          if (dmap[k] == -9) { // diam
+            cg.ndiam = nt.end;
+          }
+          // checked here since datumindex_fill may run on a worker thread
+          int d = dmap[k];
+          if (!((d < 0 && d >= -9) || (d > 0 && d != 1000))) {
+            char errmes[100];
+            sprintf(errmes, "Unknown semantics type %d for dparam item %d of", d, k);
+            hoc_execerror(errmes, memb_func[type].sym->name);
+          }
+        }
       }
     }
   }
@@ -910,10 +942,8 @@ void datumindex_fill(int ith, CellGroup& cg, DatumIndices& di, Memb_list* ml) {
         //store the actual ionstyle
         etype = dmap[j];
         eindex = *((int*)dparam[j]._pvoid);
-      } else {
-        char errmes[100];
-        sprintf(errmes, "Unknown semantics type %d for dparam item %d of", dmap[j], j);
-        hoc_execerror(errmes, memb_func[di.type].sym->name);
+      } else { // rejected by datumtransform
+        assert(0);
       }
       di.ion_type[offset + j] = etype;
       di.ion_index[offset + j] = eindex;
@@ -1042,22 +1072,23 @@ static void* get_global_dbl_item(void* p, const char* & name, int& size, double*
   return NULL;
 }
 
-void writeint_(int* p, size_t size, FILE* f) {
+void writeint_(int* p, size_t size, FILE* f, int& chkpnt) {
   fprintf(f, "chkpnt %d\n", chkpnt++);
   size_t n = fwrite(p, sizeof(int), size, f);
   assert(n == size);
 }
 
-void writedbl_(double* p, size_t size, FILE* f) {
+void writedbl_(double* p, size_t size, FILE* f, int& chkpnt) {
   fprintf(f, "chkpnt %d\n", chkpnt++);
   size_t n = fwrite(p, sizeof(double), size, f);
   assert(n == size);
 }
 
-#define writeint(p,size) writeint_(p, size, f)
-#define writedbl(p,size) writedbl_(p, size, f)
+// chkpnt counts the arrays written to the file f
+#define writeint(p,size) writeint_(p, size, f, chkpnt)
+#define writedbl(p,size) writedbl_(p, size, f, chkpnt)
 
-static void write_contiguous_art_data(double** data, int nitem, int szitem, FILE* f) {
+static void write_contiguous_art_data(double** data, int nitem, int szitem, FILE* f, int& chkpnt) {
   fprintf(f, "chkpnt %d\n", chkpnt++);
   // the assumption is that an fwrite of nitem groups of szitem doubles can be
   // fread as a single group of nitem*szitem doubles.
@@ -1152,7 +1183,7 @@ static int nrnthread_dat2_vecplay_inst(int tid, int i, int& vptype, int& mtype,
   return 0;
 }
 
-static void nrnbbcore_vecplay_write(FILE* f, NrnThread& nt) {
+static void nrnbbcore_vecplay_write(FILE* f, NrnThread& nt, int& chkpnt) {
   // count the instances for this thread
   // error if not a VecPlayContinuous with no discon vector
   int n;
@@ -1319,9 +1350,17 @@ static int nrnthread_dat2_mech(int tid, size_t i, int dsz_inst, int*& nodeindice
     sz = bbcore_dparam_size[type]; // nrn_prop_dparam_size off by 1 if cvode_ieq.
     if (sz) {
       int* pdata1;
-      pdata1 = datum2int(type, ml, nt, cg, cg.datumindices[dsz_inst], vdata_offset);
+      // fill the DatumIndices only for as long as they are needed
+      DatumIndices& di = cg.datumindices[dsz_inst];
+      int nn = n*sz;
+      di.ion_type = new int[nn];
+      di.ion_index = new int[nn];
+      datumindex_fill(tid, cg, di, ml);
+      pdata1 = datum2int(type, ml, nt, cg, di, vdata_offset);
+      delete [] di.ion_type;
+      delete [] di.ion_index;
+      di.ion_type = di.ion_index = NULL;
       if (copy) {
-        int nn = n*sz;
         for (int i=0; i < nn; ++i) {
           pdata[i] = pdata1[i];
         }
@@ -1343,11 +1382,8 @@ static int nrnthread_dat2_3(int tid, int nweight, int*& output_vindex, double*&
   CellGroup& cg = cellgroups_[tid];
   NrnThread& nt = nrn_threads[tid];
 
-  output_vindex = new int[cg.n_presyn];
+  output_vindex = cg.output_vindex; cg.output_vindex = NULL;
   output_threshold = new double[cg.n_real_output];
-  for (int i=0; i < cg.n_presyn; ++i) {
-    output_vindex[i] = cg.output_vindex[i];
-  }
   for (int i=0; i < cg.n_real_output; ++i) {
     output_threshold[i] = cg.output_ps[i] ? cg.output_ps[i]->threshold_ : 0.0;
   }
@@ -1431,14 +1467,18 @@ void nrnthread_group_ids(int* grp) {
   }
 }
 
+// Called concurrently for each thread by write_nrnthread_thread. The
+// name of a file that cannot be opened is left in part2_err_.
 void write_nrnthread(const char* path, NrnThread& nt, CellGroup& cg) {
   char fname[1000];
+  int chkpnt = 0;
   if (cg.n_output <= 0) { return; }
   assert(cg.group_id >= 0);
   nrn_assert(snprintf(fname, 1000, "%s/%d_1.dat", path, cg.group_id) < 1000);
   FILE* f = fopen(fname, "wb");
   if (!f) {
-    hoc_execerror("nrnbbcore_write write_nrnthread could not open for writing:", fname);
+    part2_err_[nt.id] = fname;
+    return;
   }
   fprintf(f, "%s\n", bbcore_write_version);
 
@@ -1455,7 +1495,8 @@ void write_nrnthread(const char* path, NrnThread& nt, CellGroup& cg) {
   nrn_assert(snprintf(fname, 1000, "%s/%d_2.dat", path, cg.group_id) < 1000);
   f = fopen(fname, "w");
   if (!f) {
-    hoc_execerror("nrnbbcore_write write_nrnthread could not open for writing:", fname);
+    part2_err_[nt.id] = fname;
+    return;
   }
 
   fprintf(f, "%s\n", bbcore_write_version);
@@ -1527,6 +1568,7 @@ void write_nrnthread(const char* path, NrnThread& nt, CellGroup& cg) {
   nrnthread_dat2_3(nt.id, nweight, output_vindex, output_threshold,
     netcon_pnttype, netcon_pntindex, weights, delays);
   writeint(output_vindex, cg.n_presyn);
+  delete [] output_vindex;
   writedbl(output_threshold, cg.n_real_output);
   delete [] output_threshold;
 
@@ -1567,7 +1609,7 @@ void write_nrnthread(const char* path, NrnThread& nt, CellGroup& cg) {
     }
   }
 
-  nrnbbcore_vecplay_write(f, nt);
+  nrnbbcore_vecplay_write(f, nt, chkpnt);
 
   fclose(f);
 }
@@ -1808,6 +1850,7 @@ void nrn_write_mapping_info(const char *path, int gid, NrnMappingInfo &minfo) {
     }
 
     fprintf(f, "%s\n", bbcore_write_version);
+    int chkpnt = 0;
 
     /** number of gids in NrnThread */
     fprintf(f, "%zd\n", minfo.size());
@@ -2,6 +2,7 @@
 
 #include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
 #include <errno.h>
 #include <InterViews/resource.h>
 #include <OS/list.h>
@@ -10,6 +11,8 @@
 #include <nrnmpi.h>
 #include <nrnhash.h>
 #include <mymath.h>
+#include <oclist.h>
+#include <parse.h>
 #if defined(HAVE_STDINT_H)
 #include <stdint.h>
 #endif
@@ -36,6 +39,8 @@
 extern "C" {
 void nrnmpi_source_var();
 void nrnmpi_target_var();
+int nrnmpi_source_var_bulk();
+int nrnmpi_target_var_bulk();
 void nrnmpi_setup_transfer();
 void nrn_partrans_clear();
 static void mpi_transfer();
@@ -48,6 +53,9 @@ extern int structure_change_cnt;
 extern int nrn_node_ptr_change_cnt_;
 extern double* nrn_recalc_ptr(double*);
 extern const char *bbcore_write_version;
+extern int vector_capacity(IvocVect*); //ivocvect.h conflicts with STL
+extern double* vector_vec(IvocVect*);
+extern IvocVect* vector_arg(int);
 // see lengthy comment in ../nrnoc/fadvance.c
 // nrnmpi_v_transfer requires existence of nrnthread_v_transfer even if there
 // is only one thread.
@@ -223,13 +231,21 @@ static void delete_imped_info() {
 // pv2node extended to any range variable in the section
 // This helper searches over all the mechanisms in the node.
 // If *pv exists, store mechtype and parray_index.
-static bool non_vsrc_setinfo(sgid_t ssid, Node* nd, double* pv) {
+static Prop* pv2prop(Node* nd, double* pv) {
   for (Prop* p = nd->prop; p; p = p->next) {
     if (pv >= p->param && pv < (p->param + p->param_size)) {
+      return p;
+    }
+  }
+  return NULL;
+}
+
+static bool non_vsrc_setinfo(sgid_t ssid, Node* nd, double* pv) {
+  Prop* p = pv2prop(nd, pv);
+  if (p) {
       non_vsrc_update_info_[ssid] = std::pair<int,int>(p->type, pv - p->param);
       //printf("non_vsrc_setinfo %p %d %ld %s\n", pv, p->type, pv-p->param, memb_func[p->type].sym->name);
       return true;
-    }
   }
   return false;
 }
@@ -251,20 +267,30 @@ static double* non_vsrc_update(Node* nd, int type, int ix) {
 // Extended to any pointer to range variable in the section.
 // If not a voltage save pv associated with mechtype, p_array_index
 // in non_vsrc_update_info_
-static Node* pv2node(sgid_t ssid, double* pv) {
-	Section* sec = chk_access();
+static Node* sec_pv2node(Section* sec, double* pv) {
 	Node* nd = sec->parentnode;
 	if (nd) {
-		if (&NODEV(nd) == pv || non_vsrc_setinfo(ssid, nd, pv)) {
+		if (&NODEV(nd) == pv || pv2prop(nd, pv)) {
 			return nd;
 		}
 	}
 	for (int i = 0; i < sec->nnode; ++i) {
 		nd = sec->pnode[i];
-		if (&NODEV(nd) == pv || non_vsrc_setinfo(ssid, nd, pv)) {
+		if (&NODEV(nd) == pv || pv2prop(nd, pv)) {
 			return nd;
 		}
 	}
+	return NULL;
+}
+
+static Node* pv2node(sgid_t ssid, double* pv) {
+	Node* nd = sec_pv2node(chk_access(), pv);
+	if (nd) {
+		if (&NODEV(nd) != pv) {
+			non_vsrc_setinfo(ssid, nd, pv);
+		}
+		return nd;
+	}
 	
 	hoc_execerror("Pointer to v is not in the currently accessed section", 0);
 	return NULL;
@@ -342,6 +368,156 @@ void nrnmpi_target_var() {
 	//printf("nrnmpi_target_var %p target_val=%g sgid=%ld\n", ptv, *ptv, (long)sgid);
 }
 
+// Bulk registration for models with very many half gap junctions.
+// Every argument is checked before anything is registered so that an
+// error does not leave a partial registration behind.
+
+static double* bulk_vec(int iarg, int n, const char* name) {
+	IvocVect* vec = vector_arg(iarg);
+	if (vector_capacity(vec) != n) {
+		hoc_execerror(name, "Vector must have the same size as the sgid Vector");
+	}
+	return vector_vec(vec);
+}
+
+static OcList* bulk_list(int iarg) {
+	Object* ob = *hoc_objgetarg(iarg);
+	check_obj_type(ob, "List");
+	return (OcList*)ob->u.this_pointer;
+}
+
+static void sgid_in_use(sgid_t sgid) {
+	char tmp[40];
+	sprintf(tmp, "%lld", (long long)sgid);
+	hoc_execerror("source var gid already in use:", tmp);
+}
+
+// pc.source_var_bulk(sgidvec, seclist, secindexvec, xvec [, "rangevar"])
+// equivalent to
+// for i: seclist.o(secindexvec.x[i]).sec pc.source_var(&rangevar(xvec.x[i]), sgidvec.x[i])
+// where seclist is a List of SectionRef and rangevar defaults to v.
+int nrnmpi_source_var_bulk() {
+	int i, j;
+	alloclists();
+	IvocVect* vsgid = vector_arg(1);
+	int n = vector_capacity(vsgid);
+	double* sg = vector_vec(vsgid);
+	OcList* secs = bulk_list(2);
+	double* isec = bulk_vec(3, n, "section index");
+	double* x = bulk_vec(4, n, "x");
+	const char* name = ifarg(5) ? gargstr(5) : "v";
+	Symbol* sym = hoc_lookup(name);
+	if (!sym || sym->type != RANGEVAR) {
+		hoc_execerror(name, "is not a range variable");
+	}
+	long nsec = secs->count();
+	for (i = 0; i < nsec; ++i) {
+		Object* ob = secs->object(i);
+		if (!is_obj_type(ob, "SectionRef")) {
+			hoc_execerror(hoc_object_name(ob), "is not a SectionRef");
+		}
+		if (!((Section*)ob->u.this_pointer)->prop) {
+			hoc_execerror(hoc_object_name(ob), "refers to a deleted section");
+		}
+	}
+	std::vector<sgid_t> sorted(n);
+	std::vector<Node*> nodes(n);
+	DblPVec pvs(n);
+	for (i = 0; i < n; ++i) {
+		if (isec[i] < 0. || isec[i] >= nsec) {
+			hoc_execerror("section index out of range", 0);
+		}
+		if (x[i] < 0. || x[i] > 1.) {
+			hoc_execerror("x out of range", 0);
+		}
+		Section* sec = (Section*)secs->object(long(isec[i]))->u.this_pointer;
+		pvs[i] = nrn_rangepointer(sec, sym, x[i]);
+		nodes[i] = sec_pv2node(sec, pvs[i]);
+		if (!nodes[i]) {
+			hoc_execerror(sym->name, "is not a range variable in a node of the section");
+		}
+		sorted[i] = (sgid_t)sg[i];
+	}
+	std::sort(sorted.begin(), sorted.end());
+	for (i = 0; i < n; ++i) {
+		if ((i > 0 && sorted[i] == sorted[i-1]) || sgid2srcindex_->find(sorted[i], j)) {
+			sgid_in_use(sorted[i]);
+		}
+	}
+	is_setup_ = false;
+	for (i = 0; i < n; ++i) {
+		sgid_t sgid = (sgid_t)sg[i];
+		if (pvs[i] != &NODEV(nodes[i])) {
+			non_vsrc_setinfo(sgid, nodes[i], pvs[i]);
+		}
+		(*sgid2srcindex_)[sgid] = visources_->count();
+		visources_->append(nodes[i]);
+		sgids_->append(sgid);
+	}
+	return n;
+}
+
+// index of the named range variable in the param array of a point process
+static int pp_param_index(int type, const char* name) {
+	Symbol* msym = memb_func[type].sym;
+	for (int i = 0; i < msym->s_varn; ++i) {
+		Symbol* s = msym->u.ppsym[i];
+		if (s->subtype != NRNPOINTER && strcmp(s->name, name) == 0) {
+			return s->u.rng.index;
+		}
+	}
+	hoc_execerror(name, "is not a range variable of the POINT_PROCESS target");
+	return -1;
+}
+
+// pc.target_var_bulk(sgidvec, pplist, ppindexvec, "rangevar")
+// equivalent to
+// for i: pc.target_var(pplist.o(ppindexvec.x[i]), &pplist.o(ppindexvec.x[i]).rangevar, sgidvec.x[i])
+int nrnmpi_target_var_bulk() {
+	int i;
+	alloclists();
+	IvocVect* vsgid = vector_arg(1);
+	int n = vector_capacity(vsgid);
+	double* sg = vector_vec(vsgid);
+	OcList* tars = bulk_list(2);
+	double* ipp = bulk_vec(3, n, "target index");
+	const char* name = gargstr(4);
+	long ntar = tars->count();
+	std::vector<Point_process*> pps(ntar);
+	std::vector<int> ixs(ntar);
+	std::map<int, int> type2ix; // the name is looked up once per type
+	for (i = 0; i < ntar; ++i) {
+		Object* ob = tars->object(i);
+		if (!is_point_process(ob)) {
+			hoc_execerror(hoc_object_name(ob), "is not a point process");
+		}
+		pps[i] = ob2pntproc(ob);
+		if (!pps[i]->prop) {
+			hoc_execerror(hoc_object_name(ob), "is not located in a section");
+		}
+		int type = pps[i]->prop->type;
+		std::map<int, int>::iterator it = type2ix.find(type);
+		if (it == type2ix.end()) {
+			it = type2ix.insert(std::pair<int, int>(type, pp_param_index(type, name))).first;
+		}
+		ixs[i] = it->second;
+	}
+	for (i = 0; i < n; ++i) {
+		if (ipp[i] < 0. || ipp[i] >= ntar) {
+			hoc_execerror("target index out of range", 0);
+		}
+	}
+	is_setup_ = false;
+	for (i = 0; i < n; ++i) {
+		long k = long(ipp[i]);
+		targets_->append(tar_ptr(pps[k], ixs[k]));
+		target_pntlist_->append(pps[k]);
+		target_parray_index_->append(ixs[k]);
+		sgid2targets_->append((sgid_t)sg[i]);
+	}
+	return n;
+}
+
 void nrn_partrans_update_ptrs() {
 	// These pointer changes require that the targets be range variables
 	// of a point process and the sources be range variables
@@ -723,26 +899,27 @@ void nrnmpi_setup_transfer() {
 	// At the end of this section, needsrc is an array of needsrc_cnt
 	// sids needed by this machine. The 'seen' table values are unused
 	// but the keys are all the (unique) sgid needed by this process.
-	int needsrc_cnt = 0;
-	MapSgid2Int* seen = new MapSgid2Int(targets_->count());//for single counting
-	int szalloc = targets_->count();
-	szalloc = szalloc ? szalloc : 1;
-	sgid_t* needsrc = new sgid_t[szalloc]; // more than we need
+	// Note that although old comment possibly mention that we do not
+	// transfer intraprocessor sids, it is actually a good idea to do so
+	// in order to produce a reasonable error message about using the
+	// same sid for multiple source variables.
+	// With millions of targets, a sort and unique of the sgids is much
+	// faster than a hash table lookup and insert per target, and the
+	// table can then be allocated at its final size.
+	std::vector<sgid_t> need(sgid2targets_->count());
 	for (int i = 0; i < sgid2targets_->count(); ++i) {
-		sgid_t sid = sgid2targets_->item(i);
-		// only need it if not a source on this machine
-		int srcindex;
-// Note that although old comment possibly mention that we do not transfer
-// intraprocessor sids, it is actually a good idea to do so in order to
-// produce a reasonable error message about using the same sid for multiple
-// source variables. Hence the following statement is commented out.
-//		if (!sgid2srcindex_->find(sid, srcindex)) {
-			if (!seen->find(sid, srcindex)) {
-				(*seen)[sid] = srcindex;
-				needsrc[needsrc_cnt++] = sid;
-			}
-//		}
+		need[i] = sgid2targets_->item(i);
+	}
+	std::sort(need.begin(), need.end());
+	int needsrc_cnt = std::unique(need.begin(), need.end()) - need.begin();
+	int szalloc = needsrc_cnt ? needsrc_cnt : 1;
+	MapSgid2Int* seen = new MapSgid2Int(szalloc);//for single counting
+	sgid_t* needsrc = new sgid_t[szalloc];
+	for (int i = 0; i < needsrc_cnt; ++i) {
+		needsrc[i] = need[i];
+		(*seen)[need[i]] = -1;
 	}
+	std::vector<sgid_t>().swap(need);
 #if 0
 	for (int i=0; i < needsrc_cnt; ++i) {
 		printf("%d step 1 need %d\n", nrnmpi_myid, needsrc[i]);
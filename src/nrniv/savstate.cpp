@@ -27,6 +27,10 @@ extern PlayRecList* net_cvode_instance_prl();
 extern double t;
 extern short* nrn_is_artificial_;
 static void tqcallback(const TQItem* tq, int i);
+// the rxd states, set by nrnpython. save returns NULL (and size 0) if there
+// are no rxd states, restore returns 0 on success.
+double* (*nrnpy_rxd_save_state)(int* size);
+int (*nrnpy_rxd_restore_state)(double* data, int size);
 };
 
 #define ASSERTfgets(a,b,c) nrn_assert(fgets(a,b,c) != 0)
@@ -124,6 +128,14 @@ private:
 	void allocnet();
 	void free_tq();
 	void alloc_tq();
+
+	void saverxd();
+	void restorerxd();
+	void readrxd(FILE*);
+	void writerxd(FILE*);
+	void freerxd();
+	int nrxd_;
+	double* rxd_;
 public:
 	void tqcount(const TQItem*, int);
 	void tqsave(const TQItem*, int);
@@ -162,6 +174,8 @@ SaveState::SaveState() {
 	tqs_->nstate = 0;
 	nprs_ = 0;
 	prs_ = NULL;
+	nrxd_ = 0;
+	rxd_ = NULL;
 	nacell_ = 0;
 	for (i=0; i < n_memb_func; ++i) if (nrn_is_artificial_[i]) {
 		++nacell_;
@@ -542,6 +556,7 @@ void SaveState::ssfree() {
 		delete [] prs_;
 	}
 	nprs_ = 0;
+	freerxd();
 }
 
 void SaveState::save() {
@@ -581,6 +596,7 @@ void SaveState::save() {
 		}
 	}
 	savenet();
+	saverxd();
 }
 
 void SaveState::savenode(NodeState& ns, Node* nd) {
@@ -626,6 +642,7 @@ void SaveState::restore(int type) {
 		hoc_execerror("SaveState:",
 		"Stored state inconsistent with current neuron structure");
 	}
+	restorerxd();
 	t = t_;
 	FOR_THREADS(nt) {
 		nt->_t = t_;
@@ -776,6 +793,7 @@ void SaveState::read(OcFile* ocf, bool close) {
 		}
 	}
 	readnet(f);
+	readrxd(f);
 	if (close) {
 		ocf->close();
 	}
@@ -827,6 +845,7 @@ void SaveState::write(OcFile* ocf, bool close) {
 		prs_[i]->savestate_write(f);
 	}
 	writenet(f);
+	writerxd(f);
 	if (close) {
 		ocf->close();
 	}
@@ -1024,6 +1043,54 @@ void SaveState::writenet(FILE* f) {
 	}
 }
 
+void SaveState::freerxd() {
+	if (rxd_) {
+		delete [] rxd_;
+	}
+	nrxd_ = 0;
+	rxd_ = NULL;
+}
+
+void SaveState::saverxd() {
+	freerxd();
+	if (nrnpy_rxd_save_state) {
+		rxd_ = (*nrnpy_rxd_save_state)(&nrxd_);
+	}
+}
+
+void SaveState::restorerxd() {
+	// states saved before rxd was in use leave the rxd states unchanged
+	if (!nrxd_) {
+		return;
+	}
+	if (!nrnpy_rxd_restore_state
+	    || (*nrnpy_rxd_restore_state)(rxd_, nrxd_) != 0) {
+		hoc_execerror("SaveState:",
+		"Stored rxd state inconsistent with current rxd model");
+	}
+}
+
+void SaveState::readrxd(FILE* f) {
+	// files written before the rxd states were added end after the net
+	char buf[200];
+	freerxd();
+	if (fgets(buf, 200, f) == 0) {
+		return;
+	}
+	nrn_assert(sscanf(buf, "%d\n", &nrxd_) == 1);
+	if (nrxd_) {
+		rxd_ = new double[nrxd_];
+		ASSERTfread((char*)rxd_, sizeof(double), nrxd_, f);
+	}
+}
+
+void SaveState::writerxd(FILE* f) {
+	fprintf(f, "%d\n", nrxd_);
+	if (nrxd_) {
+		ASSERTfwrite((char*)rxd_, sizeof(double), nrxd_, f);
+	}
+}
+
 bool SaveState::checknet(bool warn) {
 	if (nncs_ != nct->count) {
 		if (warn) {
@@ -13,6 +13,7 @@
 
 #include "ocpointer.h"
 #include "vrecitem.h"
+#include "recstream.h"
 #include "netcvode.h"
 #include "cvodeobj.h"
 
@@ -128,6 +129,39 @@ hoc_execerror("Second argument of Vector.play in continuous mode must be a time
 	}
 }
 
+// record the n variables pds every dt into successive rows of y
+void nrn_vecsim_record_multi(IvocVect* y, int n, double** pds, double dt) {
+	nrn_vecsim_remove(y);
+	new VecRecordMulti(n, pds, y, dt);
+}
+
+static VecRecordMulti* record_multi_item(IvocVect* y) {
+	PlayRecord* pr = net_cvode_instance->playrec_uses(y);
+	if (!pr || pr->type() != VecRecordMultiType) {
+		hoc_execerror("Vector is not recording multiple variables", 0);
+	}
+	return (VecRecordMulti*)pr;
+}
+
+// send the rows of the multiple variable recording into y to a file
+void nrn_vecsim_record_stream(IvocVect* y, const char* fname, int chunk,
+  const char* labels) {
+	VecRecordMulti* pr = record_multi_item(y);
+	if (pr->stream_) {
+		delete pr->stream_;
+		pr->stream_ = nil;
+	}
+	pr->stream_ = new RecordStream(fname, pr->n_, chunk, pr->dt_, labels);
+	y->resize(0);
+}
+
+void nrn_vecsim_record_flush(IvocVect* y) {
+	VecRecordMulti* pr = record_multi_item(y);
+	if (pr->stream_) {
+		pr->stream_->flush();
+	}
+}
+
 VecPlayStep::VecPlayStep(double* pd, IvocVect* y, IvocVect* t, double dt, Object* ppobj) : PlayRecord(pd, ppobj) {
 //printf("VecPlayStep\n");
 	init(y, t, dt);
@@ -413,7 +413,7 @@ void* nrn_fixed_step_group_thread(NrnThread* nth) {
 }
 
 void* nrn_fixed_step_thread(NrnThread* nth) {
-	double wt;
+	double wt, pt;
 	deliver_net_events(nth);
 	wt = nrnmpi_wtime();
 	nrn_random_play(nth);
@@ -425,9 +425,12 @@ void* nrn_fixed_step_thread(NrnThread* nth) {
 #endif
 	fixed_play_continuous(nth);
 	setup_tree_matrix(nth);
+	if (nrn_prof_) { pt = nrnmpi_wtime(); }
 	nrn_solve(nth);
+	if (nrn_prof_) { pt = nrn_prof_phase(nth->id, NRN_PROF_SOLVE, pt); }
 	second_order_cur(nth);
 	update(nth);
+	if (nrn_prof_) { nrn_prof_phase(nth->id, NRN_PROF_UPDATE, pt); }
 	CTADD
 /*
   To simplify the logic,
@@ -683,7 +686,7 @@ void nonvint(NrnThread* _nt)
 {
 #if VECTORIZE
 	int i=0;
-	double w;
+	double w, pt;
 	int measure = 0;
 	NrnThreadMembList* tml;
 #if 1 || PARANEURON
@@ -691,12 +694,14 @@ void nonvint(NrnThread* _nt)
 	if (nrnthread_v_transfer_) {(*nrnthread_v_transfer_)(_nt);}
 #endif
 	if (_nt->id == 0 && nrn_mech_wtime_) { measure = 1; }
+	if (nrn_prof_) { pt = nrnmpi_wtime(); }
 	errno = 0;
 	for (tml = _nt->tml; tml; tml = tml->next) if (memb_func[tml->index].state) {
 		Pvmi s = memb_func[tml->index].state;
-		if (measure) { w = nrnmpi_wtime(); }
+		if (measure || nrn_prof_) { w = nrnmpi_wtime(); }
 		(*s)(_nt, tml->ml, tml->index);
 		if (measure) { nrn_mech_wtime_[tml->index] += nrnmpi_wtime() - w; }
+		if (nrn_prof_) { nrn_prof_mech(_nt->id, tml->index, NRN_PROF_STATE, w); }
 		if (errno) {
 			if (nrn_errno_check(i)) {
 hoc_warning("errno set during calculation of states", (char*)0);
@@ -704,7 +709,9 @@ hoc_warning("errno set during calculation of states", (char*)0);
 		}
   	  }
 	long_difus_solve(0, _nt); /* if any longitudinal diffusion */
+	if (nrn_prof_) { pt = nrn_prof_phase(_nt->id, NRN_PROF_NONVINT, pt); }
 	nrn_nonvint_block_fixed_step_solve(_nt->id);
+	if (nrn_prof_) { nrn_prof_phase(_nt->id, NRN_PROF_RXD, pt); }
 #endif
 }
 
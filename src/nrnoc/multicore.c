@@ -449,13 +449,33 @@ static void threads_free_pthread(){
 }
 #endif /* !USE_PTHREAD */
 
+/*
+The worker threads do not exist in a forked child. BBSLocal stops them
+before it forks its worker processes and creates them again afterwards,
+in the master and in each child.
+*/
+static int fork_parallel_;
+
+void nrn_threads_fork_prepare() {
+	fork_parallel_ = nrn_thread_parallel_;
+	threads_free_pthread();
+}
+
+void nrn_threads_fork_restore() {
+	if (fork_parallel_) {
+		threads_create_pthread();
+	}
+}
+
 void nrn_thread_error(const char* s) {
 	if (nrn_nthread != 1) {
 		hoc_execerror(s, (char*)0);
 	}
 }
 
-void nrn_thread_stat() {
+static double part_stat();
+
+double nrn_thread_stat() {
 #if BENCHMARKING
 	FILE* f;
 	long i, j, n;
@@ -483,6 +503,7 @@ void nrn_thread_stat() {
 	}
 	fclose(f);
 #endif /*BENCHMARKING*/
+	return part_stat();
 }
 
 void nrn_threads_create(int n, int parallel) {
@@ -534,6 +555,8 @@ void nrn_threads_create(int n, int parallel) {
 				nt->_v_parent_index = 0;
 				nt->_v_node = 0;
 				nt->_v_parent = 0;
+				nt->_group_start = 0;
+				nt->_ngroup = 0;
 				nt->_ecell_memb_list = 0;
 				nt->_ecell_child_cnt = 0;
 				nt->_ecell_children = NULL;
@@ -545,6 +568,9 @@ void nrn_threads_create(int n, int parallel) {
 		}
 		v_structure_change = 1;
 		diam_changed = 1;
+		if (nrn_prof_) { /* restart for the new number of threads */
+			nrn_prof_set(nrn_prof_, -1);
+		}
 	}
 	if (nrn_thread_parallel_ != parallel) {
 		threads_free_pthread();
@@ -667,6 +693,8 @@ void nrn_threads_free() {
 		if (nt->_v_parent_index) {free((char*)nt->_v_parent_index); nt->_v_parent_index = 0;}
 		if (nt->_v_node) {free((char*)nt->_v_node); nt->_v_node = 0;}
 		if (nt->_v_parent) {free((char*)nt->_v_parent); nt->_v_parent = 0;}
+		if (nt->_group_start) {free((char*)nt->_group_start); nt->_group_start = 0;}
+		nt->_ngroup = 0;
 		nt->_ecell_memb_list = 0;
 		if (nt->_ecell_children) {
 			nt->_ecell_child_cnt = 0;
@@ -870,6 +898,91 @@ static void nrn_thread_memblist_setup() {
 /* this differs from original secorder where all roots are at the beginning */
 /* in passing, also set start and end indices. */
 
+/*
+Interleaved node order, CVode.cache_efficient(1, 1). The classical
+order stores the nodes of a thread cell after cell. Here, after the
+roots, the nodes are sorted by depth in the tree, then by rank among
+the nodes of their cell at that depth, then by cell. Nodes with the same
+depth and rank form a group with at most one node per cell, so no two
+nodes of a group have the same parent and triang and bksub can process
+a group as a vector loop. With identical cells a group holds the
+corresponding node of every cell. The children of a node keep their
+relative order, so the solution is the same as with the classical order.
+*/
+typedef struct InterleaveKey {
+	int depth, rank, cell, i;
+} InterleaveKey;
+
+static int interleave_cell_cmp(const void* a, const void* b) {
+	const InterleaveKey* ka = (const InterleaveKey*)a;
+	const InterleaveKey* kb = (const InterleaveKey*)b;
+	if (ka->cell != kb->cell) { return ka->cell - kb->cell; }
+	if (ka->depth != kb->depth) { return ka->depth - kb->depth; }
+	return ka->i - kb->i;
+}
+
+static int interleave_group_cmp(const void* a, const void* b) {
+	const InterleaveKey* ka = (const InterleaveKey*)a;
+	const InterleaveKey* kb = (const InterleaveKey*)b;
+	if (ka->depth != kb->depth) { return ka->depth - kb->depth; }
+	if (ka->rank != kb->rank) { return ka->rank - kb->rank; }
+	return ka->cell - kb->cell;
+}
+
+static void interleave_permute(NrnThread* _nt) {
+	int i, ig, n;
+	InterleaveKey* key;
+	Node** vnode, **vparent;
+	n = _nt->end;
+	if (n == 0) { return; }
+	key = (InterleaveKey*)ecalloc(n, sizeof(InterleaveKey));
+	/* in classical order a parent is before its children */
+	for (i = 0; i < n; ++i) {
+		key[i].i = i;
+		if (i < _nt->ncell) {
+			key[i].cell = i;
+		}else{
+			InterleaveKey* kp = key + _nt->_v_parent[i]->v_node_index;
+			key[i].depth = kp->depth + 1;
+			key[i].cell = kp->cell;
+		}
+	}
+	qsort(key, n, sizeof(InterleaveKey), interleave_cell_cmp);
+	for (i = 1; i < n; ++i) {
+		if (key[i].cell == key[i-1].cell && key[i].depth == key[i-1].depth) {
+			key[i].rank = key[i-1].rank + 1;
+		}
+	}
+	qsort(key, n, sizeof(InterleaveKey), interleave_group_cmp);
+
+	vnode = (Node**)ecalloc(n, sizeof(Node*));
+	vparent = (Node**)ecalloc(n, sizeof(Node*));
+	_nt->_ngroup = 1;
+	for (i = 0; i < n; ++i) {
+		vnode[i] = _nt->_v_node[key[i].i];
+		vparent[i] = _nt->_v_parent[key[i].i];
+		if (i && (key[i].depth != key[i-1].depth
+		    || key[i].rank != key[i-1].rank)) {
+			++_nt->_ngroup;
+		}
+	}
+	_nt->_group_start = (int*)ecalloc(_nt->_ngroup + 1, sizeof(int));
+	ig = 0;
+	for (i = 0; i < n; ++i) {
+		_nt->_v_node[i] = vnode[i];
+		_nt->_v_parent[i] = vparent[i];
+		vnode[i]->v_node_index = i;
+		if (i && (key[i].depth != key[i-1].depth
+		    || key[i].rank != key[i-1].rank)) {
+			_nt->_group_start[++ig] = i;
+		}
+	}
+	_nt->_group_start[_nt->_ngroup] = n;
+	free((char*)vnode);
+	free((char*)vparent);
+	free((char*)key);
+}
+
 static void reorder_secorder() {
 	NrnThread* _nt;
 	Section* sec, *ch;
@@ -986,6 +1099,10 @@ static void reorder_secorder() {
 	if (nrn_multisplit_setup_) {
 		/* classical order abandoned */
 		(*nrn_multisplit_setup_)();
+	}else if (use_cachevec && use_interleave) {
+		FOR_THREADS(_nt) {
+			interleave_permute(_nt);
+		}
 	}
 	/* make the Nodes point to the proper d, rhs */
 	FOR_THREADS(_nt) {
@@ -1221,6 +1338,427 @@ void nrn_thread_partition(int it, Object* sl) {
 	v_structure_change = 1;	
 }
 
+/*
+Automatic partition of the cells among the threads. The cost of a cell
+is the sum over its nodes of the cost of each mechanism instance,
+which, as in loadbal.hoc, is 1 plus the number of STATEs for a
+density mechanism or point process and 0 for an ion. If pc.mech_time()
+was called before a run, the measured time per instance on thread 0
+replaces that estimate for each mechanism that thread 0 has, scaled
+so that the estimates of the other mechanisms stay comparable.
+The cells are then distributed with the least processing time
+algorithm: largest first, each to the thread with the least cost so far.
+*/
+static double* part_cost_; /* per mechanism instance, 0 means round robin */
+static int part_ncost_; /* n_memb_func when part_cost_ was computed */
+static double part_imbalance_[2]; /* before and after auto partition */
+
+static double* mech_complexity() {
+	int i, j, n;
+	Symbol* sym;
+	double* w = (double*)ecalloc(n_memb_func, sizeof(double));
+	for (i = CAP; i < n_memb_func; ++i) {
+		if (!memb_func[i].sym || nrn_is_ion(i) || nrn_is_artificial_[i]) {
+			continue;
+		}
+		sym = memb_func[i].sym;
+		n = 0;
+		for (j = 0; j < sym->s_varn; ++j) {
+			if (nrn_vartype(sym->u.ppsym[j]) == STATE) {
+				++n;
+			}
+		}
+		w[i] = 1. + n;
+	}
+	return w;
+}
+
+static void mech_measured(double* w) {
+	int i, *n;
+	double tt, tc;
+	NrnThreadMembList* tml;
+	if (!nrn_mech_wtime_ || nrn_nthread < 1) { return; }
+	n = (int*)ecalloc(n_memb_func, sizeof(int));
+	for (tml = nrn_threads[0].tml; tml; tml = tml->next) {
+		n[tml->index] = tml->ml->nodecount;
+	}
+	tt = tc = 0.;
+	for (i = 0; i < n_memb_func; ++i) if (n[i]) {
+		tt += nrn_mech_wtime_[i];
+		tc += n[i]*w[i];
+	}
+	if (tt > 0.) {
+		for (i = 0; i < n_memb_func; ++i) if (n[i]) {
+			w[i] = nrn_mech_wtime_[i]/n[i] * tc/tt;
+		}
+	}
+	free((char*)n);
+}
+
+static double sec_cost(Section* sec, double* w) {
+	int i;
+	double c = 0.;
+	Prop* p;
+	Section* ch;
+	for (i = 0; i < sec->nnode; ++i) {
+		for (p = sec->pnode[i]->prop; p; p = p->next) {
+			c += w[p->type];
+		}
+	}
+	for (ch = sec->child; ch; ch = ch->sibling) {
+		c += sec_cost(ch, w);
+	}
+	return c;
+}
+
+/* max over mean of the thread costs of the current partition */
+static double part_imbalance(double* w) {
+	int it;
+	double c, mx, sum;
+	hoc_Item* qsec;
+	mx = sum = 0.;
+	for (it = 0; it < nrn_nthread; ++it) {
+		c = 0.;
+		if (nrn_threads[it].roots) {
+			ITERATE(qsec, nrn_threads[it].roots) {
+				c += sec_cost(hocSEC(qsec), w);
+			}
+		}
+		if (mx < c) { mx = c; }
+		sum += c;
+	}
+	return sum > 0. ? mx*nrn_nthread/sum : 1.;
+}
+
+static double* sort_cost_;
+static int cost_cmp(const void* a, const void* b) {
+	double ca = sort_cost_[*(const int*)a], cb = sort_cost_[*(const int*)b];
+	if (ca != cb) { return ca < cb ? 1 : -1; }
+	return *(const int*)a - *(const int*)b;
+}
+
+/* called by v_setup_vectors after section_order, instead of round robin */
+static int nrn_auto_partition() {
+	int i, j, k, it, *order, *ith;
+	double *cost, *load;
+	NrnThread* nt;
+	if (!part_cost_) { return 0; }
+	if (part_ncost_ < n_memb_func) { /* mechanisms loaded since */
+		double* w = mech_complexity();
+		part_cost_ = (double*)erealloc(part_cost_, n_memb_func*sizeof(double));
+		for (i = part_ncost_; i < n_memb_func; ++i) {
+			part_cost_[i] = w[i];
+		}
+		part_ncost_ = n_memb_func;
+		free((char*)w);
+	}
+	cost = (double*)ecalloc(nrn_global_ncell, sizeof(double));
+	order = (int*)ecalloc(nrn_global_ncell, sizeof(int));
+	ith = (int*)ecalloc(nrn_global_ncell, sizeof(int));
+	load = (double*)ecalloc(nrn_nthread, sizeof(double));
+	/* the roots are first in secorder, sort them largest cost first */
+	for (i = 0; i < nrn_global_ncell; ++i) {
+		cost[i] = sec_cost(secorder[i], part_cost_);
+		order[i] = i;
+	}
+	sort_cost_ = cost;
+	qsort(order, nrn_global_ncell, sizeof(int), cost_cmp);
+	for (i = 0; i < nrn_global_ncell; ++i) {
+		k = order[i];
+		it = 0;
+		for (j = 1; j < nrn_nthread; ++j) {
+			if (load[j] < load[it]) { it = j; }
+		}
+		load[it] += cost[k];
+		ith[k] = it;
+	}
+	/* keep the original order of the cells within a thread */
+	FOR_THREADS(nt) {
+		nt->roots = hoc_l_newlist();
+		nt->ncell = 0;
+	}
+	for (i = 0; i < nrn_global_ncell; ++i) {
+		nt = nrn_threads + ith[i];
+		hoc_l_lappendsec(nt->roots, secorder[i]);
+		++nt->ncell;
+	}
+	free((char*)cost);
+	free((char*)order);
+	free((char*)ith);
+	free((char*)load);
+	return 1;
+}
+
+/*
+Print the cells, estimated cost and computation time of each thread.
+Returns the estimated imbalance of the current partition.
+*/
+static double part_stat() {
+	int it;
+	double x, ct, ctmax;
+	double* w;
+	NrnThread* nt;
+	v_setup_vectors();
+	w = mech_complexity();
+	mech_measured(w);
+	x = part_imbalance(w);
+	if (nrnmpi_myid == 0) {
+		int user = nrn_threads && nrn_threads[0].userpart;
+		Printf("thread partition (%s): estimated imbalance %g\n",
+			user ? "user" : (part_cost_ ? "auto" : "round robin"), x);
+		if (part_cost_ && !user) {
+			Printf("  before auto partition %g, after %g\n",
+				part_imbalance_[0], part_imbalance_[1]);
+		}
+		ct = ctmax = 0.;
+		FOR_THREADS(nt) {
+			double c = 0.;
+			hoc_Item* qsec;
+			if (nt->roots) {
+				ITERATE(qsec, nt->roots) {
+					c += sec_cost(hocSEC(qsec), w);
+				}
+			}
+			Printf("  thread %d: %d cells, cost %g, ctime %g s\n",
+				nt->id, nt->ncell, c, nt->_ctime);
+			ct += nt->_ctime;
+			if (ctmax < nt->_ctime) { ctmax = nt->_ctime; }
+		}
+		if (ct > 0.) {
+			Printf("  measured imbalance %g\n", ctmax*nrn_nthread/ct);
+		}
+	}
+	free((char*)w);
+	return x;
+}
+
+/*
+Turn automatic partition on (1) or off (0, round robin). Returns the
+estimated imbalance, max over mean thread cost, of the new partition.
+*/
+double nrn_thread_partition_auto(int on) {
+	int it;
+	double* w;
+	v_setup_vectors();
+	w = mech_complexity();
+	mech_measured(w);
+	part_imbalance_[0] = part_imbalance(w);
+	if (part_cost_) {
+		free((char*)part_cost_);
+		part_cost_ = (double*)0;
+	}
+	if (on) {
+		part_cost_ = w;
+		part_ncost_ = n_memb_func;
+		/* would take precedence */
+		for (it = 0; it < nrn_nthread; ++it) {
+			if (nrn_threads[it].userpart) {
+				nrn_thread_partition(it, (Object*)0);
+			}
+		}
+	}
+	v_structure_change = 1;
+	v_setup_vectors();
+	part_imbalance_[1] = part_imbalance(w);
+	if (!on) {
+		free((char*)w);
+	}
+	return part_imbalance_[1];
+}
+
+/*
+Profile of the fixed step method, turned on by pc.profile(1). Each
+thread accumulates, in its own NrnProf, the wall time and number of calls
+of the phases of a step and of the cur, jacob and state functions of each
+mechanism type. With pc.profile(2) every one of those calls is also kept
+as an event, up to maxevent per thread, and pc.profile_trace(file) writes
+them in the Chrome trace format. When off, the cost is a test of
+nrn_prof_ at each measured call.
+*/
+int nrn_prof_;
+
+typedef struct NrnProfEvent {
+	int what; /* phase, or NRN_PROF_NPHASE + NRN_PROF_NFUN*type + fun */
+	double t0, dt;
+} NrnProfEvent;
+
+typedef struct NrnProf {
+	double phase_time[NRN_PROF_NPHASE];
+	long phase_count[NRN_PROF_NPHASE];
+	double* mech_time; /* NRN_PROF_NFUN*type + fun */
+	long* mech_count;
+	NrnProfEvent* ev;
+	long nev, maxev, ndrop;
+} NrnProf;
+
+static NrnProf* prof_;
+static int prof_nthread_, prof_nmech_;
+static long prof_maxevent_ = 1000000;
+static double prof_t0_;
+
+static const char* prof_names_[NRN_PROF_NPHASE] = {
+	"deliver_net_events", "setup_tree_matrix", "nrn_solve", "update",
+	"nonvint", "rxd", "deliver_events", "spike_exchange"
+};
+
+const char* nrn_prof_name(int phase) {
+	return prof_names_[phase];
+}
+
+static void prof_free() {
+	int it;
+	for (it = 0; it < prof_nthread_; ++it) {
+		free((char*)prof_[it].mech_time);
+		free((char*)prof_[it].mech_count);
+		if (prof_[it].ev) {
+			free((char*)prof_[it].ev);
+		}
+	}
+	if (prof_) {
+		free((char*)prof_);
+	}
+	prof_ = (NrnProf*)0;
+	prof_nthread_ = 0;
+}
+
+/*
+mode 0 stops, the results remain available. 1 or 2 start again from zero
+for the current number of threads and mechanisms. maxevent < 0 keeps the
+previous limit. Returns the previous mode.
+*/
+int nrn_prof_set(int mode, int maxevent) {
+	int it, old = nrn_prof_;
+	if (maxevent >= 0) {
+		prof_maxevent_ = maxevent;
+	}
+	if (mode) {
+		nrn_prof_ = 0;
+		prof_free();
+		prof_nthread_ = nrn_nthread;
+		prof_nmech_ = n_memb_func;
+		prof_ = (NrnProf*)ecalloc(prof_nthread_, sizeof(NrnProf));
+		for (it = 0; it < prof_nthread_; ++it) {
+			prof_[it].mech_time = (double*)ecalloc(NRN_PROF_NFUN*prof_nmech_, sizeof(double));
+			prof_[it].mech_count = (long*)ecalloc(NRN_PROF_NFUN*prof_nmech_, sizeof(long));
+		}
+		prof_t0_ = nrnmpi_wtime();
+	}
+	nrn_prof_ = mode;
+	return old;
+}
+
+static void prof_event(NrnProf* p, int what, double t0, double dt) {
+	if (p->nev >= p->maxev) {
+		if (p->nev >= prof_maxevent_) {
+			++p->ndrop;
+			return;
+		}
+		p->maxev = p->maxev ? 2*p->maxev : 1024;
+		if (p->maxev > prof_maxevent_) {
+			p->maxev = prof_maxevent_;
+		}
+		p->ev = (NrnProfEvent*)erealloc(p->ev, p->maxev*sizeof(NrnProfEvent));
+	}
+	p->ev[p->nev].what = what;
+	p->ev[p->nev].t0 = t0;
+	p->ev[p->nev].dt = dt;
+	++p->nev;
+}
+
+/* add the time since t0 to phase of thread tid. Returns the present time */
+double nrn_prof_phase(int tid, int phase, double t0) {
+	double t = nrnmpi_wtime();
+	if (tid < prof_nthread_) {
+		NrnProf* p = prof_ + tid;
+		p->phase_time[phase] += t - t0;
+		++p->phase_count[phase];
+		if (nrn_prof_ == 2) {
+			prof_event(p, phase, t0, t - t0);
+		}
+	}
+	return t;
+}
+
+/* same for the cur, jacob or state function of a mechanism type */
+double nrn_prof_mech(int tid, int type, int fun, double t0) {
+	double t = nrnmpi_wtime();
+	if (tid < prof_nthread_ && type < prof_nmech_) {
+		NrnProf* p = prof_ + tid;
+		int i = NRN_PROF_NFUN*type + fun;
+		p->mech_time[i] += t - t0;
+		++p->mech_count[i];
+		if (nrn_prof_ == 2) {
+			prof_event(p, NRN_PROF_NPHASE + i, t0, t - t0);
+		}
+	}
+	return t;
+}
+
+/*
+The phase times and counts of thread tid followed by those of the
+mechanism functions, NRN_PROF_NPHASE + NRN_PROF_NFUN*type + fun.
+Returns the number of threads profiled, 0 if never turned on.
+*/
+int nrn_prof_data(int tid, double** time, long** count, int* nmech) {
+	int i, n;
+	if (tid >= prof_nthread_) {
+		return prof_nthread_;
+	}
+	*nmech = prof_nmech_;
+	n = NRN_PROF_NPHASE + NRN_PROF_NFUN*prof_nmech_;
+	*time = (double*)ecalloc(n, sizeof(double));
+	*count = (long*)ecalloc(n, sizeof(long));
+	for (i = 0; i < NRN_PROF_NPHASE; ++i) {
+		(*time)[i] = prof_[tid].phase_time[i];
+		(*count)[i] = prof_[tid].phase_count[i];
+	}
+	for (i = 0; i < NRN_PROF_NFUN*prof_nmech_; ++i) {
+		(*time)[NRN_PROF_NPHASE + i] = prof_[tid].mech_time[i];
+		(*count)[NRN_PROF_NPHASE + i] = prof_[tid].mech_count[i];
+	}
+	return prof_nthread_;
+}
+
+/*
+Write the events in the Chrome trace event format (chrome://tracing or
+Perfetto), times in microseconds since the profile started, the rank as
+pid and the thread as tid. Returns the number of events, -1 if the file
+cannot be opened.
+*/
+long nrn_prof_trace(const char* fname) {
+	static const char* funs[NRN_PROF_NFUN] = {"cur", "jacob", "state"};
+	int it;
+	long i, n = 0, ndrop = 0;
+	FILE* f = fopen(fname, "w");
+	if (!f) {
+		return -1;
+	}
+	fprintf(f, "{\"traceEvents\":[");
+	for (it = 0; it < prof_nthread_; ++it) {
+		NrnProf* p = prof_ + it;
+		for (i = 0; i < p->nev; ++i) {
+			NrnProfEvent* e = p->ev + i;
+			fprintf(f, "%s\n{\"ph\":\"X\",\"pid\":%d,\"tid\":%d,\"ts\":%.3f,\"dur\":%.3f,",
+				n ? "," : "", nrnmpi_myid, it,
+				(e->t0 - prof_t0_)*1e6, e->dt*1e6);
+			if (e->what < NRN_PROF_NPHASE) {
+				fprintf(f, "\"cat\":\"phase\",\"name\":\"%s\"}",
+					prof_names_[e->what]);
+			}else{
+				int j = e->what - NRN_PROF_NPHASE;
+				fprintf(f, "\"cat\":\"mechanism\",\"name\":\"%s %s\"}",
+					memb_func[j/NRN_PROF_NFUN].sym->name,
+					funs[j%NRN_PROF_NFUN]);
+			}
+			++n;
+		}
+		ndrop += p->ndrop;
+	}
+	fprintf(f, "\n],\"displayTimeUnit\":\"ms\",\"otherData\":{\"dropped\":%ld}}\n", ndrop);
+	fclose(f);
+	return n;
+}
+
 void nrn_use_busywait(int b) {
 #if USE_PTHREAD
 	if (allow_busywait_ && nrn_thread_parallel_) {
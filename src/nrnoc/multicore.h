@@ -92,6 +92,8 @@ typedef struct NrnThread {
 	NrnThreadBAList* tbl[BEFORE_AFTER_SIZE]; /* wasteful since almost all empty */
 	hoc_List* roots; /* ncell of these */
 	Object* userpart; /* the SectionList if this is a user defined partition */
+	int* _group_start; /* interleaved node order: first node of each group */
+	int _ngroup;
 
 } NrnThread;
 
@@ -106,6 +108,29 @@ extern void nrn_thread_table_check();
 
 #define FOR_THREADS(nt) for (nt = nrn_threads; nt < nrn_threads + nrn_nthread; ++nt)
 
+/* pc.profile(): per thread wall time and number of calls of the phases
+   of a fixed step and of the mechanism functions. See multicore.c */
+#define NRN_PROF_DELIVER_NET_EVENTS 0
+#define NRN_PROF_SETUP_TREE_MATRIX 1
+#define NRN_PROF_SOLVE 2
+#define NRN_PROF_UPDATE 3
+#define NRN_PROF_NONVINT 4
+#define NRN_PROF_RXD 5
+#define NRN_PROF_DELIVER_EVENTS 6
+#define NRN_PROF_SPIKE_EXCHANGE 7
+#define NRN_PROF_NPHASE 8
+#define NRN_PROF_CUR 0
+#define NRN_PROF_JACOB 1
+#define NRN_PROF_STATE 2
+#define NRN_PROF_NFUN 3
+extern int nrn_prof_; /* 0 off, 1 times and counts, 2 also a trace */
+extern int nrn_prof_set(int mode, int maxevent);
+extern double nrn_prof_phase(int tid, int phase, double t0);
+extern double nrn_prof_mech(int tid, int type, int fun, double t0);
+extern const char* nrn_prof_name(int phase);
+extern int nrn_prof_data(int tid, double** time, long** count, int* nmech);
+extern long nrn_prof_trace(const char* fname);
+
 #if defined(__cplusplus)
 }
 #endif
@@ -388,6 +388,60 @@ extern int* v_node_depth_count;
 extern int v_node_depth; /* so depth may be more than twice what you'd expect */
 #endif
 
+#if CACHEVEC
+/* the nodes of a group have different parents */
+#if defined(__INTEL_COMPILER)
+#define IVDEP _Pragma("ivdep")
+#elif defined(__clang__)
+#define IVDEP _Pragma("clang loop vectorize(assume_safety)")
+#elif defined(__GNUC__) && (__GNUC__ > 4 || (__GNUC__ == 4 && __GNUC_MINOR__ >= 9))
+#define IVDEP _Pragma("GCC ivdep")
+#else
+#define IVDEP /**/
+#endif
+
+/* interleaved node order, group by group, see multicore.c */
+static void triang_interleaved(NrnThread* _nt) {
+	int g, i, i1, i2;
+	double p;
+	double* a = _nt->_actual_a;
+	double* b = _nt->_actual_b;
+	double* d = _nt->_actual_d;
+	double* rhs = _nt->_actual_rhs;
+	int* pi = _nt->_v_parent_index;
+	for (g = _nt->_ngroup - 1; g > 0; --g) {
+		i1 = _nt->_group_start[g];
+		i2 = _nt->_group_start[g + 1];
+		IVDEP
+		for (i = i1; i < i2; ++i) {
+			p = a[i] / d[i];
+			d[pi[i]] -= p * b[i];
+			rhs[pi[i]] -= p * rhs[i];
+		}
+	}
+}
+
+static void bksub_interleaved(NrnThread* _nt) {
+	int g, i, i1, i2;
+	double* b = _nt->_actual_b;
+	double* d = _nt->_actual_d;
+	double* rhs = _nt->_actual_rhs;
+	int* pi = _nt->_v_parent_index;
+	for (i = 0; i < _nt->ncell; ++i) {
+		rhs[i] /= d[i];
+	}
+	for (g = 1; g < _nt->_ngroup; ++g) {
+		i1 = _nt->_group_start[g];
+		i2 = _nt->_group_start[g + 1];
+		IVDEP
+		for (i = i1; i < i2; ++i) {
+			rhs[i] -= b[i] * rhs[pi[i]];
+			rhs[i] /= d[i];
+		}
+	}
+}
+#endif /* CACHEVEC */
+
 /* triangularization of the matrix equations */
 void triang(NrnThread* _nt)
 {
@@ -397,7 +451,9 @@ void triang(NrnThread* _nt)
 	i2 = _nt->ncell;
 	i3 = _nt->end;
 #if CACHEVEC
-    if (use_cachevec) {
+    if (use_cachevec && _nt->_group_start) {
+	triang_interleaved(_nt);
+    }else if (use_cachevec) {
 	for (i = i3 - 1; i >= i2; --i) {
 		p = VEC_A(i) / VEC_D(i);
 		VEC_D(_nt->_v_parent_index[i]) -= p * VEC_B(i);
@@ -425,7 +481,9 @@ void bksub(NrnThread* _nt)
 	i2 = i1 + _nt->ncell;
 	i3 = _nt->end;
 #if CACHEVEC
-    if (use_cachevec) {
+    if (use_cachevec && _nt->_group_start) {
+	bksub_interleaved(_nt);
+    }else if (use_cachevec) {
 	for (i = i1; i < i2; ++i) {
 		VEC_RHS(i) /= VEC_D(i);
 	}
@@ -51,6 +51,7 @@ static void nrn_recalc_node_ptrs();
 #define UPDATE_VEC_AREA(nd) if (nd->_nt && nd->_nt->_actual_area) { nd->_nt->_actual_area[(nd)->v_node_index] = NODEAREA(nd);}
 #endif /* CACHEVEC */
 int use_cachevec;
+int use_interleave; /* cell interleaved node order, see multicore.c */
 
 /*
 Do not use unless necessary (loops in tree structure) since overhead
@@ -388,9 +389,10 @@ void nrn_rhs(NrnThread* _nt) {
 	/* note that CAP has no current */
 	for (tml = _nt->tml; tml; tml = tml->next) if (memb_func[tml->index].current) {
 		Pvmi s = memb_func[tml->index].current;
-		if (measure) { w = nrnmpi_wtime(); }
+		if (measure || nrn_prof_) { w = nrnmpi_wtime(); }
 		(*s)(_nt, tml->ml, tml->index);
 		if (measure) { nrn_mech_wtime_[tml->index] += nrnmpi_wtime() - w; }
+		if (nrn_prof_) { nrn_prof_mech(_nt->id, tml->index, NRN_PROF_CUR, w); }
 		if (errno) {
 			if (nrn_errno_check(tml->index)) {
 hoc_warning("errno set during calculation of currents", (char*)0);
@@ -467,6 +469,7 @@ This is a common operation for fixed step, cvode, and daspk methods
 
 void nrn_lhs(NrnThread* _nt) {
 	int i, i1, i2, i3;
+	double w;
 	NrnThreadMembList* tml;
 
 	i1 = 0;
@@ -505,7 +508,9 @@ void nrn_lhs(NrnThread* _nt) {
 	/* note that CAP has no jacob */
 	for (tml = _nt->tml; tml; tml = tml->next) if (memb_func[tml->index].jacob) {
 		Pvmi s = memb_func[tml->index].jacob;
+		if (nrn_prof_) { w = nrnmpi_wtime(); }
 		(*s)(_nt, tml->ml, tml->index);
+		if (nrn_prof_) { nrn_prof_mech(_nt->id, tml->index, NRN_PROF_JACOB, w); }
 		if (errno) {
 			if (nrn_errno_check(tml->index)) {
 hoc_warning("errno set during calculation of jacobian", (char*)0);
@@ -592,10 +597,13 @@ has taken effect
 
 /* for the fixed step method */
 void* setup_tree_matrix(NrnThread* _nt){
+	double w;
+	if (nrn_prof_) { w = nrnmpi_wtime(); }
 	nrn_rhs(_nt);
 	nrn_lhs(_nt);
 	nrn_nonvint_block_current(_nt->end, _nt->_actual_rhs, _nt->id);
 	nrn_nonvint_block_conductance(_nt->end, _nt->_actual_d, _nt->id);
+	if (nrn_prof_) { nrn_prof_phase(_nt->id, NRN_PROF_SETUP_TREE_MATRIX, w); }
 	return (void*)0;
 }
 
@@ -1668,6 +1676,7 @@ void v_setup_vectors(void) {
 		int ith, j;
 		NrnThread* _nt;
 		section_order(); /* could be already reordered */
+	    if (!nrn_auto_partition()) {
 		/* round robin distribution */
 		for (ith=0; ith < nrn_nthread; ++ith) {
 			_nt = nrn_threads + ith;
@@ -1683,6 +1692,7 @@ void v_setup_vectors(void) {
 				++j;
 			}
 		}
+	    }
 	}
 	/* reorder. also fill NrnThread node indices, v_node, and v_parent */
 	reorder_secorder();
@@ -2094,6 +2104,13 @@ void nrn_cachevec(int b) {
 	}
 }
 
+void nrn_interleave(int b) {
+	if (b != use_interleave) {
+		use_interleave = b;
+		v_structure_change = 1;
+	}
+}
+
 #if CACHEVEC
 /*
 Pointers that need to be updated are:
@@ -67,6 +67,8 @@ ECS_Grid_node *ECS_make_Grid(PyHocObject* my_states, int my_num_states_x,
     new_Grid->num_concentrations = 0;
     new_Grid->current_list = NULL;
     new_Grid->num_currents = 0;
+    new_Grid->thread_partition = NULL;
+    new_Grid->partition_tasks = NULL;
 
     new_Grid->next = NULL;
 	new_Grid->VARIABLE_ECS_VOLUME = FALSE;
@@ -208,6 +210,8 @@ ICS_Grid_node::ICS_Grid_node(PyHocObject* my_states, long num_nodes, long* neigh
     current_list = NULL;
     num_currents = 0;
     node_flux_count = 0;
+    thread_partition = NULL;
+    partition_tasks = NULL;
 
     ics_surface_nodes_per_seg = NULL;
     ics_surface_nodes_per_seg_start_indices = NULL;
@@ -438,7 +442,7 @@ extern "C" void ics_set_grid_concentrations(int grid_list_index, int index_in_li
     }
 
     g->ics_num_segs = n;
-
+    g->set_thread_partition(NUM_THREADS);
 }
 
 extern "C" void ics_set_grid_currents(int grid_list_index, int index_in_list, int64_t* nodes_per_seg, int64_t* nodes_per_seg_start_indices, PyObject* neuron_pointers, double* scale_factors, int total_nodes){
@@ -458,87 +462,99 @@ extern "C" void ics_set_grid_currents(int grid_list_index, int index_in_list, in
     for(i = 0; i < n; i++){
         g->ics_current_seg_ptrs[i] = ((PyHocObject*) PyList_GET_ITEM(neuron_pointers, i)) -> u.px_;
     }
+    g->set_thread_partition(NUM_THREADS);
 }
 
 
 
-/* TODO: make this work with Grid_node ptrs instead of pairs of list indices */
-extern "C" void set_grid_concentrations(int grid_list_index, int index_in_list, PyObject* grid_indices, PyObject* neuron_pointers) {
+static Grid_node* find_grid(int grid_list_index, int index_in_list) {
+    Grid_node* g = Parallel_grids[grid_list_index];
+    for (int i = 0; i < index_in_list; i++) {
+        g = g->next;
+    }
+    return g;
+}
+
+extern "C" int set_grid_concentrations(int grid_list_index, int index_in_list, int64_t num_locations, int64_t* grid_indices, int ion_type, int field) {
     /*
     Preconditions:
 
     Assumes the specified grid has been created.
-    Assumes len(grid_indices) = len(neuron_pointers) and that both are proper python lists
+    grid_indices has one entry for every segment of every section (in
+    h.allsec() order); segments outside the grid have a negative index.
+    field is the offset of the concentration in the ion's data.
     */
     /* TODO: note that these will need updating anytime the structure of the model changes... look at the structure change count at each advance and trigger a callback to regenerate if necessary */
-    Grid_node* g;
-    ssize_t i;
-    ssize_t n = (ssize_t)PyList_Size(grid_indices);
+    Grid_node* g = find_grid(grid_list_index, index_in_list);
+    ssize_t i, n = 0;
+    double** ptrs;
+    int unresolved;
 
-    /* Find the Grid Object */
-    g = Parallel_grids[grid_list_index];
-    for (i = 0; i < index_in_list; i++) {
-        g = g->next;
-    }
+    ptrs = (double**)malloc(sizeof(double*) * num_locations);
+    unresolved = resolve_ion_pointers(num_locations, grid_indices, ion_type, field, ptrs);
 
     /* free the old concentration list */
     free(g->concentration_list);
 
     /* allocate space for the new list */
-    g->concentration_list = (Concentration_Pair*)malloc(sizeof(Concentration_Pair) * n);
-    g->num_concentrations = n;
+    g->concentration_list = (Concentration_Pair*)malloc(sizeof(Concentration_Pair) * num_locations);
 
     /* populate the list */
-    /* TODO: it would be more general to iterate instead of assuming lists and using list lookups */
-    for (i = 0; i < n; i++) {
-        /* printf("set_grid_concentrations %ld\n", i); */
-        g->concentration_list[i].source = PyInt_AS_LONG(PyList_GET_ITEM(grid_indices, i));
-        g->concentration_list[i].destination = ((PyHocObject*) PyList_GET_ITEM(neuron_pointers, i)) -> u.px_;
+    if (unresolved == 0) {
+        for (i = 0; i < num_locations; i++) {
+            if (grid_indices[i] >= 0) {
+                g->concentration_list[n].source = grid_indices[i];
+                g->concentration_list[n].destination = ptrs[n];
+                n++;
+            }
+        }
     }
+    g->num_concentrations = n;
+    free(ptrs);
+    g->set_thread_partition(NUM_THREADS);
+    return unresolved;
 }
 
-/* TODO: make this work with Grid_node ptrs instead of pairs of list indices */
-extern "C" void set_grid_currents(int grid_list_index, int index_in_list, PyObject* grid_indices, PyObject* neuron_pointers, PyObject* scale_factors) {
+extern "C" int set_grid_currents(int grid_list_index, int index_in_list, int64_t num_locations, int64_t* grid_indices, double* scale_factors, int ion_type, int field) {
     /*
     Preconditions:
 
     Assumes the specified grid has been created.
-    Assumes len(grid_indices) = len(neuron_pointers) = len(scale_factors) and that all are proper python lists
+    grid_indices and scale_factors have one entry for every segment of
+    every section (in h.allsec() order); segments outside the grid have a
+    negative index. field is the offset of the current in the ion's data.
     */
     /* TODO: note that these will need updating anytime the structure of the model changes... look at the structure change count at each advance and trigger a callback to regenerate if necessary */
-    Grid_node* g;
-    ssize_t i;
-    ssize_t n = (ssize_t)PyList_Size(grid_indices);
+    Grid_node* g = find_grid(grid_list_index, index_in_list);
+    ssize_t i, n = 0;
+    double** ptrs;
     long* dests;
+    int unresolved = 0;
 
-    /* Find the Grid Object */
-    g = Parallel_grids[grid_list_index];
-    for (i = 0; i < index_in_list; i++) {
-        g = g->next;
+    ptrs = (double**)malloc(sizeof(double*) * num_locations);
+    if (num_locations) {
+        unresolved = resolve_ion_pointers(num_locations, grid_indices, ion_type, field, ptrs);
     }
 
     /* free the old current list */
     free(g->current_list);
 
     /* allocate space for the new list */
-    g->current_list = (Current_Triple*)malloc(sizeof(Current_Triple) * n);
-    g->num_currents = n;
+    g->current_list = (Current_Triple*)malloc(sizeof(Current_Triple) * num_locations);
 
     /* populate the list */
-    /* TODO: it would be more general to iterate instead of assuming lists and using list lookups */
-    for (i = 0; i < n; i++) {
-        g->current_list[i].destination = PyInt_AS_LONG(PyList_GET_ITEM(grid_indices, i));
-        g->current_list[i].scale_factor = PyFloat_AS_DOUBLE(PyList_GET_ITEM(scale_factors, i));
-        g->current_list[i].source = ((PyHocObject*) PyList_GET_ITEM(neuron_pointers, i)) -> u.px_;
-        /* printf("set_grid_currents %ld out of %ld, %ld, %ld\n", i, n, PyList_Size(neuron_pointers), PyList_Size(scale_factors)); */
-    }/*
-    if (PyErr_Occurred()) {
-        printf("uh oh\n");
-        PyErr_PrintEx(0);
-    } else {
-        printf("no problems\n");
-    }
-    PyErr_Clear(); */
+    if (unresolved == 0) {
+        for (i = 0; i < num_locations; i++) {
+            if (grid_indices[i] >= 0) {
+                g->current_list[n].destination = grid_indices[i];
+                g->current_list[n].scale_factor = scale_factors[i];
+                g->current_list[n].source = ptrs[n];
+                n++;
+            }
+        }
+    }
+    g->num_currents = n;
+    free(ptrs);
 
 #if NRNMPI
     if(nrnmpi_use)
@@ -576,6 +592,7 @@ extern "C" void set_grid_currents(int grid_list_index, int index_in_list, PyObje
     g->all_currents = (double*)malloc(sizeof(double) * g->num_currents);
     g->num_all_currents = g->num_currents;
 #endif
+    return unresolved;
 }
 
 // Delete a specific Grid_node from the list
@@ -664,6 +681,35 @@ int Grid_node::insert(int grid_list_index){
     return i;
 }
 
+/* run_threaded_partition executes task over every range of the grids
+ * thread_partition, one range per thread.
+ * output - passed to the task, e.g. the states or ydot for currents
+ * dt - passed to the task, the step size or 1 for variable step
+ */
+void Grid_node::run_threaded_partition(void* (*task)(void*), double* output, double dt)
+{
+    int k;
+    if(thread_partition == NULL)
+        return;
+    for(k = 0; k < NUM_THREADS; k++)
+    {
+        partition_tasks[k].g = this;
+        partition_tasks[k].onset = thread_partition[k];
+        partition_tasks[k].offset = thread_partition[k + 1];
+        partition_tasks[k].output = output;
+        partition_tasks[k].dt = dt;
+    }
+    for(k = 0; k < NUM_THREADS - 1; k++)
+    {
+        TaskQueue_add_task(AllTasks, task, &partition_tasks[k], NULL);
+    }
+    /* run one task in the main thread */
+    task(&partition_tasks[NUM_THREADS - 1]);
+
+    /* wait for them to finish */
+    TaskQueue_sync(AllTasks);
+}
+
 /*****************************************************************************
 *
 * Begin ECS_Grid_node Functions
@@ -687,6 +733,19 @@ void ECS_Grid_node::set_num_threads(const int n)
         ecs_tasks[i].scratchpad = (double*)malloc(sizeof(double) * MAX(size_x,MAX(size_y, size_z)));
         ecs_tasks[i].g = this;
     }
+    set_thread_partition(n);
+}
+
+/* divide the concentration_list into n contiguous ranges of equal size */
+void ECS_Grid_node::set_thread_partition(const int n)
+{
+    int k;
+    free(thread_partition);
+    free(partition_tasks);
+    thread_partition = (int*)malloc((n + 1) * sizeof(int));
+    partition_tasks = (GridPartitionData*)malloc(n * sizeof(GridPartitionData));
+    for(k = 0; k <= n; k++)
+        thread_partition[k] = (int)((k * num_concentrations) / n);
 }
 
 static void* gather_currents(void* dataptr)
@@ -877,16 +936,27 @@ void ECS_Grid_node::variable_step_diffusion(const double* states, double* ydot)
     }
 }
 
-void ECS_Grid_node::scatter_grid_concentrations()
+static void* ecs_scatter_concentrations(void* dataptr)
 {
-    ssize_t i, n;
-    Concentration_Pair* cp;
+    GridPartitionData* d = (GridPartitionData*)dataptr;
+    Concentration_Pair* cp = d->g->concentration_list;
+    double* states = d->g->states;
+    int i, stop = d->offset;
 
-    n = num_concentrations;
-    cp = concentration_list;
-    for (i = 0; i < n; i++) {
+    for (i = d->onset; i < stop; i++) {
         (*cp[i].destination) = states[cp[i].source];
-    }  
+    }
+    return NULL;
+}
+
+void ECS_Grid_node::scatter_grid_concentrations()
+{
+    run_threaded_partition(&ecs_scatter_concentrations, NULL, 0);
+}
+
+double ECS_Grid_node::voxel_volume(int idx)
+{
+    return dx * dy * dz * get_alpha(alpha, idx);
 }
 
 void ECS_Grid_node::hybrid_connections()
@@ -902,9 +972,16 @@ void ECS_Grid_node::variable_step_ode_solve(const double* states, double* RHS, d
 {
 }
 
+void ECS_Grid_node::variable_step_preconditioner(double* RHS, double dt)
+{
+    ecs_variable_step_preconditioner(this, RHS, dt);
+}
+
 // Free a single Grid_node
 ECS_Grid_node::~ECS_Grid_node(){
     int i;
+    free(thread_partition);
+    free(partition_tasks);
     free(states_x);
     free(states_y);
     free(states_cur);
@@ -1294,6 +1371,32 @@ void ICS_Grid_node::set_num_threads(const int n)
     divide_x_work(n);
     divide_y_work(n);
     divide_z_work(n);
+    set_thread_partition(n);
+}
+
+/* divide the segments into n contiguous ranges with approximately the same
+ * number of surface nodes */
+void ICS_Grid_node::set_thread_partition(const int n)
+{
+    int k, i;
+    long total, target;
+    free(thread_partition);
+    free(partition_tasks);
+    thread_partition = NULL;
+    partition_tasks = NULL;
+    if(ics_surface_nodes_per_seg_start_indices == NULL)
+        return;
+    thread_partition = (int*)malloc((n + 1) * sizeof(int));
+    partition_tasks = (GridPartitionData*)malloc(n * sizeof(GridPartitionData));
+    total = ics_surface_nodes_per_seg_start_indices[ics_num_segs];
+    thread_partition[0] = 0;
+    for(k = 1, i = 0; k < n; k++)
+    {
+        target = (k * total) / n;
+        for(; i < ics_num_segs && ics_surface_nodes_per_seg_start_indices[i] < target; i++);
+        thread_partition[k] = i;
+    }
+    thread_partition[n] = ics_num_segs;
 }
 
 
@@ -1308,24 +1411,35 @@ void ICS_Grid_node::apply_node_flux3D(double dt, double* ydot)
     apply_node_flux(node_flux_count, node_flux_idx, node_flux_scale, node_flux_src, dt, dest);
 }
 
+/* the surface nodes of each segment are distinct so each thread can add
+ * the currents for its own range of segments to the output */
+static void* ics_gather_currents(void* dataptr)
+{
+    GridPartitionData* d = (GridPartitionData*)dataptr;
+    ICS_Grid_node* g = (ICS_Grid_node*)d->g;
+    double* output = d->output;
+    double dt = d->dt;
+    ssize_t i, j;
+    int seg_start_index, seg_stop_index;
+    int state_index;
+    double seg_cur;
+    for(i = d->onset; i < d->offset; i++){
+        seg_start_index = g->ics_surface_nodes_per_seg_start_indices[i];
+        seg_stop_index = g->ics_surface_nodes_per_seg_start_indices[i+1];
+        seg_cur = *g->ics_current_seg_ptrs[i];
+        for(j = seg_start_index; j < seg_stop_index; j++){
+            state_index = g->ics_surface_nodes_per_seg[j];
+            output[state_index] += seg_cur * g->ics_scale_factors[state_index] * dt;
+        }
+    }
+    return NULL;
+}
+
 void ICS_Grid_node::do_grid_currents(double* output, double dt, int grid_id)
 {
     MEM_ZERO(states_cur,sizeof(double)*_num_nodes);
     if(ics_current_seg_ptrs != NULL){
-        ssize_t i, j, n;
-        int seg_start_index, seg_stop_index;
-        int state_index;
-        double seg_cur;
-        n = ics_num_segs;
-        for(i = 0; i < n; i++){
-            seg_start_index = ics_surface_nodes_per_seg_start_indices[i];
-            seg_stop_index = ics_surface_nodes_per_seg_start_indices[i+1];
-            seg_cur = *ics_current_seg_ptrs[i];
-            for(j = seg_start_index; j < seg_stop_index; j++){
-                state_index = ics_surface_nodes_per_seg[j];
-                output[state_index] += seg_cur * ics_scale_factors[state_index] * dt;
-            }
-        }        
+        run_threaded_partition(&ics_gather_currents, output, dt);
     }
 }
 
@@ -1386,6 +1500,14 @@ void ICS_Grid_node::variable_step_ode_solve(const double* states, double* RHS, d
     }
 }
 
+void ICS_Grid_node::variable_step_preconditioner(double* RHS, double dt)
+{
+    if (diffusable)
+    {
+        ics_ode_solve_helper(this, dt, NULL, RHS);
+    }
+}
+
 void ICS_Grid_node::hybrid_connections()
 {
     _ics_hybrid_helper(this);
@@ -1396,18 +1518,20 @@ void ICS_Grid_node::variable_step_hybrid_connections(const double* cvode_states_
     _ics_variable_hybrid_helper(this, cvode_states_3d, ydot_3d, cvode_states_1d, ydot_1d);
 }
 
-void ICS_Grid_node::scatter_grid_concentrations()
+static void* ics_scatter_concentrations(void* dataptr)
 {
-    ssize_t i, j, n;
-    double* my_states;
+    GridPartitionData* d = (GridPartitionData*)dataptr;
+    ICS_Grid_node* g = (ICS_Grid_node*)d->g;
+    double* states = g->states;
+    int64_t* ics_surface_nodes_per_seg = g->ics_surface_nodes_per_seg;
+    int64_t* ics_surface_nodes_per_seg_start_indices = g->ics_surface_nodes_per_seg_start_indices;
+    double** ics_concentration_seg_ptrs = g->ics_concentration_seg_ptrs;
+    ssize_t i, j;
     double total_seg_concentration;  
     double average_seg_concentration;
     int seg_start_index, seg_stop_index;
 
-    my_states = states;
-    n = ics_num_segs;
-
-    for (i = 0; i < n; i++) {
+    for (i = d->onset; i < d->offset; i++) {
         total_seg_concentration = 0.0;
         seg_start_index = ics_surface_nodes_per_seg_start_indices[i];
         seg_stop_index = ics_surface_nodes_per_seg_start_indices[i+1];
@@ -1418,11 +1542,25 @@ void ICS_Grid_node::scatter_grid_concentrations()
 
         *ics_concentration_seg_ptrs[i] = average_seg_concentration;
     } 
+    return NULL;
+}
+
+void ICS_Grid_node::scatter_grid_concentrations()
+{
+    if(ics_concentration_seg_ptrs != NULL)
+        run_threaded_partition(&ics_scatter_concentrations, NULL, 0);
+}
+
+double ICS_Grid_node::voxel_volume(int idx)
+{
+    return CU(ics_adi_dir_x->d) * _ics_alphas[idx];
 }
 
 // Free a single Grid_node
 ICS_Grid_node::~ICS_Grid_node(){
     int i;
+    free(thread_partition);
+    free(partition_tasks);
     free(states_x);
     free(states_y);
     free(states_z);
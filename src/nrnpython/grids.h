@@ -84,6 +84,27 @@ typedef struct {
 
 typedef void (*ReactionRate)(double**, double**, double**, double*, double*, double*, double*, double**, double);
 typedef void (*ECSReactionRate)(double*, double*, double*, double*);
+typedef void (*ReactionPropensity)(double**, double**, double*, double*, double*, double*, double);
+typedef void (*ECSReactionPropensity)(double*, double*, double*);
+
+/*Reaction channels used by the stochastic method. Channel k changes the
+ *species in stoich_species[j] (and stoich_region[j] for 1D) by
+ *stoich_change[j] molecules for stoich_start[k] <= j < stoich_start[k+1].
+ *A signed channel (an rxd.Rate) has a propensity of either sign, when it is
+ *negative the channel fires in reverse.*/
+typedef struct StochasticChannels {
+    int num_channels;
+    unsigned char* signed_rate;
+    int* stoich_start;
+    int* stoich_species;
+    int* stoich_region;
+    double* stoich_change;
+    int id;     /*used to select the random streams*/
+    void* propensity;
+} StochasticChannels;
+
+class Grid_node;
+
 typedef struct Reaction {
 	struct Reaction* next;
 	ECSReactionRate reaction;
@@ -94,6 +115,8 @@ typedef struct Reaction {
 	unsigned int region_size;
     int* mc3d_indices_offsets;
     double** mc3d_mults;
+    Grid_node* grid;
+    StochasticChannels* stochastic;
 } Reaction;
 
 typedef struct {
@@ -161,7 +184,14 @@ class Grid_node {
     double* ics_scale_factors;
     int ics_num_segs;
 
+    /*contiguous per-thread partitions [thread_partition[k], thread_partition[k+1])
+     *of the concentration_list (ECS) or segments (ICS), used to scatter
+     *concentrations and gather currents*/
+    int* thread_partition;
+    struct GridPartitionData* partition_tasks;
+
     int insert(int grid_list_index);
+    void run_threaded_partition(void* (*task)(void*), double* output, double dt);
     int node_flux_count;
     long * node_flux_idx;
     double * node_flux_scale;
@@ -169,13 +199,16 @@ class Grid_node {
 
     virtual void set_diffusion(double*, int) = 0;
     virtual void set_num_threads(const int n) = 0;
+    virtual void set_thread_partition(const int n) = 0;
     virtual void do_grid_currents(double*, double dt, int id) = 0;
     virtual void apply_node_flux3D(double dt, double* states) = 0;
     virtual void volume_setup() = 0;
     virtual int dg_adi() = 0;
     virtual void variable_step_diffusion(const double* states, double* ydot) = 0;
     virtual void variable_step_ode_solve(const double* states, double* RHS, double dt) = 0;
+    virtual void variable_step_preconditioner(double* RHS, double dt) = 0;
     virtual void scatter_grid_concentrations() = 0;
+    virtual double voxel_volume(int idx) = 0;
     virtual void hybrid_connections() = 0;
     virtual void variable_step_hybrid_connections(const double* cvode_states_3d, double* const ydot_3d, const double* cvode_states_1d, double *const  ydot_1d) = 0;
 };
@@ -190,14 +223,17 @@ class ECS_Grid_node : public Grid_node{
         struct ECSAdiDirection* ecs_adi_dir_z;
 
         void set_num_threads(const int n);
+        void set_thread_partition(const int n);
         void do_grid_currents(double *, double dt, int id);
         void apply_node_flux3D(double dt, double* states);
         void volume_setup();
         int dg_adi();
         void variable_step_diffusion(const double* states, double* ydot);
         void variable_step_ode_solve(const double* states, double* RHS, double dt);
+        void variable_step_preconditioner(double* RHS, double dt);
         void variable_step_hybrid_connections(const double* cvode_states_3d, double* const ydot_3d, const double* cvode_states_1d, double *const  ydot_1d);
         void scatter_grid_concentrations();
+        double voxel_volume(int idx);
         void hybrid_connections();
         void set_diffusion(double*, int);
 };
@@ -260,15 +296,18 @@ class ICS_Grid_node : public Grid_node{
         void divide_y_work(const int nthreads);
         void divide_z_work(const int nthreads);
         void set_num_threads(const int n);
+        void set_thread_partition(const int n);
         void do_grid_currents(double*, double dt, int id);
         void apply_node_flux3D(double dt, double* states); 
         void volume_setup();
         int dg_adi();
         void variable_step_diffusion(const double* states, double* ydot);
         void variable_step_ode_solve(const double* states, double* RHS, double dt);
+        void variable_step_preconditioner(double* RHS, double dt);
         void hybrid_connections();
         void variable_step_hybrid_connections(const double* cvode_states_3d, double* const ydot_3d, const double* cvode_states_1d, double *const  ydot_1d);
         void scatter_grid_concentrations();
+        double voxel_volume(int idx);
         void run_threaded_ics_dg_adi(struct ICSAdiDirection*);
         void set_diffusion(double*, int);
 };
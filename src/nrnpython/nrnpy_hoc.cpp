@@ -9,6 +9,7 @@
 #include "nrnpy_utils.h"
 #include "../nrniv/shapeplt.h"
 #include <vector>
+#include <map>
 
 #if defined(NRNPYTHON_DYNAMICLOAD) && NRNPYTHON_DYNAMICLOAD > 0
 // when compiled with different Python.h, force correct value
@@ -47,6 +48,7 @@ extern double cable_prop_eval(Symbol* sym);
 extern void nrn_change_nseg(Section*, int);
 extern Symlist* hoc_top_level_symlist;
 extern Symlist* hoc_built_in_symlist;
+extern unsigned long hoc_symlist_change_cnt;
 extern Inst* hoc_pc;
 extern void hoc_push_string();
 extern char** hoc_strpop();
@@ -410,14 +412,49 @@ static void hocobj_pushargs_free_strings(std::vector<char*>& s2free) {
   }
 }
 
-static Symbol* getsym(char* name, Object* ho, int fail) {
+// Symbols found by getsym for a Python attribute name, one dict per
+// template (0 for the top level) keyed by the name object. The linear
+// symlist search is done once per name instead of on every attribute
+// access. Only defined symbols are cached and all the dicts are cleared
+// when a symbol is linked into or unlinked from any symlist, e.g. when a
+// template, mechanism or top level variable is declared.
+typedef std::map<cTemplate*, PyObject*> SymCache;
+static SymCache* symcache_;
+static unsigned long symcache_cnt_;
+
+static PyObject* symcache(Object* ho) {
+  if (!symcache_) {
+    symcache_ = new SymCache();
+    symcache_cnt_ = hoc_symlist_change_cnt;
+  }
+  if (symcache_cnt_ != hoc_symlist_change_cnt) {
+    for (SymCache::iterator it = symcache_->begin(); it != symcache_->end();
+         ++it) {
+      PyDict_Clear(it->second);
+    }
+    symcache_cnt_ = hoc_symlist_change_cnt;
+  }
+  PyObject*& d = (*symcache_)[ho ? ho->ctemplate : 0];
+  if (!d) {
+    d = PyDict_New();
+  }
+  return d;
+}
+
+static Symbol* getsym(char* name, Object* ho, int fail,
+                      PyObject* pyname = NULL) {
   Symbol* sym = 0;
-  if (ho) {
+  PyObject* cache = pyname ? symcache(ho) : NULL;
+  PyObject* p = cache ? PyDict_GetItem(cache, pyname) : NULL;
+  if (p) {
+    sym = (Symbol*)PyLong_AsVoidPtr(p);
+  } else if (ho) {
     sym = hoc_table_lookup(name, ho->ctemplate->symtable);
     if (!sym && strcmp(name, "delay") == 0) {
       sym = hoc_table_lookup("del", ho->ctemplate->symtable);
     } else if (!sym && ho->aliases) {
       sym = ivoc_alias_lookup(name, ho);
+      cache = NULL;  // aliases belong to the object, not the template
     }
   } else {
     sym = hoc_table_lookup(name, hoc_top_level_symlist);
@@ -425,6 +462,11 @@ static Symbol* getsym(char* name, Object* ho, int fail) {
       sym = hoc_table_lookup(name, hoc_built_in_symlist);
     }
   }
+  if (cache && !p && sym && sym->type != UNDEF) {
+    p = PyLong_FromVoidPtr(sym);
+    PyDict_SetItem(cache, pyname, p);
+    Py_DECREF(p);
+  }
   if (sym && sym->type == UNDEF) {
     sym = 0;
   }
@@ -952,7 +994,7 @@ static PyObject* hocobj_getattr(PyObject* subself, PyObject* pyname) {
   }
   // printf("hocobj_getattr %s\n", n);
 
-  Symbol* sym = getsym(n, self->ho_, 0);
+  Symbol* sym = getsym(n, self->ho_, 0, pyname);
   if (!sym) {
     if (self->type_ == PyHoc::HocObject &&
         self->ho_->ctemplate->sym == nrnpy_pyobj_sym_) {
@@ -1305,7 +1347,7 @@ static int hocobj_setattro(PyObject* subself, PyObject* pyname,
     return -1;
   }
   // printf("hocobj_setattro %s\n", n);
-  Symbol* sym = getsym(n, self->ho_, 0);
+  Symbol* sym = getsym(n, self->ho_, 0, pyname);
   if (!sym) {
     if (issub) {
       return PyObject_GenericSetAttr(subself, pyname, value);
@@ -2167,6 +2209,63 @@ static char* double_array_interface(PyObject* po, long& stride) {
   return (char*)data;
 }
 
+#define VEC_FROM_BUFFER(ctype)                         \
+  for (Py_ssize_t i = 0; i < n; ++i) {                 \
+    x[i] = double(*(const ctype*) (y + i * stride));   \
+  }                                                    \
+  break;
+
+// Fill hv from a one dimensional buffer of numbers, e.g. a numpy array.
+// Contiguous float64 data is copied with memcpy and other native item
+// types are converted in a single loop. Returns false, leaving hv
+// unchanged, if po does not provide such a buffer.
+static bool vec_from_buffer(Vect* hv, PyObject* po) {
+  if (!PyObject_CheckBuffer(po)) {
+    return false;
+  }
+  Py_buffer view;
+  if (PyObject_GetBuffer(po, &view, PyBUF_STRIDES | PyBUF_FORMAT) < 0) {
+    PyErr_Clear();
+    return false;
+  }
+  const char* f = view.format ? view.format : "B";
+  if (*f == '@') {
+    ++f;
+  }
+  if (view.ndim != 1 || strlen(f) != 1 || !strchr("dfbBhHiIlLqQ?", *f)) {
+    PyBuffer_Release(&view);
+    return false;
+  }
+  Py_ssize_t n = view.shape[0];
+  Py_ssize_t stride = view.strides[0];
+  hv->resize(n);
+  double* x = vector_vec(hv);
+  const char* y = (const char*) view.buf;
+  if (*f == 'd' && stride == sizeof(double)) {
+    // memmove since po may be a view of hv itself
+    memmove(x, y, n * sizeof(double));
+  } else {
+    switch (*f) {
+      case 'd': VEC_FROM_BUFFER(double)
+      case 'f': VEC_FROM_BUFFER(float)
+      case 'b': VEC_FROM_BUFFER(signed char)
+      case 'B': VEC_FROM_BUFFER(unsigned char)
+      case 'h': VEC_FROM_BUFFER(short)
+      case 'H': VEC_FROM_BUFFER(unsigned short)
+      case 'i': VEC_FROM_BUFFER(int)
+      case 'I': VEC_FROM_BUFFER(unsigned int)
+      case 'l': VEC_FROM_BUFFER(long)
+      case 'L': VEC_FROM_BUFFER(unsigned long)
+      case 'q': VEC_FROM_BUFFER(long long)
+      case 'Q': VEC_FROM_BUFFER(unsigned long long)
+      case '?': VEC_FROM_BUFFER(bool)
+    }
+  }
+  PyBuffer_Release(&view);
+  return true;
+}
+#undef VEC_FROM_BUFFER
+
 static IvocVect* nrnpy_vec_from_python(void* v) {
   Vect* hv = (Vect*)v;
   //	printf("%s.from_array\n", hoc_object_name(hv->obj_));
@@ -2176,6 +2275,10 @@ static IvocVect* nrnpy_vec_from_python(void* v) {
   }
   PyObject* po = nrnpy_hoc2pyobject(ho);
   Py_INCREF(po);
+  if (vec_from_buffer(hv, po)) {
+    Py_DECREF(po);
+    return hv;
+  }
   if (!PySequence_Check(po)) {
     if (!PyIter_Check(po)) {
       hoc_execerror(
@@ -2521,13 +2624,6 @@ static void add2topdict(PyObject* dict) {
   }
 }
 
-static PyObject* nrnpy_vec_math = NULL;
-
-int nrnpy_vec_math_register(PyObject* callback) {
-  nrnpy_vec_math = callback;
-  return 0;
-}
-
 static bool pyobj_is_vector(PyObject* obj) {
   if (PyObject_TypeCheck(obj, hocobject_type)) {
     PyHocObject* obj_h = (PyHocObject*) obj;
@@ -2541,59 +2637,282 @@ static bool pyobj_is_vector(PyObject* obj) {
   return false;
 }
 
-static PyObject* py_hocobj_math(const char* op, PyObject* obj1, PyObject* obj2) {
-  bool potentially_valid = false;
-  int reversed = 0;
-  if (pyobj_is_vector(obj1)) {
-    potentially_valid = true;
-  } else if (pyobj_is_vector(obj2)) {
-    potentially_valid = true;
-    reversed = 1;
+// Vector arithmetic is done here instead of through the hoc Vector methods
+// so that expressions do not make extra copies and in-place operators
+// are really in place.
+enum VecOp { VecAdd, VecSub, VecMul, VecDiv };
+
+static bool native_double_format(const char* f) {
+  // the struct module format of a native double
+  if (f[0] == '@' || f[0] == '=' || f[0] == array_interface_typestr[0]) {
+    ++f;
   }
-  if (!potentially_valid){
+  return strcmp(f, "d") == 0;
+}
+
+// The other operand of a Vector operation. A number sets scalar and returns
+// data NULL. A Vector or a contiguous float64 buffer (e.g. a numpy array)
+// must have n elements and is used in place. Returns 1 on success,
+// 0 if the type is not supported, -1 with a Python error set.
+static int vec_operand(PyObject* po, Py_ssize_t n, double& scalar,
+                       const double*& data, Py_buffer& view) {
+  view.obj = NULL;
+  data = NULL;
+  if (pyobj_is_vector(po)) {
+    Vect* v = (Vect*) ((PyHocObject*) po)->ho_->u.this_pointer;
+    if (v->capacity() != n) {
+      PyErr_SetString(PyExc_ValueError, "Vector operands not the same size");
+      return -1;
+    }
+    data = vector_vec(v);
+    return 1;
+  }
+  if (PyObject_CheckBuffer(po)) {
+    if (PyObject_GetBuffer(po, &view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) < 0) {
+      // e.g. a non-contiguous array
+      PyErr_Clear();
+      return 0;
+    }
+    if (view.ndim > 0) {
+      if (view.ndim != 1 || !view.format || !native_double_format(view.format)) {
+        PyBuffer_Release(&view);
+        view.obj = NULL;
+        return 0;
+      }
+      if (view.shape[0] != n) {
+        PyBuffer_Release(&view);
+        view.obj = NULL;
+        PyErr_SetString(PyExc_ValueError, "Vector operands not the same size");
+        return -1;
+      }
+      data = (const double*) view.buf;
+      return 1;
+    }
+    // zero dimensional, e.g. a numpy scalar
+    PyBuffer_Release(&view);
+    view.obj = NULL;
+  }
+  if (nrnpy_numbercheck(po)) {
+    scalar = PyFloat_AsDouble(po);
+    return PyErr_Occurred() ? -1 : 1;
+  }
+  return 0;
+}
+
+static PyObject* new_vector(Py_ssize_t n, double*& data) {
+  Object* ho = hoc_newobj1(hoc_vec_template_->sym, 0);
+  PyHocObject* result = (PyHocObject*) hocobj_new(hocobject_type, 0, 0);
+  result->ho_ = ho;
+  result->type_ = PyHoc::HocObject;
+  Vect* v = (Vect*) ho->u.this_pointer;
+  v->resize(n);
+  data = vector_vec(v);
+  return (PyObject*) result;
+}
+
+static PyObject* py_hocobj_math(VecOp op, PyObject* obj1, PyObject* obj2,
+                                bool inplace) {
+  PyObject* self;
+  PyObject* other;
+  bool reversed = false;
+  if (pyobj_is_vector(obj1)) {
+    self = obj1;
+    other = obj2;
+  } else if (!inplace && pyobj_is_vector(obj2)) {
+    self = obj2;
+    other = obj1;
+    reversed = true;
+  } else {
     Py_INCREF(Py_NotImplemented);
     return Py_NotImplemented;
   }
-  char buf[8];
-  return PyObject_CallFunction(nrnpy_vec_math, strcpy(buf, "siOO"), op, reversed, obj1, obj2);
+  Vect* x = (Vect*) ((PyHocObject*) self)->ho_->u.this_pointer;
+  Py_ssize_t n = x->capacity();
+  double s = 0.;
+  const double* b;
+  Py_buffer view;
+  int r = vec_operand(other, n, s, b, view);
+  if (r <= 0) {
+    if (r == 0) {
+      Py_INCREF(Py_NotImplemented);
+      return Py_NotImplemented;
+    }
+    return NULL;
+  }
+  PyObject* result;
+  double* c;
+  if (inplace) {
+    result = self;
+    Py_INCREF(result);
+    c = vector_vec(x);
+  } else {
+    result = new_vector(n, c);
+  }
+  const double* a = vector_vec(x);
+  Py_ssize_t i;
+  switch (op) {
+    case VecAdd:
+      if (b) {
+        for (i = 0; i < n; ++i) { c[i] = a[i] + b[i]; }
+      } else {
+        for (i = 0; i < n; ++i) { c[i] = a[i] + s; }
+      }
+      break;
+    case VecMul:
+      if (b) {
+        for (i = 0; i < n; ++i) { c[i] = a[i] * b[i]; }
+      } else {
+        for (i = 0; i < n; ++i) { c[i] = a[i] * s; }
+      }
+      break;
+    case VecSub:
+      if (reversed) {
+        if (b) {
+          for (i = 0; i < n; ++i) { c[i] = b[i] - a[i]; }
+        } else {
+          for (i = 0; i < n; ++i) { c[i] = s - a[i]; }
+        }
+      } else if (b) {
+        for (i = 0; i < n; ++i) { c[i] = a[i] - b[i]; }
+      } else {
+        for (i = 0; i < n; ++i) { c[i] = a[i] - s; }
+      }
+      break;
+    case VecDiv:
+      if (reversed) {
+        if (b) {
+          for (i = 0; i < n; ++i) { c[i] = b[i] / a[i]; }
+        } else {
+          for (i = 0; i < n; ++i) { c[i] = s / a[i]; }
+        }
+      } else if (b) {
+        for (i = 0; i < n; ++i) { c[i] = a[i] / b[i]; }
+      } else {
+        for (i = 0; i < n; ++i) { c[i] = a[i] / s; }
+      }
+      break;
+  }
+  if (view.obj) {
+    PyBuffer_Release(&view);
+  }
+  return result;
 }
 
-static PyObject* py_hocobj_math_unary(const char* op, PyObject* obj) {
-  if (pyobj_is_vector(obj)) {
-    char buf[8];
-    return PyObject_CallFunction(nrnpy_vec_math, strcpy(buf, "siO"), op, 2, obj);
+static PyObject* py_hocobj_math_unary(double (*f)(double), PyObject* obj) {
+  if (!pyobj_is_vector(obj)) {
+    Py_INCREF(Py_NotImplemented);
+    return Py_NotImplemented;
+  }
+  Vect* x = (Vect*) ((PyHocObject*) obj)->ho_->u.this_pointer;
+  Py_ssize_t n = x->capacity();
+  double* c;
+  PyObject* result = new_vector(n, c);
+  const double* a = vector_vec(x);
+  for (Py_ssize_t i = 0; i < n; ++i) {
+    c[i] = f(a[i]);
   }
-  Py_INCREF(Py_NotImplemented);
-  return Py_NotImplemented;
+  return result;
+}
+
+static double vec_neg(double x) {
+  return -x;
+}
+
+static double vec_pos(double x) {
+  return x;
+}
+
+static double vec_abs(double x) {
+  return fabs(x);
 }
 
 static PyObject* py_hocobj_add(PyObject* obj1, PyObject* obj2) {
-  return py_hocobj_math("add", obj1, obj2);
+  return py_hocobj_math(VecAdd, obj1, obj2, false);
 }
 
 static PyObject* py_hocobj_uabs(PyObject* obj) {
-  return py_hocobj_math_unary("uabs", obj);
+  return py_hocobj_math_unary(vec_abs, obj);
 }
 
 static PyObject* py_hocobj_uneg(PyObject* obj) {
-  return py_hocobj_math_unary("uneg", obj);
+  return py_hocobj_math_unary(vec_neg, obj);
 }
 
 static PyObject* py_hocobj_upos(PyObject* obj) {
-  return py_hocobj_math_unary("upos", obj);
+  return py_hocobj_math_unary(vec_pos, obj);
 }
 
 static PyObject* py_hocobj_sub(PyObject* obj1, PyObject* obj2) {
-  return py_hocobj_math("sub", obj1, obj2);
+  return py_hocobj_math(VecSub, obj1, obj2, false);
 }
 
 static PyObject* py_hocobj_mul(PyObject* obj1, PyObject* obj2) {
-  return py_hocobj_math("mul", obj1, obj2);
+  return py_hocobj_math(VecMul, obj1, obj2, false);
 }
 
 static PyObject* py_hocobj_div(PyObject* obj1, PyObject* obj2) {
-  return py_hocobj_math("div", obj1, obj2);
+  return py_hocobj_math(VecDiv, obj1, obj2, false);
+}
+
+static PyObject* py_hocobj_iadd(PyObject* obj1, PyObject* obj2) {
+  return py_hocobj_math(VecAdd, obj1, obj2, true);
+}
+
+static PyObject* py_hocobj_isub(PyObject* obj1, PyObject* obj2) {
+  return py_hocobj_math(VecSub, obj1, obj2, true);
+}
+
+static PyObject* py_hocobj_imul(PyObject* obj1, PyObject* obj2) {
+  return py_hocobj_math(VecMul, obj1, obj2, true);
 }
+
+static PyObject* py_hocobj_idiv(PyObject* obj1, PyObject* obj2) {
+  return py_hocobj_math(VecDiv, obj1, obj2, true);
+}
+// PEP 3118 buffer of a Vector, so memoryview(vec) and numpy.asarray(vec)
+// share the Vector data. The PyHocObject is kept alive by view->obj. If the
+// Vector needs new data space, the buffer keeps the old data (see
+// IvocVect::export_release) and no longer follows the Vector.
+static int hocobj_getbuffer(PyObject* self, Py_buffer* view, int flags) {
+  if (!pyobj_is_vector(self)) {
+    view->obj = NULL;
+    PyErr_SetString(PyExc_BufferError,
+                    "only a hoc Vector supports the buffer protocol");
+    return -1;
+  }
+  Vect* v = (Vect*) ((PyHocObject*) self)->ho_->u.this_pointer;
+  static double empty;
+  double* data = vector_vec(v);
+  Py_ssize_t* shape = (Py_ssize_t*) PyMem_Malloc(2 * sizeof(Py_ssize_t));
+  if (!shape) {
+    view->obj = NULL;
+    PyErr_NoMemory();
+    return -1;
+  }
+  shape[0] = v->capacity();
+  shape[1] = sizeof(double);
+  view->buf = data ? data : &empty;
+  view->obj = self;
+  Py_INCREF(self);
+  view->len = shape[0] * sizeof(double);
+  view->readonly = 0;
+  view->itemsize = sizeof(double);
+  view->format = (flags & PyBUF_FORMAT) ? (char*) "d" : NULL;
+  view->ndim = 1;
+  view->shape = (flags & PyBUF_ND) ? shape : NULL;
+  view->strides = ((flags & PyBUF_STRIDES) == PyBUF_STRIDES) ? shape + 1 : NULL;
+  view->suboffsets = NULL;
+  view->internal = shape;
+  v->export_acquire();
+  return 0;
+}
+
+static void hocobj_releasebuffer(PyObject* self, Py_buffer* view) {
+  Vect* v = (Vect*) ((PyHocObject*) self)->ho_->u.this_pointer;
+  v->export_release((double*) view->buf);
+  PyMem_Free(view->internal);
+}
+
 static PyMemberDef hocobj_members[] = {{NULL, 0, 0, 0, NULL}};
 
 #if (PY_MAJOR_VERSION >= 3)
@@ -2699,6 +3018,11 @@ myPyMODINIT_FUNC nrnpy_hoc() {
   Symbol* s = NULL;
 #if PY_MAJOR_VERSION >= 3
   hocobject_type = (PyTypeObject*)PyType_FromSpec(&nrnpy_HocObjectType_spec);
+#if PY_VERSION_HEX < 0x03090000
+  // the buffer slots cannot be given in a PyType_Spec before 3.9
+  hocobject_type->tp_as_buffer->bf_getbuffer = hocobj_getbuffer;
+  hocobject_type->tp_as_buffer->bf_releasebuffer = hocobj_releasebuffer;
+#endif
 #else
   hocobject_type = &nrnpy_HocObjectType;
 #endif
@@ -25,10 +25,10 @@ static PyNumberMethods hocobj_as_number = {
     0,                       /* nb_float */
     0,                       /* nb_oct */
     0,                       /* nb_hex */
-    0,                       /* nb_inplace_add */
-    0,                       /* nb_inplace_subtract */
-    0,                       /* nb_inplace_multiply */
-    0,                       /* nb_inplace_divide */
+    py_hocobj_iadd,          /* nb_inplace_add */
+    py_hocobj_isub,          /* nb_inplace_subtract */
+    py_hocobj_imul,          /* nb_inplace_multiply */
+    py_hocobj_idiv,          /* nb_inplace_divide */
     0,                       /* nb_inplace_remainder */
     0,                       /* nb_inplace_power */
     0,                       /* nb_inplace_lshift */
@@ -37,14 +37,23 @@ static PyNumberMethods hocobj_as_number = {
     0,                       /* nb_inplace_xor */
     0,                       /* nb_inplace_or */
     0,                       /* nb_floor_divide */
-    0,                       /* nb_true_divide */
+    py_hocobj_div,           /* nb_true_divide */
     0,                       /* nb_inplace_floor_divide */
-    py_hocobj_div,           /* nb_inplace_true_divide */
+    py_hocobj_idiv,          /* nb_inplace_true_divide */
 #if PYTHON_API_VERSION > 1012
     0, /* nb_index */
 #endif
 };
 
+static PyBufferProcs hocobj_as_buffer = {
+    0,                    /* bf_getreadbuffer */
+    0,                    /* bf_getwritebuffer */
+    0,                    /* bf_getsegcount */
+    0,                    /* bf_getcharbuffer */
+    hocobj_getbuffer,     /* bf_getbuffer */
+    hocobj_releasebuffer, /* bf_releasebuffer */
+};
+
 static PySequenceMethods hocobj_seqmeth = {
     hocobj_len,     NULL, NULL, hocobj_getitem, NULL,
     hocobj_setitem, NULL, NULL, NULL,           NULL
@@ -76,8 +85,9 @@ static PyTypeObject nrnpy_HocObjectType = {
     0,                                        /*tp_str*/
     hocobj_getattro,                          /*tp_getattro*/
     hocobj_setattro,                          /*tp_setattro*/
-    0,                                        /*tp_as_buffer*/
-    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE| Py_TPFLAGS_CHECKTYPES, /*tp_flags*/
+    &hocobj_as_buffer,                        /*tp_as_buffer*/
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE| Py_TPFLAGS_CHECKTYPES |
+        Py_TPFLAGS_HAVE_NEWBUFFER,            /*tp_flags*/
     ccast hocobj_docstring,                   /* tp_doc */
     0,                                        /* tp_traverse */
     0,                                        /* tp_clear */
@@ -25,6 +25,14 @@ static PyType_Slot nrnpy_HocObjectType_slots[] = {
     {Py_nb_positive, (PyObject*)py_hocobj_upos},
     {Py_nb_absolute, (PyObject*)py_hocobj_uabs},
     {Py_nb_true_divide, (PyObject*)py_hocobj_div},
+    {Py_nb_inplace_add, (PyObject*)py_hocobj_iadd},
+    {Py_nb_inplace_subtract, (PyObject*)py_hocobj_isub},
+    {Py_nb_inplace_multiply, (PyObject*)py_hocobj_imul},
+    {Py_nb_inplace_true_divide, (PyObject*)py_hocobj_idiv},
+#if PY_VERSION_HEX >= 0x03090000
+    {Py_bf_getbuffer, (void*)hocobj_getbuffer},
+    {Py_bf_releasebuffer, (void*)hocobj_releasebuffer},
+#endif
     {0, 0},
 };
 static PyType_Spec nrnpy_HocObjectType_spec = {
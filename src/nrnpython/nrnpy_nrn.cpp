@@ -4,10 +4,18 @@
 #include <nrnoc2iv.h>
 #include "nrnpy_utils.h"
 #include <cmath>
+#include <vector>
+#include <map>
+#include <algorithm>
 #ifndef M_PI
 #define M_PI (3.14159265358979323846)
 #endif
 
+class IvocVect;
+extern void nrn_vecsim_record_multi(IvocVect*, int, double**, double);
+extern void nrn_vecsim_record_stream(IvocVect*, const char*, int, const char*);
+extern void nrn_vecsim_record_flush(IvocVect*);
+
 extern "C" {
 #include <membfunc.h>
 #include <parse.h>
@@ -25,6 +33,8 @@ extern Symlist* hoc_built_in_symlist;
 double* nrnpy_rangepointer(Section*, Symbol*, double, int*);
 extern PyObject* nrn_ptr_richcmp(void* self_ptr, void* other_ptr, int op);
 extern int has_membrane(char*, Section*);
+extern void* nrn_prop_data_export(int type);
+extern void nrn_prop_data_release(void* pool);
 typedef struct {
   PyObject_HEAD Section* sec_;
   char* name_;
@@ -75,6 +85,12 @@ typedef struct {
   int attr_from_sec_; // so section.xraxial[0] = e assigns to all segments.
 } NPyRangeVar;
 
+typedef struct {
+  PyObject_HEAD void* pool_;
+  double* data_;
+  Py_ssize_t size_;
+} NPyMembListBuffer;
+
 PyTypeObject* psection_type;
 static PyTypeObject* pallseg_of_sec_iter_type;
 static PyTypeObject* pseg_of_sec_iter_type;
@@ -83,6 +99,7 @@ static PyTypeObject* pmech_of_seg_iter_generic_type;
 static PyTypeObject* pmech_generic_type;
 static PyTypeObject* pvar_of_mech_iter_generic_type;
 static PyTypeObject* range_type;
+static PyTypeObject* memb_list_buffer_type;
 
 PyObject* pmech_types;  // Python map for name to Mechanism
 PyObject* rangevars_;   // Python map for name to Symbol
@@ -99,6 +116,10 @@ extern cTemplate** nrn_pnt_template_;
 extern void nrn_diam_change(Section*);
 extern void nrn_length_change(Section*, double);
 extern int diam_changed;
+extern int tree_changed;
+extern int v_structure_change;
+extern int structure_change_cnt;
+extern void v_setup_vectors();
 extern void mech_insert1(Section*, int);
 extern void mech_uninsert1(Section*, Symbol*);
 extern PyObject* nrn_hocobj_ptr(double*);
@@ -1454,7 +1475,7 @@ static PyObject* section_getattro(NPySecObj* self, PyObject* pyname) {
     result = Py_BuildValue("d", nrn_ra(self->sec_));
   } else if (strcmp(n, "nseg") == 0) {
     result = Py_BuildValue("i", self->sec_->nnode - 1);
-  } else if ((rv = PyDict_GetItemString(rangevars_, n)) != NULL) {
+  } else if ((rv = PyDict_GetItem(rangevars_, pyname)) != NULL) {
     Symbol* sym = ((NPyRangeVar*)rv)->sym_;
     if (ISARRAY(sym)) {
       NPyRangeVar* r = rvnew(sym, self, 0.5);
@@ -1537,7 +1558,7 @@ static int section_setattro(NPySecObj* self, PyObject* pyname,
     }
     // printf("section_setattro err=%d nseg=%d nnode\n", err, nseg,
     // self->sec_->nnode);
-  } else if ((rv = PyDict_GetItemString(rangevars_, n)) != NULL) {
+  } else if ((rv = PyDict_GetItem(rangevars_, pyname)) != NULL) {
     Symbol* sym = ((NPyRangeVar*)rv)->sym_;
     if (ISARRAY(sym)) {
       PyErr_SetString(PyExc_IndexError, "missing index");
@@ -1637,7 +1658,7 @@ static PyObject* segment_getattro(NPySegObj* self, PyObject* pyname) {
   if (strcmp(n, "v") == 0) {
     Node* nd = node_exact(sec, self->x_);
     result = Py_BuildValue("d", NODEV(nd));
-  } else if ((otype = PyDict_GetItemString(pmech_types, n)) != NULL) {
+  } else if ((otype = PyDict_GetItem(pmech_types, pyname)) != NULL) {
     int type = PyInt_AsLong(otype);
     // printf("segment_getattr type=%d\n", type);
     Node* nd = node_exact(sec, self->x_);
@@ -1656,7 +1677,7 @@ static PyObject* segment_getattro(NPySegObj* self, PyObject* pyname) {
         result = (PyObject*)m;
       }
     }
-  } else if ((rv = PyDict_GetItemString(rangevars_, n)) != NULL) {
+  } else if ((rv = PyDict_GetItem(rangevars_, pyname)) != NULL) {
     sym = ((NPyRangeVar*)rv)->sym_;
     if (ISARRAY(sym)) {
       NPyRangeVar* r = PyObject_New(NPyRangeVar, range_type);
@@ -1780,7 +1801,7 @@ static int segment_setattro(NPySegObj* self, PyObject* pyname,
       PyErr_SetString(PyExc_ValueError, "x must be in range 0. to 1.");
       err = -1;
     }
-  } else if ((rv = PyDict_GetItemString(rangevars_, n)) != NULL) {
+  } else if ((rv = PyDict_GetItem(rangevars_, pyname)) != NULL) {
     sym = ((NPyRangeVar*)rv)->sym_;
     if (ISARRAY(sym)) {
       char s[200];
@@ -2174,12 +2195,922 @@ PyObject* nrnpy_cas(PyObject* self, PyObject* args) {
   return (PyObject*)newpysechelp(sec);
 }
 
+// Bulk transfer of a range variable between the segments of a list of
+// sections and a contiguous double buffer. The symbol is resolved once and
+// the sections are collected once, so the per value cost is a pointer lookup.
+// Names are as for segment attributes, optionally with an array index,
+// e.g. "diam", "gnabar_hh", "hh.gnabar", "na_ion.ena", "vext[1]".
+static Symbol* bulk_rangevar(const char* n, int* indx) {
+  char buf[256];
+  Symbol* sym = NULL;
+  *indx = 0;
+  if (strlen(n) >= sizeof(buf)) {
+    PyErr_SetString(PyExc_ValueError, "range variable name too long");
+    return NULL;
+  }
+  strcpy(buf, n);
+  char* b = strchr(buf, '[');
+  if (b) {
+    char* e;
+    *indx = (int)strtol(b + 1, &e, 10);
+    if (e == b + 1 || strcmp(e, "]") != 0 || *indx < 0) {
+      PyErr_Format(PyExc_ValueError, "bad range variable index in %s", n);
+      return NULL;
+    }
+    *b = '\0';
+  }
+  char* dot = strchr(buf, '.');
+  if (dot) {
+    *dot = '\0';
+    PyObject* otype = PyDict_GetItemString(pmech_types, buf);
+    if (otype) {
+      int type = PyInt_AsLong(otype);
+      char name[256];
+      sprintf(name, "%s_%s", dot + 1, buf);
+      sym = hoc_table_lookup(name, hoc_built_in_symlist);
+      if (!sym || sym->type != RANGEVAR || sym->u.rng.type != type) {
+        // ion variables are not suffixed, e.g. na_ion.ena
+        sym = hoc_table_lookup(dot + 1, hoc_built_in_symlist);
+      }
+      if (sym && (sym->type != RANGEVAR || sym->u.rng.type != type)) {
+        sym = NULL;
+      }
+    }
+  } else {
+    PyObject* rv = PyDict_GetItemString(rangevars_, buf);
+    if (rv) {
+      sym = ((NPyRangeVar*)rv)->sym_;
+    }
+  }
+  if (!sym) {
+    PyErr_Format(PyExc_AttributeError, "%s is not a range variable", n);
+    return NULL;
+  }
+  int size = ISARRAY(sym) ? sym->arayinfo->sub[0] : 1;
+  if (*indx >= size) {
+    PyErr_Format(PyExc_IndexError, "%s index out of range (%d)", n, size);
+    return NULL;
+  }
+  return sym;
+}
+
+// sections is None (all sections), a SectionList or any iterable of
+// nrn.Section. Returns false with the Python error set on failure.
+static bool bulk_sections(PyObject* sections, std::vector<Section*>& secs) {
+  PyObject* iter;
+  if (sections == Py_None) {
+    PyObject* all = nrnpy_forall(NULL, NULL);
+    iter = PyObject_GetIter(all);
+    Py_DECREF(all);
+  } else {
+    iter = PyObject_GetIter(sections);
+  }
+  if (!iter) {
+    return false;
+  }
+  PyObject* item;
+  while ((item = PyIter_Next(iter)) != NULL) {
+    if (!PyObject_TypeCheck(item, psection_type)) {
+      Py_DECREF(item);
+      Py_DECREF(iter);
+      PyErr_SetString(PyExc_TypeError, "sections must be nrn.Section");
+      return false;
+    }
+    Section* sec = ((NPySecObj*)item)->sec_;
+    Py_DECREF(item);
+    if (!sec->prop) {
+      Py_DECREF(iter);
+      PyErr_SetString(PyExc_ReferenceError,
+                      "can't access a deleted section");
+      return false;
+    }
+    secs.push_back(sec);
+  }
+  Py_DECREF(iter);
+  return !PyErr_Occurred();
+}
+
+static PyObject* nrnpy_bulk_rangevar(PyObject* args, bool gather) {
+  char* n;
+  PyObject* sections;
+  PyObject* values = Py_None;
+  PyObject* xloc = Py_None;
+  int indx;
+  if (gather) {
+    if (!PyArg_ParseTuple(args, "sO|O", &n, &sections, &xloc)) {
+      return NULL;
+    }
+  } else if (!PyArg_ParseTuple(args, "sOO|O", &n, &sections, &values, &xloc)) {
+    return NULL;
+  }
+  Symbol* sym = bulk_rangevar(n, &indx);
+  if (!sym) {
+    return NULL;
+  }
+  std::vector<Section*> secs;
+  if (!bulk_sections(sections, secs)) {
+    return NULL;
+  }
+
+  Py_buffer xbuf;
+  const double* x = NULL;
+  Py_ssize_t nx = 0;
+  if (xloc != Py_None) {
+    if (PyObject_GetBuffer(xloc, &xbuf, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) < 0) {
+      return NULL;
+    }
+    if (!xbuf.format || strcmp(xbuf.format, "d") != 0) {
+      PyBuffer_Release(&xbuf);
+      PyErr_SetString(PyExc_TypeError, "x must be a contiguous float64 buffer");
+      return NULL;
+    }
+    x = (const double*)xbuf.buf;
+    nx = xbuf.len / sizeof(double);
+    for (Py_ssize_t j = 0; j < nx; ++j) {
+      if (!(x[j] >= 0. && x[j] <= 1.)) {
+        PyBuffer_Release(&xbuf);
+        PyErr_SetString(PyExc_ValueError, "x must be in range 0. to 1.");
+        return NULL;
+      }
+    }
+  }
+
+  Py_ssize_t cnt = 0;
+  for (size_t i = 0; i < secs.size(); ++i) {
+    cnt += x ? nx : secs[i]->nnode - 1;
+  }
+
+  PyObject* result = NULL;
+  Py_buffer vbuf;
+  double* data;
+  if (gather) {
+    result = PyByteArray_FromStringAndSize(NULL, cnt * sizeof(double));
+    if (!result) {
+      if (x) {
+        PyBuffer_Release(&xbuf);
+      }
+      return NULL;
+    }
+    data = (double*)PyByteArray_AS_STRING(result);
+  } else {
+    if (PyObject_GetBuffer(values, &vbuf, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) < 0) {
+      if (x) {
+        PyBuffer_Release(&xbuf);
+      }
+      return NULL;
+    }
+    if (!vbuf.format || strcmp(vbuf.format, "d") != 0 ||
+        vbuf.len != (Py_ssize_t)(cnt * sizeof(double))) {
+      PyErr_Format(PyExc_ValueError,
+                   "values must be a contiguous float64 buffer of length %ld",
+                   (long)cnt);
+      PyBuffer_Release(&vbuf);
+      if (x) {
+        PyBuffer_Release(&xbuf);
+      }
+      return NULL;
+    }
+    data = (double*)vbuf.buf;
+  }
+
+  bool ok = true;
+  bool morph = sym->u.rng.type == MORPHOLOGY;
+  for (size_t i = 0; ok && i < secs.size(); ++i) {
+    Section* sec = secs[i];
+    int nseg = sec->nnode - 1;
+    int nloc = x ? nx : nseg;
+    if (gather && morph && sec->recalc_area_) {
+      nrn_area_ri(sec);
+    }
+    for (int j = 0; j < nloc; ++j) {
+      double xj = x ? x[j] : (j + 0.5) / nseg;
+      int err;
+      double* d = nrnpy_rangepointer(sec, sym, xj, &err);
+      if (!d) {
+        rv_noexist(sec, n, xj, err);
+        ok = false;
+        break;
+      }
+      if (gather) {
+        *data++ = d[indx];
+      } else {
+        d[indx] = *data++;
+      }
+    }
+    if (!gather && morph) {
+      diam_changed = 1;
+      sec->recalc_area_ = 1;
+      nrn_diam_change(sec);
+    }
+  }
+  if (!gather && sym->u.rng.type == EXTRACELL && sym->u.rng.index == 0) {
+    diam_changed = 1;
+  }
+
+  if (x) {
+    PyBuffer_Release(&xbuf);
+  }
+  if (gather) {
+    if (!ok) {
+      Py_DECREF(result);
+      return NULL;
+    }
+    return result;
+  }
+  PyBuffer_Release(&vbuf);
+  if (!ok) {
+    return NULL;
+  }
+  Py_RETURN_NONE;
+}
+
+static PyObject* nrnpy_gather(PyObject* self, PyObject* args) {
+  return nrnpy_bulk_rangevar(args, true);
+}
+
+static PyObject* nrnpy_scatter(PyObject* self, PyObject* args) {
+  return nrnpy_bulk_rangevar(args, false);
+}
+
+static bool morph_add(PyObject* result, const char* name, const void* data,
+                      size_t nbytes) {
+  PyObject* a = PyByteArray_FromStringAndSize((const char*)data, nbytes);
+  if (!a) {
+    return false;
+  }
+  int err = PyDict_SetItemString(result, name, a);
+  Py_DECREF(a);
+  return err == 0;
+}
+
+// The 3-d location of arc length a along the 3-d points of sec.
+static void morph_pt3d_at(Section* sec, double a, double* xyz) {
+  Pt3d* p = sec->pt3d;
+  int n = sec->npt3d;
+  int i = 1;
+  while (i < n - 1 && p[i].arc < a) {
+    ++i;
+  }
+  double f = 0.;
+  if (p[i].arc > p[i - 1].arc) {
+    f = (a - p[i - 1].arc) / (p[i].arc - p[i - 1].arc);
+  }
+  xyz[0] = p[i - 1].x + f * (p[i].x - p[i - 1].x);
+  xyz[1] = p[i - 1].y + f * (p[i].y - p[i - 1].y);
+  xyz[2] = p[i - 1].z + f * (p[i].z - p[i - 1].z);
+}
+
+// the node of the jth segment in order of increasing x. The pnode order
+// is reversed for a section connected at its 1 end.
+static Node* seg_node(Section* sec, int j) {
+  return sec->pnode[node_index(sec, (j + 0.5) / (sec->nnode - 1))];
+}
+
+// morphology(sections) returns a dict of bytearrays, the geometry of all
+// the sections in a single pass. See neuron.morphology.
+static PyObject* nrnpy_morphology(PyObject* self, PyObject* args) {
+  PyObject* sections = Py_None;
+  if (!PyArg_ParseTuple(args, "|O", &sections)) {
+    return NULL;
+  }
+  std::vector<Section*> secs;
+  if (!bulk_sections(sections, secs)) {
+    return NULL;
+  }
+  size_t nsec = secs.size();
+  std::map<Section*, int> index;
+  for (size_t i = 0; i < nsec; ++i) {
+    index[secs[i]] = i;
+  }
+
+  std::vector<int> parent(nsec), nseg(nsec);
+  std::vector<double> parentx(nsec), orientation(nsec), length(nsec);
+  std::vector<long long> pt3d_offset(nsec + 1), seg_offset(nsec + 1);
+  std::vector<double> pt3d, seg_x, seg_area, seg_diam, seg_xyz;
+  pt3d_offset[0] = seg_offset[0] = 0;
+  for (size_t i = 0; i < nsec; ++i) {
+    Section* sec = secs[i];
+    if (sec->recalc_area_) {
+      nrn_area_ri(sec);
+    }
+    std::map<Section*, int>::iterator it = index.find(sec->parentsec);
+    parent[i] = (sec->parentsec && it != index.end()) ? it->second : -1;
+    parentx[i] = sec->parentsec ? nrn_connection_position(sec) : NAN;
+    orientation[i] = nrn_section_orientation(sec);
+    length[i] = section_length(sec);
+    nseg[i] = sec->nnode - 1;
+    for (int j = 0; j < sec->npt3d; ++j) {
+      Pt3d& p = sec->pt3d[j];
+      pt3d.push_back(p.x);
+      pt3d.push_back(p.y);
+      pt3d.push_back(p.z);
+      pt3d.push_back(p.arc);
+      pt3d.push_back(fabs(p.d));
+    }
+    pt3d_offset[i + 1] = pt3d_offset[i] + sec->npt3d;
+    for (int j = 0; j < nseg[i]; ++j) {
+      double x = (j + 0.5) / nseg[i];
+      Node* nd = seg_node(sec, j);
+      seg_x.push_back(x);
+      seg_area.push_back(NODEAREA(nd));
+      double d = NAN;
+      for (Prop* p = nd->prop; p; p = p->next) {
+        if (p->type == MORPHOLOGY) {
+          d = p->param[0];
+          break;
+        }
+      }
+      seg_diam.push_back(d);
+      double xyz[3] = {NAN, NAN, NAN};
+      if (sec->npt3d > 1) {
+        // the 3-d points start at the 1 end of a section connected by it
+        double a = arc0at0(sec) ? x : 1. - x;
+        morph_pt3d_at(sec, a * sec->pt3d[sec->npt3d - 1].arc, xyz);
+      } else if (sec->npt3d == 1) {
+        xyz[0] = sec->pt3d[0].x;
+        xyz[1] = sec->pt3d[0].y;
+        xyz[2] = sec->pt3d[0].z;
+      }
+      seg_xyz.insert(seg_xyz.end(), xyz, xyz + 3);
+    }
+    seg_offset[i + 1] = seg_offset[i] + nseg[i];
+  }
+
+  PyObject* result = PyDict_New();
+  if (!result) {
+    return NULL;
+  }
+#define MORPH_ADD(name, v)                                                  \
+  if (!morph_add(result, name, v.empty() ? NULL : &v[0],                   \
+                 v.size() * sizeof(v[0]))) {                               \
+    Py_DECREF(result);                                                     \
+    return NULL;                                                           \
+  }
+  MORPH_ADD("parent", parent)
+  MORPH_ADD("parentx", parentx)
+  MORPH_ADD("orientation", orientation)
+  MORPH_ADD("L", length)
+  MORPH_ADD("nseg", nseg)
+  MORPH_ADD("pt3d_offset", pt3d_offset)
+  MORPH_ADD("pt3d", pt3d)
+  MORPH_ADD("seg_offset", seg_offset)
+  MORPH_ADD("seg_x", seg_x)
+  MORPH_ADD("seg_area", seg_area)
+  MORPH_ADD("seg_diam", seg_diam)
+  MORPH_ADD("seg_xyz", seg_xyz)
+#undef MORPH_ADD
+  return result;
+}
+
+// The range variables of a density mechanism, resolved once per type, and
+// their values in every segment (nan where the mechanism is absent).
+struct DescribeMech {
+  std::vector<Symbol*> syms;
+  std::vector<int> sizes;
+  std::vector<std::vector<double> > values;
+  std::vector<unsigned char> present;
+};
+
+static void describe_mech_init(DescribeMech& m, int type, size_t nseg) {
+  Symbol* msym = memb_func[type].sym;
+  for (int i = 0; i < msym->s_varn; ++i) {
+    Symbol* sym = msym->u.ppsym[i];
+    if (sym->subtype == NRNPOINTER) {
+      continue;
+    }
+    int size = ISARRAY(sym) ? sym->arayinfo->sub[0] : 1;
+    m.syms.push_back(sym);
+    m.sizes.push_back(size);
+    m.values.push_back(std::vector<double>(nseg * size, NAN));
+  }
+  m.present.resize(nseg, 0);
+}
+
+static void describe_mechs_free(std::vector<DescribeMech*>& mechs,
+                                std::vector<int>& order) {
+  for (size_t i = 0; i < order.size(); ++i) {
+    delete mechs[order[i]];
+    mechs[order[i]] = NULL;
+  }
+}
+
+// model_description(sections) returns, in a single pass over the Prop
+// lists of the nodes, a dict of bytearrays with the per section and per
+// segment values of all density mechanisms and the point processes.
+// See neuron.psection.model_description.
+static PyObject* nrnpy_model_description(PyObject* self, PyObject* args) {
+  PyObject* sections = Py_None;
+  if (!PyArg_ParseTuple(args, "|O", &sections)) {
+    return NULL;
+  }
+  std::vector<Section*> secs;
+  if (!bulk_sections(sections, secs)) {
+    return NULL;
+  }
+  size_t nsec = secs.size();
+  std::vector<int> nseg(nsec);
+  std::vector<double> length(nsec), ra(nsec);
+  size_t nsegtot = 0;
+  for (size_t i = 0; i < nsec; ++i) {
+    nseg[i] = secs[i]->nnode - 1;
+    nsegtot += nseg[i];
+  }
+  std::vector<double> cm(nsegtot, NAN), diam(nsegtot, NAN);
+  std::vector<DescribeMech*> mechs(n_memb_func, (DescribeMech*)0);
+  std::vector<int> order;  // mechanism types in order of appearance
+
+  PyObject* pps = PyList_New(0);
+  if (!pps) {
+    return NULL;
+  }
+  size_t iseg = 0;
+  for (size_t i = 0; i < nsec; ++i) {
+    Section* sec = secs[i];
+    length[i] = section_length(sec);
+    ra[i] = nrn_ra(sec);
+    nrn_parent_info(sec);
+    // point processes, also those at the ends of the section
+    for (int j = -1; j < sec->nnode; ++j) {
+      Node* nd = (j < 0) ? sec->parentnode : sec->pnode[j];
+      if (!nd) {
+        continue;
+      }
+      for (Prop* p = nd->prop; p; p = p->next) {
+        if (!memb_func[p->type].is_point) {
+          continue;
+        }
+        Point_process* pnt = (Point_process*)p->dparam[1]._pvoid;
+        if (!pnt || pnt->sec != sec || !pnt->ob) {
+          continue;
+        }
+        PyObject* item = Py_BuildValue("(sidN)", memb_func[p->type].sym->name,
+                                       (int)i, nrn_arc_position(sec, nd),
+                                       nrnpy_ho2po(pnt->ob));
+        if (!item || PyList_Append(pps, item) != 0) {
+          Py_XDECREF(item);
+          Py_DECREF(pps);
+          describe_mechs_free(mechs, order);
+          return NULL;
+        }
+        Py_DECREF(item);
+      }
+    }
+    // density mechanisms
+    for (int j = 0; j < nseg[i]; ++j, ++iseg) {
+      Node* nd = seg_node(sec, j);
+      for (Prop* p = nd->prop; p; p = p->next) {
+        int type = p->type;
+        if (type == CAP) {
+          cm[iseg] = p->param[0];
+          continue;
+        }
+        if (type == MORPHOLOGY) {
+          diam[iseg] = p->param[0];
+          continue;
+        }
+        if (memb_func[type].is_point ||
+            !PyDict_GetItemString(pmech_types, memb_func[type].sym->name)) {
+          continue;
+        }
+        DescribeMech* m = mechs[type];
+        if (!m) {
+          m = mechs[type] = new DescribeMech();
+          describe_mech_init(*m, type, nsegtot);
+          order.push_back(type);
+        }
+        m->present[iseg] = 1;
+        for (size_t k = 0; k < m->syms.size(); ++k) {
+          int size = m->sizes[k];
+          double* src = nrn_vext_pd(m->syms[k], 0, nd);
+          if (!src) {
+            src = p->param + m->syms[k]->u.rng.index;
+          }
+          std::copy(src, src + size, &m->values[k][iseg * size]);
+        }
+      }
+    }
+  }
+
+  PyObject* result = PyDict_New();
+  PyObject* pymechs = PyList_New(0);
+  bool ok = result && pymechs &&
+            PyDict_SetItemString(result, "point_processes", pps) == 0 &&
+            PyDict_SetItemString(result, "mechanisms", pymechs) == 0;
+#define DESC_ADD(name, v)                                                   \
+  ok = ok && morph_add(result, name, v.empty() ? NULL : &v[0],             \
+                       v.size() * sizeof(v[0]));
+  DESC_ADD("nseg", nseg)
+  DESC_ADD("L", length)
+  DESC_ADD("Ra", ra)
+  DESC_ADD("cm", cm)
+  DESC_ADD("diam", diam)
+#undef DESC_ADD
+  // [(name, present, [(varname, size, values), ...]), ...]
+  for (size_t i = 0; ok && i < order.size(); ++i) {
+    DescribeMech* m = mechs[order[i]];
+    PyObject* vars = PyList_New(0);
+    ok = vars != NULL;
+    for (size_t k = 0; ok && k < m->syms.size(); ++k) {
+      std::vector<double>& v = m->values[k];
+      PyObject* item = Py_BuildValue(
+          "(siN)", m->syms[k]->name, m->sizes[k],
+          PyByteArray_FromStringAndSize((const char*)&v[0],
+                                        v.size() * sizeof(double)));
+      ok = item && PyList_Append(vars, item) == 0;
+      Py_XDECREF(item);
+    }
+    PyObject* item = NULL;
+    if (ok) {
+      item = Py_BuildValue("(sNO)", memb_func[order[i]].sym->name,
+                           PyByteArray_FromStringAndSize(
+                               (const char*)&m->present[0], nsegtot),
+                           vars);
+      ok = item && PyList_Append(pymechs, item) == 0;
+    }
+    Py_XDECREF(item);
+    Py_XDECREF(vars);
+  }
+  describe_mechs_free(mechs, order);
+  Py_DECREF(pps);
+  Py_XDECREF(pymechs);
+  if (!ok) {
+    Py_XDECREF(result);
+    return NULL;
+  }
+  return result;
+}
+
+static IvocVect* pyvec_arg(PyObject* pyvec) {
+  Object* ho = nrnpy_po2ho(pyvec);
+  if (!ho || strcmp(ho->ctemplate->sym->name, "Vector") != 0) {
+    hoc_obj_unref(ho);
+    PyErr_SetString(PyExc_TypeError, "first argument must be a Vector");
+    return NULL;
+  }
+  IvocVect* vec = (IvocVect*) ho->u.this_pointer;
+  hoc_obj_unref(ho);
+  return vec;
+}
+
+// record_multi(vec, dt, pointers) or record_multi(vec, dt, name, sections[, x])
+// records the variables every dt into successive rows of vec.
+static PyObject* nrnpy_record_multi(PyObject* self, PyObject* args) {
+  PyObject* pyvec;
+  PyObject* signals;
+  PyObject* sections = Py_None;
+  PyObject* xloc = Py_None;
+  double dt;
+  if (!PyArg_ParseTuple(args, "OdO|OO", &pyvec, &dt, &signals, &sections,
+                        &xloc)) {
+    return NULL;
+  }
+  IvocVect* vec = pyvec_arg(pyvec);
+  if (!vec) {
+    return NULL;
+  }
+  if (!(dt > 0.)) {
+    PyErr_SetString(PyExc_ValueError, "dt must be positive");
+    return NULL;
+  }
+  std::vector<double*> pds;
+  Py2NRNString name(signals);
+  if (name.c_str()) {
+    int indx;
+    Symbol* sym = bulk_rangevar(name.c_str(), &indx);
+    std::vector<Section*> secs;
+    if (!sym || !bulk_sections(sections, secs)) {
+      return NULL;
+    }
+    std::vector<double> x;
+    if (xloc != Py_None) {
+      PyObject* seq = PySequence_Fast(xloc, "x must be a sequence");
+      if (!seq) {
+        return NULL;
+      }
+      for (Py_ssize_t i = 0; i < PySequence_Fast_GET_SIZE(seq); ++i) {
+        x.push_back(PyFloat_AsDouble(PySequence_Fast_GET_ITEM(seq, i)));
+      }
+      Py_DECREF(seq);
+      if (PyErr_Occurred()) {
+        return NULL;
+      }
+    }
+    for (size_t i = 0; i < secs.size(); ++i) {
+      Section* sec = secs[i];
+      int nseg = sec->nnode - 1;
+      int nloc = x.empty() ? nseg : x.size();
+      for (int j = 0; j < nloc; ++j) {
+        double xj = x.empty() ? (j + 0.5) / nseg : x[j];
+        int err;
+        double* d = nrnpy_rangepointer(sec, sym, xj, &err);
+        if (!d) {
+          rv_noexist(sec, name.c_str(), xj, err);
+          return NULL;
+        }
+        pds.push_back(d + indx);
+      }
+    }
+  } else {
+    PyErr_Clear();
+    PyObject* seq = PySequence_Fast(signals,
+                      "signals must be a range variable name or pointers");
+    if (!seq) {
+      return NULL;
+    }
+    for (Py_ssize_t i = 0; i < PySequence_Fast_GET_SIZE(seq); ++i) {
+      double* pd;
+      if (!nrn_is_hocobj_ptr(PySequence_Fast_GET_ITEM(seq, i), pd)) {
+        Py_DECREF(seq);
+        PyErr_Format(PyExc_TypeError, "item %ld is not a pointer", (long) i);
+        return NULL;
+      }
+      pds.push_back(pd);
+    }
+    Py_DECREF(seq);
+  }
+  if (pds.empty()) {
+    PyErr_SetString(PyExc_ValueError, "nothing to record");
+    return NULL;
+  }
+  nrn_vecsim_record_multi(vec, pds.size(), &pds[0], dt);
+  return PyInt_FromLong(pds.size());
+}
+
+static PyObject* nrnpy_record_stream(PyObject* self, PyObject* args) {
+  PyObject* pyvec;
+  char* fname;
+  char* labels = NULL;
+  int chunk;
+  if (!PyArg_ParseTuple(args, "Osi|s", &pyvec, &fname, &chunk, &labels)) {
+    return NULL;
+  }
+  IvocVect* vec = pyvec_arg(pyvec);
+  if (!vec) {
+    return NULL;
+  }
+  if (chunk < 1) {
+    PyErr_SetString(PyExc_ValueError, "chunk must be at least 1");
+    return NULL;
+  }
+  nrn_vecsim_record_stream(vec, fname, chunk, labels);
+  Py_RETURN_NONE;
+}
+
+static PyObject* nrnpy_record_flush(PyObject* self, PyObject* args) {
+  PyObject* pyvec;
+  if (!PyArg_ParseTuple(args, "O", &pyvec)) {
+    return NULL;
+  }
+  IvocVect* vec = pyvec_arg(pyvec);
+  if (!vec) {
+    return NULL;
+  }
+  nrn_vecsim_record_flush(vec);
+  Py_RETURN_NONE;
+}
+
+// A zero-copy view of the Memb_list data of the mechanism of a range
+// variable in one thread. With cvode.cache_efficient(1) the instances of a
+// mechanism in a thread are consecutive arrays of the same size, so the
+// whole block is exposed as one buffer along with the stride and offset of
+// the variable and a copy of the nodeindices of the instances. The buffer
+// keeps the pool of the data alive, so after a structure change it is
+// still valid memory but no longer the data of the model.
+static void NPyMembListBuffer_dealloc(NPyMembListBuffer* self) {
+  if (self->pool_) {
+    nrn_prop_data_release(self->pool_);
+  }
+  ((PyObject*)self)->ob_type->tp_free((PyObject*)self);
+}
+
+static int NPyMembListBuffer_getbuffer(PyObject* self, Py_buffer* view,
+                                       int flags) {
+  NPyMembListBuffer* b = (NPyMembListBuffer*)self;
+  return PyBuffer_FillInfo(view, self, b->data_, b->size_ * sizeof(double),
+                           0, flags);
+}
+
+static Symbol* memb_list_rangevar(const char* n, int* indx) {
+  const char* dot = strchr(n, '.');
+  if (dot) {
+    char buf[256];
+    if (dot - n >= (int)sizeof(buf)) {
+      PyErr_SetString(PyExc_ValueError, "range variable name too long");
+      return NULL;
+    }
+    strncpy(buf, n, dot - n);
+    buf[dot - n] = '\0';
+    Symbol* s = hoc_table_lookup(buf, hoc_built_in_symlist);
+    if (s && s->type == TEMPLATE && s->u.ctemplate->is_point_) {
+      // point process variables are in the template symbol table
+      strcpy(buf, dot + 1);
+      char* b = strchr(buf, '[');
+      *indx = 0;
+      if (b) {
+        *indx = atoi(b + 1);
+        *b = '\0';
+      }
+      Symbol* sym = hoc_table_lookup(buf, s->u.ctemplate->symtable);
+      if (!sym || sym->type != RANGEVAR) {
+        PyErr_Format(PyExc_AttributeError, "%s is not a range variable", n);
+        return NULL;
+      }
+      int size = ISARRAY(sym) ? sym->arayinfo->sub[0] : 1;
+      if (*indx < 0 || *indx >= size) {
+        PyErr_Format(PyExc_IndexError, "%s index out of range (%d)", n, size);
+        return NULL;
+      }
+      return sym;
+    }
+  }
+  return bulk_rangevar(n, indx);
+}
+
+static PyObject* nrnpy_memb_list_data(PyObject* self, PyObject* args) {
+  char* n;
+  int ith = 0;
+  int indx;
+  if (!PyArg_ParseTuple(args, "s|i", &n, &ith)) {
+    return NULL;
+  }
+  Symbol* sym = memb_list_rangevar(n, &indx);
+  if (!sym) {
+    return NULL;
+  }
+  int type = sym->u.rng.type;
+  if (type == VINDEX || type == IMEMFAST || type == MORPHOLOGY ||
+      type == EXTRACELL || memb_func[type].hoc_mech) {
+    PyErr_Format(PyExc_ValueError, "%s is not stored in a Memb_list", n);
+    return NULL;
+  }
+  if (ith < 0 || ith >= nrn_nthread) {
+    PyErr_SetString(PyExc_IndexError, "thread index out of range");
+    return NULL;
+  }
+  if (tree_changed || v_structure_change || diam_changed) {
+    v_setup_vectors();
+  }
+  Memb_list* ml = NULL;
+  for (NrnThreadMembList* tml = nrn_threads[ith].tml; tml; tml = tml->next) {
+    if (tml->index == type) {
+      ml = tml->ml;
+      break;
+    }
+  }
+  int cnt = ml ? ml->nodecount : 0;
+  int stride = nrn_prop_param_size_[type];
+  int offset = sym->u.rng.index + indx;
+  double* data = cnt ? ml->data[0] : NULL;
+  for (int i = 1; i < cnt; ++i) {
+    if (ml->data[i] != data + i * stride) {
+      PyErr_SetString(PyExc_RuntimeError,
+                      "mechanism data is not contiguous, "
+                      "use cvode.cache_efficient(1)");
+      return NULL;
+    }
+  }
+  static double empty;
+  NPyMembListBuffer* pdata = PyObject_New(NPyMembListBuffer,
+                                          memb_list_buffer_type);
+  if (!pdata) {
+    return NULL;
+  }
+  pdata->pool_ = cnt ? nrn_prop_data_export(type) : NULL;
+  pdata->data_ = data ? data : &empty;
+  pdata->size_ = Py_ssize_t(cnt) * stride;
+  PyObject* pindex = PyBytes_FromStringAndSize(
+      cnt ? (char*)ml->nodeindices : NULL, Py_ssize_t(cnt) * sizeof(int));
+  if (!pindex) {
+    Py_DECREF(pdata);
+    return NULL;
+  }
+  return Py_BuildValue("NNiiii", (PyObject*)pdata, pindex, cnt, stride, offset,
+                       structure_change_cnt);
+}
+
+// {'time': [per thread], 'count': [per thread]} of item i of the
+// nrn_prof_data arrays
+static PyObject* profile_item(std::vector<double*>& time,
+                              std::vector<long*>& count, int i) {
+  size_t n = time.size();
+  PyObject* t = PyList_New(n);
+  PyObject* c = PyList_New(n);
+  if (!t || !c) {
+    Py_XDECREF(t);
+    Py_XDECREF(c);
+    return NULL;
+  }
+  for (size_t it = 0; it < n; ++it) {
+    PyList_SET_ITEM(t, it, PyFloat_FromDouble(time[it][i]));
+    PyList_SET_ITEM(c, it, PyInt_FromLong(count[it][i]));
+  }
+  return Py_BuildValue("{sNsN}", "time", t, "count", c);
+}
+
+// profile() returns the times and counts of each thread since pc.profile(1)
+// as a dict of phases and a dict of mechanisms with the cur, jacob and
+// state functions that were called, see neuron.profile_report.
+static PyObject* nrnpy_profile(PyObject* self, PyObject* args) {
+  static const char* funs[NRN_PROF_NFUN] = {"cur", "jacob", "state"};
+  std::vector<double*> time;
+  std::vector<long*> count;
+  int nmech = 0;
+  double* t;
+  long* c;
+  while (int(time.size()) < nrn_prof_data(time.size(), &t, &c, &nmech)) {
+    time.push_back(t);
+    count.push_back(c);
+  }
+  PyObject* result = NULL;
+  PyObject* phases = PyDict_New();
+  PyObject* mechs = PyDict_New();
+  if (!phases || !mechs) {
+    goto done;
+  }
+  for (int i = 0; i < NRN_PROF_NPHASE; ++i) {
+    PyObject* item = profile_item(time, count, i);
+    if (!item || PyDict_SetItemString(phases, nrn_prof_name(i), item) != 0) {
+      Py_XDECREF(item);
+      goto done;
+    }
+    Py_DECREF(item);
+  }
+  for (int type = 0; type < nmech; ++type) {
+    PyObject* funcs = NULL;
+    for (int j = 0; j < NRN_PROF_NFUN; ++j) {
+      int i = NRN_PROF_NPHASE + NRN_PROF_NFUN * type + j;
+      size_t it;
+      for (it = 0; it < time.size() && count[it][i] == 0; ++it) {
+      }
+      if (it == time.size()) {
+        continue;
+      }
+      if (!funcs) {
+        funcs = PyDict_New();
+        if (!funcs ||
+            PyDict_SetItemString(mechs, memb_func[type].sym->name, funcs) != 0) {
+          Py_XDECREF(funcs);
+          goto done;
+        }
+        Py_DECREF(funcs);
+      }
+      PyObject* item = profile_item(time, count, i);
+      if (!item || PyDict_SetItemString(funcs, funs[j], item) != 0) {
+        Py_XDECREF(item);
+        goto done;
+      }
+      Py_DECREF(item);
+    }
+  }
+  result = Py_BuildValue("{sisisOsO}", "nthread", int(time.size()), "mode",
+                         nrn_prof_, "phases", phases, "mechanisms", mechs);
+done:
+  Py_XDECREF(phases);
+  Py_XDECREF(mechs);
+  for (size_t it = 0; it < time.size(); ++it) {
+    free(time[it]);
+    free(count[it]);
+  }
+  return result;
+}
+
 static PyMethodDef nrnpy_methods[] = {
     {"cas", nrnpy_cas, METH_VARARGS, "Return the currently accessed section."},
     {"allsec", nrnpy_forall, METH_VARARGS,
      "Return iterator over all sections."},
     {"set_psection", nrnpy_set_psection, METH_VARARGS,
      "Specify the nrn.Section.psection callback."},
+    {"gather", nrnpy_gather, METH_VARARGS,
+     "gather(name, sections[, x]) returns a bytearray of the float64 values "
+     "of the range variable at each segment (or at each x) of the sections."},
+    {"scatter", nrnpy_scatter, METH_VARARGS,
+     "scatter(name, sections, values[, x]) assigns the range variable from "
+     "a float64 buffer in the order returned by gather."},
+    {"morphology", nrnpy_morphology, METH_VARARGS,
+     "morphology([sections]) returns a dict of bytearrays with the geometry "
+     "of the sections (default all), see neuron.morphology."},
+    {"model_description", nrnpy_model_description, METH_VARARGS,
+     "model_description([sections]) returns a dict with the mechanisms, "
+     "their values and the point processes of the sections (default all), "
+     "see neuron.psection.model_description."},
+    {"record_multi", nrnpy_record_multi, METH_VARARGS,
+     "record_multi(vec, dt, pointers) or record_multi(vec, dt, name, "
+     "sections[, x]) records the variables every dt into successive rows of "
+     "vec and returns the number of variables (columns)."},
+    {"record_stream", nrnpy_record_stream, METH_VARARGS,
+     "record_stream(vec, fname, chunk[, labels]) writes the rows of the "
+     "record_multi(vec, ...) recording to fname, chunk rows at a time."},
+    {"record_flush", nrnpy_record_flush, METH_VARARGS,
+     "record_flush(vec) waits until the streamed rows are on disk."},
+    {"memb_list_data", nrnpy_memb_list_data, METH_VARARGS,
+     "memb_list_data(name[, ithread]) returns (data, nodeindices, count, "
+     "stride, offset, structure_change_cnt) where data and nodeindices are "
+     "writable float64 and read only int32 buffers over the Memb_list of "
+     "the mechanism of the range variable."},
+    {"profile", nrnpy_profile, METH_NOARGS,
+     "profile() returns the per thread times and counts of the step phases "
+     "and mechanism functions collected since pc.profile(1), see "
+     "neuron.profile_report."},
     {NULL}};
 
 #if PY_MAJOR_VERSION >= 3
@@ -2256,6 +3187,18 @@ myPyMODINIT_FUNC nrnpy_nrn(void) {
   if (PyType_Ready(range_type) < 0) goto fail;
   Py_INCREF(range_type);
 
+#if PY_MAJOR_VERSION >= 3
+  memb_list_buffer_type = (PyTypeObject*)PyType_FromSpec(&nrnpy_MembListBufferType_spec);
+#if PY_VERSION_HEX < 0x03090000
+  // the buffer slots cannot be given in a PyType_Spec before 3.9
+  memb_list_buffer_type->tp_as_buffer->bf_getbuffer = NPyMembListBuffer_getbuffer;
+#endif
+#else
+  memb_list_buffer_type = &nrnpy_MembListBufferType;
+#endif
+  if (PyType_Ready(memb_list_buffer_type) < 0) goto fail;
+  Py_INCREF(memb_list_buffer_type);
+
 #if PY_MAJOR_VERSION >= 3
   m = PyModule_Create(
       &nrnsectionmodule);  // like nrn but namespace will not include mechanims.
@@ -176,6 +176,39 @@ static PyTypeObject nrnpy_RangeType = {
     NPyRangeVar_new,                          /* tp_new */
 };
 
+static PyBufferProcs memb_list_buffer_as_buffer = {
+    0,                           /* bf_getreadbuffer */
+    0,                           /* bf_getwritebuffer */
+    0,                           /* bf_getsegcount */
+    0,                           /* bf_getcharbuffer */
+    NPyMembListBuffer_getbuffer, /* bf_getbuffer */
+    0,                           /* bf_releasebuffer */
+};
+
+static PyTypeObject nrnpy_MembListBufferType = {
+    PyObject_HEAD_INIT(NULL)0,                /*ob_size*/
+    ccast "nrn.MembListBuffer",               /*tp_name*/
+    sizeof(NPyMembListBuffer),                /*tp_basicsize*/
+    0,                                        /*tp_itemsize*/
+    (destructor)NPyMembListBuffer_dealloc,    /*tp_dealloc*/
+    0,                                        /*tp_print*/
+    0,                                        /*tp_getattr*/
+    0,                                        /*tp_setattr*/
+    0,                                        /*tp_compare*/
+    0,                                        /*tp_repr*/
+    0,                                        /*tp_as_number*/
+    0,                                        /*tp_as_sequence*/
+    0,                                        /*tp_as_mapping*/
+    0,                                        /*tp_hash */
+    0,                                        /*tp_call*/
+    0,                                        /*tp_str*/
+    0,                                        /*tp_getattro*/
+    0,                                        /*tp_setattro*/
+    &memb_list_buffer_as_buffer,              /*tp_as_buffer*/
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_NEWBUFFER, /*tp_flags*/
+    "Memb_list data of neuron.MembListData",  /* tp_doc */
+};
+
 static PyTypeObject nrnpy_MechanismType = {
     PyObject_HEAD_INIT(NULL)0,                /*ob_size*/
     ccast "nrn.Mechanism",                    /*tp_name*/
@@ -147,6 +147,22 @@ static PyType_Spec nrnpy_RangeType_spec = {
     nrnpy_RangeType_slots,
 };
 
+static PyType_Slot nrnpy_MembListBufferType_slots[] = {
+    {Py_tp_dealloc, (void*)NPyMembListBuffer_dealloc},
+#if PY_VERSION_HEX >= 0x03090000
+    {Py_bf_getbuffer, (void*)NPyMembListBuffer_getbuffer},
+#endif
+    {Py_tp_doc, (void*)"Memb_list data of neuron.MembListData"},
+    {0, 0},
+};
+static PyType_Spec nrnpy_MembListBufferType_spec = {
+    "nrn.MembListBuffer",
+    sizeof(NPyMembListBuffer),
+    0,
+    Py_TPFLAGS_DEFAULT,
+    nrnpy_MembListBufferType_slots,
+};
+
 static struct PyModuleDef nrnmodule = {PyModuleDef_HEAD_INIT, "nrn",
                                        "NEURON interaction with Python", -1,
                                        nrnpy_methods, NULL, NULL, NULL, NULL};
@@ -45,6 +45,8 @@ extern Object* (*nrnpy_pickle2po)(char*, size_t size);
 extern char* (*nrnpy_callpicklef)(char*, size_t size, int narg,
                                   size_t* retsize);
 extern int (*nrnpy_pysame)(Object*, Object*);  // contain same Python object
+extern double* (*nrnpy_rxd_save_state)(int* size);
+extern int (*nrnpy_rxd_restore_state)(double* data, int size);
 extern Object* (*nrnpympi_alltoall_type)(int, int);
 typedef struct {
   PyObject_HEAD Section* sec_;
@@ -75,6 +77,8 @@ static Object* pickle2po(char*, size_t size);
 static char* call_picklef(char*, size_t size, int narg, size_t* retsize);
 static Object* py_alltoall_type(int, int);
 static int pysame(Object*, Object*);
+static double* rxd_save_state(int* size);
+static int rxd_restore_state(double* data, int size);
 static PyObject* main_module;
 static PyObject* main_namespace;
 static hoc_List* dlist;
@@ -136,6 +140,8 @@ void nrnpython_reg_real() {
   nrnpy_callpicklef = call_picklef;
   nrnpympi_alltoall_type = py_alltoall_type;
   nrnpy_pysame = pysame;
+  nrnpy_rxd_save_state = rxd_save_state;
+  nrnpy_rxd_restore_state = rxd_restore_state;
   nrnpy_save_thread = save_thread;
   nrnpy_restore_thread = restore_thread;
   dlist = hoc_l_newlist();
@@ -1072,3 +1078,60 @@ Object* py_alltoall_type(int size, int type) {
   return NULL;
 #endif
 }
+
+// The rxd states for SaveState and BBSaveState. Nothing is saved unless
+// the rxd implementation, neuron.rxd.rxd, has been loaded (importing
+// neuron.rxd alone does not load it) and the model has rxd states.
+static PyObject* rxd_module() {
+  PyObject* modules = PyImport_GetModuleDict();
+  return PyDict_GetItemString(modules, "neuron.rxd.rxd");  // borrowed
+}
+
+static double* rxd_save_state(int* size) {
+  PyLockGIL lock;
+
+  *size = 0;
+  PyObject* rxd = rxd_module();
+  if (!rxd) {
+    return NULL;
+  }
+  PyObject* r = PyObject_CallMethod(rxd, (char*)"save_state", NULL);
+  if (!r || !PyBytes_Check(r)) {
+    Py_XDECREF(r);
+    PyErr_Print();
+    lock.release();
+    hoc_execerror("rxd.save_state failed", 0);
+  }
+  // the header is magic, version, stochastic step, number of node fluxes
+  // and number of records, each record is its size followed by the states.
+  // A model with no states and no node fluxes has nothing to save.
+  int n = int(PyBytes_Size(r) / sizeof(double));
+  double* blob = (double*)PyBytes_AsString(r);
+  if (n < 5 || (blob[3] == 0. && n == 5 + int(blob[4]))) {
+    Py_DECREF(r);
+    return NULL;
+  }
+  *size = n;
+  double* data = new double[n];
+  memcpy(data, blob, n * sizeof(double));
+  Py_DECREF(r);
+  return data;
+}
+
+static int rxd_restore_state(double* data, int size) {
+  PyLockGIL lock;
+
+  PyObject* rxd = rxd_module();
+  if (!rxd) {
+    return -1;
+  }
+  PyObject* state = PyBytes_FromStringAndSize((char*)data, size * sizeof(double));
+  PyObject* r = PyObject_CallMethod(rxd, (char*)"restore_state", (char*)"O", state);
+  Py_XDECREF(state);
+  if (!r) {
+    PyErr_Print();
+    return -1;
+  }
+  Py_DECREF(r);
+  return 0;
+}
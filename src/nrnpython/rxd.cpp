@@ -18,6 +18,8 @@ static void ode_solve(double, double, double*, double*);
 extern PyTypeObject* hocobject_type;
 extern int structure_change_cnt;
 extern int states_cvode_offset;
+extern int tree_changed;
+extern int v_structure_change;
 int prev_structure_change_cnt = 0;
 unsigned char initialized = 0;
 
@@ -872,6 +874,7 @@ extern "C" int rxd_nonvint_block(int method, int size, double* p1, double* p2, i
             /* fixed step solve */
 			_fadvance();
             _fadvance_fixed_step_3D();
+            _rxd_stochastic_step++;
             break;
         case 5:
             /* ode_count */
@@ -1025,6 +1028,7 @@ extern "C" void register_rate(int nspecies, int nparam, int nregions, int nseg,
     Grid_node* grid;
     ICSReactions* react = (ICSReactions*)malloc(sizeof(ICSReactions));
     react->reaction = f;
+    react->stochastic = NULL;
     react->num_species = nspecies;
     react->num_regions = nregions;
     react->num_params = nparam;
@@ -1165,6 +1169,7 @@ extern "C" void clear_rates()
 
         free(react->state_idx);
         SAFE_FREE(react->ecs_state);
+        free_stochastic_channels(react->stochastic);
         prev = react;
         react = react->next;
         free(prev);
@@ -1252,13 +1257,17 @@ extern "C" void setup_solver(double* my_states, int my_num_states, long* zvi, in
     set_num_threads(NUM_THREADS);
 }
 
+static void fork_prepare(void);
+static void fork_restart(void);
+
 void start_threads(const int n)
 {
     int i;
     if(Threads == NULL)
     {
+        pthread_atfork(fork_prepare, fork_restart, fork_restart);
         AllTasks = (TaskQueue*)calloc(1,sizeof(TaskQueue));
-        Threads = (pthread_t*)malloc(sizeof(pthread_t)*(n-1));
+        Threads = (pthread_t*)malloc(sizeof(pthread_t)*(n > 1 ? n - 1 : 1));
         AllTasks->task_mutex = (pthread_mutex_t*)malloc(sizeof(pthread_mutex_t));
         AllTasks->waiting_mutex = (pthread_mutex_t*)malloc(sizeof(pthread_mutex_t));
         AllTasks->task_cond = (pthread_cond_t*)malloc(sizeof(pthread_cond_t));
@@ -1320,7 +1329,7 @@ void* TaskQueue_exe_tasks(void* dat)
     }
     fprintf(stderr,"%i] ready\n",id);
     */
-    while(1)    //loop until thread is killed
+    while(1)    //loop until the thread is asked to exit
     {
         pthread_mutex_lock(q->task_mutex);
         while(q->first == NULL) //no tasks
@@ -1333,6 +1342,19 @@ void* TaskQueue_exe_tasks(void* dat)
         q->first = job->next;
         pthread_mutex_unlock(q->task_mutex); 
     
+        //a task without a function asks the thread to exit
+        if(job->task == NULL)
+        {
+            free(job);
+            pthread_mutex_lock(q->waiting_mutex);
+            if(--(q->length) == 0)
+            {
+                pthread_cond_broadcast(q->waiting_cond);
+            }
+            pthread_mutex_unlock(q->waiting_mutex);
+            return NULL;
+        }
+
         //execute
         job->result = job->task(job->args);
         free(job);
@@ -1351,6 +1373,44 @@ void* TaskQueue_exe_tasks(void* dat)
 }
 
 
+/*Stop all the worker threads. Each thread takes one exit task from the
+ *queue, after any outstanding work, and is then joined. A thread must
+ *not be cancelled as it may hold the task_mutex.
+ */
+static void stop_threads(void)
+{
+    int k;
+    for(k = 0; k < NUM_THREADS - 1; k++)
+    {
+        TaskQueue_add_task(AllTasks, NULL, NULL, NULL);
+    }
+    for(k = 0; k < NUM_THREADS - 1; k++)
+    {
+        pthread_join(Threads[k], NULL);
+    }
+}
+
+/*The worker threads do not exist in a forked child, e.g. a
+ *ParallelContext worker process. They are stopped before a fork and
+ *started again in the parent and in the child.
+ */
+static void fork_prepare(void)
+{
+    stop_threads();
+}
+
+static void fork_restart(void)
+{
+    int k;
+    for(k = 0; k < NUM_THREADS - 1; k++)
+    {
+        pthread_create(&Threads[k], NULL, TaskQueue_exe_tasks, AllTasks);
+    }
+}
+
+/*The worker threads are Threads[0] to Threads[NUM_THREADS-2], the main
+ *thread is the remaining one.
+ */
 void set_num_threads(const int n)
 {
     int k, old_num = NUM_THREADS;
@@ -1362,22 +1422,21 @@ void set_num_threads(const int n)
     {
         if(n<old_num)
         {
-            //Kill some threads
-            for(k=old_num-1; k>=n; k--)
+            //Stop the threads and start the ones still needed, the exiting
+            //threads cannot be chosen
+            stop_threads();
+            for(k = 0; k < n - 1; k++)
             {
-                TaskQueue_sync(AllTasks);
-                pthread_cancel(Threads[k]);
-            } 
-            Threads = (pthread_t*)realloc(Threads,sizeof(pthread_t) * n);
-            assert(Threads);
+                pthread_create(&Threads[k], NULL, TaskQueue_exe_tasks, AllTasks);
+            }
         }
         else if(n>old_num)
         {
             //Create some threads
-            Threads = (pthread_t*)realloc(Threads,sizeof(pthread_t) * n);
+            Threads = (pthread_t*)realloc(Threads,sizeof(pthread_t) * (n - 1));
             assert(Threads);
             
-            for (k = old_num-1; k < n; k++) 
+            for (k = old_num - 1; k < n - 1; k++) 
             {
                 pthread_create(&Threads[k], NULL, TaskQueue_exe_tasks, AllTasks);
             }
@@ -1576,7 +1635,10 @@ void _fadvance(void) {
     free(rhs);
 
     /*reactions*/
-    do_ics_reactions(states, NULL, NULL, NULL);
+    if(_rxd_reaction_method == RXD_STOCHASTIC)
+        do_stochastic_reactions(states, dt);
+    else
+        do_ics_reactions(states, NULL, NULL, NULL);
 
     /*node fluxes*/
     apply_node_flux1D(dt, states);
@@ -2223,6 +2285,86 @@ void get_all_reaction_rates(double* states, double* rates, double* ydot)
 *
 *****************************************************************************/
 
+/*
+Resolve the NEURON ion pointers for the segments of every section, in
+section_list order (the same order as h.allsec() and the segments of each
+section). Only the segments whose grid index is non-negative are resolved.
 
+The data is located by walking the ion's memb list in each NrnThread
+rather than by passing a _ref_ pointer object per segment from Python.
 
+Returns the number of requested segments that could not be resolved (e.g.
+the ion is not present in that section) or -1 if the number of segments
+does not match num_locations.
+*/
+int resolve_ion_pointers(int64_t num_locations, int64_t* grid_indices, int ion_type, int field, double** ptrs) {
+    NrnThread* nt;
+    NrnThreadMembList* tml;
+    Memb_list* ml;
+    Memb_list** ml_by_thread;
+    hoc_Item* qsec;
+    Node* nd;
+    int** row_by_node;
+    int64_t i = 0, n = 0;
+    int j, row, unresolved = 0;
+
+    if (tree_changed) {
+        setup_topology();
+    }
+    if (v_structure_change) {
+        v_setup_vectors();
+    }
+
+    /* for each thread, map node index to the row of the ion's memb list */
+    row_by_node = (int**)calloc(nrn_nthread, sizeof(int*));
+    ml_by_thread = (Memb_list**)calloc(nrn_nthread, sizeof(Memb_list*));
+    FOR_THREADS(nt) {
+        for (tml = nt->tml; tml; tml = tml->next) {
+            if (tml->index == ion_type) {
+                ml = ml_by_thread[nt->id] = tml->ml;
+                row_by_node[nt->id] = (int*)malloc(nt->end * sizeof(int));
+                for (j = 0; j < nt->end; j++) {
+                    row_by_node[nt->id][j] = -1;
+                }
+                for (j = 0; j < ml->nodecount; j++) {
+                    row_by_node[nt->id][ml->nodeindices[j]] = j;
+                }
+                break;
+            }
+        }
+    }
 
+    ForAllSections(sec)
+        for (j = 0; j < sec->nnode - 1; j++, i++) {
+            if (i >= num_locations) {
+                unresolved = -1;
+                goto done;
+            }
+            if (grid_indices[i] < 0) {
+                continue;
+            }
+            nd = sec->pnode[j];
+            row = -1;
+            if (nd->_nt && row_by_node[nd->_nt->id]) {
+                row = row_by_node[nd->_nt->id][nd->v_node_index];
+            }
+            if (row < 0) {
+                ptrs[n++] = NULL;
+                unresolved++;
+            } else {
+                ptrs[n++] = ml_by_thread[nd->_nt->id]->data[row] + field;
+            }
+        }
+    }
+    if (i != num_locations) {
+        unresolved = -1;
+    }
+
+done:
+    for (j = 0; j < nrn_nthread; j++) {
+        free(row_by_node[j]);
+    }
+    free(row_by_node);
+    free(ml_by_thread);
+    return unresolved;
+}
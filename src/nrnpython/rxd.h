@@ -6,6 +6,12 @@ extern "C"{
 #define	v_get_val(x,i)		((x)->ve[(i)])
 #define	m_get_val(A,i,j)	((A)->me[(i)][(j)])
 #define SPECIES_ABSENT      -1
+/*linear solvers for 3D variable step*/
+#define RXD_3D_ADI          0
+#define RXD_3D_KRYLOV       1
+/*methods for the reactions with a fixed step*/
+#define RXD_DETERMINISTIC   0
+#define RXD_STOCHASTIC      1
 #define PREFETCH 4
 
 typedef void (*fptr)(void);
@@ -49,6 +55,13 @@ typedef struct {
     double* val;
 } CurrentData;
 
+typedef struct GridPartitionData {
+    Grid_node* g;
+    int onset, offset;
+    double* output;
+    double dt;
+} GridPartitionData;
+
 
 typedef struct SpeciesIndexList {
     int id;
@@ -80,6 +93,7 @@ typedef struct ICSReactions {
     double **mc_multiplier;
     int* mc_flux_idx;
     double** vptrs;
+    StochasticChannels* stochastic;
     struct ICSReactions* next;
 } ICSReactions;
 
@@ -163,6 +177,7 @@ void _ics_rhs_variable_step_helper(ICS_Grid_node*, double const* const, double*)
 void _rhs_variable_step_helper(Grid_node*, double const * const, double*);
 
 void ics_ode_solve(double, double*, const double*);
+void ecs_variable_step_preconditioner(ECS_Grid_node*, double*, double);
 void ics_ode_solve_helper(ICS_Grid_node*, double, const double*, double*);
 
 void _rhs_variable_step_helper_tort(Grid_node*, double const * const, double*);
@@ -177,6 +192,12 @@ void _rhs_variable_step_ecs(const double, const double*, double*, const int);
 void clear_rates_ecs();
 void do_ics_reactions(double*, double*, double*, double*);
 void get_all_reaction_rates(double*, double*, double*);
+/*stochastic reactions*/
+extern int _rxd_reaction_method;
+extern uint32_t _rxd_stochastic_step;
+void do_stochastic_reactions(double*, double);
+void do_stochastic_reactions_3d(double);
+void free_stochastic_channels(StochasticChannels*);
 void _ecs_ode_reinit(double*); 
 void do_currents(Grid_node*, double*, double, int);
 void TaskQueue_add_task(TaskQueue*, void* (*task)(void* args), void*, void*);
@@ -185,4 +206,5 @@ void start_threads(const int);
 void TaskQueue_sync(TaskQueue*);
 void ecs_atolscale(double*);
 void apply_node_flux3D(Grid_node*, double, double*);
+int resolve_ion_pointers(int64_t, int64_t*, int, int, double**);
 
@@ -39,6 +39,18 @@ extern double* _rxd_induced_currents_scale;
 
 int states_cvode_offset;
 
+/*3D variable step linear solver*/
+int _rxd_3d_linear_solver = RXD_3D_ADI;
+int _rxd_krylov_maxl = 5;
+int _rxd_krylov_maxiter = 20;
+double _rxd_krylov_tol = 0.05;
+
+/*3D variable step statistics*/
+static long _rxd_3d_rhs_count = 0;
+static long _rxd_3d_solve_count = 0;
+static long _rxd_3d_lin_iter_count = 0;
+static long _rxd_3d_precond_count = 0;
+
 /*Update the global array of reaction tasks when the number of reactions 
  *or threads change.
  *n - the old number of threads - use to free the old threaded_reactions_tasks*/
@@ -79,6 +91,7 @@ void clear_rates_ecs(void)
 	for (r = ecs_reactions; r != NULL; r = tmp)
 	{
 		SAFE_FREE(r->species_states);
+		free_stochastic_channels(r->stochastic);
 		if(r->subregion)
 		{
 			SAFE_FREE(r->subregion);
@@ -111,6 +124,7 @@ Reaction* ecs_create_reaction(int list_idx, int num_species, int num_params,
 	r = (Reaction*)malloc(sizeof(Reaction));
 	assert(r);
 	r->reaction = f;
+	r->stochastic = NULL;
 	/*place reaction on the top of the stack of reactions*/
 	r->next = ecs_reactions;
 	ecs_reactions = r;
@@ -120,6 +134,7 @@ Reaction* ecs_create_reaction(int list_idx, int num_species, int num_params,
 		/* Assume all species have the same grid */ 
 		if(i==species_ids[0])
 		{
+            r->grid = grid;
             if (mc3d_region_size > 0)
             {
                 r->subregion = NULL;
@@ -644,7 +659,9 @@ void _fadvance_fixed_step_3D(void) {
     /*Maybe TODO: Should check #currents << #voxels and not the other way round*/
     int id;
 
-	if(threaded_reactions_tasks != NULL)
+	if(_rxd_reaction_method == RXD_STOCHASTIC)
+	    do_stochastic_reactions_3d(dt);
+	else if(threaded_reactions_tasks != NULL)
 	    run_threaded_reactions(threaded_reactions_tasks);
 
     for (id = 0, grid = Parallel_grids[0]; grid != NULL; grid = grid -> next, id++) {
@@ -754,6 +771,7 @@ void _rhs_variable_step_ecs(const double t, const double* states, double* ydot,
     if (!calculate_rhs) {
         return;
     }
+    _rxd_3d_rhs_count++;
 	
 	states = orig_states;
 	ydot = orig_ydot;
@@ -950,12 +968,180 @@ void _rhs_variable_step_helper(Grid_node* g, double const * const states, double
     */
 }
 
+/* apply the ADI approximation of (I - dt*J)^-1 to every 3D grid in place */
+static void rxd3d_precondition(double dt, double* RHS)
+{
+    Grid_node *grid;
+    int grid_size;
+
+    for (grid = Parallel_grids[0]; grid != NULL; grid = grid -> next) {
+        grid_size = grid->size_x * grid->size_y * grid->size_z;
+        grid->variable_step_preconditioner(RHS, dt);
+        RHS += grid_size;
+    }
+    _rxd_3d_precond_count++;
+}
+
+/* matrix-free product result = (I - dt*J)*x where J is the diffusion
+ * Jacobian, evaluated with the same helpers used for the RHS.
+ * scratch - array of the same length as x used to accumulate J*x
+ */
+static void rxd3d_jacobian_times(double dt, const double* x, double* result,
+                                 double* scratch, const long n)
+{
+    Grid_node *grid;
+    int grid_size;
+    long i;
+    double* jx = scratch;
+
+    MEM_ZERO(scratch, sizeof(double)*n);
+    for (grid = Parallel_grids[0]; grid != NULL; grid = grid -> next) {
+        grid_size = grid->size_x * grid->size_y * grid->size_z;
+        grid->variable_step_diffusion(x, jx);
+        x += grid_size;
+        jx += grid_size;
+    }
+    x -= n;
+    for (i = 0; i < n; i++)
+        result[i] = x[i] - dt * scratch[i];
+}
+
+static double rxd3d_dot(const double* a, const double* b, const long n)
+{
+    long i;
+    double sum = 0;
+    for (i = 0; i < n; i++)
+        sum += a[i] * b[i];
+    return sum;
+}
+
+/* rxd3d_gmres solves (I - dt*J)x = b with restarted GMRES, using the ADI
+ * pass as a right preconditioner and a matrix-free Jacobian product.
+ * b    -   right hand side, overwritten with the solution
+ * n    -   number of 3D states
+ */
+static void rxd3d_gmres(double dt, double* b, const long n)
+{
+    const int m = _rxd_krylov_maxl;
+    int i, j, k, iter = 0;
+    long l;
+    double beta, target, resid, tmp, nrm;
+    double* V = (double*)malloc(sizeof(double) * n * (m + 1));
+    double* H = (double*)calloc((m + 1) * m, sizeof(double));
+    double* cs = (double*)malloc(sizeof(double) * m);
+    double* sn = (double*)malloc(sizeof(double) * m);
+    double* g = (double*)malloc(sizeof(double) * (m + 1));
+    double* y = (double*)malloc(sizeof(double) * m);
+    double* x = (double*)calloc(n, sizeof(double));
+    double* w = (double*)malloc(sizeof(double) * n);
+    double* scratch = (double*)malloc(sizeof(double) * n);
+
+    /* initial guess x = 0 so the residual is b */
+    memcpy(V, b, sizeof(double) * n);
+    beta = sqrt(rxd3d_dot(V, V, n));
+    target = _rxd_krylov_tol * beta;
+    while (beta > 0)
+    {
+        for (l = 0; l < n; l++)
+            V[l] /= beta;
+        g[0] = beta;
+        for (j = 1; j <= m; j++)
+            g[j] = 0;
+        resid = beta;
+
+        for (j = 0; j < m && iter < _rxd_krylov_maxiter; j++, iter++)
+        {
+            /* w = A P^-1 v_j */
+            memcpy(scratch, &V[j * n], sizeof(double) * n);
+            rxd3d_precondition(dt, scratch);
+            memcpy(w, scratch, sizeof(double) * n);
+            rxd3d_jacobian_times(dt, w, w, scratch, n);
+
+            /* modified Gram-Schmidt */
+            for (i = 0; i <= j; i++)
+            {
+                H[i * m + j] = tmp = rxd3d_dot(w, &V[i * n], n);
+                for (l = 0; l < n; l++)
+                    w[l] -= tmp * V[i * n + l];
+            }
+            H[(j + 1) * m + j] = nrm = sqrt(rxd3d_dot(w, w, n));
+            if (nrm > 0)
+            {
+                for (l = 0; l < n; l++)
+                    V[(j + 1) * n + l] = w[l] / nrm;
+            }
+
+            /* apply the previous Givens rotations to the new column */
+            for (i = 0; i < j; i++)
+            {
+                tmp = cs[i] * H[i * m + j] + sn[i] * H[(i + 1) * m + j];
+                H[(i + 1) * m + j] = -sn[i] * H[i * m + j] + cs[i] * H[(i + 1) * m + j];
+                H[i * m + j] = tmp;
+            }
+            tmp = sqrt(SQ(H[j * m + j]) + SQ(H[(j + 1) * m + j]));
+            cs[j] = H[j * m + j] / tmp;
+            sn[j] = H[(j + 1) * m + j] / tmp;
+            H[j * m + j] = tmp;
+            H[(j + 1) * m + j] = 0;
+            g[j + 1] = -sn[j] * g[j];
+            g[j] = cs[j] * g[j];
+            resid = fabs(g[j + 1]);
+            _rxd_3d_lin_iter_count++;
+            if (resid <= target || nrm == 0)
+            {
+                j++;
+                iter++;
+                break;
+            }
+        }
+
+        /* back substitution for y then update x += P^-1 V y */
+        for (i = j - 1; i >= 0; i--)
+        {
+            y[i] = g[i];
+            for (k = i + 1; k < j; k++)
+                y[i] -= H[i * m + k] * y[k];
+            y[i] /= H[i * m + i];
+        }
+        MEM_ZERO(w, sizeof(double) * n);
+        for (i = 0; i < j; i++)
+            for (l = 0; l < n; l++)
+                w[l] += y[i] * V[i * n + l];
+        rxd3d_precondition(dt, w);
+        for (l = 0; l < n; l++)
+            x[l] += w[l];
+
+        if (resid <= target || iter >= _rxd_krylov_maxiter)
+            break;
+
+        /* restart with the true residual r = b - A x */
+        rxd3d_jacobian_times(dt, x, V, scratch, n);
+        for (l = 0; l < n; l++)
+            V[l] = b[l] - V[l];
+        beta = sqrt(rxd3d_dot(V, V, n));
+        if (beta <= target)
+            break;
+    }
+    memcpy(b, x, sizeof(double) * n);
+
+    free(V);
+    free(H);
+    free(cs);
+    free(sn);
+    free(g);
+    free(y);
+    free(x);
+    free(w);
+    free(scratch);
+}
+
 //p1 = b  p2 = states 
 void ics_ode_solve(double dt,  double* RHS, const double* states) 
 {
 	Grid_node *grid;
     ssize_t i;
     int grid_size;
+    long n = 0;
     double* grid_states;
     double const * const orig_states = states + states_cvode_offset;
     const unsigned char calculate_rhs = RHS == NULL ? 0 : 1;
@@ -973,12 +1159,14 @@ void ics_ode_solve(double dt,  double* RHS, const double* states)
             grid_states[i] = states[i];
         }
         states += grid_size;
+        n += grid_size;
     }
     /* transfer concentrations to classic NEURON states */
     scatter_concentrations();
     if (!calculate_rhs) {
         return;
     }
+    _rxd_3d_solve_count++;
 	
 	states = orig_states;
 	RHS = orig_RHS;
@@ -987,12 +1175,59 @@ void ics_ode_solve(double dt,  double* RHS, const double* states)
 	if(threaded_reactions_tasks != NULL){
 	    run_threaded_reactions(threaded_reactions_tasks);
     }
+
+    if(_rxd_3d_linear_solver == RXD_3D_KRYLOV)
+    {
+        if(n > 0)
+            rxd3d_gmres(dt, RHS, n);
+        return;
+    }
+
     /* do the diffusion rates */
     for (grid = Parallel_grids[0]; grid != NULL; grid = grid -> next) {
+        grid_size = grid->size_x * grid->size_y * grid->size_z;
         grid->variable_step_ode_solve(states, RHS, dt);
         RHS += grid_size;
         states += grid_size;        
     }
+    _rxd_3d_lin_iter_count++;
+}
+
+/* rxd_set_3d_linear_solver selects how CVode's linear systems are solved for
+ * the 3D species.
+ * method   -   RXD_3D_ADI a single ADI pass (the default) or
+ *              RXD_3D_KRYLOV ADI preconditioned GMRES
+ * maxl     -   maximum dimension of the Krylov subspace before a restart
+ * maxiter  -   maximum number of Krylov iterations per solve
+ * tol      -   relative residual at which the Krylov iteration stops
+ */
+extern "C" void rxd_set_3d_linear_solver(int method, int maxl, int maxiter, double tol)
+{
+    _rxd_3d_linear_solver = method;
+    _rxd_krylov_maxl = MAX(maxl, 1);
+    _rxd_krylov_maxiter = MAX(maxiter, 1);
+    _rxd_krylov_tol = tol;
+}
+
+/* rxd_3d_solver_statistics fills stats with the number of RHS evaluations,
+ * linear solves, linear iterations and preconditioner applications made for
+ * the 3D species since the last reset. */
+extern "C" void rxd_3d_solver_statistics(long* stats, int reset)
+{
+    if(stats != NULL)
+    {
+        stats[0] = _rxd_3d_rhs_count;
+        stats[1] = _rxd_3d_solve_count;
+        stats[2] = _rxd_3d_lin_iter_count;
+        stats[3] = _rxd_3d_precond_count;
+    }
+    if(reset)
+    {
+        _rxd_3d_rhs_count = 0;
+        _rxd_3d_solve_count = 0;
+        _rxd_3d_lin_iter_count = 0;
+        _rxd_3d_precond_count = 0;
+    }
 }
 /*****************************************************************************
 *
@@ -1370,3 +1605,62 @@ void ecs_set_adi_homogeneous(ECS_Grid_node *g)
     g->ecs_adi_dir_y->ecs_dg_adi_dir = ecs_dg_adi_y;
     g->ecs_adi_dir_z->ecs_dg_adi_dir = ecs_dg_adi_z;
 }
+
+/* ecs_variable_step_preconditioner approximately solves (I - dt*D)x = b for
+ * the extracellular diffusion operator D with the ADI factorization
+ * (I - dt*Dx)(I - dt*Dy)(I - dt*Dz)x = b, one tridiagonal solve per line.
+ * Only grids with a homogeneous volume fraction and tortuosity are
+ * preconditioned, otherwise b is returned unchanged.
+ * g    -   the parameters of the grid
+ * RHS  -   b, overwritten with x
+ * dt   -   the scaling of the Jacobian provided by CVode
+ */
+void ecs_variable_step_preconditioner(ECS_Grid_node* g, double* RHS, double dt)
+{
+    int i, j, k, n, d, stride, size_i, size_j, size_k;
+    int sizes[3] = {g->size_x, g->size_y, g->size_z};
+    int strides[3] = {g->size_y * g->size_z, g->size_z, 1};
+    double rates[3] = {g->dc_x/SQ(g->dx), g->dc_y/SQ(g->dy), g->dc_z/SQ(g->dz)};
+    double r, *line, *scratch, *base;
+
+    if(g->VARIABLE_ECS_VOLUME != FALSE || !g->diffusable)
+        return;
+
+    n = MAX(g->size_x, MAX(g->size_y, g->size_z));
+    line = (double*)malloc(sizeof(double) * n);
+    scratch = (double*)malloc(sizeof(double) * n);
+    for(d = 0; d < 3; d++)
+    {
+        size_i = sizes[d];
+        if(size_i < 2)
+            continue;
+        stride = strides[d];
+        size_j = sizes[(d + 1) % 3];
+        size_k = sizes[(d + 2) % 3];
+        r = dt * rates[d];
+        for(j = 0; j < size_j; j++)
+        {
+            for(k = 0; k < size_k; k++)
+            {
+                /*Dirichlet boundaries have a zero Jacobian, so are left unchanged*/
+                if(g->bc->type == DIRICHLET && (j == 0 || k == 0 ||
+                   j == size_j - 1 || k == size_k - 1))
+                    continue;
+                base = RHS + j * strides[(d + 1) % 3] + k * strides[(d + 2) % 3];
+                for(i = 0; i < size_i; i++)
+                    line[i] = base[i * stride];
+                if(g->bc->type == NEUMANN)
+                    solve_dd_clhs_tridiag(size_i, -r, 1.0 + 2.0 * r, -r,
+                                          1.0 + r, -r, -r, 1.0 + r,
+                                          line, scratch);
+                else
+                    solve_dd_clhs_tridiag(size_i, -r, 1.0 + 2.0 * r, -r,
+                                          1.0, 0, 0, 1.0, line, scratch);
+                for(i = 0; i < size_i; i++)
+                    base[i * stride] = line[i];
+            }
+        }
+    }
+    free(line);
+    free(scratch);
+}
@@ -0,0 +1,613 @@
+#include <../../nrnconf.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <math.h>
+#include "grids.h"
+#include "rxd.h"
+#include <../oc/nrnran123.h>
+
+/*
+    Stochastic reactions with tau-leaping
+
+    The reactions at each location (1D segment or 3D voxel) are advanced by
+    dt with explicit tau-leaping (Cao, Gillespie & Petzold 2006). When the
+    leap would cover fewer than SSA_THRESHOLD events the location falls back
+    to the exact stochastic simulation algorithm. The states remain
+    concentrations, they are converted to molecule counts with the volume of
+    the node. Diffusion is unchanged (deterministic).
+
+    The random numbers are counter based (Random123). The stream for a
+    location is selected by the reaction set, the location and the step, so
+    the results do not depend on the number of threads.
+*/
+
+#define TAU_EPSILON     0.03
+#define SSA_THRESHOLD   10.0
+#define SSA_MAX_EVENTS  100
+/*offset for the stream ids of the 3D reactions*/
+#define STOCHASTIC_3D_ID    0x10000
+
+extern int NUM_THREADS;
+extern TaskQueue* AllTasks;
+extern ICSReactions* _reactions;
+extern Reaction* ecs_reactions;
+
+int _rxd_reaction_method = RXD_DETERMINISTIC;
+uint32_t _rxd_stochastic_step = 0;
+static double* _stochastic_volumes = NULL;
+static double _molecules_per_mM_um3 = 602214.08570000001;
+
+typedef struct {
+    uint32_t id1, id2, id3;
+    uint32_t seq;
+    int avail;
+    nrnran123_array4x32 r;
+} StochasticRandom;
+
+/*A location, the reactions are evaluated with propensity(loc, a) which
+ *returns the rates (concentration/ms) of the channels in a.
+ *slot[j] is the state changed by stoichiometry entry j, x[slot] points to
+ *the concentration and conv[slot] the molecules per unit concentration.*/
+typedef struct StochasticLocation {
+    StochasticChannels* ch;
+    int num_slots;
+    int* slot;
+    double** x;
+    double* conv;
+    unsigned char* active;
+    double* a;
+    double* sign;
+    double* fired;
+    double* delta;
+    void (*propensity)(struct StochasticLocation*, double*);
+    void* data;
+    int idx;
+} StochasticLocation;
+
+typedef struct {
+    ICSReactions* react;
+    Reaction* ecs_react;
+    double* states;
+    int onset, offset;
+    double dt;
+} StochasticTask;
+
+static double stochastic_uniform(StochasticRandom* s)
+{
+    if(s->avail == 0)
+    {
+        s->r = nrnran123_iran3(s->seq++, s->id1, s->id2, s->id3);
+        s->avail = 4;
+    }
+    return nrnran123_uint2dbl(s->r.v[--s->avail]);
+}
+
+/*Poisson deviate, multiplication for small means, otherwise the
+ *transformed rejection of Hormann (1993)*/
+static double stochastic_poisson(StochasticRandom* s, const double mu)
+{
+    double p, limit, k;
+    double slam, loglam, a, b, invalpha, vr, U, V, us;
+    if(mu <= 0)
+        return 0;
+    if(mu < 10)
+    {
+        limit = exp(-mu);
+        p = stochastic_uniform(s);
+        for(k = 0; p > limit; k++)
+            p *= stochastic_uniform(s);
+        return k;
+    }
+    slam = sqrt(mu);
+    loglam = log(mu);
+    b = 0.931 + 2.53 * slam;
+    a = -0.059 + 0.02483 * b;
+    invalpha = 1.1239 + 1.1328 / (b - 3.4);
+    vr = 0.9277 - 3.6224 / (b - 2);
+    while(TRUE)
+    {
+        U = stochastic_uniform(s) - 0.5;
+        V = stochastic_uniform(s);
+        us = 0.5 - fabs(U);
+        k = floor((2 * a / us + b) * U + mu + 0.43);
+        if(us >= 0.07 && V <= vr)
+            return k;
+        if(k < 0 || (us < 0.013 && V > us))
+            continue;
+        if(log(V) + log(invalpha) - log(a / (us * us) + b) <= -mu + k * loglam - lgamma(k + 1))
+            return k;
+    }
+}
+
+/*propensities in molecules/ms, returns their sum*/
+static double stochastic_propensities(StochasticLocation* loc)
+{
+    StochasticChannels* ch = loc->ch;
+    double a0 = 0;
+    int k;
+    loc->propensity(loc, loc->a);
+    for(k = 0; k < ch->num_channels; k++)
+    {
+        double a = loc->a[k];
+        loc->sign[k] = 1;
+        if(!loc->active[k] || a != a)
+        {
+            a = 0;
+        }
+        else if(a < 0)
+        {
+            if(ch->signed_rate[k])
+                loc->sign[k] = -1;
+            a = ch->signed_rate[k] ? -a : 0;
+        }
+        /*the channel uses the volume of its first species*/
+        loc->a[k] = a * loc->conv[loc->slot[ch->stoich_start[k]]];
+        a0 += loc->a[k];
+    }
+    return a0;
+}
+
+/*the largest leap that keeps the expected relative change of every species
+ *below TAU_EPSILON (Cao, Gillespie & Petzold 2006, with g = 1)*/
+static double stochastic_select_tau(StochasticLocation* loc)
+{
+    StochasticChannels* ch = loc->ch;
+    double tau = HUGE_VAL;
+    double change, bound;
+    int j, k, n;
+    double* mu = loc->delta;
+    double* sigma2 = loc->fired;
+    for(n = 0; n < loc->num_slots; n++)
+        mu[n] = sigma2[n] = 0;
+    for(k = 0; k < ch->num_channels; k++)
+    {
+        for(j = ch->stoich_start[k]; j < ch->stoich_start[k + 1]; j++)
+        {
+            change = loc->sign[k] * ch->stoich_change[j];
+            mu[loc->slot[j]] += change * loc->a[k];
+            sigma2[loc->slot[j]] += change * change * loc->a[k];
+        }
+    }
+    for(n = 0; n < loc->num_slots; n++)
+    {
+        bound = MAX(TAU_EPSILON * (*loc->x[n]) * loc->conv[n], 1.0);
+        if(mu[n] != 0)
+            tau = MIN(tau, bound / fabs(mu[n]));
+        if(sigma2[n] > 0)
+            tau = MIN(tau, bound * bound / sigma2[n]);
+    }
+    return tau;
+}
+
+static void stochastic_fire(StochasticLocation* loc, const int k, const double count)
+{
+    StochasticChannels* ch = loc->ch;
+    int j;
+    for(j = ch->stoich_start[k]; j < ch->stoich_start[k + 1]; j++)
+    {
+        *loc->x[loc->slot[j]] += count * loc->sign[k] * ch->stoich_change[j] / loc->conv[loc->slot[j]];
+    }
+}
+
+static void stochastic_advance(StochasticLocation* loc, StochasticRandom* rng, const double dt)
+{
+    StochasticChannels* ch = loc->ch;
+    double t = 0, tau, a0, r, change;
+    int j, k, n, events, negative;
+
+    while(t < dt)
+    {
+        a0 = stochastic_propensities(loc);
+        if(a0 <= 0)
+            break;
+        tau = MIN(stochastic_select_tau(loc), dt - t);
+        if(tau * a0 < SSA_THRESHOLD)
+        {
+            /*too few events to leap, use the exact algorithm*/
+            for(events = 0; events < SSA_MAX_EVENTS; events++)
+            {
+                if(events > 0)
+                    a0 = stochastic_propensities(loc);
+                if(a0 <= 0)
+                {
+                    t = dt;
+                    break;
+                }
+                t -= log(stochastic_uniform(rng)) / a0;
+                if(t >= dt)
+                    break;
+                r = stochastic_uniform(rng) * a0;
+                for(k = 0; k < ch->num_channels - 1 && r >= loc->a[k]; k++)
+                    r -= loc->a[k];
+                stochastic_fire(loc, k, 1);
+            }
+            continue;
+        }
+        /*leap, halving tau if any species would become negative*/
+        do
+        {
+            for(k = 0; k < ch->num_channels; k++)
+                loc->fired[k] = stochastic_poisson(rng, loc->a[k] * tau);
+            for(n = 0; n < loc->num_slots; n++)
+                loc->delta[n] = 0;
+            for(k = 0; k < ch->num_channels; k++)
+            {
+                for(j = ch->stoich_start[k]; j < ch->stoich_start[k + 1]; j++)
+                {
+                    change = loc->sign[k] * ch->stoich_change[j];
+                    loc->delta[loc->slot[j]] += change * loc->fired[k];
+                }
+            }
+            for(n = 0, negative = FALSE; n < loc->num_slots && !negative; n++)
+                negative = (*loc->x[n]) * loc->conv[n] + loc->delta[n] < 0;
+            if(negative)
+                tau /= 2;
+        } while(negative);
+        for(n = 0; n < loc->num_slots; n++)
+            *loc->x[n] += loc->delta[n] / loc->conv[n];
+        t += tau;
+    }
+}
+
+/*Find the distinct states changed by the channels at a location.
+ *state(loc, j) returns the state for stoichiometry entry j or NULL if the
+ *species is absent at this location.*/
+static void stochastic_set_slots(StochasticLocation* loc, double* (*state)(StochasticLocation*, int, double*))
+{
+    StochasticChannels* ch = loc->ch;
+    int j, k, n;
+    double* x;
+    double conv;
+
+    loc->num_slots = 0;
+    for(k = 0; k < ch->num_channels; k++)
+    {
+        loc->active[k] = TRUE;
+        for(j = ch->stoich_start[k]; j < ch->stoich_start[k + 1]; j++)
+        {
+            x = state(loc, j, &conv);
+            if(x == NULL)
+            {
+                loc->active[k] = FALSE;
+                loc->slot[j] = 0;
+                continue;
+            }
+            for(n = 0; n < loc->num_slots && loc->x[n] != x; n++);
+            if(n == loc->num_slots)
+            {
+                loc->x[n] = x;
+                loc->conv[n] = conv;
+                loc->num_slots++;
+            }
+            loc->slot[j] = n;
+        }
+    }
+    /*a location where no channel is active has nothing to do*/
+    if(loc->num_slots == 0)
+    {
+        for(k = 0; k < ch->num_channels; k++)
+            loc->active[k] = FALSE;
+    }
+}
+
+static void stochastic_location_alloc(StochasticLocation* loc, StochasticChannels* ch)
+{
+    int num_entries = ch->stoich_start[ch->num_channels];
+    int n = MAX(num_entries, ch->num_channels);
+    loc->ch = ch;
+    loc->slot = (int*)malloc(sizeof(int) * MAX(num_entries, 1));
+    loc->x = (double**)malloc(sizeof(double*) * MAX(num_entries, 1));
+    loc->conv = (double*)malloc(sizeof(double) * MAX(num_entries, 1));
+    loc->active = (unsigned char*)malloc(MAX(ch->num_channels, 1));
+    loc->a = (double*)malloc(sizeof(double) * MAX(ch->num_channels, 1));
+    loc->sign = (double*)malloc(sizeof(double) * MAX(ch->num_channels, 1));
+    loc->fired = (double*)malloc(sizeof(double) * MAX(n, 1));
+    loc->delta = (double*)malloc(sizeof(double) * MAX(n, 1));
+}
+
+static void stochastic_location_free(StochasticLocation* loc)
+{
+    free(loc->slot);
+    free(loc->x);
+    free(loc->conv);
+    free(loc->active);
+    free(loc->a);
+    free(loc->sign);
+    free(loc->fired);
+    free(loc->delta);
+}
+
+static void stochastic_random_init(StochasticRandom* rng, StochasticChannels* ch, const int idx)
+{
+    rng->id1 = (uint32_t)ch->id;
+    rng->id2 = (uint32_t)idx;
+    rng->id3 = _rxd_stochastic_step;
+    rng->seq = 0;
+    rng->avail = 0;
+}
+
+/*
+    1D reactions (registered with register_rate)
+*/
+typedef struct {
+    ICSReactions* react;
+    double* states;
+    double** species;
+    double** params;
+    double* mult;
+    double* ecs_species;
+    double* ecs_params;
+} Stochastic1DData;
+
+static double* stochastic_state_1d(StochasticLocation* loc, int j, double* conv)
+{
+    Stochastic1DData* d = (Stochastic1DData*)loc->data;
+    int idx = d->react->state_idx[loc->idx][loc->ch->stoich_species[j]][loc->ch->stoich_region[j]];
+    if(idx == SPECIES_ABSENT)
+        return NULL;
+    *conv = _stochastic_volumes[idx] * _molecules_per_mM_um3;
+    return &(d->states[idx]);
+}
+
+static void stochastic_propensity_1d(StochasticLocation* loc, double* a)
+{
+    Stochastic1DData* d = (Stochastic1DData*)loc->data;
+    ICSReactions* react = d->react;
+    int segment = loc->idx;
+    int i, j, k, idx;
+    double v = 0;
+
+    for(i = 0; i < react->num_species; i++)
+    {
+        for(j = 0; j < react->num_regions; j++)
+        {
+            idx = react->state_idx[segment][i][j];
+            d->species[i][j] = idx != SPECIES_ABSENT ? d->states[idx] : NAN;
+        }
+    }
+    for(k = 0; i < react->num_species + react->num_params; i++, k++)
+    {
+        for(j = 0; j < react->num_regions; j++)
+        {
+            idx = react->state_idx[segment][i][j];
+            d->params[k][j] = idx != SPECIES_ABSENT ? d->states[idx] : NAN;
+        }
+    }
+    for(i = 0; i < react->num_ecs_species; i++)
+        d->ecs_species[i] = react->ecs_state[segment][i] != NULL ? *(react->ecs_state[segment][i]) : NAN;
+    for(k = 0; i < react->num_ecs_species + react->num_ecs_params; i++, k++)
+        d->ecs_params[k] = react->ecs_state[segment][i] != NULL ? *(react->ecs_state[segment][i]) : NAN;
+    for(i = 0; i < react->num_mult; i++)
+        d->mult[i] = react->mc_multiplier[i][segment];
+    if(react->vptrs != NULL)
+        v = *(react->vptrs[segment]);
+    ((ReactionPropensity)loc->ch->propensity)(d->species, d->params, a, d->mult, d->ecs_species, d->ecs_params, v);
+}
+
+static void* do_stochastic_reactions_1d(void* dataptr)
+{
+    StochasticTask* task = (StochasticTask*)dataptr;
+    ICSReactions* react = task->react;
+    StochasticLocation loc;
+    StochasticRandom rng;
+    Stochastic1DData d;
+    int i, segment;
+
+    d.react = react;
+    d.states = task->states;
+    d.species = (double**)malloc(sizeof(double*) * MAX(react->num_species, 1));
+    d.params = (double**)malloc(sizeof(double*) * MAX(react->num_params, 1));
+    for(i = 0; i < react->num_species; i++)
+        d.species[i] = (double*)malloc(sizeof(double) * react->num_regions);
+    for(i = 0; i < react->num_params; i++)
+        d.params[i] = (double*)malloc(sizeof(double) * react->num_regions);
+    d.mult = (double*)malloc(sizeof(double) * MAX(react->num_mult, 1));
+    d.ecs_species = (double*)malloc(sizeof(double) * MAX(react->num_ecs_species, 1));
+    d.ecs_params = (double*)malloc(sizeof(double) * MAX(react->num_ecs_params, 1));
+
+    stochastic_location_alloc(&loc, react->stochastic);
+    loc.propensity = &stochastic_propensity_1d;
+    loc.data = &d;
+    for(segment = task->onset; segment < task->offset; segment++)
+    {
+        loc.idx = segment;
+        stochastic_set_slots(&loc, &stochastic_state_1d);
+        if(loc.num_slots == 0)
+            continue;
+        stochastic_random_init(&rng, react->stochastic, segment);
+        stochastic_advance(&loc, &rng, task->dt);
+    }
+    stochastic_location_free(&loc);
+
+    for(i = 0; i < react->num_species; i++)
+        free(d.species[i]);
+    for(i = 0; i < react->num_params; i++)
+        free(d.params[i]);
+    free(d.species);
+    free(d.params);
+    free(d.mult);
+    free(d.ecs_species);
+    free(d.ecs_params);
+    return NULL;
+}
+
+/*
+    3D reactions (registered with ics_register_reaction or
+    ecs_register_reaction)
+*/
+typedef struct {
+    Reaction* react;
+    double* species;
+    double* params;
+} Stochastic3DData;
+
+static double* stochastic_state_3d(StochasticLocation* loc, int j, double* conv)
+{
+    Stochastic3DData* d = (Stochastic3DData*)loc->data;
+    *conv = d->react->grid->voxel_volume(loc->idx) * _molecules_per_mM_um3;
+    return &(d->react->species_states[loc->ch->stoich_species[j]][loc->idx]);
+}
+
+static void stochastic_propensity_3d(StochasticLocation* loc, double* a)
+{
+    Stochastic3DData* d = (Stochastic3DData*)loc->data;
+    Reaction* react = d->react;
+    unsigned int i, k;
+    for(i = 0; i < react->num_species_involved; i++)
+        d->species[i] = react->species_states[i][loc->idx];
+    for(k = 0; i < react->num_species_involved + react->num_params_involved; i++, k++)
+        d->params[k] = react->species_states[i][loc->idx];
+    ((ECSReactionPropensity)loc->ch->propensity)(d->species, d->params, a);
+}
+
+static void* do_stochastic_reactions_3d_task(void* dataptr)
+{
+    StochasticTask* task = (StochasticTask*)dataptr;
+    Reaction* react = task->ecs_react;
+    StochasticLocation loc;
+    StochasticRandom rng;
+    Stochastic3DData d;
+    int i;
+
+    d.react = react;
+    d.species = (double*)malloc(sizeof(double) * MAX(react->num_species_involved, 1));
+    d.params = (double*)malloc(sizeof(double) * MAX(react->num_params_involved, 1));
+    stochastic_location_alloc(&loc, react->stochastic);
+    loc.propensity = &stochastic_propensity_3d;
+    loc.data = &d;
+    for(i = task->onset; i < task->offset; i++)
+    {
+        if(react->subregion && !react->subregion[i])
+            continue;
+        loc.idx = i;
+        stochastic_set_slots(&loc, &stochastic_state_3d);
+        if(loc.num_slots == 0 || react->grid->voxel_volume(i) <= 0)
+            continue;
+        stochastic_random_init(&rng, react->stochastic, i);
+        stochastic_advance(&loc, &rng, task->dt);
+    }
+    stochastic_location_free(&loc);
+    free(d.species);
+    free(d.params);
+    return NULL;
+}
+
+/*split the locations [0, n) evenly between the threads and run task on each*/
+static void run_stochastic_tasks(void* (*task)(void*), ICSReactions* react, Reaction* ecs_react, double* states, const int n, const double dt)
+{
+    StochasticTask* tasks = (StochasticTask*)malloc(sizeof(StochasticTask) * NUM_THREADS);
+    int k;
+    for(k = 0; k < NUM_THREADS; k++)
+    {
+        tasks[k].react = react;
+        tasks[k].ecs_react = ecs_react;
+        tasks[k].states = states;
+        tasks[k].onset = (int)(((long)n * k) / NUM_THREADS);
+        tasks[k].offset = (int)(((long)n * (k + 1)) / NUM_THREADS);
+        tasks[k].dt = dt;
+    }
+    for(k = 0; k < NUM_THREADS - 1; k++)
+        TaskQueue_add_task(AllTasks, task, &tasks[k], NULL);
+    task(&tasks[NUM_THREADS - 1]);
+    TaskQueue_sync(AllTasks);
+    free(tasks);
+}
+
+void do_stochastic_reactions(double* states, double dt)
+{
+    ICSReactions* react;
+    for(react = _reactions; react != NULL; react = react->next)
+    {
+        if(react->stochastic != NULL && react->stochastic->num_channels > 0)
+            run_stochastic_tasks(&do_stochastic_reactions_1d, react, NULL, states, react->num_segments, dt);
+    }
+}
+
+void do_stochastic_reactions_3d(double dt)
+{
+    Reaction* react;
+    for(react = ecs_reactions; react != NULL; react = react->next)
+    {
+        if(react->stochastic != NULL && react->stochastic->num_channels > 0)
+            run_stochastic_tasks(&do_stochastic_reactions_3d_task, NULL, react, NULL, react->region_size, dt);
+    }
+}
+
+static StochasticChannels* create_stochastic_channels(int id, int num_channels, unsigned char* signed_rate, int* stoich_start, int* stoich_species, int* stoich_region, double* stoich_change, void* propensity)
+{
+    StochasticChannels* ch = (StochasticChannels*)malloc(sizeof(StochasticChannels));
+    int num_entries = stoich_start[num_channels];
+    ch->num_channels = num_channels;
+    ch->signed_rate = (unsigned char*)malloc(MAX(num_channels, 1));
+    memcpy(ch->signed_rate, signed_rate, num_channels);
+    ch->stoich_start = (int*)malloc(sizeof(int) * (num_channels + 1));
+    memcpy(ch->stoich_start, stoich_start, sizeof(int) * (num_channels + 1));
+    ch->stoich_species = (int*)malloc(sizeof(int) * MAX(num_entries, 1));
+    memcpy(ch->stoich_species, stoich_species, sizeof(int) * num_entries);
+    ch->stoich_region = (int*)malloc(sizeof(int) * MAX(num_entries, 1));
+    if(stoich_region != NULL)
+        memcpy(ch->stoich_region, stoich_region, sizeof(int) * num_entries);
+    else
+        memset(ch->stoich_region, 0, sizeof(int) * num_entries);
+    ch->stoich_change = (double*)malloc(sizeof(double) * MAX(num_entries, 1));
+    memcpy(ch->stoich_change, stoich_change, sizeof(double) * num_entries);
+    ch->propensity = propensity;
+    ch->id = id;
+    return ch;
+}
+
+void free_stochastic_channels(StochasticChannels* ch)
+{
+    if(ch == NULL)
+        return;
+    free(ch->signed_rate);
+    free(ch->stoich_start);
+    free(ch->stoich_species);
+    free(ch->stoich_region);
+    free(ch->stoich_change);
+    free(ch);
+}
+
+/*register_stochastic_rate adds the stochastic channels to the most
+ *recently registered 1D reactions (register_rate)*/
+extern "C" void register_stochastic_rate(int num_channels, unsigned char* signed_rate,
+                                         int* stoich_start, int* stoich_species,
+                                         int* stoich_region, double* stoich_change,
+                                         ReactionPropensity f)
+{
+    ICSReactions* react;
+    int id = 0;
+    /*the streams are selected by the position in the list of reactions*/
+    for(react = _reactions->next; react != NULL; react = react->next, id++);
+    free_stochastic_channels(_reactions->stochastic);
+    _reactions->stochastic = create_stochastic_channels(id, num_channels, signed_rate, stoich_start, stoich_species, stoich_region, stoich_change, (void*)f);
+}
+
+/*register_stochastic_reaction_3d adds the stochastic channels to the most
+ *recently registered 3D reactions (ics_register_reaction or
+ *ecs_register_reaction)*/
+extern "C" void register_stochastic_reaction_3d(int num_channels, unsigned char* signed_rate,
+                                                int* stoich_start, int* stoich_species,
+                                                double* stoich_change,
+                                                ECSReactionPropensity f)
+{
+    Reaction* react;
+    int id = STOCHASTIC_3D_ID;
+    for(react = ecs_reactions->next; react != NULL; react = react->next, id++);
+    free_stochastic_channels(ecs_reactions->stochastic);
+    ecs_reactions->stochastic = create_stochastic_channels(id, num_channels, signed_rate, stoich_start, stoich_species, NULL, stoich_change, (void*)f);
+}
+
+/*rxd_set_stochastic is called at initialization, it selects the method and
+ *restarts the random streams
+ * method - RXD_DETERMINISTIC or RXD_STOCHASTIC
+ * volumes - the volume (um^3) of each 1D state
+ * molecules_per_mM_um3 - the number of molecules in 1 um^3 at 1 mM*/
+extern "C" void rxd_set_stochastic(int method, double* volumes, double molecules_per_mM_um3)
+{
+    _rxd_reaction_method = method;
+    _stochastic_volumes = volumes;
+    _molecules_per_mM_um3 = molecules_per_mM_um3;
+    _rxd_stochastic_step = 0;
+}
@@ -221,6 +221,7 @@ extern int hoc_stacktype(void);
 extern int hoc_inside_stacktype(int);
 extern void hoc_link_symbol(Symbol*, Symlist*);
 extern void hoc_unlink_symbol(Symbol*, Symlist*);
+extern unsigned long hoc_symlist_change_cnt;
 extern void notify_freed(void*);
 extern void notify_freed_val_array(double*, size_t);
 extern void notify_pointer_freed(void*);
@@ -51,6 +51,9 @@ Symlist	*p_symlist = (Symlist *)0; /* current proc, func, or temp table */
 			/* containing constants, strings, and auto */
 			/* variables. Discarding these lists at */
 			/* appropriate times prevents storage leakage. */
+unsigned long hoc_symlist_change_cnt; /* incremented whenever a symbol is
+	linked into or unlinked from a symlist or a template is freed, so
+	that lookups cached elsewhere know when to start over */
 
 void print_symlist(const char* s, Symlist* tab) {
 	Symbol *sp;
@@ -172,10 +175,12 @@ void hoc_unlink_symbol(Symbol* s, Symlist* list)
 		}
 	}
 	s->next = (Symbol*)0;
+	++hoc_symlist_change_cnt;
 }
 
 void hoc_link_symbol(Symbol* sp, Symlist* list) {
 	/* put at end of list */
+	++hoc_symlist_change_cnt;
 	if (list->last) {
 		list->last->next = sp;
 	}else{
@@ -302,6 +307,7 @@ void hoc_free_symspace(Symbol* s1) {	/* frees symbol space. Marks it UNDEF */
 		case AUTOOBJ:
 			break;
 		case TEMPLATE:
+			++hoc_symlist_change_cnt;
 hoc_free_allobjects(s1->u.template, hoc_top_level_symlist, hoc_top_level_data);
 			free_list(&(s1->u.template->symtable));
 			{hoc_List* l = s1->u.template->olist;
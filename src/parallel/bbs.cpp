@@ -49,10 +49,12 @@ BBS::BBS(int n) {
 }
 
 #if NRNMPI
-void BBS::init(int) {
+void BBS::init(int n) {
 	if (nrnmpi_use == 0) {
-		BBSImpl::is_master_ = true;
-		impl_ = new BBSLocal();
+		if (!BBSImpl::started_) {
+			BBSImpl::is_master_ = true;
+		}
+		impl_ = new BBSLocal(n);
 		return;
 	}
 	if (!BBSImpl::started_) {
@@ -82,12 +84,12 @@ void BBS::init(int) {
 	}
 }
 #else // !NRNMPI
-void BBS::init(int) {
+void BBS::init(int n) {
 	if (!BBSImpl::started_) {
 		BBSImpl::is_master_ = true;
 		BBSImpl::master_works_ = true;
 	}
-	impl_ = new BBSLocal();
+	impl_ = new BBSLocal(n);
 }
 #endif // !NRNMPI
 
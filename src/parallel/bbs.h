@@ -62,6 +62,7 @@ public:
 	Object** gid2obj(int);
 	Object** gid2cell(int);
 	Object** gid_connect(int);
+	Object** gid_connect_bulk();
 	double netpar_mindelay(double maxdelay);
 	void netpar_spanning_statistics(int*, int*, int*, int*);
 	IvocVect* netpar_max_histogram(IvocVect*);
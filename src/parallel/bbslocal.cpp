@@ -5,6 +5,25 @@
 #include "bbslocal.h"
 #include "bbslsrv.h"
 #include <nrnmpi.h>
+#include "../nrnpython/nrnpython_config.h"
+
+// with fork, ParallelContext.runworker can start a pool of local worker
+// processes that use the master bulletin board through a socket
+#if defined(HAVE_STL) && !defined(MINGW)
+#define BBSPOOL 1
+#include <list>
+#include <vector>
+#include <errno.h>
+#include <signal.h>
+#include <unistd.h>
+#include <poll.h>
+#include <sys/types.h>
+#include <sys/socket.h>
+#include <sys/wait.h>
+#include "bbssrv.h"
+#else
+#define BBSPOOL 0
+#endif
 
 #if defined(HAVE_STL)
 #if defined(HAVE_SSTREAM) // the standard ...
@@ -30,12 +49,451 @@ static MessageValue* posting_;
 static MessageValue* taking_;
 static BBSLocalServer* server_;
 
-BBSLocal::BBSLocal() {
+#if BBSPOOL
+extern "C" {
+	extern Symbol* hoc_lookup(const char*);
+	extern void nrn_threads_fork_prepare();
+	extern void nrn_threads_fork_restore();
+}
+#if defined(USE_PYTHON)
+extern int (*p_nrnpython_start)(int);
+extern void (*p_nrnpython_finalize)();
+#endif
+
+static int nhost_; // requested pool size, including the master
+static int nworker_; // forked workers, only nonzero on the master
+static int* wfd_; // master end of the socket to each worker
+static pid_t* wpid_;
+static struct pollfd* pfd_;
+
+// every request and reply is a PoolMsg followed by the key (if keysize)
+// and the MessageValue bytes (if size)
+struct PoolMsg {
+	int type;
+	int id;
+	int hasval;
+	size_t keysize;
+	size_t size;
+};
+
+// a worker blocked in take or take_todo
+struct PoolPending {
+	int w;
+	int type;
+	char* key;
+};
+typedef std::list<PoolPending> PoolPendingList;
+static PoolPendingList* pending_;
+
+// context statements not yet executed by every worker
+static std::vector<MessageValue*>* contexts_;
+static int* ncontext_; // number of contexts_ sent to each worker
+
+static void pool_quit() {
+	// as BBSClient::done
+#if defined(USE_PYTHON)
+	if (p_nrnpython_start) { (*p_nrnpython_start)(0);}
+	if (p_nrnpython_finalize) { (*p_nrnpython_finalize)(); }
+#endif
+	exit(0);
+}
+
+static bool pool_write(int fd, const void* buf, size_t n) {
+	const char* p = (const char*)buf;
+	while (n > 0) {
+		ssize_t i = write(fd, p, n);
+		if (i < 0 && errno == EINTR) { continue; }
+		if (i <= 0) { return false; }
+		p += i;
+		n -= i;
+	}
+	return true;
+}
+
+static bool pool_read(int fd, void* buf, size_t n) {
+	char* p = (char*)buf;
+	while (n > 0) {
+		ssize_t i = read(fd, p, n);
+		if (i < 0 && errno == EINTR) { continue; }
+		if (i <= 0) { return false; }
+		p += i;
+		n -= i;
+	}
+	return true;
+}
+
+static bool pool_send(int fd, int type, int id, const char* key,
+  MessageValue* val) {
+	PoolMsg m;
+	char* buf = nil;
+	m.type = type;
+	m.id = id;
+	m.hasval = val ? 1 : 0;
+	m.keysize = key ? strlen(key) : 0;
+	m.size = 0;
+	if (val) {
+		buf = val->bytes(&m.size);
+	}
+	bool b = pool_write(fd, &m, sizeof(m))
+		&& pool_write(fd, key, m.keysize)
+		&& pool_write(fd, buf, m.size);
+	if (buf) {
+		delete [] buf;
+	}
+	return b;
+}
+
+// key and val are nil if not sent. val is returned with a reference.
+static bool pool_recv(int fd, PoolMsg& m, char** key, MessageValue** val) {
+	*key = nil;
+	*val = nil;
+	if (!pool_read(fd, &m, sizeof(m))) {
+		return false;
+	}
+	if (m.keysize) {
+		*key = new char[m.keysize + 1];
+		if (!pool_read(fd, *key, m.keysize)) { return false; }
+		(*key)[m.keysize] = '\0';
+	}
+	if (m.hasval) {
+		char* buf = new char[m.size > 0 ? m.size : 1];
+		bool b = pool_read(fd, buf, m.size);
+		if (b) {
+			*val = new MessageValue();
+			(*val)->ref();
+			b = ((*val)->from_bytes(buf, m.size) == 0);
+		}
+		delete [] buf;
+		return b;
+	}
+	return true;
+}
+
+// In a worker process, the bulletin board of the master.
+class BBSLocalProxy : public BBSLocalServer {
+public:
+	BBSLocalProxy(int fd);
+	virtual ~BBSLocalProxy();
+
+	virtual void post(const char* key, MessageValue*);
+	virtual bool look(const char* key, MessageValue**);
+	virtual bool look_take(const char* key, MessageValue**);
+	virtual bool take(const char* key, MessageValue**);
+	virtual int take_todo(MessageValue**);
+
+	virtual void post_todo(int parentid, MessageValue*);
+	virtual void post_result(int id, MessageValue*);
+	virtual int look_take_todo(MessageValue**);
+	virtual int look_take_result(int pid, MessageValue**);
+private:
+	void send(int type, int id, const char* key, MessageValue*);
+	int request(int type, int id, const char* key, MessageValue**);
+	int fd_;
+};
+
+BBSLocalProxy::BBSLocalProxy(int fd) {
+	fd_ = fd;
+}
+
+BBSLocalProxy::~BBSLocalProxy() {
+	close(fd_);
+}
+
+void BBSLocalProxy::send(int type, int id, const char* key,
+  MessageValue* val) {
+	if (!pool_send(fd_, type, id, key, val)) {
+		pool_quit();
+	}
+}
+
+// returns the reply type and its id in val (if any)
+int BBSLocalProxy::request(int type, int id, const char* key,
+  MessageValue** val) {
+	PoolMsg m;
+	char* s;
+	send(type, id, key, nil);
+	if (!pool_recv(fd_, m, &s, val) || m.type == QUIT) {
+		pool_quit();
+	}
+	if (s) {
+		delete [] s;
+	}
+	if (type == LOOK_TAKE_TODO || type == LOOK_TAKE_RESULT
+	    || type == TAKE_TODO) {
+		return m.type == CONTEXT ? -1 : m.id;
+	}
+	return m.type;
+}
+
+void BBSLocalProxy::post(const char* key, MessageValue* val) {
+	send(POST, 0, key, val);
+}
+
+void BBSLocalProxy::post_todo(int parentid, MessageValue* val) {
+	send(POST_TODO, parentid, nil, val);
+}
+
+void BBSLocalProxy::post_result(int id, MessageValue* val) {
+	send(POST_RESULT, id, nil, val);
+}
+
+bool BBSLocalProxy::look(const char* key, MessageValue** val) {
+	return request(LOOK, 0, key, val) == LOOK_YES;
+}
+
+bool BBSLocalProxy::look_take(const char* key, MessageValue** val) {
+	return request(LOOK_TAKE, 0, key, val) == LOOK_TAKE_YES;
+}
+
+bool BBSLocalProxy::take(const char* key, MessageValue** val) {
+	return request(TAKE, 0, key, val) == LOOK_TAKE_YES;
+}
+
+int BBSLocalProxy::take_todo(MessageValue** val) {
+	return request(TAKE_TODO, 0, nil, val);
+}
+
+int BBSLocalProxy::look_take_todo(MessageValue** val) {
+	return request(LOOK_TAKE_TODO, 0, nil, val);
+}
+
+int BBSLocalProxy::look_take_result(int pid, MessageValue** val) {
+	return request(LOOK_TAKE_RESULT, pid, nil, val);
+}
+
+// reply to the waiting workers whose request can now be satisfied
+static void pool_serve_pending() {
+	PoolPendingList::iterator i = pending_->begin();
+	while (i != pending_->end()) {
+		PoolPending& p = *i;
+		MessageValue* val = nil;
+		bool b = false;
+		if (p.type == TAKE_TODO) {
+			int id;
+			if (ncontext_[p.w] < int(contexts_->size())) {
+				b = pool_send(wfd_[p.w], CONTEXT, 0, nil,
+					(*contexts_)[ncontext_[p.w]++]);
+			}else if ((id = server_->look_take_todo(&val)) != 0) {
+				b = pool_send(wfd_[p.w], TAKE_TODO, id, nil, val);
+			}else{
+				++i;
+				continue;
+			}
+		}else{
+			if (!server_->look_take(p.key, &val)) {
+				++i;
+				continue;
+			}
+			b = pool_send(wfd_[p.w], LOOK_TAKE_YES, 0, nil, val);
+			delete [] p.key;
+		}
+		Resource::unref(val);
+		if (!b) {
+			hoc_execerror("BBSLocal", "lost a worker process");
+		}
+		i = pending_->erase(i);
+	}
+	// forget the contexts every worker has executed
+	if (!contexts_->empty()) {
+		for (int w = 0; w < nworker_; ++w) {
+			if (ncontext_[w] < int(contexts_->size())) { return; }
+		}
+		for (size_t j = 0; j < contexts_->size(); ++j) {
+			Resource::unref((*contexts_)[j]);
+		}
+		contexts_->clear();
+		for (int w = 0; w < nworker_; ++w) { ncontext_[w] = 0; }
+	}
+}
+
+// one request from worker w
+static void pool_serve(int w) {
+	PoolMsg m;
+	char* key;
+	MessageValue* val;
+	MessageValue* rval = nil;
+	int fd = wfd_[w];
+	bool b = true;
+	int id;
+	if (!pool_recv(fd, m, &key, &val)) {
+		hoc_execerror("BBSLocal", "lost a worker process");
+	}
+	switch (m.type) {
+	case POST:
+		server_->post(key, val);
+		pool_serve_pending();
+		break;
+	case POST_TODO:
+		server_->post_todo(m.id, val);
+		pool_serve_pending();
+		break;
+	case POST_RESULT:
+		server_->post_result(m.id, val);
+		break;
+	case LOOK:
+		b = server_->look(key, &rval);
+		b = pool_send(fd, b ? LOOK_YES : LOOK_NO, 0, nil, rval);
+		break;
+	case LOOK_TAKE:
+		b = server_->look_take(key, &rval);
+		b = pool_send(fd, b ? LOOK_TAKE_YES : LOOK_TAKE_NO, 0, nil, rval);
+		break;
+	case LOOK_TAKE_TODO:
+		id = server_->look_take_todo(&rval);
+		b = pool_send(fd, LOOK_TAKE_TODO, id, nil, rval);
+		break;
+	case LOOK_TAKE_RESULT:
+		id = server_->look_take_result(m.id, &rval);
+		b = pool_send(fd, LOOK_TAKE_RESULT, id, nil, rval);
+		break;
+	case TAKE:
+	case TAKE_TODO: {
+		PoolPending p;
+		p.w = w;
+		p.type = m.type;
+		p.key = key;
+		key = nil;
+		pending_->push_back(p);
+		pool_serve_pending();
+		} break;
+	default:
+		hoc_execerror("BBSLocal", "unknown worker request");
+	}
+	Resource::unref(val);
+	Resource::unref(rval);
+	if (key) {
+		delete [] key;
+	}
+	if (!b) {
+		hoc_execerror("BBSLocal", "lost a worker process");
+	}
+}
+
+// serve all the worker requests that have arrived. If block, first wait
+// for at least one. Returns false, without waiting, when no worker can
+// send anything, ie. there are none or all of them wait for the master.
+static bool pool_handle(bool block) {
+	if (nworker_ == 0) {
+		return false;
+	}
+	if (block && int(pending_->size()) == nworker_) {
+		return false;
+	}
+	for (;;) {
+		int n = poll(pfd_, nworker_, block ? -1 : 0);
+		if (n < 0 && errno == EINTR) {
+			continue;
+		}
+		if (n < 0) {
+			hoc_execerror("BBSLocal", "poll failed");
+		}
+		if (n == 0) {
+			return true;
+		}
+		for (int w = 0; w < nworker_; ++w) {
+			if (pfd_[w].revents) {
+				pool_serve(w);
+			}
+		}
+		block = false;
+	}
+}
+
+static void pool_flush() {
+	// output still buffered would be written by every process
+	fflush(stdout);
+	fflush(stderr);
+	if (hoc_lookup("nrnpython")) {
+		hoc_obj_run("{nrnpython(\"import sys\\nsys.stdout.flush()\\nsys.stderr.flush()\")}\n", nil);
+	}
+}
+
+// Returns true in the master. A new worker process returns false with
+// server_ the proxy for the master bulletin board.
+static bool pool_fork() {
+	int i, j;
+	int nw = nhost_ - 1;
+	pool_flush();
+	wfd_ = new int[nw];
+	wpid_ = new pid_t[nw];
+	pfd_ = new struct pollfd[nw];
+	ncontext_ = new int[nw];
+	pending_ = new PoolPendingList();
+	contexts_ = new std::vector<MessageValue*>();
+	// the thread workers are not copied by fork
+	nrn_threads_fork_prepare();
+	for (i = 0; i < nw; ++i) {
+		int sv[2];
+		if (socketpair(AF_UNIX, SOCK_STREAM, 0, sv) != 0) {
+			nrn_threads_fork_restore();
+			hoc_execerror("BBSLocal", "socketpair failed");
+		}
+		pid_t pid = fork();
+		if (pid < 0) {
+			nrn_threads_fork_restore();
+			hoc_execerror("BBSLocal", "fork failed");
+		}
+		if (pid == 0) {
+			nrn_threads_fork_restore();
+			close(sv[0]);
+			for (j = 0; j < i; ++j) {
+				close(wfd_[j]);
+			}
+			nworker_ = 0;
+			// a lost master is reported by write
+			signal(SIGPIPE, SIG_IGN);
+			nrnmpi_myid_bbs = i + 1;
+			nrnmpi_numprocs_bbs = nhost_;
+			server_ = new BBSLocalProxy(sv[1]);
+			return false;
+		}
+		close(sv[1]);
+		wfd_[i] = sv[0];
+		wpid_[i] = pid;
+		pfd_[i].fd = sv[0];
+		pfd_[i].events = POLLIN;
+		ncontext_[i] = 0;
+		nworker_ = i + 1;
+	}
+	nrn_threads_fork_restore();
+	return true;
+}
+
+static void pool_done() {
+	int w;
+	for (w = 0; w < nworker_; ++w) {
+		pool_send(wfd_[w], QUIT, 0, nil, nil);
+		close(wfd_[w]);
+	}
+	for (w = 0; w < nworker_; ++w) {
+		waitpid(wpid_[w], nil, 0);
+	}
+	nworker_ = 0;
+}
+#else
+static bool pool_handle(bool) { return false; }
+#endif
+
+BBSLocal::BBSLocal(int nhost) {
 	if (!server_) {
 		server_ = new BBSLocalServer();
 		posting_ = nil;
 		taking_ = nil;
+#if BBSPOOL
+		const char* s = getenv("NRN_BBS_NHOST");
+		if (s) {
+			nhost_ = atoi(s);
+		}
+#endif
 	}
+#if BBSPOOL
+	if (nworker_ == 0 && nrnmpi_myid_bbs == 0) {
+		if (nhost > 0) {
+			nhost_ = nhost;
+		}
+		nrnmpi_numprocs_bbs = (nhost_ > 1) ? nhost_ : 1;
+	}
+#endif
 	start();
 #if defined(HAVE_STL)
 	keepargs_ = new KeepArgs();
@@ -49,7 +507,16 @@ BBSLocal::~BBSLocal() {
 #endif
 }
 
-void BBSLocal::context() { }
+void BBSLocal::context() {
+#if BBSPOOL
+	// every worker executes it before its next todo
+	if (nworker_) {
+		contexts_->push_back(posting_);
+		posting_ = nil;
+		pool_serve_pending();
+	}
+#endif
+}
 
 void BBSLocal::perror(const char* s) {
 	hoc_execerror("BBSLocal error in ", s);
@@ -122,9 +589,15 @@ void BBSLocal::post(const char* key) {
 	server_->post(key, posting_);
 	Resource::unref(posting_);
 	posting_ = nil;
+#if BBSPOOL
+	if (nworker_) {
+		pool_serve_pending();
+	}
+#endif
 }
 
 bool BBSLocal::look_take(const char* key) {
+	pool_handle(false);
 	Resource::unref(taking_);
 	taking_ = nil;
 	bool b = server_->look_take(key, &taking_);
@@ -132,6 +605,7 @@ bool BBSLocal::look_take(const char* key) {
 }
 
 bool BBSLocal::look(const char* key) {
+	pool_handle(false);
 	Resource::unref(taking_);
 	taking_ = nil;
 	bool b = server_->look(key, &taking_);
@@ -141,13 +615,15 @@ bool BBSLocal::look(const char* key) {
 void BBSLocal::take(const char* key) { // blocking
 	int id;
 	for (;;) {
+		pool_handle(false);
 		Resource::unref(taking_);
 		taking_ = nil;
-		if (server_->look_take(key, &taking_)) {
+		if (server_->take(key, &taking_)) {
 			return;
-		} else if ((id = server_->look_take_todo(&taking_)) != 0) {
+		} else if (master_works_
+		    && (id = server_->look_take_todo(&taking_)) != 0) {
 			execute(id);
-		} else {
+		} else if (!pool_handle(true)) {
 			perror("take blocking");
 		}
 	}
@@ -157,6 +633,11 @@ void BBSLocal::post_todo(int parentid) {
 	server_->post_todo(parentid, posting_);
 	Resource::unref(posting_);
 	posting_ = nil;
+#if BBSPOOL
+	if (nworker_) {
+		pool_serve_pending();
+	}
+#endif
 }
 
 void BBSLocal::post_result(int id) {
@@ -166,23 +647,53 @@ void BBSLocal::post_result(int id) {
 }
 
 int BBSLocal::look_take_result(int pid) {
+	pool_handle(false);
 	Resource::unref(taking_);
 	taking_ = nil;
 	int id = server_->look_take_result(pid, &taking_);
 	return id;
 }
 
+int BBSLocal::master_take_result(int pid) {
+	for (;;) {
+		int id = look_take_result(pid);
+		if (id) {
+			return id;
+		}
+		if (!pool_handle(true)) {
+			perror("master_take_result blocking");
+		}
+	}
+}
+
 int BBSLocal::look_take_todo() {
+	pool_handle(false);
 	Resource::unref(taking_);
 	taking_ = nil;
 	int id = server_->look_take_todo(&taking_);
+	if (id == 0) {
+		// wait for the workers instead of spinning in working()
+		pool_handle(true);
+	}
 	return id;
 }
 
 int BBSLocal::take_todo() {
-	Resource::unref(taking_);
-	taking_ = nil;
-	int id = look_take_todo();
+	int id;
+	char* rs;
+	size_t n;
+	for (;;) {
+		Resource::unref(taking_);
+		taking_ = nil;
+		id = server_->take_todo(&taking_);
+		if (id != -1) {
+			break;
+		}
+		upkint(); // throw away userid
+		upkint(); // throw away info in reserved second slot for worker_id
+		rs = execute_helper(&n, -1);
+		if (rs) { delete [] rs; }
+	}
 	if (id == 0) {
 		perror("take_todo blocking");
 	}
@@ -212,9 +723,25 @@ void BBSLocal::return_args(int userid) {
 }
 
 void BBSLocal::done() {
+#if BBSPOOL
+	if (nworker_) {
+		pool_done();
+	}
+#endif
 	BBSImpl::done();
 }
 
+void BBSLocal::worker() {
+#if BBSPOOL
+	if (nhost_ > 1 && is_master_ && nworker_ == 0 && !done_) {
+		if (!pool_fork()) {
+			is_master_ = false;
+		}
+	}
+#endif
+	BBSImpl::worker();
+}
+
 void BBSLocal::start() {
 	if (started_) { return; }
 	BBSImpl::start();
@@ -7,7 +7,7 @@ class KeepArgs;
 
 class BBSLocal : public BBSImpl {
 public:
-	BBSLocal();
+	BBSLocal(int nhost = -1);
 	virtual ~BBSLocal();
 
 	virtual bool look(const char*);
@@ -33,6 +33,7 @@ public:
 	virtual void post_todo(int parentid);
 	virtual void post_result(int id);
 	virtual int look_take_result(int pid); // returns id, or 0 if nothing
+	virtual int master_take_result(int pid); // returns id
 	virtual int look_take_todo(); // returns id, or 0 if nothing
 	virtual int take_todo(); // returns id
 	virtual void save_args(int);
@@ -42,6 +43,7 @@ public:
 	
 	virtual void start();
 	virtual void done();
+	virtual void worker(); // forks the worker pool
 
 	virtual void perror(const char*);
 private:
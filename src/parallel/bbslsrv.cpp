@@ -176,6 +176,7 @@ int MessageValue::pkvec(int n, double* x) {
 	int i;
 	MessageItem* m = link();
 	m->type_ = VECTOR;
+	m->size_ = n;
 	m->u.pd = new double[n];
 	for (i=0; i < n; ++i) {
 		m->u.pd[i] = x[i];
@@ -249,6 +250,91 @@ int MessageValue::upkpickle(char* s, size_t* n) {
 	return 0;
 }
 
+// each item is the type followed by the value. Vectors and pickles
+// have their size first.
+char* MessageValue::bytes(size_t* size) {
+	MessageItem* mi;
+	size_t n = 0;
+	for (mi = first_; mi; mi = mi->next_) {
+		n += sizeof(int);
+		switch (mi->type_) {
+		case INT: n += sizeof(int); break;
+		case DOUBLE: n += sizeof(double); break;
+		case STRING: n += strlen(mi->u.s) + 1; break;
+		case VECTOR: n += sizeof(size_t) + mi->size_*sizeof(double); break;
+		case PICKLE: n += sizeof(size_t) + mi->size_; break;
+		}
+	}
+	char* buf = new char[n > 0 ? n : 1];
+	char* p = buf;
+	for (mi = first_; mi; mi = mi->next_) {
+		memcpy(p, &mi->type_, sizeof(int)); p += sizeof(int);
+		switch (mi->type_) {
+		case INT:
+			memcpy(p, &mi->u.i, sizeof(int)); p += sizeof(int);
+			break;
+		case DOUBLE:
+			memcpy(p, &mi->u.d, sizeof(double)); p += sizeof(double);
+			break;
+		case STRING:
+			strcpy(p, mi->u.s); p += strlen(mi->u.s) + 1;
+			break;
+		case VECTOR:
+			memcpy(p, &mi->size_, sizeof(size_t)); p += sizeof(size_t);
+			memcpy(p, mi->u.pd, mi->size_*sizeof(double));
+			p += mi->size_*sizeof(double);
+			break;
+		case PICKLE:
+			memcpy(p, &mi->size_, sizeof(size_t)); p += sizeof(size_t);
+			memcpy(p, mi->u.s, mi->size_); p += mi->size_;
+			break;
+		}
+	}
+	*size = n;
+	return buf;
+}
+
+int MessageValue::from_bytes(const char* buf, size_t size) {
+	const char* p = buf;
+	const char* end = buf + size;
+	int type, i;
+	double x;
+	size_t n;
+	while (p < end) {
+		memcpy(&type, p, sizeof(int)); p += sizeof(int);
+		switch (type) {
+		case INT:
+			memcpy(&i, p, sizeof(int)); p += sizeof(int);
+			pkint(i);
+			break;
+		case DOUBLE:
+			memcpy(&x, p, sizeof(double)); p += sizeof(double);
+			pkdouble(x);
+			break;
+		case STRING:
+			pkstr(p); p += strlen(p) + 1;
+			break;
+		case VECTOR: {
+			MessageItem* m;
+			memcpy(&n, p, sizeof(size_t)); p += sizeof(size_t);
+			m = link();
+			m->type_ = VECTOR;
+			m->size_ = n;
+			m->u.pd = new double[n];
+			memcpy(m->u.pd, p, n*sizeof(double));
+			p += n*sizeof(double);
+			} break;
+		case PICKLE:
+			memcpy(&n, p, sizeof(size_t)); p += sizeof(size_t);
+			pkpickle(p, n); p += n;
+			break;
+		default:
+			return -1;
+		}
+	}
+	return (p == end) ? 0 : -1;
+}
+
 BBSLocalServer::BBSLocalServer(){
 #if defined(HAVE_STL)
 	messages_ = new MessageList();
@@ -315,6 +401,14 @@ nostl();
 	return false;
 }
 
+bool BBSLocalServer::take(const char* key, MessageValue** val) {
+	return look_take(key, val);
+}
+
+int BBSLocalServer::take_todo(MessageValue** val) {
+	return look_take_todo(val);
+}
+
 void BBSLocalServer::post(const char* key, MessageValue* val) {
 #if defined(HAVE_STL)
 	MessageList::iterator m = messages_->insert(
@@ -40,6 +40,11 @@ public:
 	int pkvec(int, double*);
 	int pkstr(const char*);
 	int pkpickle(const char*, size_t);
+
+	// flat copy for sending to another process
+	// caller is responsible for delete [] of the returned buffer
+	char* bytes(size_t* size);
+	int from_bytes(const char*, size_t);
 private:
 	MessageItem* link();
 private:
@@ -54,14 +59,17 @@ public:
 	BBSLocalServer();
 	virtual ~BBSLocalServer();
 
-	void post(const char* key, MessageValue*);
-	bool look(const char* key, MessageValue**);
-	bool look_take(const char* key, MessageValue**);
+	virtual void post(const char* key, MessageValue*);
+	virtual bool look(const char* key, MessageValue**);
+	virtual bool look_take(const char* key, MessageValue**);
+	// blocking versions, only a worker process can wait
+	virtual bool take(const char* key, MessageValue**);
+	virtual int take_todo(MessageValue**); // -1 if context statement
 
-	void post_todo(int parentid, MessageValue*);
-	void post_result(int id, MessageValue*);
-	int look_take_todo(MessageValue**);
-	int look_take_result(int pid, MessageValue**);
+	virtual void post_todo(int parentid, MessageValue*);
+	virtual void post_result(int id, MessageValue*);
+	virtual int look_take_todo(MessageValue**);
+	virtual int look_take_result(int pid, MessageValue**);
 private:
 	MessageList* messages_;
 	WorkList* work_;
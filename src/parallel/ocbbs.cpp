@@ -28,7 +28,9 @@ extern "C" {
 	int BGLCheckpoint();
 #endif
 	extern void nrnmpi_source_var(), nrnmpi_target_var(), nrnmpi_setup_transfer();
+	extern int nrnmpi_source_var_bulk(), nrnmpi_target_var_bulk();
 	extern int nrnmpi_spike_compress(int nspike, bool gid_compress, int xchng_meth);
+	extern int nrnmpi_spike_exchange_auto(int ninterval, int verbose);
 	extern int nrnmpi_splitcell_connect(int that_host);
 	extern int nrnmpi_multisplit(Section*, double x, int sid, int backbonestyle);
 	extern int nrn_set_timeout(int timeout);
@@ -66,7 +68,11 @@ extern "C" {
 	extern int nrn_nthread;
 	extern void nrn_threads_create(int, int);
 	extern void nrn_thread_partition(int, Object*);
-	extern void nrn_thread_stat();
+	extern double nrn_thread_stat();
+	extern double nrn_thread_partition_auto(int);
+	extern int nrn_prof_;
+	extern int nrn_prof_set(int, int);
+	extern long nrn_prof_trace(const char*);
 	extern int nrn_allow_busywait(int);
 	extern int nrn_how_many_processors();
 	extern size_t nrnbbcore_write();
@@ -515,6 +521,27 @@ static double mech_time(void* v) {
 	return 0;
 }
 
+// profile(mode[, maxevent]): 0 off, 1 time and count the step phases and
+// mechanism functions of each thread, 2 also keep maxevent events per
+// thread for profile_trace. Returns the previous mode.
+static double profile(void* v) {
+	hoc_return_type_code = 1; // integer
+	if (!ifarg(1)) {
+		return nrn_prof_;
+	}
+	int mode = int(chkarg(1, 0, 2));
+	int maxevent = ifarg(2) ? int(chkarg(2, 0, 1e9)) : -1;
+	return nrn_prof_set(mode, maxevent);
+}
+
+static double profile_trace(void* v) {
+	long n = nrn_prof_trace(gargstr(1));
+	if (n < 0) {
+		hoc_execerror("could not open", gargstr(1));
+	}
+	return double(n);
+}
+
 static double prcellstate(void* v) {
 	nrn_prcellstate(int(*hoc_getarg(1)), hoc_gargstr(2));
 	return 0;
@@ -600,6 +627,18 @@ static double spcompress(void* v) {
 	return (double)nrnmpi_spike_compress(nspike, gid_compress, xchng_meth);
 }
 
+static double spexchange_auto(void* v) {
+	int ninterval = -1;
+	int verbose = 1;
+	if (ifarg(1)) {
+		ninterval = (int)chkarg(1, 0, 1e6);
+	}
+	if (ifarg(2)) {
+		verbose = (int)chkarg(2, 0, 1);
+	}
+	return (double)nrnmpi_spike_exchange_auto(ninterval, verbose);
+}
+
 static double splitcell_connect(void* v) {
 	int that_host = (int)chkarg(1, 0, nrnmpi_numprocs-1);
 	// also needs a currently accessed section that is the root of this_tree
@@ -713,6 +752,16 @@ static double target_var(void*) { // &target_variable, source_global_index
 	return 0.;
 }
 
+static double source_var_bulk(void*) { // sgids, List of SectionRef, indices, x [, "rangevar"]
+	// source_var for many sources at once. Returns the number registered.
+	return double(nrnmpi_source_var_bulk());
+}
+
+static double target_var_bulk(void*) { // sgids, List of POINT_PROCESS, indices, "rangevar"
+	// target_var for many targets at once. Returns the number registered.
+	return double(nrnmpi_target_var_bulk());
+}
+
 static double setup_transfer(void*) { // after all source/target and before init and run
 	nrnmpi_setup_transfer();
 	return 0.;
@@ -921,9 +970,12 @@ static double partition(void*) {
 	return 0.0;
 }
 
+static double partition_auto(void*) {
+	return nrn_thread_partition_auto(ifarg(1) ? int(chkarg(1, 0, 1)) : 1);
+}
+
 static double thread_stat(void*) {
-	nrn_thread_stat();
-	return 0.0;
+	return nrn_thread_stat();
 }
 
 static double thread_busywait(void*) {
@@ -1000,6 +1052,11 @@ static Object** gid_connect(void* v) {
 	return bbs->gid_connect(int(chkarg(1, 0, MD)));
 }
 
+static Object** gid_connect_bulk(void* v) {
+	OcBBS* bbs = (OcBBS*)v;
+	return bbs->gid_connect_bulk();
+}
+
 static Member_func members[] = {
 	"submit", submit,
 	"working", working,
@@ -1033,6 +1090,8 @@ static Member_func members[] = {
 	"integ_time", integ_time,
 	"vtransfer_time", vtransfer_time,
 	"mech_time", mech_time,
+	"profile", profile,
+	"profile_trace", profile_trace,
 	"timeout", set_timeout,
 
 	"set_gid2node", set_gid2node,
@@ -1047,11 +1106,14 @@ static Member_func members[] = {
 	"max_histogram", maxhist,
 	"checkpoint", checkpoint,
 	"spike_compress", spcompress,
+	"spike_exchange_auto", spexchange_auto,
 	"gid_clear", gid_clear,
 	"prcellstate", prcellstate,
 
 	"source_var", source_var,
 	"target_var", target_var,
+	"source_var_bulk", source_var_bulk,
+	"target_var_bulk", target_var_bulk,
 	"setup_transfer", setup_transfer,
 	"splitcell_connect", splitcell_connect,
 	"multisplit", multisplit,
@@ -1064,6 +1126,7 @@ static Member_func members[] = {
 
 	"nthread", nthrd,
 	"partition", partition,
+	"partition_auto", partition_auto,
 	"thread_stat", thread_stat,
 	"thread_busywait", thread_busywait,
 	"thread_how_many_proc", thread_how_many_proc,
@@ -1089,6 +1152,7 @@ static Member_ret_obj_func retobj_members[] = {
 	"gid2obj", gid2obj,
 	"gid2cell", gid2cell,
 	"gid_connect", gid_connect,
+	"gid_connect_bulk", gid_connect_bulk,
 	"upkpyobj", upkpyobj,
 	"pyret", pyret,
 	"py_alltoall", py_alltoall,
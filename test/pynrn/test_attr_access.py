@@ -0,0 +1,80 @@
+import sys
+import timeit
+
+from neuron import h
+
+
+def test_toplevel_attr():
+    h('attr_a = 0')
+    h.attr_a = 3
+    assert h.attr_a == 3
+    # a name seen before it is declared
+    assert not hasattr(h, 'attr_b')
+    h('attr_b = 4')
+    assert h.attr_b == 4
+    # built-in names, functions and templates
+    assert h.PI == h.PI
+    assert h.Vector(3).size() == 3
+
+
+def test_template_attr():
+    h('''begintemplate AttrA
+    public x, f
+    proc init() { x = 1 }
+    func f() { return x + 1 }
+    endtemplate AttrA''')
+    a = h.AttrA()
+    assert a.x == 1 and a.f() == 2
+    a.x = 5
+    assert a.x == 5 and a.f() == 6
+    # delay is del in the template
+    stim = h.NetStim()
+    nc = h.NetCon(stim, None)
+    nc.delay = 2
+    assert nc.delay == 2
+    # same name in another template
+    h('''begintemplate AttrB
+    public y, x
+    proc init() { x = 10 y = 20 }
+    endtemplate AttrB''')
+    b = h.AttrB()
+    assert b.x == 10 and b.y == 20 and a.x == 5
+    assert not hasattr(a, 'y')
+
+
+def test_segment_attr():
+    s = h.Section(name='attr')
+    s.insert('hh')
+    seg = s(0.5)
+    assert seg.hh.gnabar == seg.gnabar_hh
+    seg.gnabar_hh = 0.2
+    assert seg.gnabar_hh == 0.2 and s.gnabar_hh == 0.2
+    assert seg.diam == s.diam
+    assert not hasattr(seg, 'pas')
+
+
+def bench(number=200000):
+    """Time attribute access, run with python test_attr_access.py"""
+    h('attr_bench = 0')
+    s = h.Section(name='bench')
+    s.insert('hh')
+    seg = s(0.5)
+    vec = h.Vector(10)
+    env = {'h': h, 'seg': seg, 'vec': vec}
+    cases = [
+        ('h.attr_bench', 'h.attr_bench'),
+        ('h.attr_bench = 1', 'h.attr_bench = 1'),
+        ('h.t', 'h.t'),
+        ('vec.size', 'vec.size'),
+        ('seg.v', 'seg.v'),
+        ('seg.gnabar_hh', 'seg.gnabar_hh'),
+        ('seg.hh', 'seg.hh'),
+        ('seg.diam = 1', 'seg.diam = 1'),
+    ]
+    for name, stmt in cases:
+        t = min(timeit.repeat(stmt, globals=env, number=number, repeat=3))
+        print('%-20s %8.1f ns' % (name, 1e9 * t / number))
+
+
+if __name__ == '__main__':
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
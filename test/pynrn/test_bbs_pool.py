@@ -0,0 +1,150 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# submit tasks, nested submits from a task, a context statement and
+# post/take with the local bulletin board, serially and with a pool of
+# forked worker processes
+script = '''
+import json
+import os
+import sys
+from neuron import h
+pc = h.ParallelContext(int(sys.argv[1]))
+
+def square(i):
+    return i * i, int(pc.id_bbs()), os.getpid()
+
+def inner(i):
+    return i + 1
+
+def outer(i):
+    for j in range(3):
+        pc.submit(inner, 10 * i + j)
+    s = 0
+    while pc.working():
+        s += pc.pyret()
+    return s
+
+def setx(x):
+    global gx
+    gx = x
+
+def addx(i):
+    return gx + i
+
+result = {'nhost': pc.nhost_bbs()}
+pc.runworker()
+for i in range(40):
+    pc.submit(square, i)
+r = []
+while pc.working():
+    r.append(pc.pyret())
+result['square'] = sorted(x[0] for x in r)
+result['ids'] = sorted(set(x[1] for x in r))
+result['npid'] = len(set(x[2] for x in r))
+
+for i in range(8):
+    pc.submit(outer, i)
+result['nested'] = 0
+while pc.working():
+    result['nested'] += pc.pyret()
+
+pc.context(setx, 100)
+setx(100)
+for i in range(10):
+    pc.submit(addx, i)
+result['context'] = 0
+while pc.working():
+    result['context'] += pc.pyret()
+
+pc.post('key', 5)
+pc.take('key')
+result['take'] = pc.upkscalar()
+pc.done()
+print(json.dumps(result))
+'''
+
+# worker processes forked while the NEURON or the rxd thread pool exists
+# run simulations with those threads
+thread_script = '''
+import json
+import sys
+from neuron import h, rxd
+h.load_file('stdrun.hoc')
+pc = h.ParallelContext(2)
+secs = [h.Section(name='s%d' % i) for i in range(4)]
+for sec in secs:
+    sec.nseg = 5
+    sec.insert('hh')
+if sys.argv[-1] == 'rxd':
+    ecs = rxd.Extracellular(-50, -50, -50, 50, 50, 50, dx=10)
+    # not an ion of hh, whose ek would follow the zero concentrations
+    k = rxd.Species(ecs, d=1, name='x',
+                    initial=lambda nd: 1 if nd.x3d < 0 else 0)
+    rxd.nthread(2)
+else:
+    pc.nthread(2, 1)
+
+def job(i):
+    h.finitialize(-65)
+    h.continuerun(5)
+    c = k[ecs].states3d[4, 5, 5] if sys.argv[-1] == 'rxd' else 0
+    return secs[0](0.5).v, c, int(pc.id_bbs())
+
+pc.runworker()
+pc.master_works_on_jobs(0)
+for i in range(4):
+    pc.submit(job, i)
+r = []
+while pc.working():
+    r.append(pc.pyret())
+ref = job(0)
+pc.done()
+print(json.dumps({'r': r, 'ref': ref}))
+'''
+
+
+def run(nhost, env=None):
+    out = subprocess.check_output([sys.executable, '-c', script, str(nhost)],
+                                  env=env, timeout=300)
+    return json.loads(out.decode().strip().splitlines()[-1])
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='needs fork')
+def test_bbs_pool():
+    ref = run(1)
+    assert ref['nhost'] == 1 and ref['ids'] == [0] and ref['npid'] == 1
+    assert ref['square'] == [i * i for i in range(40)]
+    assert ref['nested'] == sum(10 * i + j + 1 for i in range(8)
+                                for j in range(3))
+    assert ref['context'] == sum(100 + i for i in range(10))
+    assert ref['take'] == 5
+
+    result = run(4)
+    assert result['nhost'] == 4
+    # the master works on jobs too, the tasks are spread over processes
+    assert len(result['ids']) > 1 and set(result['ids']) <= {0, 1, 2, 3}
+    assert result['npid'] == len(result['ids'])
+    for key in ('square', 'nested', 'context', 'take'):
+        assert result[key] == ref[key]
+
+    # the pool size from the environment
+    env = dict(os.environ, NRN_BBS_NHOST='3')
+    assert run(0, env)['nhost'] == 3
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='needs fork')
+@pytest.mark.parametrize('pool', ['nrn', 'rxd'])
+def test_bbs_pool_threads(pool):
+    out = subprocess.check_output([sys.executable, '-c', thread_script,
+                                   pool], timeout=300)
+    result = json.loads(out.decode().strip().splitlines()[-1])
+    assert len(result['r']) == 4
+    for v, c, id in result['r']:
+        # the master does not work on jobs
+        assert id == 1
+        assert [v, c] == result['ref'][:2]
@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+from neuron import h
+
+pc = h.ParallelContext()
+h.load_file('stdrun.hoc')
+
+
+# BBSaveState saves cells that are hoc objects
+h('''
+begintemplate BBSSCell
+public soma, syn, nc
+create soma
+objref syn, nc, nil
+proc init() {
+    soma {
+        L = diam = 20
+        insert hh
+        syn = new ExpSyn(0.5)
+        nc = new NetCon(&v(0.5), nil)
+    }
+}
+endtemplate BBSSCell
+''')
+
+
+def mkcell(gid):
+    cell = h.BBSSCell()
+    pc.set_gid2node(gid, pc.id())
+    pc.cell(gid, cell.nc)
+    return cell
+
+
+@pytest.fixture
+def ring():
+    """hh cells in a ring, the first driven by a NetStim"""
+    cells = [mkcell(gid) for gid in range(5)]
+    ncs = []
+    for gid, cell in enumerate(cells):
+        nc = pc.gid_connect((gid - 1) % len(cells), cell.syn)
+        nc.delay, nc.weight[0] = 1 + gid, 0.05
+        ncs.append(nc)
+    stim = h.NetStim()
+    stim.interval, stim.number, stim.start = 20, 1e9, 1
+    ncs.append(h.NetCon(stim, cells[0].syn, 0, 1, 0.05))
+    tvec, idvec = h.Vector(), h.Vector()
+    pc.spike_record(-1, tvec, idvec)
+    yield cells, tvec, idvec
+    pc.gid_clear()
+
+
+def state(cells, tvec, idvec, t0):
+    spikes = sorted((t, i) for t, i in zip(tvec, idvec) if t > t0)
+    return [c.soma(0.5).v for c in cells], [c.soma(0.5).m_hh for c in cells], \
+        spikes
+
+
+def test_bbsavestate_bin(ring, tmpdir):
+    cells, tvec, idvec = ring
+    path = str(tmpdir.join('bin'))
+    pc.set_maxstep(10)
+    h.finitialize(-65)
+    pc.psolve(30)
+    bbss = h.BBSaveState()
+    assert bbss.save_bin(path) == len(cells)
+    assert sorted(os.listdir(path)) == ['0', 'global']
+    pc.psolve(100)
+    ref = state(cells, tvec, idvec, 30)
+    assert len(ref[2]) > 10
+
+    # same number of ranks and gids, reads only the rank file
+    h.finitialize(-65)
+    assert h.BBSaveState().restore_bin(path) == len(cells)
+    assert abs(h.t - 30) < 1e-9
+    pc.psolve(100)
+    assert state(cells, tvec, idvec, 30) == ref
+
+    # the binary file is much smaller than the text format
+    h.finitialize(-65)
+    pc.psolve(30)
+    h.BBSaveState().save(str(tmpdir.join('state.txt')))
+    txt = os.path.getsize(str(tmpdir.join('state.txt')))
+    assert os.path.getsize(os.path.join(path, '0')) < txt / 2
+
+
+def test_bbsavestate_bin_subset(tmpdir):
+    """a model with fewer gids scans the index"""
+    path = str(tmpdir.join('bin'))
+    cells = [mkcell(gid) for gid in range(5)]
+    stims = [h.IClamp(c.soma(0.5)) for c in cells]
+    for i, stim in enumerate(stims):
+        stim.delay, stim.dur, stim.amp = 1, 1e9, 0.05 * i
+    h.finitialize(-65)
+    h.continuerun(10)
+    h.BBSaveState().save_bin(path)
+    ref = [(c.soma(0.5).v, c.soma(0.5).m_hh) for c in cells]
+    pc.gid_clear()
+    del cells, stims
+
+    # the point processes of a cell have to exist on restore
+    cells = {gid: mkcell(gid) for gid in (1, 3)}
+    stims = [h.IClamp(c.soma(0.5)) for c in cells.values()]
+    h.finitialize(-65)
+    assert h.BBSaveState().restore_bin(path) == 2
+    for gid, c in cells.items():
+        assert (c.soma(0.5).v, c.soma(0.5).m_hh) == ref[gid]
+    pc.gid_clear()
+    with pytest.raises(RuntimeError):
+        h.BBSaveState().restore_bin(str(tmpdir.join('none')))
@@ -0,0 +1,135 @@
+import sys
+import time
+
+import pytest
+
+from neuron import h
+
+pc = h.ParallelContext()
+
+def net(ncell, nstim, fanout, seed=1):
+    """IntFire1 cells driven by noisy NetStims, all delays different"""
+    r = h.Random(seed)
+    r.uniform(0, 1)
+    cells = [h.IntFire1() for i in range(ncell)]
+    for c in cells:
+        c.tau, c.refrac = 5, 2
+    stims = [h.NetStim() for i in range(nstim)]
+    for i, s in enumerate(stims):
+        s.interval, s.number, s.start, s.noise = 5, 1e9, 0, 1
+        s.noiseFromRandom123(seed, i, 0)
+    ncs = []
+    for s in stims:
+        for i in range(fanout):
+            nc = h.NetCon(s, cells[int(r.repick() * ncell)])
+            nc.delay, nc.weight[0] = 1 + 20 * r.repick(), 0.3
+            ncs.append(nc)
+    # recurrent connections with integral delays, many events at one time
+    for i, c in enumerate(cells):
+        nc = h.NetCon(c, cells[(i + 1) % ncell])
+        nc.delay, nc.weight[0] = 2, 0.5
+        ncs.append(nc)
+    tvec, idvec = h.Vector(), h.Vector()
+    for i, c in enumerate(cells):
+        h.NetCon(c, None).record(tvec, idvec, i)
+    return cells, stims, ncs, tvec, idvec
+
+
+def queue_state(calendar, cvode, lvardt):
+    """set the queue and integrator, returns a function that restores them"""
+    cv = h.CVode()
+    q, active, local = int(cv.queue_mode()), cv.active(), cv.use_local_dt()
+    cv.queue_mode(0, 0, calendar)
+    cv.active(cvode)
+    cv.use_local_dt(lvardt)
+    pc.set_maxstep(10)
+
+    def restore():
+        cv.queue_mode(q & 1, (q >> 1) & 1, (q >> 2) & 1)
+        cv.use_local_dt(local)
+        cv.active(active)
+    return restore
+
+
+def run(calendar, tstop, cvode=False, lvardt=False):
+    restore = queue_state(calendar, cvode, lvardt)
+    try:
+        h.finitialize(-65)
+        t0 = time.time()
+        pc.psolve(tstop)
+        elapsed = time.time() - t0
+        stat = h.Vector()
+        h.CVode().spike_stat(stat)
+    finally:
+        restore()
+    return elapsed, stat
+
+
+@pytest.mark.parametrize('cvode, lvardt', [(False, False), (True, False),
+                                           (True, True)])
+def test_calendar_queue(cvode, lvardt):
+    h.load_file('stdrun.hoc')
+    model = net(100, 50, 20)
+    tvec, idvec = model[-2:]
+    run(0, 200, cvode, lvardt)
+    t, ids = tvec.c(), idvec.c()
+    _, stat = run(1, 200, cvode, lvardt)
+    assert tvec.size() > 100
+    assert tvec.eq(t) and idvec.eq(ids)
+    assert h.CVode().queue_mode() == 0
+
+
+def test_calendar_queue_lvardt_cells():
+    """each cell of the local variable step method has an item in the queue
+    whose time changes on re_init and finitialize"""
+    secs, stims, ncs = [], [], []
+    tvec, idvec = h.Vector(), h.Vector()
+    for i in range(6):
+        sec = h.Section(name='calq%d' % i)
+        sec.L = sec.diam = 10
+        sec.insert('hh')
+        stim = h.IClamp(sec(0.5))
+        stim.delay, stim.dur, stim.amp = 1 + i, 1, 0.3
+        nc = h.NetCon(sec(0.5)._ref_v, None, sec=sec)
+        nc.record(tvec, idvec, i)
+        secs.append(sec)
+        stims.append(stim)
+        ncs.append(nc)
+
+    def spikes(calendar):
+        restore = queue_state(calendar, True, True)
+        try:
+            result = []
+            h.finitialize(-65)
+            pc.psolve(7.3)
+            h.CVode().re_init()
+            pc.psolve(40)
+            result.append(sorted(zip(tvec, idvec)))
+            h.finitialize(-65)
+            pc.psolve(20)
+            result.append(sorted(zip(tvec, idvec)))
+        finally:
+            restore()
+        return result
+
+    ref = spikes(0)
+    assert len(ref[0]) == 6
+    assert spikes(1) == ref
+
+
+def bench(ncell=1000, nstim=500, fanout=100, tstop=100):
+    """Compare the splay tree and calendar queue, run with
+    python test_event_queue.py [ncell nstim fanout tstop]"""
+    h.load_file('stdrun.hoc')
+    model = net(ncell, nstim, fanout)
+    tvec = model[-2]
+    for calendar in (0, 1):
+        elapsed, stat = run(calendar, tstop)
+        print('%-8s %7.3f s  spikes=%d insertions=%d moves=%d removals=%d'
+              % ('calendar' if calendar else 'splay', elapsed, tvec.size(),
+                 stat[8], stat[9], stat[10]))
+        h.CVode().statistics()
+
+
+if __name__ == '__main__':
+    bench(*[int(arg) for arg in sys.argv[1:]])
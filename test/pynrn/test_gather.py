@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+import neuron
+from neuron import h
+
+
+@pytest.fixture
+def cell():
+    soma = h.Section(name='soma')
+    dend = h.Section(name='dend')
+    dend.connect(soma)
+    soma.nseg = 3
+    dend.nseg = 5
+    dend.L = 200
+    soma.insert('hh')
+    dend.insert('pas')
+    sl = h.SectionList()
+    sl.append(sec=soma)
+    sl.append(sec=dend)
+    yield soma, dend, sl
+
+
+def test_gather(cell):
+    soma, dend, sl = cell
+    for i, seg in enumerate(dend):
+        seg.diam = i + 1
+    diam = neuron.gather('diam', sl)
+    assert diam.tolist() == [seg.diam for sec in sl for seg in sec]
+    assert neuron.gather('v', [dend]).tolist() == [seg.v for seg in dend]
+    gnabar = neuron.gather('hh.gnabar', [soma])
+    assert gnabar.tolist() == [seg.hh.gnabar for seg in soma]
+    assert neuron.gather('gnabar_hh', [soma]).tolist() == gnabar.tolist()
+    assert neuron.gather('na_ion.ena', [soma]).tolist() == [seg.ena for seg in soma]
+    assert len(neuron.gather('diam')) == sum(sec.nseg for sec in h.allsec())
+    assert neuron.gather('diam', [dend], x=[0, 1]).tolist() == [1, 5]
+
+
+def test_scatter(cell):
+    soma, dend, sl = cell
+    neuron.scatter('pas.g', [dend], np.arange(5) * 1e-4)
+    assert [seg.pas.g for seg in dend] == (np.arange(5) * 1e-4).tolist()
+    neuron.scatter('diam', sl, 2.0)
+    assert all(seg.diam == 2 for sec in sl for seg in sec)
+    # area is recomputed after a diam change
+    assert abs(soma(0.5).area() - np.pi * 2 * soma.L / 3) < 1e-9
+    neuron.scatter('v', sl, -70, x=[0.5])
+    assert soma(0.5).v == dend(0.5).v == -70
+
+
+def test_gather_errors(cell):
+    soma, dend, sl = cell
+    with pytest.raises(AttributeError):
+        neuron.gather('nothing', sl)
+    with pytest.raises(AttributeError):
+        neuron.gather('hh.gnabar', sl)
+    with pytest.raises(ValueError):
+        neuron.scatter('diam', sl, [1, 2])
+    with pytest.raises(ValueError):
+        neuron.gather('diam', sl, x=[2])
+    with pytest.raises(TypeError):
+        neuron.gather('diam', [soma(0.5)])
@@ -0,0 +1,82 @@
+import pytest
+
+from neuron import h
+
+pc = h.ParallelContext()
+
+
+@pytest.fixture
+def cells():
+    # gids may be left by other tests
+    pc.gid_clear()
+    try:
+        cells = [h.IntFire1() for i in range(10)]
+        for gid, cell in enumerate(cells):
+            cell.tau, cell.refrac = 5, 2
+            pc.set_gid2node(gid, pc.id())
+            pc.cell(gid, h.NetCon(cell, None))
+        yield cells
+    finally:
+        pc.gid_clear()
+
+
+def run(tstop):
+    spikes, gids = h.Vector(), h.Vector()
+    pc.spike_record(-1, spikes, gids)
+    pc.set_maxstep(10)
+    h.finitialize(-65)
+    pc.psolve(tstop)
+    return spikes.to_python(), gids.to_python()
+
+
+def test_gid_connect_bulk(cells):
+    stim = h.NetStim()
+    stim.interval, stim.number, stim.start = 10, 5, 1
+    ncstim = h.NetCon(stim, cells[0])
+    ncstim.weight[0] = 2
+    n = len(cells)
+    src = [i for i in range(n) for j in (1, 3)]
+    tar = [(i + j) % n for i in range(n) for j in (1, 3)]
+    w = [1.5 if j == 1 else 0.2 for i in range(n) for j in (1, 3)]
+    delay = [1 + 0.1 * i for i in range(len(src))]
+
+    ncs = [pc.gid_connect(s, cells[t]) for s, t in zip(src, tar)]
+    for nc, wi, d in zip(ncs, w, delay):
+        nc.weight[0], nc.delay = wi, d
+    ref = run(100)
+    assert len(ref[0]) > n
+    del ncs, nc
+
+    targets = h.List()
+    for cell in cells:
+        targets.append(cell)
+    ncl = pc.gid_connect_bulk(h.Vector(src), targets, h.Vector(tar),
+                              h.Vector(w), h.Vector(delay))
+    assert ncl.count() == len(src)
+    assert ncl.o(3).srcgid() == src[3] and ncl.o(3).syn() == cells[tar[3]]
+    assert ncl.o(3).weight[0] == w[3] and ncl.o(3).delay == delay[3]
+    assert run(100) == ref
+
+    # appended to a given List, thresholds of sources on this rank
+    ncl2 = pc.gid_connect_bulk(h.Vector([0, 1]), targets, h.Vector([5, 5]),
+                               h.Vector([0.1]), h.Vector([2]),
+                               h.Vector([0.5, 0.7]), ncl)
+    assert ncl2.count() == len(src) + 2 and ncl2.o(len(src)).delay == 2
+    assert pc.threshold(0) == 0.5 and pc.threshold(1) == 0.7
+
+
+def test_gid_connect_bulk_errors(cells):
+    targets = h.List()
+    targets.append(cells[0])
+    v = h.Vector
+    with pytest.raises(RuntimeError):
+        pc.gid_connect_bulk(v([0, 1]), targets, v([0]), v([1]), v([1]))
+    with pytest.raises(RuntimeError):
+        pc.gid_connect_bulk(v([0]), targets, v([1]), v([1]), v([1]))
+    with pytest.raises(RuntimeError):
+        pc.gid_connect_bulk(v([0, 1]), targets, v([0, 0]), v([1, 2, 3]),
+                            v([1]))
+    s = h.Section(name='bulk')
+    targets.append(h.IClamp(s(0.5)))
+    with pytest.raises(RuntimeError):
+        pc.gid_connect_bulk(v([0]), targets, v([0]), v([1]), v([1]))
@@ -0,0 +1,119 @@
+import json
+import subprocess
+import sys
+import time
+
+import pytest
+
+from neuron import h
+
+pc = h.ParallelContext()
+
+
+def cell(i, nbranch, nseg):
+    """soma with nbranch dendrites, the first one branching again"""
+    soma = h.Section(name='soma%d' % i)
+    soma.L = soma.diam = 20
+    soma.insert('hh')
+    dends = []
+    for j in range(nbranch):
+        d = h.Section(name='dend%d_%d' % (i, j))
+        d.L, d.diam, d.nseg = 200, 1, nseg
+        d.insert('pas')
+        d.connect(soma(1 if j % 2 else 0))
+        dends.append(d)
+    for j in range(2):
+        d = h.Section(name='tip%d_%d' % (i, j))
+        d.L, d.diam, d.nseg = 100, 0.5, nseg
+        d.insert('pas')
+        d.connect(dends[0](1))
+        dends.append(d)
+    stim = h.IClamp(soma(0.5))
+    stim.delay, stim.dur, stim.amp = 1, 20, 1 + 0.05 * i
+    return soma, dends, stim
+
+
+def run(cells, interleave, cvode=False, tstop=20):
+    h.CVode().cache_efficient(1, interleave)
+    h.CVode().active(cvode)
+    # with cvode, at the same times for different step sequences
+    dt = (0.1,) if cvode else ()
+    vs = [h.Vector().record(c[0](0.5)._ref_v, *dt) for c in cells]
+    vs += [h.Vector().record(c[1][-1](0.9)._ref_v, *dt) for c in cells]
+    h.finitialize(-65)
+    t0 = time.time()
+    h.continuerun(tstop)
+    elapsed = time.time() - t0
+    h.CVode().active(0)
+    h.CVode().cache_efficient(0)
+    return elapsed, [v.to_python() for v in vs]
+
+
+def check(nthread, cvode):
+    """the results in classical, interleaved and again classical order and
+    the node order after cache_efficient(1) without the interleave arg"""
+    h.load_file('stdrun.hoc')
+    # identical and different cells
+    cells = [cell(i, 3 + i % 3, 3 + 2 * (i % 2)) for i in range(10)]
+    segs = [seg for c in cells for sec in [c[0]] + c[1] for seg in sec]
+    result = {}
+    pc.nthread(nthread)
+    try:
+        result['ref'] = run(cells, 0, cvode)[1]
+        result['interleaved'] = run(cells, 1, cvode)[1]
+        result['classical'] = run(cells, 0, cvode)[1]
+        # cache_efficient(1) keeps the order, cache_efficient(0) resets it
+        order = {}
+        for name, args in (('classical', (1, 0)), ('interleaved', (1, 1)),
+                           ('kept', (1,)), ('reset', (0,)), ('off', (1,))):
+            h.CVode().cache_efficient(*args)
+            h.finitialize(-65)
+            order[name] = [seg.node_index() for seg in segs]
+        result['order'] = order
+    finally:
+        h.CVode().cache_efficient(0)
+        pc.nthread(1)
+    return result
+
+
+# Run in its own process, sections left by other tests would be part of
+# the model.
+@pytest.mark.parametrize('nthread, cvode', [(1, False), (3, False),
+                                            (1, True)])
+def test_interleave(nthread, cvode):
+    out = subprocess.check_output([sys.executable, __file__, 'check',
+                                   str(nthread), str(int(cvode))],
+                                  timeout=300)
+    r = json.loads(out.decode().strip().splitlines()[-1])
+    ref = r['ref']
+    assert max(ref[0]) > 0
+    if cvode:
+        # the order of the state vector changes the error norm sums
+        assert all(abs(x - y) < 1e-6 for v, vref in zip(r['interleaved'], ref)
+                   for x, y in zip(v, vref))
+    else:
+        assert r['interleaved'] == ref
+    # back to the classical order
+    assert r['classical'] == ref
+    order = r['order']
+    assert order['interleaved'] != order['classical']
+    assert order['kept'] == order['interleaved']
+    assert order['off'] == order['classical']
+
+
+def bench(ncell=2000, tstop=100):
+    """Compare classical and interleaved order for many identical cells,
+    run with python test_interleave.py [ncell tstop]"""
+    h.load_file('stdrun.hoc')
+    cells = [cell(i, 4, 5) for i in range(ncell)]
+    for interleave in (0, 1):
+        elapsed, _ = run(cells, interleave, tstop=tstop)
+        print('%-12s %7.3f s' % ('interleaved' if interleave else 'classical',
+                                 elapsed))
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['check']:
+        print(json.dumps(check(int(sys.argv[2]), bool(int(sys.argv[3])))))
+    else:
+        bench(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+import neuron
+from neuron import h
+
+
+@pytest.fixture
+def cells():
+    cvode = h.CVode()
+    cvode.cache_efficient(1)
+    secs = [h.Section(name='s%d' % i) for i in range(3)]
+    for sec in secs:
+        sec.nseg = 3
+        sec.insert('hh')
+    syn = h.ExpSyn(secs[1](0.5))
+    h.finitialize(-65)
+    yield secs, syn
+    cvode.cache_efficient(0)
+
+
+def test_memb_list_view(cells):
+    secs, syn = cells
+    segs = [seg for sec in h.allsec() if sec.has_membrane('hh') for seg in sec]
+    m = neuron.MembListData('hh.m')
+    assert len(m) == len(segs)
+    assert sorted(m.data.tolist()) == sorted(seg.hh.m for seg in segs)
+    # writes go to the model
+    m.data[:] = np.arange(len(m)) * 0.1
+    assert sorted(seg.hh.m for seg in segs) == \
+        (np.arange(len(m)) * 0.1).tolist()
+    assert neuron.MembListData('m_hh').data.tolist() == m.data.tolist()
+    # one node per instance
+    g = neuron.MembListData('hh.gnabar')
+    assert g.nodeindices.tolist() == m.nodeindices.tolist()
+    assert len(set(m.nodeindices.tolist())) == len(m)
+    # point processes
+    syn.tau = 3
+    tau = neuron.MembListData('ExpSyn.tau')
+    assert 3 in tau.data.tolist()
+
+
+def test_memb_list_invalid(cells):
+    secs, syn = cells
+    m = neuron.MembListData('hh.m')
+    assert m.valid
+    n = len(m)
+    secs[0].nseg = 5
+    assert not m.valid
+    with pytest.raises(RuntimeError):
+        m.data
+    h.finitialize(-65)
+    assert len(neuron.MembListData('hh.m')) == n + 2
+    with pytest.raises(RuntimeError):
+        m.nodeindices
+    with pytest.raises(AttributeError):
+        neuron.MembListData('hh.nothing')
+    with pytest.raises(ValueError):
+        neuron.MembListData('diam')
+
+
+def test_memb_list_refetch(cells):
+    """arrays are dropped before a structure change and fetched again"""
+    secs, syn = cells
+    m = neuron.MembListData('hh.gnabar')
+    data = m.data
+    data[:] = 0.2
+    del data
+    secs[2].nseg = 1
+    h.finitialize(-65)
+    with pytest.raises(RuntimeError):
+        m.data
+    m = neuron.MembListData('hh.gnabar')
+    assert m.valid
+    data = m.data
+    data[:] = 0.3
+    assert [seg.hh.gnabar for sec in secs for seg in sec] == [0.3] * 7
+    del data
+
+
+def test_memb_list_stale(cells):
+    """arrays held across a structure change no longer follow the model"""
+    secs, syn = cells
+    m = neuron.MembListData('hh.gnabar')
+    n = len(m)
+    data = m.data
+    nodeindices = m.nodeindices
+    secs[0].nseg = 5
+    h.finitialize(-65)
+    with pytest.raises(RuntimeError):
+        m.data
+    # the old memory is kept, so this is safe but does not reach the model
+    data[:] = 0.5
+    assert data.tolist() == [0.5] * n
+    assert len(nodeindices) == n
+    gnabar = [seg.hh.gnabar for sec in h.allsec() if sec.has_membrane('hh')
+              for seg in sec]
+    assert len(gnabar) == n + 2 and 0.5 not in gnabar
+    m = neuron.MembListData('hh.gnabar')
+    assert sorted(m.data.tolist()) == sorted(gnabar)
+    del data, nodeindices
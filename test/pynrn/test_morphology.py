@@ -0,0 +1,75 @@
+import numpy as np
+
+from neuron import h, morphology
+
+
+def test_morphology():
+    soma = h.Section(name='soma')
+    soma.pt3dadd(0, 0, 0, 10)
+    soma.pt3dadd(10, 0, 0, 10)
+    dend = h.Section(name='dend')
+    dend.pt3dadd(10, 0, 0, 2)
+    dend.pt3dadd(10, 30, 0, 1)
+    dend.pt3dadd(10, 30, 40, 1)
+    dend.nseg = 5
+    dend.connect(soma(1))
+    axon = h.Section(name='axon')
+    axon.L, axon.diam = 100, 1
+    axon.connect(soma(0), 1)
+    secs = [soma, dend, axon]
+
+    m = morphology(secs)
+    assert m['sections'] == secs
+    assert m['parent'].tolist() == [-1, 0, 0]
+    assert np.isnan(m['parentx'][0]) and m['parentx'][1:].tolist() == [1, 0]
+    assert m['orientation'].tolist() == [0, 0, 1]
+    assert np.allclose(m['L'], [sec.L for sec in secs])
+    assert m['nseg'].tolist() == [1, 5, 1]
+    assert m['pt3d_offset'].tolist() == [0, 2, 5, 5]
+    pts = [[sec.x3d(i), sec.y3d(i), sec.z3d(i), sec.arc3d(i), sec.diam3d(i)]
+           for sec in secs for i in range(sec.n3d())]
+    assert np.allclose(m['pt3d'], pts)
+    assert m['seg_offset'].tolist() == [0, 1, 6, 7]
+    segs = [seg for sec in secs for seg in sec]
+    assert np.allclose(m['seg_x'], [seg.x for seg in segs])
+    assert np.allclose(m['seg_area'], [seg.area() for seg in segs])
+    assert np.allclose(m['seg_diam'], [seg.diam for seg in segs])
+    # dend centers are at arc 7, 21, 35, 49, 63 along 30 um in y then z
+    assert np.allclose(m['seg_xyz'][1:6], [[10, 7, 0], [10, 21, 0],
+                       [10, 30, 5], [10, 30, 19], [10, 30, 33]])
+    assert np.isnan(m['seg_xyz'][6]).all()
+
+    # parents outside of the list
+    m = morphology([dend])
+    assert m['parent'].tolist() == [-1] and m['parentx'].tolist() == [1]
+    assert len(morphology()['sections']) == len(list(h.allsec()))
+
+
+def test_morphology_reversed():
+    """segment values follow x also for a section connected at its 1 end"""
+    a = h.Section(name='a')
+    b = h.Section(name='b')
+    b.connect(a(1), 1)
+    b.L, b.nseg = 30, 3
+    for seg, d in zip(b, [1, 2, 3]):
+        seg.diam = d
+    m = morphology([a, b])
+    assert m['orientation'].tolist() == [0, 1]
+    assert m['seg_diam'][1:].tolist() == [1, 2, 3]
+    assert np.allclose(m['seg_area'][1:], [seg.area() for seg in b])
+    assert np.allclose(m['seg_x'][1:], [seg.x for seg in b])
+
+
+def test_morphology_reversed_3d():
+    """segment centers of a section with 3-d points connected at its 1 end"""
+    a = h.Section(name='a')
+    b = h.Section(name='b')
+    b.connect(a(1), 1)
+    b.pt3dadd(0, 0, 0, 1)
+    b.pt3dadd(30, 0, 0, 5)
+    b.nseg = 3
+    m = morphology([a, b])
+    # x = 0 is at the last 3-d point
+    assert np.allclose(m['seg_diam'][1:], [seg.diam for seg in b])
+    assert m['seg_diam'][1] > m['seg_diam'][3]
+    assert np.allclose(m['seg_xyz'][1:], [[25, 0, 0], [15, 0, 0], [5, 0, 0]])
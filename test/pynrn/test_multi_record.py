@@ -0,0 +1,148 @@
+import numpy as np
+import pytest
+
+from neuron import h, MultiRecorder, RecordFile
+
+
+@pytest.fixture
+def cell():
+    soma = h.Section(name='soma')
+    soma.insert('hh')
+    dend = h.Section(name='dend')
+    dend.nseg = 3
+    dend.insert('pas')
+    dend.connect(soma)
+    stim = h.IClamp(soma(0.5))
+    stim.delay, stim.dur, stim.amp = 1, 5, 0.5
+    try:
+        yield [soma, dend]
+    finally:
+        h.CVode().active(False)
+        pc = h.ParallelContext()
+        pc.partition()
+        pc.nthread(1)
+
+
+def run(tstop):
+    h.finitialize(-65)
+    while h.t < tstop - h.dt / 2:
+        h.fadvance()
+
+
+def reference(pointers, dt):
+    vecs = [h.Vector() for p in pointers]
+    for v, p in zip(vecs, pointers):
+        v.record(p, dt)
+    return vecs
+
+
+def test_multi_record_pointers(cell):
+    soma, dend = cell
+    pointers = [h._ref_t, soma(0.5)._ref_v, soma(0.5).hh._ref_m,
+                dend(0.9)._ref_v]
+    rec = MultiRecorder(pointers, 0.1, capacity=51)
+    ref = reference(pointers, 0.1)
+    run(5)
+    assert len(rec) == 4
+    assert rec.data.shape == (len(ref[0]), 4)
+    for j, v in enumerate(ref):
+        assert np.array_equal(rec.data[:, j], v)
+    assert np.allclose(rec.t, rec.data[:, 0])
+    # a new run starts over
+    run(2)
+    assert rec.data.shape == (len(ref[0]), 4)
+
+
+def test_multi_record_rangevar(cell):
+    soma, dend = cell
+    rec = MultiRecorder('v', 0.25, sections=cell)
+    ref = reference([seg._ref_v for sec in cell for seg in sec], 0.25)
+    run(5)
+    assert len(rec) == 4
+    for j, v in enumerate(ref):
+        assert np.array_equal(rec.data[:, j], v)
+    rec = MultiRecorder('v', 0.25, sections=[dend], x=[0, 1])
+    assert len(rec) == 2
+    with pytest.raises(AttributeError):
+        MultiRecorder('nonsense', 0.25, sections=cell)
+    with pytest.raises(ValueError):
+        MultiRecorder('v', 0, sections=cell)
+    with pytest.raises(TypeError):
+        MultiRecorder([1.0], 0.25)
+
+
+@pytest.mark.parametrize('nthread, cvode', [(1, True), (2, False)])
+def test_multi_record_solvers(cell, nthread, cvode):
+    soma, dend = cell
+    h.CVode().active(cvode)
+    pointers = [soma(0.5)._ref_v, dend(0.5)._ref_v]
+    # Vector.record(&var, dt) samples on thread 0, so the reference is
+    # recorded with one thread. The fixed step results do not depend on it.
+    ref = reference(pointers, 0.5)
+    run(5)
+    ref = [v.to_python() for v in ref]
+    h.ParallelContext().nthread(nthread)
+    rec = MultiRecorder(pointers, 0.5)
+    run(5)
+    for j, v in enumerate(ref):
+        assert np.array_equal(rec.data[:, j], v)
+
+
+def test_multi_record_threads(cell, tmpdir):
+    """variables of two threads are sampled by their own threads"""
+    soma, dend = cell
+    other = h.Section(name='other')
+    other.insert('hh')
+    stim = h.IClamp(other(0.5))
+    stim.delay, stim.dur, stim.amp = 2, 5, 0.3
+    pointers = [h._ref_t, soma(0.5)._ref_v, other(0.5)._ref_v,
+                dend(0.5)._ref_v, other(0.5).hh._ref_m]
+    ref = MultiRecorder(pointers, 0.25)
+    run(10)
+    ref = ref.data.copy()
+    pc = h.ParallelContext()
+    pc.nthread(2)
+    # other in thread 1, all the other cells in thread 0
+    sl = [h.SectionList() for i in range(2)]
+    for sec in h.allsec():
+        if sec.parentseg() is None:
+            sl[sec == other].append(sec=sec)
+    for i in range(2):
+        pc.partition(i, sl[i])
+    rec = MultiRecorder(pointers, 0.25)
+    path = str(tmpdir.join('threads.dat'))
+    streamed = MultiRecorder(pointers, 0.25, path=path, chunk=3)
+    run(10)
+    assert np.array_equal(rec.data, ref)
+    assert np.array_equal(streamed.data, ref)
+    # a new run starts over
+    run(1)
+    n = len(rec.data)
+    assert 0 < n < len(ref) and np.array_equal(rec.data, ref[:n])
+    streamed.close()
+
+
+def test_multi_record_stream(cell, tmpdir):
+    soma, dend = cell
+    path = str(tmpdir.join('v.dat'))
+    rec = MultiRecorder('v', 0.1, sections=cell, path=path, chunk=7)
+    mem = MultiRecorder('v', 0.1, sections=cell)
+    run(5)
+    assert np.array_equal(rec.data, mem.data)
+    assert len(rec.vector) == 0
+    f = RecordFile(path)
+    assert f.labels == ['soma(0.5).v', 'dend(0.166667).v',
+                        'dend(0.5).v', 'dend(0.833333).v']
+    assert f.dt == 0.1
+    assert np.array_equal(f.data, mem.data)
+    assert np.allclose(f.t, rec.t)
+    # a new run starts the file over
+    run(1)
+    assert np.array_equal(rec.data, mem.data)
+    # closed, the file keeps the last run
+    ref = mem.data.copy()
+    rec.close()
+    run(2)
+    assert np.array_equal(RecordFile(path).data, ref)
+    with pytest.raises(ValueError):
+        RecordFile(__file__)
@@ -0,0 +1,69 @@
+import os
+import re
+import subprocess
+import sys
+
+# Run in its own process, the files describe every cell of the model,
+# including any left by other tests.
+script = '''
+import sys
+from neuron import h
+
+pc = h.ParallelContext()
+path, parallel = sys.argv[-2], int(sys.argv[-1])
+
+# hh cells in a ring, an artificial cell and a Vector.play
+cells = []
+for gid in range(6):
+    soma = h.Section(name='bbw_soma%d' % gid)
+    soma.insert('hh')
+    dend = h.Section(name='bbw_dend%d' % gid)
+    dend.connect(soma(1))
+    dend.nseg = 3
+    dend.insert('pas')
+    syn = h.ExpSyn(dend(0.5))
+    pc.set_gid2node(gid, pc.id())
+    nc = h.NetCon(soma(0.5)._ref_v, None, sec=soma)
+    pc.cell(gid, nc)
+    cells.append((soma, dend, syn, nc))
+ncs = [pc.gid_connect((gid + 1) % 6, c[2]) for gid, c in enumerate(cells)]
+for nc in ncs:
+    nc.delay, nc.weight[0] = 2, 0.01
+stim = h.NetStim()
+stim.number = 3
+ncs.append(h.NetCon(stim, cells[0][2], 0, 1, 0.02))
+ic = h.IClamp(cells[2][0](0.5))
+ic.dur = 1
+tvec, yvec = h.Vector([0, 1, 2]), h.Vector([0, 0.1, 0])
+yvec.play(ic._ref_amp, tvec, 1)
+
+h.CVode().cache_efficient(1)
+pc.nthread(3, parallel)
+h.finitialize(-65)
+pc.nrnbbcore_write(path)
+'''
+
+
+def write(path, parallel):
+    subprocess.check_call([sys.executable, '-c', script, path,
+                           str(parallel)], timeout=300)
+    files = {}
+    for name in os.listdir(path):
+        with open(os.path.join(path, name), 'rb') as f:
+            files[name] = f.read()
+    return files
+
+
+def test_nrnbbcore_write(tmpdir):
+    serial = write(str(tmpdir.join('serial')), 0)
+    # the threads write their cell groups concurrently
+    threaded = write(str(tmpdir.join('threaded')), 1)
+    assert threaded == serial
+    with open(str(tmpdir.join('serial', 'files.dat'))) as f:
+        groups = [int(x) for x in f.read().split()[2:]]
+    assert len(groups) == 3
+    for gid in groups:
+        # the arrays of each cell group are numbered from 0
+        data = serial['%d_1.dat' % gid] + serial['%d_2.dat' % gid]
+        marks = [int(x) for x in re.findall(rb'chkpnt (\d+)\n', data)]
+        assert marks == list(range(len(marks))) and marks
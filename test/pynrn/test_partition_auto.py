@@ -0,0 +1,75 @@
+import json
+import subprocess
+import sys
+
+# Run in its own process: the thread balance depends on every section of
+# the model, including those left by other tests.
+script = '''
+import json
+from neuron import h
+pc = h.ParallelContext()
+h.load_file('stdrun.hoc')
+
+# the first four cells are much more expensive than the others
+cells = []
+for i in range(16):
+    soma = h.Section(name='soma%d' % i)
+    soma.L = soma.diam = 20
+    if i < 4:
+        soma.nseg = 51
+        soma.insert('hh')
+    else:
+        soma.insert('pas')
+    stim = h.IClamp(soma(0.5))
+    stim.delay, stim.dur, stim.amp = 1, 5, 0.1 + 0.01 * i
+    cells.append((soma, stim))
+
+def run():
+    vs = [h.Vector().record(s(0.5)._ref_v) for s, _ in cells]
+    h.finitialize(-65)
+    h.continuerun(10)
+    return [v.to_python() for v in vs]
+
+result = {}
+pc.nthread(4)
+try:
+    ref = run()
+    # by default each thread gets a block of cells, all the hh in thread 0
+    result['before'] = pc.thread_stat()
+    result['auto'] = pc.partition_auto()
+    result['auto_stat'] = pc.thread_stat()
+    result['auto_same'] = run() == ref
+
+    # measured mechanism times
+    pc.mech_time()
+    run()
+    result['measured'] = pc.partition_auto(1)
+    result['measured_same'] = run() == ref
+
+    # user partition is replaced, off is round robin again
+    sl = [h.SectionList() for i in range(4)]
+    for i, (s, _) in enumerate(cells):
+        sl[i // 4].append(sec=s)
+    for i in range(4):
+        pc.partition(i, sl[i])
+    result['user'] = pc.thread_stat()
+    result['user_auto'] = pc.partition_auto()
+    result['off'] = pc.partition_auto(0)
+finally:
+    pc.partition_auto(0)
+    pc.nthread(1)
+print(json.dumps(result))
+'''
+
+
+def test_partition_auto():
+    out = subprocess.check_output([sys.executable, '-c', script], timeout=300)
+    result = json.loads(out.decode().strip().splitlines()[-1])
+    assert result['before'] > 2
+    assert result['auto'] < 1.5 and result['auto'] == result['auto_stat']
+    assert result['auto_same']
+    assert result['measured'] < 1.5
+    assert result['measured_same']
+    assert result['user'] > 2
+    assert result['user_auto'] < 1.5
+    assert result['off'] > 2
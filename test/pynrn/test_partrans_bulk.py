@@ -0,0 +1,156 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from neuron import h
+
+# hh cells whose ExpSyn reversal potentials are the soma v and m_hh of
+# other cells, registered one call at a time or in bulk. Several targets
+# share a source. The soma voltages of all cells are printed by rank 0.
+script = '''
+import json
+import sys
+from neuron import h
+pc = h.ParallelContext()
+rank, nhost = int(pc.id()), int(pc.nhost())
+bulk = sys.argv[-1] == 'bulk'
+ncell = 8
+cells = {}
+for gid in range(rank, ncell, nhost):
+    soma = h.Section(name='soma%d' % gid)
+    soma.L = soma.diam = 20
+    soma.insert('hh')
+    dend = h.Section(name='dend%d' % gid)
+    dend.connect(soma(1))
+    dend.nseg, dend.L = 3, 100
+    dend.insert('pas')
+    syns = [h.ExpSyn(dend(0.9)), h.ExpSyn(soma(0.5)), h.ExpSyn(soma(0.5))]
+    stim = h.NetStim()
+    stim.number, stim.start, stim.interval = 5, 1 + gid, 3
+    ncs = [h.NetCon(stim, s, 0, 0, 0.005) for s in syns]
+    cells[gid] = soma, dend, syns, stim, ncs
+
+def vsrc(gid):
+    return (gid + 1) % ncell
+
+def msrc(gid):
+    return ncell + (gid + 3) % ncell
+
+gids = sorted(cells)
+if bulk:
+    secs, pps = h.List(), h.List()
+    for gid in gids:
+        secs.append(h.SectionRef(sec=cells[gid][0]))
+        for syn in cells[gid][2]:
+            pps.append(syn)
+    idx = h.Vector(range(len(gids)))
+    x = h.Vector(len(gids)).fill(0.5)
+    assert pc.source_var_bulk(h.Vector(gids), secs, idx, x) == len(gids)
+    assert pc.source_var_bulk(h.Vector([ncell + g for g in gids]), secs,
+                              idx, x, 'm_hh') == len(gids)
+    vidx = [3 * i + j for i in range(len(gids)) for j in (0, 1)]
+    pc.target_var_bulk(h.Vector([vsrc(gids[i // 3]) for i in vidx]), pps,
+                       h.Vector(vidx), 'e')
+    midx = [3 * i + 2 for i in range(len(gids))]
+    pc.target_var_bulk(h.Vector([msrc(gids[i // 3]) for i in midx]), pps,
+                       h.Vector(midx), 'e')
+else:
+    for gid in gids:
+        soma, dend, syns = cells[gid][:3]
+        soma.push()
+        pc.source_var(soma(0.5)._ref_v, gid)
+        pc.source_var(soma(0.5)._ref_m_hh, ncell + gid)
+        h.pop_section()
+    for gid in gids:
+        syns = cells[gid][2]
+        for syn in syns[:2]:
+            pc.target_var(syn, syn._ref_e, vsrc(gid))
+    for gid in gids:
+        syn = cells[gid][2][2]
+        pc.target_var(syn, syn._ref_e, msrc(gid))
+pc.setup_transfer()
+pc.set_maxstep(10)
+h.finitialize(-65)
+pc.psolve(20)
+v = pc.py_gather({gid: cells[gid][0](0.5).v for gid in gids}, 0)
+if rank == 0:
+    result = {}
+    for d in v:
+        result.update(d)
+    print(json.dumps({'nhost': nhost, 'v': [result[g] for g in range(ncell)]}))
+pc.barrier()
+pc.done()
+h.quit()
+'''
+
+
+def run(mode, mpi=False):
+    env = dict(os.environ)
+    cmd = [sys.executable, '-c', script, mode]
+    if mpi:
+        env['NEURON_INIT_MPI'] = '1'
+        # allow a local OpenMPI run in a container
+        env.setdefault('OMPI_ALLOW_RUN_AS_ROOT', '1')
+        env.setdefault('OMPI_ALLOW_RUN_AS_ROOT_CONFIRM', '1')
+        env.setdefault('OMPI_MCA_rmaps_base_oversubscribe', '1')
+        cmd = ['mpiexec', '-n', '2'] + cmd
+    out = subprocess.check_output(cmd, env=env, timeout=300)
+    return json.loads(out.decode().strip().splitlines()[-1])
+
+
+def test_partrans_bulk():
+    ref = run('single')
+    assert ref['nhost'] == 1
+    assert len(set(ref['v'])) == len(ref['v'])
+    assert run('bulk') == ref
+
+
+@pytest.mark.skipif(shutil.which('mpiexec') is None, reason='needs mpiexec')
+def test_partrans_bulk_mpi():
+    ref = run('single')
+    result = run('single', mpi=True)
+    if result['nhost'] != 2:
+        pytest.skip('NEURON is not built with MPI')
+    for a, b in zip(result['v'], ref['v']):
+        assert abs(a - b) < 1e-9
+    assert run('bulk', mpi=True) == result
+
+
+def test_partrans_bulk_errors():
+    pc = h.ParallelContext()
+    soma = h.Section(name='soma')
+    soma.insert('hh')
+    syn = h.ExpSyn(soma(0.5))
+    secs, pps = h.List(), h.List()
+    secs.append(h.SectionRef(sec=soma))
+    pps.append(syn)
+    one, zero = h.Vector([1]), h.Vector(1)
+    half = h.Vector(1).fill(0.5)
+    try:
+        assert pc.source_var_bulk(h.Vector([5]), secs, zero, half) == 1
+        # nothing is registered when any item is in error
+        for args in ((h.Vector([6, 5]), secs, h.Vector(2), h.Vector(2)),
+                     (h.Vector([7, 7]), secs, h.Vector(2), h.Vector(2)),
+                     (h.Vector([6]), secs, one, half),
+                     (h.Vector([6]), secs, zero, half, 'gnabar_pas'),
+                     (h.Vector([6]), pps, zero, half)):
+            with pytest.raises(RuntimeError):
+                pc.source_var_bulk(*args)
+        assert pc.source_var_bulk(h.Vector([6, 7]), secs, h.Vector(2),
+                                  h.Vector(2).fill(1), 'ena') == 2
+        for name in ('nonsense', 'g'):
+            with pytest.raises(RuntimeError):
+                pc.target_var_bulk(h.Vector([5]), secs if name == 'g'
+                                   else pps, zero, name)
+        with pytest.raises(RuntimeError):
+            pc.target_var_bulk(h.Vector([5]), pps, one, 'e')
+        assert pc.target_var_bulk(h.Vector([6]), pps, zero, 'e') == 1
+        pc.setup_transfer()
+        h.finitialize(-65)
+        assert syn.e == soma(1).ena
+    finally:
+        pc.gid_clear()
@@ -0,0 +1,75 @@
+import json
+
+import neuron
+from neuron import h
+
+pc = h.ParallelContext()
+
+
+def model():
+    secs = [h.Section(name='prof%d' % i) for i in range(6)]
+    for sec in secs:
+        sec.nseg = 3
+        sec.insert('hh')
+    syn = h.ExpSyn(secs[0](0.5))
+    stim = h.NetStim()
+    stim.number, stim.start = 3, 1
+    nc = h.NetCon(stim, syn, 0, 1, 0.01)
+    return secs, syn, stim, nc
+
+
+def test_profile(tmpdir):
+    h.load_file('stdrun.hoc')
+    m = model()
+    pc.nthread(2)
+    try:
+        assert pc.profile(1) == 0
+        assert pc.profile() == 1
+        h.finitialize(-65)
+        h.continuerun(5)
+        nstep = int(round(5 / h.dt))
+        assert pc.profile(0) == 1
+        r = neuron.profile_report()
+        assert r['nthread'] == 2 and r['mode'] == 0
+        phases = r['phases']
+        assert phases['nrn_solve']['count'] == [nstep, nstep]
+        assert phases['setup_tree_matrix']['total'] > 0
+        assert set(phases) >= {'deliver_net_events', 'update', 'nonvint',
+                               'rxd', 'deliver_events', 'spike_exchange'}
+        hh = r['mechanisms']['hh']
+        assert hh['state']['count'] == [nstep, nstep]
+        assert sorted(hh) == ['cur', 'jacob', 'state']
+        # counted only in the threads with synapses, other tests may have
+        # left some
+        syn_threads = {int(pc.sec_in_thread(sec=syn.get_segment().sec))
+                       for syn in h.List('ExpSyn')}
+        assert int(pc.sec_in_thread(sec=m[0][0])) in syn_threads
+        for ith, count in enumerate(r['mechanisms']['ExpSyn']['cur']['count']):
+            assert (count > 0) == (ith in syn_threads)
+        # no events without mode 2
+        trace = str(tmpdir.join('trace.json'))
+        assert pc.profile_trace(trace) == 0
+
+        # off, nothing more is counted
+        h.continuerun(6)
+        assert neuron.profile_report()['phases']['nrn_solve']['count'] == \
+            [nstep, nstep]
+
+        # a new number of threads starts again
+        pc.profile(2, 100)
+        pc.nthread(1)
+        h.finitialize(-65)
+        h.continuerun(5)
+        pc.profile(0)
+        r = neuron.profile_report()
+        assert r['nthread'] == 1
+        assert r['phases']['nrn_solve']['count'] == [nstep]
+        assert pc.profile_trace(trace) == 100
+        with open(trace) as f:
+            events = json.load(f)['traceEvents']
+        assert len(events) == 100
+        assert {e['cat'] for e in events} == {'phase', 'mechanism'}
+        assert any(e['name'] == 'hh cur' for e in events)
+    finally:
+        pc.profile(0)
+        pc.nthread(1)
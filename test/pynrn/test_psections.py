@@ -0,0 +1,61 @@
+import numpy as np
+
+from neuron import h
+from neuron.psection import psection, psections, model_description
+
+
+def test_psections():
+    soma = h.Section(name='soma')
+    soma.nseg = 3
+    soma.insert('hh')
+    soma.insert('pas')
+    soma(0.5).pas.g = 2e-3
+    dend = h.Section(name='dend')
+    dend.nseg = 2
+    dend.insert('extracellular')
+    dend.connect(soma)
+    dend.pt3dadd(0, 0, 0, 1)
+    dend.pt3dadd(10, 0, 0, 1)
+    stim = h.IClamp(soma(0.5))
+    syns = [h.ExpSyn(dend(1)), h.ExpSyn(soma(0))]
+    secs = [soma, dend]
+
+    ref = [psection(sec) for sec in secs]
+    assert psections(secs) == ref
+
+    d = model_description(secs)
+    assert d['nseg'].tolist() == [3, 2]
+    assert d['seg_offset'].tolist() == [0, 3, 5]
+    hh = d['mechanisms']['hh']
+    assert hh['present'].tolist() == [True] * 3 + [False] * 2
+    assert np.isnan(hh['gnabar_hh'][3:]).all()
+    assert d['mechanisms']['pas']['g_pas'][1] == 2e-3
+    assert d['mechanisms']['extracellular']['vext'].shape == (5, 2)
+    pps = d['point_processes']
+    assert sorted(zip(pps['name'], pps['section'].tolist(), pps['x'].tolist())) \
+        == [('ExpSyn', 0, 0.0), ('ExpSyn', 1, 1.0), ('IClamp', 0, 0.5)]
+
+
+def test_psections_reversed():
+    # b is connected at its 1 end, so its nodes are in reverse x order
+    a = h.Section(name='a')
+    b = h.Section(name='b')
+    b.connect(a(1), 1)
+    b.nseg = 3
+    b.insert('pas')
+    b.insert('extracellular')
+    for i, seg in enumerate(b):
+        seg.diam = 1 + i
+        seg.cm = 2 + i
+        seg.pas.g = 1e-4 * (1 + i)
+        seg.xg[0] = 1 + i
+    secs = [a, b]
+
+    assert psections(secs) == [psection(sec) for sec in secs]
+
+    d = model_description(secs)
+    assert d['diam'][1:].tolist() == [1, 2, 3]
+    assert d['cm'][1:].tolist() == [2, 3, 4]
+    assert d['mechanisms']['pas']['g_pas'][1:].tolist() == \
+        [seg.pas.g for seg in b]
+    assert d['mechanisms']['extracellular']['xg'][1:, 0].tolist() == [1, 2, 3]
@@ -0,0 +1,30 @@
+import json
+import os
+import subprocess
+import sys
+
+# import neuron, then time importing neuron.rxd and then using it
+script = '''
+import json, sys, time
+import neuron
+t0 = time.time()
+from neuron import rxd
+t1 = time.time()
+loaded = sorted(m for m in ['neuron.rxd.rxd', 'neuron.rxd.species',
+                'neuron.rxd.region', 'distutils', 'uuid'] if m in sys.modules)
+rxd.Region
+t2 = time.time()
+print(json.dumps({'import': t1 - t0, 'load': t2 - t1, 'loaded': loaded,
+                  'after': 'neuron.rxd.rxd' in sys.modules}))
+'''
+
+
+def test_rxd_import_is_lazy():
+    """Importing neuron.rxd defers the implementation to its first use"""
+    out = subprocess.check_output([sys.executable, '-c', script],
+                                  env=os.environ)
+    result = json.loads(out.decode().strip().splitlines()[-1])
+    assert result['loaded'] == []
+    assert result['after']
+    # the deferred part is the bulk of the import time
+    assert result['import'] < result['load']
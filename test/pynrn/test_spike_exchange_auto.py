@@ -0,0 +1,95 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from neuron import h
+
+# a ring-ish network of IntFire1 driven by noisy NetStims, spikes and the
+# compressed buffer size of rank 0 after runs with allgather, compressed
+# and automatic selection
+script = '''
+import ctypes
+import json
+from neuron import h, nrn_dll_sym
+pc = h.ParallelContext()
+rank, nhost = int(pc.id()), int(pc.nhost())
+h.CVode().queue_mode(1, 0)  # on the dt grid, compressed loses nothing
+ncell = 100
+cells, stims, ncs = {}, [], []
+for gid in range(rank, ncell, nhost):
+    cells[gid] = c = h.IntFire1()
+    c.tau, c.refrac = 5, 2
+    pc.set_gid2node(gid, rank)
+    pc.cell(gid, h.NetCon(c, None))
+    s = h.NetStim()
+    s.interval, s.number, s.start, s.noise = 10, 1e9, 0, 1
+    s.noiseFromRandom123(gid, 0, 0)
+    stims.append((s, h.NetCon(s, c, 0, 0, 0.5)))
+    for j in (1, 7, 31):
+        ncs.append(pc.gid_connect((gid + j) % ncell, c))
+        ncs[-1].delay, ncs[-1].weight[0] = 1 + 0.1 * j, 0.3
+
+def run():
+    tv, idv = h.Vector(), h.Vector()
+    pc.spike_record(-1, tv, idv)
+    pc.set_maxstep(10)
+    h.finitialize(-65)
+    pc.psolve(200)
+    return sorted(zip(tv.to_python(), idv.to_python()))
+
+result = {'nhost': nhost, 'allgather': run()}
+pc.spike_compress(10)
+result['compressed'] = run()
+pc.spike_compress(0)
+result['ninterval'] = pc.spike_exchange_auto(20)
+result['auto'] = [run(), run()]
+result['nspike'] = pc.spike_compress(-1)
+# the trials keep the gid_compress of the user
+pc.spike_compress(10, 0)
+result['auto_nogid'] = run()
+result['localgid'] = nrn_dll_sym('nrn_use_localgid_', ctypes.c_bool).value
+pc.spike_exchange_auto(0)
+pc.barrier()
+if rank == 0:
+    print(json.dumps(result))
+pc.done()
+h.quit()
+'''
+
+
+def test_spike_exchange_auto_one_rank():
+    pc = h.ParallelContext()
+    if pc.nhost() == 1:
+        # nothing to exchange
+        assert pc.spike_exchange_auto(10) == 0
+        assert pc.spike_exchange_auto() == 0
+
+
+@pytest.mark.skipif(shutil.which('mpiexec') is None, reason='needs mpiexec')
+def test_spike_exchange_auto_mpi():
+    env = dict(os.environ, NEURON_INIT_MPI='1')
+    # allow a local OpenMPI run in a container
+    env.setdefault('OMPI_ALLOW_RUN_AS_ROOT', '1')
+    env.setdefault('OMPI_ALLOW_RUN_AS_ROOT_CONFIRM', '1')
+    env.setdefault('OMPI_MCA_rmaps_base_oversubscribe', '1')
+    out = subprocess.check_output(['mpiexec', '-n', '2', sys.executable,
+                                   '-c', script], env=env, timeout=300)
+    lines = out.decode().strip().splitlines()
+    result = json.loads(lines[-1])
+    if result['nhost'] != 2:
+        pytest.skip('NEURON is not built with MPI')
+    ref = result['allgather']
+    assert len(ref) > 50
+    assert result['compressed'] == ref
+    assert result['ninterval'] == 20
+    assert result['auto'] == [ref, ref]
+    assert result['nspike'] >= 0
+    assert result['auto_nogid'] == ref
+    assert not result['localgid']
+    # the decision is reported for each run
+    assert sum('spike_exchange_auto:' in s and 'using' in s
+               for s in lines) == 3
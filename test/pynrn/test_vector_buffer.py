@@ -0,0 +1,82 @@
+import array
+import gc
+
+import numpy as np
+
+from neuron import h
+
+
+def test_vector_buffer():
+    v = h.Vector([1, 2, 3])
+    m = memoryview(v)
+    assert m.format == 'd' and m.shape == (3,) and not m.readonly
+    a = np.asarray(v)
+    assert a.dtype == np.float64
+    # shared, not copied
+    a[1] = 5
+    assert v[1] == 5
+    m[2] = 7
+    assert v[2] == 7
+    assert len(memoryview(h.Vector())) == 0
+
+
+def test_vector_buffer_lifetime():
+    a = np.asarray(h.Vector([4, 5, 6]))
+    gc.collect()
+    h.Vector(1000, 0)
+    assert a.tolist() == [4, 5, 6]
+
+
+def test_vector_buffer_exported():
+    v = h.Vector([1, 2, 3])
+    a = np.asarray(v)
+    m = memoryview(v)
+    # the buffers keep the data they were given when the Vector moves
+    v.resize(1000)
+    v.fill(2)
+    assert a.tolist() == [1, 2, 3] and m.tolist() == [1, 2, 3]
+    a[0] = 5
+    assert v[0] == 2
+    b = np.asarray(v)
+    v.buffer_size(2000)
+    v.append(4)
+    v.where(v, '>', 3)
+    assert v.to_python() == [4] and b[0] == 2 and b.size == 1000
+    del a, b
+    m.release()
+    assert v.to_python() == [4]
+
+
+def test_vector_buffer_record():
+    """a recording Vector can be used with an exported buffer"""
+    soma = h.Section(name='soma')
+    v = h.Vector()
+    a = np.asarray(v)
+    v.record(soma(0.5)._ref_v)
+    h.finitialize(-65)
+    h.fadvance()
+    assert v.to_python() == [-65.0, soma(0.5).v]
+    assert a.size == 0
+    a = np.asarray(v)
+    # the data space is kept when the Vector gets smaller
+    h.finitialize(-60)
+    assert v.to_python() == [-60.0] and a[0] == -60.0 and a.size == 2
+    del a
+
+
+def test_vector_from_buffer():
+    a = np.linspace(0, 1, 11)
+    assert h.Vector(a).to_python() == a.tolist()
+    v = h.Vector()
+    v.from_python(a[::2])
+    assert v.to_python() == a[::2].tolist()
+    for dtype in [np.float32, np.int8, np.uint8, np.int16, np.int32,
+                  np.int64, np.uint64, bool]:
+        b = np.array([0, 1, 2, 1], dtype=dtype)
+        assert h.Vector(b).to_python() == b.astype(float).tolist()
+    assert h.Vector(array.array('i', [3, 4])).to_python() == [3, 4]
+    # 2d and sequences take the old paths
+    assert h.Vector([1, 2]).to_python() == [1, 2]
+    v = h.Vector([1, 2, 3])
+    v.from_python(np.asarray(v))
+    assert v.to_python() == [1, 2, 3]
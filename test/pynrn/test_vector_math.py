@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from neuron import h
+
+
+def test_vector_operators():
+    v = h.Vector([1, 2, 4])
+    w = h.Vector([2, 2, 2])
+    assert list(v + w) == [3, 4, 6]
+    assert list(v - w) == [-1, 0, 2]
+    assert list(v * w) == [2, 4, 8]
+    assert list(v / w) == [0.5, 1, 2]
+    assert list(v + 1) == [2, 3, 5]
+    assert list(1 + v) == [2, 3, 5]
+    assert list(10 - v) == [9, 8, 6]
+    assert list(2 * v) == [2, 4, 8]
+    assert list(4 / v) == [4, 2, 1]
+    assert list(-v) == [-1, -2, -4]
+    assert list(abs(-v)) == [1, 2, 4]
+    p = +v
+    assert list(p) == list(v) and p is not v
+    # operands are unchanged
+    assert list(v) == [1, 2, 4] and list(w) == [2, 2, 2]
+    with pytest.raises(ValueError):
+        v + h.Vector(2)
+    with pytest.raises(TypeError):
+        v + 'a'
+
+
+def test_vector_inplace():
+    v = h.Vector([1, 2, 4])
+    u = v
+    v += 1
+    v *= 2
+    v -= h.Vector([1, 1, 1])
+    v /= 2
+    assert u is v
+    assert list(u) == [1.5, 2.5, 4.5]
+
+
+def test_vector_numpy():
+    v = h.Vector([1, 2, 4])
+    a = np.array([1., 1., 2.])
+    r = v + a
+    assert type(r) is type(v)
+    assert list(r) == [2, 3, 6]
+    v *= a
+    assert list(v) == [1, 2, 8]
+    assert list(v / np.float64(2)) == [0.5, 1, 4]
+    # other dtypes and shapes are left to numpy
+    r = v + np.array([1, 1, 1])
+    assert isinstance(r, np.ndarray) and list(r) == [2, 3, 9]
+    with pytest.raises(ValueError):
+        v + np.zeros(2)
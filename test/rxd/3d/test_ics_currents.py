@@ -64,3 +64,15 @@ def test_ics_currents_cvode(ics_example):
 
     max_err = compare_data(data)
     assert max_err < tol
+
+
+def test_ics_currents_threaded(ics_example):
+    """Test ics_example with fixed step methods and multiple rxd threads"""
+
+    (h, rxd, data), model = ics_example
+    rxd.nthread(2)
+    h.finitialize(-65)
+    h.continuerun(100)
+
+    max_err = compare_data(data, 'ics_currents')
+    assert max_err < tol
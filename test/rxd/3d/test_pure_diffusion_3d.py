@@ -94,3 +94,25 @@ def test_pure_diffusion_3d_inhom_cvode(ics_pure_diffusion):
     assert loss < tol
     max_err = compare_data(data)
     assert max_err < tol
+
+
+def test_pure_diffusion_3d_cvode_krylov(ics_pure_diffusion):
+    """Test ics_pure_diffusion with variable step methods using the ADI
+       preconditioned Krylov linear solver.
+    """
+    neuron_instance, model = ics_pure_diffusion
+    h, rxd, data = neuron_instance
+    dend, r, ca = model
+    rxd.options.variable_step_3d_solver = 'krylov'
+    h.CVode().active(True)
+    h.finitialize(-65)
+    rxd.variable_step_statistics(reset=True)
+    loss = -(numpy.array(ca.nodes.concentration) * numpy.array(ca.nodes.volume)).sum()
+    h.continuerun(125)
+    loss += (numpy.array(ca.nodes.concentration) * numpy.array(ca.nodes.volume)).sum()
+    stats = rxd.variable_step_statistics()
+    assert loss < tol
+    assert 0 < stats['rhs'] < 100
+    assert stats['iterations'] >= stats['solves']
+    max_err = compare_data(data, 'pure_diffusion_3d_cvode')
+    assert max_err < 1e-3
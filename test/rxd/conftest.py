@@ -77,4 +77,11 @@ def neuron_instance(neuron_import):
     rxd.rxd._curr_indices = None
     rxd.rxd._zero_volume_indices = numpy.ndarray(0, dtype=numpy.int_)
     rxd.set_solve_type(dimension=1)
+    rxd.set_solve_type(method='deterministic')
+    rxd.options.variable_step_3d_solver = 'adi'
+    # an Extracellular region replaces the rxd setup callbacks
+    rxd.rxd.set_setup(rxd.rxd.do_setup_fptr)
+    rxd.rxd.set_initialize(rxd.rxd.do_initialize_fptr)
+    rxd.species._extracellular_exists = False
+    rxd.nthread(1)
     cvode.extra_scatter_gather_remove(gather)
@@ -121,6 +121,36 @@ def test_ecs_example_cvode(ecs_example):
     max_err = compare_data(data)
     assert max_err < tol
 
+def test_ecs_example_threaded(ecs_example):
+    """Test ecs_example with fixed step methods and multiple rxd threads"""
+
+    (h, rxd, data), make_model = ecs_example
+    model = make_model(0.2, 1.6)
+    rxd.nthread(2)
+    h.finitialize(-65)
+    h.continuerun(1000)
+
+    max_err = compare_data(data, 'ecs_example')
+    assert max_err < tol
+
+
+def test_ecs_example_nthread_shrink(ecs_example):
+    """Test ecs_example after the rxd thread pool shrinks and is reused"""
+
+    (h, rxd, data), make_model = ecs_example
+    model = make_model(0.2, 1.6)
+    rxd.nthread(3)
+    h.finitialize(-65)
+    rxd.nthread(1)
+    h.finitialize(-65)
+    rxd.nthread(2)
+    h.finitialize(-65)
+    h.continuerun(1000)
+
+    max_err = compare_data(data, 'ecs_example')
+    assert max_err < tol
+
+
 def test_ecs_example_alpha(ecs_example):
     """Test ecs_example with fixed step and inhomogeneous volume fraction methods"""
 
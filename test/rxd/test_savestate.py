@@ -0,0 +1,237 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import numpy
+import pytest
+
+
+@pytest.fixture
+def rxd_model(neuron_instance):
+    """A 1D species with an ion and an extracellular species"""
+
+    h, rxd, data = neuron_instance
+    dend = h.Section()
+    dend.nseg = 11
+    dend.L = 100
+    cyt = rxd.Region([dend], nrn_region='i')
+    ca = rxd.Species(cyt, name='ca', d=1, charge=2,
+                     initial=lambda nd: 1 if nd.x < 0.3 else 0)
+    ecs = rxd.Extracellular(-20, -20, -20, 120, 20, 20, dx=10)
+    k = rxd.Species(ecs, name='k', d=1, charge=1,
+                    initial=lambda nd: 1 if nd.x3d < 10 else 0)
+
+    def advance(n):
+        # advance directly, continuerun is stopped by the data collection
+        for i in range(n):
+            h.fadvance()
+        return (numpy.array(ca.nodes.concentration),
+                numpy.array(k[ecs].states3d), dend(0.1).cai)
+
+    yield (neuron_instance, advance, ca, k, ecs)
+
+
+def test_savestate_rxd(rxd_model, tmpdir):
+    """SaveState restores the rxd states from a file"""
+
+    neuron_instance, advance, ca, k, ecs = rxd_model
+    h, rxd, data = neuron_instance
+    h.finitialize(-65)
+    advance(100)
+    ss = h.SaveState()
+    ss.save()
+    ss.fwrite(h.File(str(tmpdir.join('state.dat'))))
+    ref = advance(100)
+
+    ss = h.SaveState()
+    ss.fread(h.File(str(tmpdir.join('state.dat'))))
+    h.finitialize(-65)
+    ss.restore()
+    result = advance(100)
+    assert numpy.array_equal(ref[0], result[0])
+    assert numpy.array_equal(ref[1], result[1])
+    assert ref[2] == result[2]
+
+
+def test_save_state_mmap(rxd_model, tmpdir):
+    """rxd.restore_state accepts a blob or memory-maps a file"""
+
+    neuron_instance, advance, ca, k, ecs = rxd_model
+    h, rxd, data = neuron_instance
+    h.finitialize(-65)
+    saved = advance(100)
+    blob = rxd.save_state()
+    rxd.save_state(str(tmpdir.join('rxd.dat')))
+
+    for state in [blob, str(tmpdir.join('rxd.dat'))]:
+        h.finitialize(-65)
+        rxd.restore_state(state)
+        restored = advance(0)
+        assert numpy.array_equal(restored[0], saved[0])
+        assert numpy.array_equal(restored[1], saved[1])
+        assert restored[2] == saved[2]
+
+    with pytest.raises(rxd.RxDException):
+        rxd.restore_state(blob[:-8])
+    with pytest.raises(rxd.RxDException):
+        rxd.restore_state(b'\0' * 64)
+
+
+def test_savestate_stochastic(neuron_instance):
+    """The random streams continue from the restored state"""
+
+    h, rxd, data = neuron_instance
+    dend = h.Section()
+    dend.nseg = 11
+    r = rxd.Region([dend])
+    a = rxd.Species(r, name='a', initial=0.01)
+    decay = rxd.Rate(a, -0.1 * a)
+    rxd.set_solve_type(method='stochastic')
+    h.finitialize(-65)
+    for i in range(40):
+        h.fadvance()
+    ss = h.SaveState()
+    ss.save()
+    for i in range(40):
+        h.fadvance()
+    ref = numpy.array(a.nodes.concentration)
+    h.finitialize(-65)
+    ss.restore()
+    for i in range(40):
+        h.fadvance()
+    assert numpy.array_equal(ref, a.nodes.concentration)
+
+
+def test_bbsavestate_rxd(neuron_instance, tmpdir):
+    """BBSaveState restores the rxd states, a file without them leaves the
+    rxd states unchanged"""
+
+    h, rxd, data = neuron_instance
+    pc = h.ParallelContext()
+    h('''
+    begintemplate RxDBBSSCell
+    public soma
+    create soma
+    endtemplate RxDBBSSCell
+    ''')
+    cell = h.RxDBBSSCell()
+    cell.soma.nseg = 11
+    cell.soma.L = 100
+    cyt = rxd.Region([cell.soma], nrn_region='i')
+    ca = rxd.Species(cyt, name='ca', d=1, charge=2,
+                     initial=lambda nd: 1 if nd.x < 0.3 else 0)
+    path = str(tmpdir.join('bin'))
+    try:
+        pc.set_gid2node(0, pc.id())
+        pc.cell(0, h.NetCon(cell.soma(0.5)._ref_v, None, sec=cell.soma))
+        h.finitialize(-65)
+        for i in range(100):
+            h.fadvance()
+        h.BBSaveState().save_bin(path)
+        saved = numpy.array(ca.nodes.concentration)
+        for i in range(100):
+            h.fadvance()
+        h.finitialize(-65)
+        h.BBSaveState().restore_bin(path)
+        assert numpy.array_equal(ca.nodes.concentration, saved)
+
+        # the global part of a file written without rxd states is only t
+        with open(os.path.join(path, 'global'), 'rb') as f:
+            hdr = numpy.frombuffer(f.read(20), dtype=numpy.int32).copy()
+        hdr[4] = 8
+        with open(os.path.join(path, 'global'), 'wb') as f:
+            f.write(hdr.tobytes() + numpy.array([2.5]).tobytes())
+        h.finitialize(-65)
+        initial = numpy.array(ca.nodes.concentration)
+        h.BBSaveState().restore_bin(path)
+        assert h.t == 2.5
+        assert numpy.array_equal(ca.nodes.concentration, initial)
+    finally:
+        pc.gid_clear()
+
+
+# a cell with a different rxd state on each rank, saved with BBSaveState
+# and restored after running on, prints whether every rank got its own
+# states back
+bbss_mpi_script = '''
+import json
+import sys
+from neuron import h, rxd
+pc = h.ParallelContext()
+rank, nhost = int(pc.id()), int(pc.nhost())
+h(\'\'\'
+begintemplate RxDBBSSCell
+public soma
+create soma
+endtemplate RxDBBSSCell
+\'\'\')
+cell = h.RxDBBSSCell()
+cell.soma.nseg = 11
+cell.soma.L = 100
+cyt = rxd.Region([cell.soma], nrn_region='i')
+ca = rxd.Species(cyt, name='ca', d=1, charge=2,
+                 initial=lambda nd: rank + 1 if nd.x < 0.3 else 0)
+pc.set_gid2node(rank, rank)
+pc.cell(rank, h.NetCon(cell.soma(0.5)._ref_v, None, sec=cell.soma))
+h.finitialize(-65)
+for i in range(100):
+    h.fadvance()
+h.BBSaveState().save_bin(sys.argv[-1])
+saved = list(ca.nodes.concentration)
+for i in range(100):
+    h.fadvance()
+h.finitialize(-65)
+h.BBSaveState().restore_bin(sys.argv[-1])
+ok = pc.py_allgather(list(ca.nodes.concentration) == saved)
+maxima = pc.py_allgather(max(saved))
+pc.barrier()
+if rank == 0:
+    print(json.dumps({'nhost': nhost, 'ok': ok, 'max': maxima}))
+pc.done()
+h.quit()
+'''
+
+
+@pytest.mark.skipif(shutil.which('mpiexec') is None, reason='needs mpiexec')
+def test_bbsavestate_rxd_mpi(neuron_instance, tmpdir):
+    """BBSaveState saves the rxd states of each rank and restores them with
+    the same number of ranks"""
+
+    h, rxd, data = neuron_instance
+    path = str(tmpdir.join('bin'))
+    env = dict(os.environ, NEURON_INIT_MPI='1')
+    # allow a local OpenMPI run in a container
+    env.setdefault('OMPI_ALLOW_RUN_AS_ROOT', '1')
+    env.setdefault('OMPI_ALLOW_RUN_AS_ROOT_CONFIRM', '1')
+    env.setdefault('OMPI_MCA_rmaps_base_oversubscribe', '1')
+    out = subprocess.check_output(['mpiexec', '-n', '2', sys.executable,
+                                   '-c', bbss_mpi_script, path],
+                                  env=env, timeout=300)
+    result = json.loads(out.decode().strip().splitlines()[-1])
+    if result['nhost'] != 2:
+        pytest.skip('NEURON is not built with MPI')
+    assert result['ok'] == [True, True]
+    # the ranks had different states
+    assert result['max'][0] < result['max'][1]
+
+    # one host cannot restore the rxd states of two
+    pc = h.ParallelContext()
+    h('''
+    begintemplate RxDBBSSCell
+    public soma
+    create soma
+    endtemplate RxDBBSSCell
+    ''')
+    cell = h.RxDBBSSCell()
+    cyt = rxd.Region([cell.soma], nrn_region='i')
+    ca = rxd.Species(cyt, name='ca', d=1, charge=2)
+    try:
+        pc.set_gid2node(0, pc.id())
+        pc.cell(0, h.NetCon(cell.soma(0.5)._ref_v, None, sec=cell.soma))
+        h.finitialize(-65)
+        with pytest.raises(RuntimeError):
+            h.BBSaveState().restore_bin(path)
+    finally:
+        pc.gid_clear()
@@ -0,0 +1,105 @@
+import numpy
+import pytest
+
+from neuron.rxd.generalizedReaction import molecules_per_mM_um3
+
+
+@pytest.fixture
+def degradation(neuron_instance):
+    """A -> B in 101 segments without diffusion, solved stochastically"""
+
+    h, rxd, data = neuron_instance
+    dend = h.Section()
+    dend.diam = 1
+    dend.nseg = 101
+    dend.L = 101
+    r = rxd.Region([dend])
+    a = rxd.Species(r, name='a', initial=0.01)
+    b = rxd.Species(r, name='b', initial=0)
+    decay = rxd.Reaction(a, b, 0.1)
+    rxd.set_solve_type(method='stochastic')
+
+    def run(globalindex=1, tstop=10):
+        h.Random().Random123_globalindex(globalindex)
+        h.finitialize(-65)
+        # advance directly, continuerun is stopped by the data collection
+        while h.t < tstop - h.dt / 2:
+            h.fadvance()
+        return numpy.array(a.nodes.concentration), numpy.array(b.nodes.concentration)
+
+    yield (neuron_instance, run, a, b, decay)
+
+
+def test_stochastic_degradation(degradation):
+    """The molecules are conserved, change by whole numbers and decay on
+    average at the deterministic rate"""
+
+    neuron_instance, run, a, b, decay = degradation
+    ca, cb = run()
+    molecules = numpy.array(a.nodes.volume) * molecules_per_mM_um3
+    fired = cb * molecules
+    assert numpy.allclose(fired, numpy.round(fired), atol=1e-6)
+    assert numpy.allclose(ca + cb, 0.01)
+    assert abs(ca.mean() / 0.01 - numpy.exp(-1)) < 0.05
+    # the segments are independent
+    assert len(set(numpy.round(fired))) > 1
+
+
+def test_stochastic_reproducible(degradation):
+    """Runs with the same Random123 global index are identical"""
+
+    neuron_instance, run, a, b, decay = degradation
+    ca1, cb1 = run(1)
+    ca2, cb2 = run(1)
+    ca3, cb3 = run(2)
+    assert numpy.array_equal(ca1, ca2)
+    assert not numpy.array_equal(ca1, ca3)
+
+
+def test_stochastic_threads(degradation):
+    """The result does not depend on the number of threads"""
+
+    neuron_instance, run, a, b, decay = degradation
+    h, rxd, data = neuron_instance
+    ca1, cb1 = run()
+    rxd.nthread(3)
+    ca2, cb2 = run()
+    assert numpy.array_equal(ca1, ca2)
+
+
+def test_stochastic_ecs(neuron_instance):
+    """Extracellular decay is stochastic in each voxel"""
+
+    h, rxd, data = neuron_instance
+    ecs = rxd.Extracellular(-25, -25, -25, 25, 25, 25, dx=5,
+                            volume_fraction=0.2, tortuosity=1.6)
+    k = rxd.Species(ecs, name='k', charge=1, d=0, initial=0.01)
+    decay = rxd.Rate(k, -0.1 * k)
+    rxd.set_solve_type(method='stochastic')
+    h.finitialize(-65)
+    while h.t < 10 - h.dt / 2:
+        h.fadvance()
+    conc = numpy.array(k[ecs].states3d).flatten()
+    molecules = 5 ** 3 * 0.2 * molecules_per_mM_um3
+    fired = (0.01 - conc) * molecules
+    assert numpy.allclose(fired, numpy.round(fired), atol=1e-6)
+    assert abs(conc.mean() / 0.01 - numpy.exp(-1)) < 0.05
+    assert len(set(numpy.round(fired))) > 1
+
+
+def test_stochastic_options(neuron_instance):
+    """The method must be set for every section and requires fixed step"""
+
+    h, rxd, data = neuron_instance
+    dend = h.Section()
+    r = rxd.Region([dend])
+    a = rxd.Species(r, initial=1)
+    with pytest.raises(rxd.RxDException):
+        rxd.set_solve_type(method='gillespie')
+    with pytest.raises(rxd.RxDException):
+        rxd.set_solve_type(dend, method='stochastic')
+    rxd.set_solve_type(method='stochastic')
+    h.CVode().active(True)
+    # the RxDException is raised in a callback from hoc
+    with pytest.raises(RuntimeError):
+        h.finitialize(-65)
@@ -9,14 +9,18 @@ tol = 1e-10
 dt_eps = 1e-20
 
 
-def get_correct_data_for_test():
-    """returns a path to the file with the correct data for a test."""
+def get_correct_data_for_test(name=None):
+    """returns a path to the file with the correct data for a test.
 
-    curframe = inspect.currentframe()
-    calframe = inspect.getouterframes(curframe, 3)
-    testfunc_name = calframe[2][3]
-    assert testfunc_name.startswith('test_')
-    data_filename = testfunc_name[5:] + '.dat'
+    name -- the correct data to use, by default the name of the test"""
+
+    if name is None:
+        curframe = inspect.currentframe()
+        calframe = inspect.getouterframes(curframe, 3)
+        testfunc_name = calframe[2][3]
+        assert testfunc_name.startswith('test_')
+        name = testfunc_name[5:]
+    data_filename = name + '.dat'
     basepath = os.path.dirname(os.path.abspath(__file__))
     return os.path.join(basepath, 'correct_data', data_filename)
 
@@ -57,11 +61,11 @@ def collect_data(h, rxd, data, num_record=10):
         data['rlen'] = len(local_data)
 
 
-def compare_data(data):
+def compare_data(data, name=None):
     """compares the test data with the correct data"""
 
     rlen = data['rlen']
-    corr_dat = numpy.fromfile(get_correct_data_for_test()).reshape(-1, rlen)
+    corr_dat = numpy.fromfile(get_correct_data_for_test(name)).reshape(-1, rlen)
     tst_dat = numpy.array(data['data']).reshape(-1, rlen)
     t1 = corr_dat[:, 0]
     t2 = tst_dat[:, 0]